@@ -9,60 +9,62 @@ import akshare as ak
 import warnings
 import time
 import json
+import itertools
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
 warnings.filterwarnings('ignore')
 
+try:
+    from analysis.stock_universe import get_stock_universe
+except ImportError:
+    from src.analysis.stock_universe import get_stock_universe
+
+try:
+    from analysis.rate_limiter import limit_akshare
+    from analysis.client_registry import get_client_registry
+    from analysis.topk import TopKCollector, order_by_bound, iter_contenders
+    from analysis.fundamentals_store import get_fundamentals_store
+except ImportError:
+    from src.analysis.rate_limiter import limit_akshare
+    from src.analysis.client_registry import get_client_registry
+    from src.analysis.topk import TopKCollector, order_by_bound, iter_contenders
+    from src.analysis.fundamentals_store import get_fundamentals_store
+
+# 所有AkShare调用经过统一限流
+ak = limit_akshare(ak)
+
 class AdvancedStrategyEngine:
     """高级策略引擎"""
     
+    # 合格分数线
+    QUALIFIED_SCORE = 60
+    
+    # calculate_strategy_score 各评分项在参数存在时的最高得分（含超额奖励）
+    SCORE_ITEM_MAX = (
+        (('pe_min', 'pe_max'), 20),
+        (('pb_min', 'pb_max'), 15),
+        (('roe_min',), 25),
+        (('market_cap_min',), 10),
+        (('revenue_growth_min',), 25),
+        (('debt_ratio_max',), 10),
+        (('current_ratio_min',), 10),
+    )
+    
+    # 从全市场财务指标表关联的字段
+    FINANCIAL_FIELDS = ('roe', 'revenue_growth', 'profit_growth', 'debt_ratio', 'current_ratio')
+    
+    # Top-K 模式每轮提交给线程池的股票数，每轮结束后按新的第K名评分重新判断剩余股票
+    TOPK_WAVE_SIZE = 12
+    
     def __init__(self):
         """初始化高级策略引擎"""
-        self.tushare_available = True
-        self.akshare_available = True
-        
-        # 初始化TuShare
-        try:
-            import tushare as ts
-            # 修复配置文件路径问题
-            try:
-                import os
-                project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-                config_file = os.path.join(project_root, 'config', 'tushare_config.json')
-                
-                print(f"🔍 查找TuShare配置文件: {config_file}")
-                print(f"📁 配置文件是否存在: {os.path.exists(config_file)}")
-                
-                if os.path.exists(config_file):
-                    with open(config_file, 'r', encoding='utf-8') as f:
-                        config = json.load(f)
-                        token = config.get('token')
-                        if token:
-                            ts.set_token(token)
-                            self.tushare_pro = ts.pro_api()
-                            print("✅ TuShare Pro API初始化成功")
-                        else:
-                            self.tushare_available = False
-                            print("⚠️ TuShare Token未配置")
-                else:
-                    self.tushare_available = False
-                    print("⚠️ TuShare配置文件未找到")
-            except UnicodeDecodeError as e:
-                self.tushare_available = False
-                print(f"❌ TuShare配置文件编码错误: {e}")
-                print("提示: 请确保config/tushare_config.json文件为UTF-8编码")
-            except json.JSONDecodeError as e:
-                self.tushare_available = False
-                print(f"❌ TuShare配置文件JSON格式错误: {e}")
-                print("提示: 请检查JSON文件格式是否正确")
-            except Exception as e:
-                self.tushare_available = False
-                print(f"❌ TuShare配置失败: {e}")
-        except ImportError:
-            self.tushare_available = False
-            print("⚠️ TuShare未安装")
+        # 从共享注册表获取数据源（客户端延迟创建、进程内共享，健康检查在后台进行）
+        registry = get_client_registry()
+        self.tushare_pro = registry.tushare()
+        self.tushare_available = registry.tushare_available
+        self.akshare_available = registry.akshare_available
         
         print(f"📊 数据源状态: TuShare={self.tushare_available}, AkShare={self.akshare_available}")
     
@@ -76,69 +78,24 @@ class AdvancedStrategyEngine:
         stocks = []
         
         try:
-            # 方法1：AkShare获取基础信息
-            if self.akshare_available:
-                try:
-                    stock_info = ak.stock_zh_a_spot_em()
-                    if stock_info is not None and len(stock_info) > 0:
-                        for _, row in stock_info.iterrows():
-                            code = str(row.get('代码', '')).zfill(6)
-                            name = str(row.get('名称', ''))
-                            market_cap = float(row.get('总市值', 0)) / 100000000  # 转换为亿元
-                            
-                            if len(code) == 6 and code.isdigit() and market_cap >= min_market_cap:
-                                # 确定交易所
-                                if code.startswith('6'):
-                                    exchange = 'SH'
-                                elif code.startswith(('0', '3')):
-                                    exchange = 'SZ'
-                                elif code.startswith('8'):
-                                    exchange = 'BJ'
-                                else:
-                                    continue
-                                
-                                stocks.append({
-                                    'code': code,
-                                    'name': name,
-                                    'exchange': exchange,
-                                    'market_cap': market_cap,
-                                    'data_source': 'akshare'
-                                })
-                        
-                        print(f"✅ AkShare获取到 {len(stocks)} 只股票")
-                except Exception as e:
-                    print(f"⚠️ AkShare获取股票列表失败: {e}")
+            # 从共享股票池读取（每个交易日只下载一次）
+            frame = get_stock_universe().get_frame(
+                pro=self.tushare_pro if self.tushare_available else None,
+                use_akshare=self.akshare_available
+            )
             
-            # 方法2：TuShare补充信息
-            if self.tushare_available and len(stocks) < 1000:
-                try:
-                    stock_basic = self.tushare_pro.stock_basic(
-                        exchange='',
-                        list_status='L',
-                        fields='ts_code,symbol,name,area,industry,market,list_date'
-                    )
-                    
-                    if stock_basic is not None and len(stock_basic) > 0:
-                        existing_codes = {s['code'] for s in stocks}
-                        
-                        for _, row in stock_basic.iterrows():
-                            ts_code = row['ts_code']
-                            code = row['symbol']
-                            name = row['name']
-                            market = row['market']
-                            
-                            if code not in existing_codes:
-                                stocks.append({
-                                    'code': code,
-                                    'name': name,
-                                    'exchange': 'SH' if market == '主板' and code.startswith('6') else 'SZ',
-                                    'market_cap': 0,  # 需要后续获取
-                                    'data_source': 'tushare'
-                                })
-                        
-                        print(f"✅ TuShare补充股票信息")
-                except Exception as e:
-                    print(f"⚠️ TuShare获取股票基础信息失败: {e}")
+            if len(frame) > 0:
+                market_cap = frame['market_cap']
+                mask = (market_cap >= min_market_cap).to_numpy()
+                # 市值数据不足时补充没有实时行情的股票（市值待后续获取）
+                if mask.sum() < 1000:
+                    mask |= market_cap.isna().to_numpy()
+                
+                selected = frame.loc[mask, ['code', 'name', 'market', 'market_cap', 'data_source']]
+                selected = selected.rename(columns={'market': 'exchange'})
+                selected['market_cap'] = selected['market_cap'].fillna(0)
+                stocks = selected.to_dict('records')
+                print(f"✅ 股票池筛选后 {len(stocks)} 只股票")
         
         except Exception as e:
             print(f"❌ 获取股票池失败: {e}")
@@ -166,6 +123,15 @@ class AdvancedStrategyEngine:
         }
         
         try:
+            # 财务指标来自按报告期整表下载的全市场表（本地缓存），不再逐只调用 fina_indicator
+            try:
+                financials = get_fundamentals_store().get(stock_code, pro=self.tushare_pro)
+                for key in self.FINANCIAL_FIELDS:
+                    if key in financials:
+                        fundamental_data[key] = financials[key]
+            except Exception as e:
+                print(f"⚠️ {stock_code} 财务指标获取失败: {e}")
+            
             # 方法1：AkShare获取
             if self.akshare_available:
                 try:
@@ -211,22 +177,6 @@ class AdvancedStrategyEngine:
                         if pd.notna(latest['pb']):
                             fundamental_data['pb'] = float(latest['pb'])
                     
-                    # 获取财务指标
-                    fina_indicator = self.tushare_pro.fina_indicator(
-                        ts_code=ts_code,
-                        period=datetime.now().strftime('%Y%m%d'),
-                        fields='ts_code,end_date,roe,debt_to_assets,current_ratio'
-                    )
-                    
-                    if fina_indicator is not None and len(fina_indicator) > 0:
-                        latest = fina_indicator.iloc[0]
-                        if pd.notna(latest['roe']):
-                            fundamental_data['roe'] = float(latest['roe'])
-                        if pd.notna(latest['debt_to_assets']):
-                            fundamental_data['debt_ratio'] = float(latest['debt_to_assets'])
-                        if pd.notna(latest['current_ratio']):
-                            fundamental_data['current_ratio'] = float(latest['current_ratio'])
-                    
                     fundamental_data['data_source'] = 'tushare'
                     print(f"✅ TuShare获取 {stock_code} 基本面数据成功")
                     
@@ -324,13 +274,25 @@ class AdvancedStrategyEngine:
         
         return max(0, min(score, max_score))
     
+    def score_upper_bound(self, strategy_params: Dict) -> float:
+        """
+        calculate_strategy_score 在给定策略参数下可能达到的最高评分
+        基本面数据逐只获取前未知，按每个评分项都拿到最高分计算，对所有股票相同
+        :param strategy_params: 策略参数
+        :return: 评分上界(0-100)
+        """
+        bound = sum(points for keys, points in self.SCORE_ITEM_MAX
+                    if all(key in strategy_params for key in keys))
+        return float(min(bound, 100))
+    
     def execute_advanced_strategy(self, strategy_id: str, strategy_params: Dict, 
-                                max_stocks: int = 100) -> Dict:
+                                max_stocks: int = 100, top_k: Optional[int] = None) -> Dict:
         """
         执行高级策略分析
         :param strategy_id: 策略ID
         :param strategy_params: 策略参数
         :param max_stocks: 最大分析股票数
+        :param top_k: 只需要前K名时传入；按评分上界分批分析，剩余股票都进不了前K名时提前结束
         :return: 分析结果
         """
         print(f"🚀 开始执行高级策略: {strategy_id}")
@@ -361,44 +323,72 @@ class AdvancedStrategyEngine:
             
             qualified_stocks = []
             successful_analyses = 0
+            analyzed_count = 0
+            
+            # Top-K 模式分批提交，上界进不了前K名的股票不再分析；否则一次提交全部股票
+            collector = TopKCollector(top_k, floor=self.QUALIFIED_SCORE) if top_k else None
+            if collector is not None:
+                bound = self.score_upper_bound(strategy_params)
+                ranked = order_by_bound(stocks_to_analyze, [bound] * len(stocks_to_analyze))
+                pending = iter_contenders(ranked, collector)
+                wave_size = self.TOPK_WAVE_SIZE
+                print(f"🏁 Top-K模式: 只保留前{top_k}名，评分上界 {bound:.0f} 分")
+            else:
+                pending = iter(stocks_to_analyze)
+                wave_size = len(stocks_to_analyze)
             
             # 使用线程池并行处理
             with ThreadPoolExecutor(max_workers=3) as executor:
-                future_to_stock = {
-                    executor.submit(self._analyze_single_stock, stock, strategy_params): stock
-                    for stock in stocks_to_analyze
-                }
-                
-                for future in as_completed(future_to_stock):
-                    stock = future_to_stock[future]
-                    try:
-                        result = future.result(timeout=30)  # 30秒超时
-                        if result:
-                            successful_analyses += 1
-                            results['data_sources'][result.get('data_source', 'unknown')] += 1
+                while True:
+                    wave = list(itertools.islice(pending, wave_size))
+                    if not wave:
+                        break
+                    analyzed_count += len(wave)
+                    
+                    future_to_stock = {
+                        executor.submit(self._analyze_single_stock, stock, strategy_params): stock
+                        for stock in wave
+                    }
+                    
+                    for future in as_completed(future_to_stock):
+                        stock = future_to_stock[future]
+                        try:
+                            result = future.result(timeout=30)  # 30秒超时
+                            if result:
+                                successful_analyses += 1
+                                results['data_sources'][result.get('data_source', 'unknown')] += 1
+                                
+                                if result['score'] >= self.QUALIFIED_SCORE:
+                                    qualified_stocks.append(result)
+                                    if collector is not None:
+                                        collector.offer(result['score'], result)
                             
-                            if result['score'] >= 60:  # 合格分数线
-                                qualified_stocks.append(result)
-                        
-                        # API限速
-                        time.sleep(0.1)
-                        
-                    except Exception as e:
-                        print(f"⚠️ 分析股票失败: {e}")
+                        except Exception as e:
+                            print(f"⚠️ 分析股票失败: {e}")
             
             # 按评分排序
             qualified_stocks.sort(key=lambda x: x['score'], reverse=True)
             
             # 设置结果
             results['success'] = True
+            results['total_analyzed'] = analyzed_count
             results['qualified_stocks'] = qualified_stocks
-            results['top_30_stocks'] = qualified_stocks[:30]
-            results['data_quality'] = (successful_analyses / len(stocks_to_analyze) * 100) if stocks_to_analyze else 0
+            results['top_30_stocks'] = (collector.results() if collector is not None else qualified_stocks)[:30]
+            results['data_quality'] = (successful_analyses / analyzed_count * 100) if analyzed_count else 0
             results['execution_time'] = round(time.time() - start_time, 2)
+            if collector is not None:
+                results['top_k'] = {
+                    'k': top_k,
+                    'analyzed': analyzed_count,
+                    'skipped': len(stocks_to_analyze) - analyzed_count,
+                    'threshold': collector.threshold
+                }
             
             print(f"🎉 策略执行完成!")
             print(f"⏱️ 执行时间: {results['execution_time']}秒")
-            print(f"📊 成功分析: {successful_analyses}/{len(stocks_to_analyze)} 只股票")
+            print(f"📊 成功分析: {successful_analyses}/{analyzed_count} 只股票")
+            if collector is not None:
+                print(f"⏭️ Top-K跳过: {results['top_k']['skipped']} 只（无法进入前{top_k}名）")
             print(f"🎯 符合条件: {len(qualified_stocks)} 只股票")
             print(f"🏆 前30强: {len(results['top_30_stocks'])} 只股票")
             print(f"💯 数据质量: {results['data_quality']:.1f}%")
@@ -3,16 +3,29 @@
 提供技术指标计算、交易信号生成、图表生成等功能
 """
 
-from .base_analyzer import BaseAnalyzer
-from .stock_analyzer import StockAnalyzer
-from .indicators import TechnicalIndicators
-from .signals import SignalGenerator
-from .charts import ChartGenerator
+import importlib
+
+# 导出的类在首次访问时才导入，避免导入任意子模块时连带加载 akshare/tushare/plotly
+_EXPORTS = {
+    'BaseAnalyzer': '.base_analyzer',
+    'StockAnalyzer': '.stock_analyzer',
+    'TechnicalIndicators': '.indicators',
+    'SignalGenerator': '.signals',
+    'ChartGenerator': '.charts',
+}
 
 __all__ = [
     'BaseAnalyzer',
-    'StockAnalyzer', 
+    'StockAnalyzer',
     'TechnicalIndicators',
     'SignalGenerator',
     'ChartGenerator'
-] 
\ No newline at end of file
+]
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
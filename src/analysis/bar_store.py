@@ -0,0 +1,164 @@
+"""
+本地K线存储
+每个 (股票代码, 周期) 一个列式文件，读取优先走本地，缺失区间才回源增量补齐
+"""
+
+import os
+import time
+import numpy as np
+import pandas as pd
+from datetime import datetime, timedelta
+from typing import Optional, Tuple, Callable
+
+try:
+    from .columnar_store import DATA_DIR, save_frame, load_frame, get_file_lock
+except ImportError:
+    from columnar_store import DATA_DIR, save_frame, load_frame, get_file_lock
+
+
+class OHLCVStore:
+    """
+    本地K线存储
+    文件元数据记录已覆盖的日期区间，区间内的请求直接读本地文件
+    """
+
+    # 落盘的原始列（TuShare格式），标准化列（Date/Open/...）读取后再生成
+    BAR_COLUMNS = ['ts_code', 'trade_date', 'open', 'high', 'low', 'close',
+                   'pre_close', 'change', 'pct_chg', 'vol', 'amount']
+
+    def __init__(self, base_dir: str = None, tail_ttl: int = 600):
+        """
+        初始化K线存储
+        :param base_dir: 存储目录，默认 data/ohlcv
+        :param tail_ttl: 请求包含今天时，距上次回源多少秒内直接使用本地数据
+        """
+        self.base_dir = base_dir or os.path.join(DATA_DIR, 'ohlcv')
+        self.tail_ttl = tail_ttl
+
+    def _path(self, ts_code: str, freq: str) -> str:
+        """获取存储文件路径"""
+        return os.path.join(self.base_dir, freq, f"{ts_code}.npz")
+
+    def get_bars(self, ts_code: str, freq: str, start_date: str, end_date: str,
+                 fetch_func: Callable[[str, str], Tuple[Optional[pd.DataFrame], Optional[str]]]
+                 ) -> Tuple[Optional[pd.DataFrame], Optional[str]]:
+        """
+        获取K线数据，本地缺失的区间调用 fetch_func 回源
+        :param ts_code: 股票代码（如 000001.SZ）
+        :param freq: 周期
+        :param start_date: 开始日期 YYYYMMDD
+        :param end_date: 结束日期 YYYYMMDD
+        :param fetch_func: 回源函数 fetch_func(start_date, end_date) -> (原始数据, 数据源)
+        :return: (原始格式数据, 数据源)
+        """
+        path = self._path(ts_code, freq)
+
+        with get_file_lock(path):
+            cached, meta = load_frame(path)
+
+            if cached is not None and len(cached) > 0 and meta:
+                covered_start = meta.get('covered_start', '')
+                covered_end = meta.get('covered_end', '')
+                source = meta.get('source')
+
+                if start_date >= covered_start:
+                    if end_date <= covered_end:
+                        print(f"💾 本地K线命中: {ts_code} {freq} ({len(cached)} 条)")
+                        return self._slice(cached, start_date, end_date), source
+
+                    # 请求包含今天且刚回源过，不重复请求当天数据
+                    today = datetime.now().strftime('%Y%m%d')
+                    if end_date >= today and time.time() - meta.get('fetched_at', 0) < self.tail_ttl:
+                        print(f"💾 本地K线命中(近期已刷新): {ts_code} {freq}")
+                        return self._slice(cached, start_date, end_date), source
+
+                    merged, source = self._append_tail(cached, meta, ts_code, path,
+                                                       start_date, end_date, fetch_func)
+                    if merged is not None:
+                        return self._slice(merged, start_date, end_date), source
+
+                    # 回源失败时退回本地已有数据
+                    print(f"⚠️ 增量回源失败，使用本地已有K线: {ts_code}")
+                    return self._slice(cached, start_date, end_date), meta.get('source')
+
+                # 请求早于已覆盖区间，整段重新获取
+                end_date = max(end_date, covered_end)
+
+            return self._fetch_full(ts_code, path, start_date, end_date, fetch_func)
+
+    def _fetch_full(self, ts_code: str, path: str, start_date: str, end_date: str,
+                    fetch_func: Callable) -> Tuple[Optional[pd.DataFrame], Optional[str]]:
+        """整段回源并覆盖本地文件"""
+        print(f"🌐 本地K线未命中，整段回源: {ts_code} {start_date}-{end_date}")
+        data, source = fetch_func(start_date, end_date)
+        if data is None or len(data) == 0:
+            return None, None
+
+        data = self._normalize(data)
+        self._save(path, data, start_date, end_date, source)
+        return data, source
+
+    def _append_tail(self, cached: pd.DataFrame, meta: dict, ts_code: str, path: str,
+                     start_date: str, end_date: str,
+                     fetch_func: Callable) -> Tuple[Optional[pd.DataFrame], Optional[str]]:
+        """
+        只回源最后一根K线之后的区间并追加
+        新数据与本地最后一根K线重叠一天，收盘价不一致说明前复权基准已变化，需要整段重建
+        """
+        last_date = str(cached['trade_date'].iloc[-1])
+        print(f"🌐 本地K线增量回源: {ts_code} {last_date}-{end_date}")
+
+        new_data, source = fetch_func(last_date, end_date)
+        if new_data is None or len(new_data) == 0:
+            return None, None
+
+        new_data = self._normalize(new_data)
+        overlap = new_data[new_data['trade_date'] == last_date]
+        if len(overlap) > 0 and not np.isclose(float(overlap['close'].iloc[0]),
+                                               float(cached['close'].iloc[-1]), rtol=1e-6):
+            print(f"🔁 复权基准变化，重建本地K线: {ts_code}")
+            full_start = min(start_date, meta.get('covered_start', start_date))
+            return self._fetch_full(ts_code, path, full_start, end_date, fetch_func)
+
+        appended = new_data[new_data['trade_date'] > last_date]
+        merged = pd.concat([cached, appended], ignore_index=True) if len(appended) > 0 else cached
+        self._save(path, merged, meta.get('covered_start', start_date), end_date, source)
+        return merged, source
+
+    def _save(self, path: str, data: pd.DataFrame, covered_start: str, covered_end: str, source: str):
+        """保存数据，今天及以后的日期不计入已覆盖区间（当天K线可能尚未生成）"""
+        yesterday = (datetime.now() - timedelta(days=1)).strftime('%Y%m%d')
+        meta = {
+            'covered_start': covered_start,
+            'covered_end': min(covered_end, yesterday),
+            'source': source,
+            'fetched_at': time.time()
+        }
+        save_frame(path, data, meta)
+
+    def _normalize(self, data: pd.DataFrame) -> pd.DataFrame:
+        """只保留原始K线列，按日期排序去重"""
+        columns = [col for col in self.BAR_COLUMNS if col in data.columns]
+        data = data[columns].copy()
+        data['trade_date'] = data['trade_date'].astype(str)
+        data = data.drop_duplicates('trade_date', keep='last')
+        return data.sort_values('trade_date').reset_index(drop=True)
+
+    @staticmethod
+    def _slice(data: pd.DataFrame, start_date: str, end_date: str) -> pd.DataFrame:
+        """截取日期区间"""
+        dates = data['trade_date'].astype(str)
+        mask = (dates >= start_date) & (dates <= end_date)
+        return data[mask].reset_index(drop=True)
+
+
+# 进程内共享的默认存储
+_default_store = None
+
+
+def get_ohlcv_store() -> OHLCVStore:
+    """获取进程内共享的K线存储"""
+    global _default_store
+    if _default_store is None:
+        _default_store = OHLCVStore()
+    return _default_store
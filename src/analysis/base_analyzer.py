@@ -73,9 +73,6 @@ class BaseAnalyzer(ABC):
                 print(f"开始日期不能超过今天 ({today.strftime('%Y-%m-%d')})")
                 return False
             
-            # 添加延迟避免API频率限制
-            time.sleep(0.5)
-            
             print(f"正在获取 {self.stock_code} 的{self._get_period_name()}数据...")
             
             # 使用增强的数据获取器获取100%真实数据
@@ -92,7 +89,6 @@ class BaseAnalyzer(ABC):
             
             # 获取股票名称
             try:
-                time.sleep(0.5)
                 self.stock_name = self.data_fetcher.get_stock_name(self.stock_code)
             except Exception as e:
                 print(f"获取股票名称失败: {e}")
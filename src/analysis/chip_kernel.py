@@ -0,0 +1,195 @@
+"""
+筹码分布计算内核
+各处筹码分布算法的共同部分：价格分箱、时间衰减权重、按价格点/价格区间累加成交量，全部用NumPy向量运算完成；
+默认只计算最新一天的筹码分布（days × bins 的历史矩阵只在需要时生成）
+"""
+
+from typing import Optional
+
+import numpy as np
+
+# 衰减累加的分块行数，块内用 decay^-k 缩放后求累积和，分块避免缩放系数溢出
+_HISTORY_BLOCK = 64
+
+
+def bin_index(prices, price_levels, method: str = 'left') -> np.ndarray:
+    """
+    价格映射到价格区间索引
+    :param prices: 价格数组
+    :param price_levels: 升序排列的价格区间
+    :param method: left=np.searchsorted（可能等于区间数，表示超出上界）；
+                   nearest=最接近的价格区间（距离相同取较低的区间，与 np.argmin(np.abs(...)) 一致）；
+                   floor=按等宽区间向下取整并截断到有效范围
+    :return: 索引数组(int64)
+    """
+    prices = np.asarray(prices, dtype=float)
+    levels = np.asarray(price_levels, dtype=float)
+    bins = len(levels)
+
+    if method == 'left':
+        return np.searchsorted(levels, prices).astype(np.int64)
+
+    if bins < 2:
+        return np.zeros(len(prices), dtype=np.int64)
+
+    if method == 'nearest':
+        right = np.clip(np.searchsorted(levels, prices), 1, bins - 1)
+        left = right - 1
+        take_left = (prices - levels[left]) <= (levels[right] - prices)
+        return np.where(take_left, left, right).astype(np.int64)
+
+    if method == 'floor':
+        step = levels[1] - levels[0]
+        if step <= 0:
+            return np.zeros(len(prices), dtype=np.int64)
+        with np.errstate(invalid='ignore'):
+            index = np.floor((prices - levels[0]) / step)
+        return np.clip(np.nan_to_num(index), 0, bins - 1).astype(np.int64)
+
+    raise ValueError(f"未知分箱方式: {method}")
+
+
+def decay_weights(n: int, decay: float, offset: int = 0) -> np.ndarray:
+    """
+    时间衰减权重，最后一天权重为 decay ** offset，往前每天乘一次 decay
+    :param n: 天数
+    :param decay: 衰减因子
+    :param offset: 最后一天的衰减次数
+    :return: 权重数组
+    """
+    return np.power(float(decay), np.arange(n - 1 + offset, offset - 1, -1, dtype=float))
+
+
+def scatter_points(index, amounts, bins: int, rows=None, n_rows: int = None) -> np.ndarray:
+    """
+    把数量累加到价格区间（超出 [0, bins) 的索引丢弃）
+    :param index: 区间索引数组
+    :param amounts: 数量数组
+    :param bins: 区间数
+    :param rows: 每个数量所属的行（生成历史矩阵时使用）
+    :param n_rows: 行数
+    :return: 长度为 bins 的数组，或 n_rows × bins 矩阵
+    """
+    index = np.asarray(index, dtype=np.int64)
+    amounts = _clean(amounts)
+    valid = (index >= 0) & (index < bins) & (amounts != 0)
+    if rows is None:
+        return np.bincount(index[valid], weights=amounts[valid], minlength=bins)[:bins]
+
+    flat = np.asarray(rows, dtype=np.int64)[valid] * bins + index[valid]
+    return np.bincount(flat, weights=amounts[valid], minlength=n_rows * bins).reshape(n_rows, bins)
+
+
+def scatter_ranges(low_index, high_index, amounts_per_bin, bins: int, rows=None, n_rows: int = None) -> np.ndarray:
+    """
+    把数量均匀累加到 [low_index, high_index] 闭区间内的每个价格区间（差分数组实现，区间截断到 [0, bins)）
+    :param low_index: 区间起点索引数组
+    :param high_index: 区间终点索引数组
+    :param amounts_per_bin: 每个价格区间累加的数量
+    :param bins: 区间数
+    :param rows: 每个区间所属的行（生成历史矩阵时使用）
+    :param n_rows: 行数
+    :return: 长度为 bins 的数组，或 n_rows × bins 矩阵
+    """
+    low = np.maximum(np.asarray(low_index, dtype=np.int64), 0)
+    high = np.minimum(np.asarray(high_index, dtype=np.int64), bins - 1)
+    amounts = _clean(amounts_per_bin)
+    valid = (low <= high) & (amounts != 0)
+    low, high, amounts = low[valid], high[valid], amounts[valid]
+
+    width = bins + 1
+    if rows is None:
+        starts, ends, size, shape = low, high + 1, width, (width,)
+    else:
+        offset = np.asarray(rows, dtype=np.int64)[valid] * width
+        starts, ends, size, shape = offset + low, offset + high + 1, n_rows * width, (n_rows, width)
+
+    diff = (np.bincount(starts, weights=amounts, minlength=size)
+            - np.bincount(ends, weights=amounts, minlength=size)).reshape(shape)
+    # 覆盖计数用整数累加，未覆盖的区间直接置零，避免浮点差分残留的极小值被当作筹码
+    cover = (np.bincount(starts, minlength=size) - np.bincount(ends, minlength=size)).reshape(shape)
+    profile = np.cumsum(diff, axis=-1)[..., :bins]
+    covered = np.cumsum(cover, axis=-1)[..., :bins] > 0
+    return np.where(covered, np.maximum(profile, 0.0), 0.0)
+
+
+def accumulate_decay(deposits: np.ndarray, decay: float) -> np.ndarray:
+    """
+    按 C[i] = C[i-1] * decay + deposits[i] 逐日累加，得到每天的筹码分布
+    :param deposits: days × bins 的每日新增筹码
+    :param decay: 衰减因子
+    :return: days × bins 的每日筹码分布
+    """
+    deposits = np.asarray(deposits, dtype=float)
+    result = np.empty_like(deposits)
+    previous = np.zeros(deposits.shape[1])
+    for start in range(0, len(deposits), _HISTORY_BLOCK):
+        block = deposits[start:start + _HISTORY_BLOCK]
+        powers = np.power(float(decay), np.arange(len(block), dtype=float))[:, np.newaxis]
+        # C[s+k] = decay^k * (decay * C[s-1] + Σ_{j<=k} D[s+j] / decay^j)
+        result[start:start + len(block)] = powers * (previous * decay + np.cumsum(block / powers, axis=0))
+        previous = result[start + len(block) - 1]
+    return result
+
+
+def chip_profile(price_levels, volume, close, high=None, low=None, open_=None, decay: float = 0.97,
+                 close_share: float = 1.0, open_share: float = 0.0, index_method: str = 'left',
+                 range_span: str = 'exclusive', history: bool = False) -> np.ndarray:
+    """
+    计算筹码分布
+    每天的成交量按比例分配：close_share 落在收盘价区间，open_share 落在开盘价区间，其余均匀分布在
+    [最低价区间, 最高价区间]；当天最高价和最低价落在同一区间（或未提供高低价）时全部落在收盘价区间
+    :param price_levels: 升序排列的价格区间
+    :param volume: 成交量数组
+    :param close: 收盘价数组
+    :param high: 最高价数组
+    :param low: 最低价数组
+    :param open_: 开盘价数组（open_share > 0 时使用）
+    :param decay: 时间衰减因子
+    :param close_share: 收盘价区间分配比例
+    :param open_share: 开盘价区间分配比例
+    :param index_method: 价格分箱方式，见 bin_index
+    :param range_span: 区间均分的份数，exclusive=max(1, 高-低)，inclusive=高-低+1
+    :param history: 是否返回每天的筹码分布（days × bins），默认只返回最新一天
+    :return: 长度为 bins 的数组，history=True 时为 days × bins 矩阵
+    """
+    levels = np.asarray(price_levels, dtype=float)
+    bins = len(levels)
+    volume = _clean(volume)
+    n = len(volume)
+
+    rows: Optional[np.ndarray] = None
+    if history:
+        rows = np.arange(n)
+        amounts = volume
+    else:
+        amounts = volume * decay_weights(n, decay)
+
+    close_index = bin_index(close, levels, index_method)
+    if high is None or low is None:
+        result = scatter_points(close_index, amounts, bins, rows, n)
+        return accumulate_decay(result, decay) if history else result
+
+    high_index = bin_index(high, levels, index_method)
+    low_index = bin_index(low, levels, index_method)
+    has_range = high_index > low_index
+
+    range_share = max(0.0, 1.0 - close_share - open_share)
+    result = scatter_points(close_index, amounts * np.where(has_range, close_share, 1.0), bins, rows, n)
+    if open_share > 0 and open_ is not None:
+        open_index = bin_index(open_, levels, index_method)
+        result += scatter_points(open_index, amounts * np.where(has_range, open_share, 0.0), bins, rows, n)
+    if range_share > 0:
+        if range_span == 'inclusive':
+            span = high_index - low_index + 1
+        else:
+            span = np.maximum(1, high_index - low_index)
+        per_bin = np.where(has_range, amounts * range_share / span, 0.0)
+        result += scatter_ranges(low_index, high_index, per_bin, bins, rows, n)
+
+    return accumulate_decay(result, decay) if history else result
+
+
+def _clean(values) -> np.ndarray:
+    """转为float数组，NaN/inf按0处理"""
+    return np.nan_to_num(np.asarray(values, dtype=float), nan=0.0, posinf=0.0, neginf=0.0)
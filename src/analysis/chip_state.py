@@ -0,0 +1,337 @@
+"""
+筹码分布增量状态
+每只股票的衰减筹码分布连同所含最后一根K线的日期保存为列式文件；新K线到来时只需
+衰减旧分布再加上新成交量（O(价格区间数)），不再每次从120~1000根K线重新计算。
+同时保留最近若干个交易日的分布，结束日期更早的请求直接取对应日期的分布
+"""
+
+import os
+import time
+import threading
+import numpy as np
+import pandas as pd
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+try:
+    from .columnar_store import DATA_DIR, save_frame, load_frame, get_file_lock
+    from .chip_kernel import chip_profile
+except ImportError:
+    from columnar_store import DATA_DIR, save_frame, load_frame, get_file_lock
+    from chip_kernel import chip_profile
+
+
+class ChipStateStore:
+    """
+    筹码分布状态存储
+    状态按 (算法参数, 股票代码) 保存：价格区间、衰减后的筹码分布、最后一根K线的日期和收盘价。
+    价格区间在重建时按K线最高/最低价向两侧各留 margin 的余量；新K线超出价格区间、
+    与已保存的K线不连续或前复权基准变化（收盘价不一致）时从传入的K线整段重建。
+    最近 history_days 个交易日的分布（float32）一并保存：结束日期早于状态的请求在保留范围内直接取该日分布，
+    超出范围时按传入的K线单独计算，不覆盖已保存的状态
+    """
+
+    def __init__(self, base_dir: str = None, margin: float = 0.1, memory_size: int = 512,
+                 history_days: int = 60):
+        """
+        初始化状态存储
+        :param base_dir: 存储目录，默认 data/chips
+        :param margin: 重建时价格区间两侧的余量（占最高最低价差的比例）
+        :param memory_size: 内存中保留的状态个数
+        :param history_days: 保留最近多少个交易日的分布
+        """
+        self.base_dir = base_dir or os.path.join(DATA_DIR, 'chips')
+        self.margin = margin
+        self.memory_size = memory_size
+        self.history_days = history_days
+        self._memory = OrderedDict()
+        self._memory_lock = threading.Lock()
+        self._stats = {'hits': 0, 'prefix_hits': 0, 'updates': 0, 'rebuilds': 0, 'detached': 0}
+
+    @staticmethod
+    def model_key(decay: float = 0.97, close_share: float = 1.0, open_share: float = 0.0, bins: int = 200,
+                  index_method: str = 'left', range_span: str = 'exclusive') -> str:
+        """算法参数对应的目录名"""
+        return f"d{decay:g}_c{close_share:g}_o{open_share:g}_b{bins}_{index_method}_{range_span}"
+
+    def _path(self, model: str, ts_code: str) -> str:
+        """获取状态文件路径"""
+        return os.path.join(self.base_dir, model, f"{ts_code}.npz")
+
+    def get_profile(self, ts_code: str, bars: pd.DataFrame, decay: float = 0.97, close_share: float = 1.0,
+                    open_share: float = 0.0, bins: int = 200, index_method: str = 'left',
+                    range_span: str = 'exclusive') -> Tuple[np.ndarray, np.ndarray]:
+        """
+        获取截至 bars 最后一根K线的筹码分布，已有状态时只计算新增的K线；
+        bars 结束日期早于已保存的状态时取保留的历史分布，不会丢弃较新的状态
+        :param ts_code: 股票代码
+        :param bars: 按日期升序的K线（TuShare格式：trade_date、close、vol，可选 open/high/low）
+        :param decay: 时间衰减因子
+        :param close_share: 收盘价区间分配比例
+        :param open_share: 开盘价区间分配比例
+        :param bins: 价格区间数
+        :param index_method: 价格分箱方式，见 chip_kernel.bin_index
+        :param range_span: 区间均分的份数，见 chip_kernel.chip_profile
+        :return: (价格区间, 筹码分布)，分布单位与 bars['vol'] 相同
+        """
+        params = dict(decay=decay, close_share=close_share, open_share=open_share,
+                      index_method=index_method, range_span=range_span)
+        model = self.model_key(bins=bins, **params)
+        path = self._path(model, ts_code)
+        bars = bars.sort_values('trade_date').reset_index(drop=True)
+        dates = bars['trade_date'].astype(str).values
+        last_date = dates[-1]
+        last_close = float(bars['close'].iloc[-1])
+
+        with get_file_lock(path):
+            state = self._load(model, ts_code, path)
+
+            if state is not None and state['last_date'] == last_date \
+                    and np.isclose(state['last_close'], last_close, rtol=1e-6):
+                self._count('hits')
+                return state['levels'], state['chips']
+
+            if state is not None and last_date < state['last_date']:
+                # 结束日期更早：取保留的历史分布；超出保留范围时单独计算，已保存的较新状态保持不变
+                chips = self._history_at(state, last_date, last_close)
+                if chips is not None:
+                    self._count('prefix_hits')
+                    return state['levels'], chips
+                levels = self._build_levels(bars, bins)
+                self._count('detached')
+                return levels, self._deposit(levels, bars, params)
+
+            new_bars = self._bars_after(state, bars, dates) if state is not None else None
+            if new_bars is not None and self._within(state['levels'], new_bars):
+                # 新K线逐日的分布 = 旧分布按天数衰减 + 新K线逐日累加的筹码
+                levels = state['levels']
+                steps = decay ** np.arange(1, len(new_bars) + 1, dtype=float)[:, np.newaxis]
+                daily = state['chips'] * steps + self._deposit(levels, new_bars, params, history=True)
+                history = self._extend_history(state, new_bars, daily)
+                self._count('updates')
+            else:
+                levels = self._build_levels(bars, bins)
+                daily = self._deposit(levels, bars, params, history=True)
+                history = self._extend_history(None, bars, daily)
+                self._count('rebuilds')
+
+            chips = daily[-1]
+            state = dict(history, levels=levels, chips=chips, last_date=last_date, last_close=last_close)
+            self._save(model, ts_code, path, state)
+            return levels, chips
+
+    def advance(self, trade_date: str, prev_trade_date: str, snapshot: pd.DataFrame, decay: float = 0.97,
+                close_share: float = 1.0, open_share: float = 0.0, bins: int = 200,
+                index_method: str = 'left', range_span: str = 'exclusive') -> int:
+        """
+        用全市场截面把已保存的状态推进一个交易日（盘后批量预计算）
+        只推进最后日期为 prev_trade_date 的状态；新K线超出价格区间的状态保持不变，下次请求时整段重建
+        :param trade_date: 截面对应的交易日
+        :param prev_trade_date: 上一个交易日
+        :param snapshot: 截面数据（ts_code、close、vol，可选 open/high/low）
+        :return: 推进的股票数
+        """
+        params = dict(decay=decay, close_share=close_share, open_share=open_share,
+                      index_method=index_method, range_span=range_span)
+        model = self.model_key(bins=bins, **params)
+        model_dir = os.path.join(self.base_dir, model)
+        if snapshot is None or snapshot.empty or not os.path.isdir(model_dir):
+            return 0
+
+        rows = snapshot.drop_duplicates('ts_code').set_index('ts_code')
+        advanced = 0
+        for name in os.listdir(model_dir):
+            if not name.endswith('.npz'):
+                continue
+            ts_code = name[:-4]
+            if ts_code not in rows.index:
+                continue
+            path = self._path(model, ts_code)
+            with get_file_lock(path):
+                state = self._load(model, ts_code, path)
+                if state is None or state['last_date'] != prev_trade_date:
+                    continue
+                bar = rows.loc[[ts_code]].reset_index()
+                bar['trade_date'] = trade_date
+                if not self._within(state['levels'], bar):
+                    continue
+                chips = state['chips'] * decay + self._deposit(state['levels'], bar, params)
+                state = dict(self._extend_history(state, bar, chips[np.newaxis, :]),
+                             levels=state['levels'], chips=chips, last_date=trade_date,
+                             last_close=float(bar['close'].iloc[0]))
+                self._save(model, ts_code, path, state)
+                advanced += 1
+        return advanced
+
+    def stats(self) -> Dict[str, int]:
+        """命中、历史分布命中、增量更新、整段重建、单独计算（更早且超出保留范围）的次数"""
+        with self._memory_lock:
+            return dict(self._stats)
+
+    @staticmethod
+    def _bars_after(state: dict, bars: pd.DataFrame, dates: np.ndarray) -> Optional[pd.DataFrame]:
+        """
+        状态之后的新K线；bars 不包含状态的最后日期或该日收盘价不一致（复权基准变化）时返回 None
+        """
+        position = np.searchsorted(dates, state['last_date'])
+        if position >= len(dates) or dates[position] != state['last_date']:
+            return None
+        if not np.isclose(float(bars['close'].iloc[position]), state['last_close'], rtol=1e-6):
+            return None
+        return bars.iloc[position + 1:]
+
+    def _extend_history(self, state: Optional[dict], bars: pd.DataFrame, daily: np.ndarray) -> dict:
+        """
+        把新K线逐日的分布追加到保留的历史分布，只保留最近 history_days 天
+        :param state: 原状态（None 表示从头开始）
+        :param bars: 新K线
+        :param daily: 与 bars 逐行对应的分布（len(bars) × bins）
+        :return: {'history_dates', 'history_closes', 'history'}
+        """
+        keep = self.history_days
+        dates = list(bars['trade_date'].astype(str))
+        closes = bars['close'].to_numpy(dtype=float)
+        chips = np.asarray(daily, dtype=np.float32)
+        if state is not None and len(state['history_dates']) > 0:
+            dates = state['history_dates'] + dates
+            closes = np.concatenate([state['history_closes'], closes])
+            chips = np.vstack([state['history'], chips])
+        if keep <= 0:
+            return {'history_dates': [], 'history_closes': closes[:0], 'history': chips[:0]}
+        return {'history_dates': dates[-keep:], 'history_closes': closes[-keep:], 'history': chips[-keep:]}
+
+    @staticmethod
+    def _history_at(state: dict, trade_date: str, close: float) -> Optional[np.ndarray]:
+        """
+        保留的历史中某个交易日的分布；没有该日或该日收盘价不一致（复权基准变化）时返回 None
+        """
+        dates = state['history_dates']
+        position = int(np.searchsorted(dates, trade_date)) if dates else 0
+        if position >= len(dates) or dates[position] != trade_date:
+            return None
+        if not np.isclose(float(state['history_closes'][position]), close, rtol=1e-6):
+            return None
+        return state['history'][position].astype(float)
+
+    @staticmethod
+    def _within(levels: np.ndarray, bars: pd.DataFrame) -> bool:
+        """K线价格是否都在价格区间内"""
+        low = bars['low'] if 'low' in bars.columns else bars['close']
+        high = bars['high'] if 'high' in bars.columns else bars['close']
+        return bool(low.min() >= levels[0] and high.max() <= levels[-1])
+
+    def _build_levels(self, bars: pd.DataFrame, bins: int) -> np.ndarray:
+        """按K线价格范围生成价格区间（两侧留余量，减少新K线超出区间后的重建）"""
+        low = float((bars['low'] if 'low' in bars.columns else bars['close']).min())
+        high = float((bars['high'] if 'high' in bars.columns else bars['close']).max())
+        padding = (high - low) * self.margin if high > low else max(abs(high) * self.margin, 0.01)
+        return np.linspace(max(low - padding, 0.0), high + padding, bins)
+
+    @staticmethod
+    def _deposit(levels: np.ndarray, bars: pd.DataFrame, params: dict, history: bool = False) -> np.ndarray:
+        """计算一段K线的筹码（最后一根K线权重为1）；history=True 时返回逐日的分布"""
+        def column(name):
+            return bars[name].values if name in bars.columns else None
+
+        return chip_profile(levels, column('vol'), column('close'), column('high'), column('low'),
+                            column('open'), history=history, **params)
+
+    def _load(self, model: str, ts_code: str, path: str) -> Optional[dict]:
+        """从内存或磁盘读取状态"""
+        key = (model, ts_code)
+        with self._memory_lock:
+            state = self._memory.get(key)
+            if state is not None:
+                self._memory.move_to_end(key)
+                return state
+
+        frame, meta = load_frame(path)
+        if frame is None or len(frame) == 0 or not meta.get('last_date'):
+            return None
+        # 历史分布按列保存（h0 为最早一天），旧版本文件没有历史
+        history_dates = [str(date) for date in meta.get('history_dates', [])]
+        history_columns = [f"h{i}" for i in range(len(history_dates))]
+        if not all(name in frame.columns for name in history_columns):
+            history_dates, history_columns = [], []
+        state = {
+            'levels': frame['price'].to_numpy(dtype=float),
+            'chips': frame['chips'].to_numpy(dtype=float),
+            'last_date': meta['last_date'],
+            'last_close': float(meta.get('last_close', np.nan)),
+            'history_dates': history_dates,
+            'history_closes': np.asarray(meta.get('history_closes', [])[:len(history_dates)], dtype=float),
+            'history': frame[history_columns].to_numpy(dtype=np.float32).T.reshape(len(history_dates), len(frame))
+        }
+        self._remember(key, state)
+        return state
+
+    def _save(self, model: str, ts_code: str, path: str, state: dict):
+        """保存状态到内存和磁盘"""
+        self._remember((model, ts_code), state)
+        columns = {'price': state['levels'], 'chips': state['chips']}
+        for i, chips in enumerate(state['history']):
+            columns[f"h{i}"] = chips
+        save_frame(path, pd.DataFrame(columns), {
+            'ts_code': ts_code,
+            'model': model,
+            'last_date': state['last_date'],
+            'last_close': state['last_close'],
+            'history_dates': state['history_dates'],
+            'history_closes': [float(close) for close in state['history_closes']],
+            'updated_at': time.time()
+        })
+
+    def _remember(self, key, state: dict):
+        """放入内存缓存，超过容量时淘汰最久未使用的状态"""
+        with self._memory_lock:
+            self._memory[key] = state
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_size:
+                self._memory.popitem(last=False)
+
+    def _count(self, key: str):
+        with self._memory_lock:
+            self._stats[key] += 1
+
+
+# 进程内共享的状态存储
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_chip_state_store() -> ChipStateStore:
+    """获取进程内共享的筹码分布状态存储"""
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = ChipStateStore()
+        return _default_store
+
+
+def precompute_market_chips(trade_date: str = None, pro=None, **model) -> int:
+    """
+    盘后用当天全市场截面推进所有已保存的筹码分布状态
+    :param trade_date: 交易日，默认最近交易日
+    :param pro: TuShare Pro API对象（截面未缓存时下载使用）
+    :param model: 算法参数，见 ChipStateStore.get_profile
+    :return: 推进的股票数
+    """
+    try:
+        from .trade_calendar import get_trade_calendar
+        from .market_snapshot import get_snapshot_store
+    except ImportError:
+        from trade_calendar import get_trade_calendar
+        from market_snapshot import get_snapshot_store
+
+    calendar = get_trade_calendar(pro)
+    trade_date = trade_date or calendar.latest_trading_day()
+    previous = calendar.prev_n(trade_date, n=1)
+    if not trade_date or not previous:
+        print("⚠️ 交易日历不可用，跳过筹码分布预计算")
+        return 0
+
+    start_time = time.time()
+    snapshot = get_snapshot_store().get_snapshot(trade_date, pro)
+    advanced = get_chip_state_store().advance(trade_date, previous[0], snapshot, **model)
+    print(f"✅ {trade_date}筹码分布预计算完成: {advanced} 只股票，耗时 {time.time() - start_time:.2f}秒")
+    return advanced
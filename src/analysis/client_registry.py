@@ -0,0 +1,240 @@
+"""
+上游数据源客户端注册表
+TuShare/AkShare 客户端在首次使用时才创建，进程内共享；连通性检查在后台线程定期执行，
+构造引擎、扫描器、数据获取器时只读取缓存的健康状态，不再发起网络探测
+"""
+
+import os
+import sys
+import time
+import threading
+from typing import Dict, Optional
+
+try:
+    from .rate_limiter import PROJECT_ROOT, limit_tushare, limit_akshare
+    from .upstream_source import get_upstream_source, ReplayStandIn
+except ImportError:
+    from rate_limiter import PROJECT_ROOT, limit_tushare, limit_akshare
+    from upstream_source import get_upstream_source, ReplayStandIn
+
+
+def load_tushare_token() -> Optional[str]:
+    """
+    读取TuShare token：config/tushare_config.json 的 "token"，其次 config/tushare_token.txt 的第一行非注释内容
+    :return: token，未配置时返回 None
+    """
+    import json
+
+    config_path = os.path.join(PROJECT_ROOT, 'config', 'tushare_config.json')
+    try:
+        if os.path.exists(config_path):
+            with open(config_path, 'r', encoding='utf-8') as f:
+                token = json.load(f).get('token')
+                if token:
+                    return token
+    except Exception as e:
+        print(f"⚠️ 读取TuShare配置失败: {e}")
+
+    token_path = os.path.join(PROJECT_ROOT, 'config', 'tushare_token.txt')
+    try:
+        if os.path.exists(token_path):
+            with open(token_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if line and not line.startswith('#'):
+                        return line
+    except Exception as e:
+        print(f"⚠️ 读取TuShare token文件失败: {e}")
+
+    return None
+
+
+class ClientRegistry:
+    """
+    上游客户端注册表
+    健康状态未检查前，以客户端能否创建（已安装、已配置token）作为可用性；
+    首次访问时启动后台线程，每 health_ttl 秒用轻量接口检查一次连通性
+    """
+
+    SOURCES = ('tushare', 'akshare')
+
+    def __init__(self, health_ttl: int = 300, background: bool = True):
+        """
+        初始化注册表
+        :param health_ttl: 健康检查间隔（秒）
+        :param background: 是否启动后台健康检查线程
+        """
+        self.health_ttl = health_ttl
+        self.background = background
+        self._clients = {}
+        self._health: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        self._refresh_thread = None
+
+    def tushare(self):
+        """
+        获取共享的TuShare Pro客户端（已加限流）
+        :return: 客户端，未安装或未配置token时返回 None
+        """
+        return self._client('tushare')
+
+    def akshare(self):
+        """
+        获取共享的akshare模块（已加限流）
+        :return: 模块，未安装时返回 None
+        """
+        return self._client('akshare')
+
+    @property
+    def tushare_available(self) -> bool:
+        """TuShare是否可用（缓存的健康状态）"""
+        return self.is_available('tushare')
+
+    @property
+    def akshare_available(self) -> bool:
+        """AkShare是否可用（缓存的健康状态）"""
+        return self.is_available('akshare')
+
+    def is_available(self, source: str) -> bool:
+        """
+        数据源是否可用，不发起网络请求
+        :param source: tushare/akshare
+        :return: 是否可用
+        """
+        if self._client(source) is None:
+            return False
+        self._ensure_refresh_thread()
+        health = self._health.get(source)
+        return True if health is None else health['ok']
+
+    def status(self) -> Dict[str, Dict]:
+        """各数据源的健康状态（ok, checked_at, latency, error）"""
+        with self._lock:
+            return {source: dict(value) for source, value in self._health.items()}
+
+    def check(self, source: str) -> bool:
+        """
+        立即检查一次数据源连通性并更新缓存
+        :param source: tushare/akshare
+        :return: 是否可用
+        """
+        client = self._client(source)
+        if client is None:
+            return False
+
+        start_time = time.time()
+        error = None
+        try:
+            if get_upstream_source().offline:
+                # 回放模式不访问上游，数据源视为可用（缺少录制时由具体调用报错）
+                data = [True]
+            elif source == 'tushare':
+                today = time.strftime('%Y%m%d')
+                data = client.trade_cal(exchange='SSE', start_date=today, end_date=today)
+            else:
+                data = client.tool_trade_date_hist_sina()
+            ok = data is not None and len(data) > 0
+            if not ok:
+                error = 'empty response'
+        except Exception as e:
+            ok = False
+            error = str(e)[:200]
+
+        with self._lock:
+            previous = self._health.get(source)
+            self._health[source] = {
+                'ok': ok,
+                'checked_at': time.time(),
+                'latency': round(time.time() - start_time, 3),
+                'error': error
+            }
+        if previous is None or previous['ok'] != ok:
+            print(f"{'✅' if ok else '⚠️'} 数据源健康检查: {source} {'可用' if ok else '不可用'}"
+                  f"{'' if ok else f' ({error})'}")
+        return ok
+
+    def _client(self, source: str):
+        """创建或返回缓存的客户端"""
+        if source in self._clients:
+            return self._clients[source]
+        with self._lock:
+            if source not in self._clients:
+                self._clients[source] = self._create(source)
+            return self._clients[source]
+
+    @classmethod
+    def _create(cls, source: str):
+        """创建客户端（只做本地初始化，不访问网络）；回放模式下无法创建时使用占位客户端"""
+        client = cls._create_live(source)
+        if client is None and get_upstream_source().offline:
+            print(f"📼 {source} 使用回放占位客户端")
+            wrap = limit_tushare if source == 'tushare' else limit_akshare
+            client = wrap(ReplayStandIn(source))
+        return client
+
+    @staticmethod
+    def _create_live(source: str):
+        """创建真实客户端"""
+        if source == 'tushare':
+            try:
+                import tushare as ts
+            except ImportError:
+                print("⚠️ TuShare未安装")
+                return None
+            token = load_tushare_token()
+            if not token:
+                print("⚠️ TuShare token未配置")
+                return None
+            ts.set_token(token)
+            print("✅ TuShare Pro客户端已创建")
+            return limit_tushare(ts.pro_api(token))
+
+        if source == 'akshare':
+            try:
+                import akshare as ak
+            except ImportError:
+                print("⚠️ AkShare未安装")
+                return None
+            return limit_akshare(ak)
+
+        raise ValueError(f"未知数据源: {source}")
+
+    def _ensure_refresh_thread(self):
+        """首次使用时启动后台健康检查线程"""
+        if not self.background or self._refresh_thread is not None:
+            return
+        with self._lock:
+            if self._refresh_thread is not None:
+                return
+            self._refresh_thread = threading.Thread(target=self._refresh_loop,
+                                                    name='client-health-check', daemon=True)
+            self._refresh_thread.start()
+
+    def _refresh_loop(self):
+        """定期检查所有已配置的数据源"""
+        while True:
+            for source in self.SOURCES:
+                if self._client(source) is not None:
+                    self.check(source)
+            time.sleep(self.health_ttl)
+
+
+# 进程内共享的注册表
+# 与限流器相同，本文件可能以不同模块名重复导入，以最先加载的模块为准
+_SHARED_MODULE_KEY = '_upstream_client_registry'
+sys.modules.setdefault(_SHARED_MODULE_KEY, sys.modules[__name__])
+
+_default_registry = None
+_default_registry_lock = threading.Lock()
+
+
+def get_client_registry() -> ClientRegistry:
+    """获取进程内共享的客户端注册表"""
+    global _default_registry
+    shared = sys.modules[_SHARED_MODULE_KEY]
+    if shared is not sys.modules.get(__name__):
+        return shared.get_client_registry()
+    with _default_registry_lock:
+        if _default_registry is None:
+            _default_registry = ClientRegistry()
+        return _default_registry
@@ -0,0 +1,96 @@
+"""
+本地列式存储工具
+以 .npz 文件按列保存 DataFrame，读写不依赖 pyarrow 等额外库
+"""
+
+import os
+import json
+import threading
+import numpy as np
+import pandas as pd
+from typing import Optional, Tuple, Dict, Any
+
+# 项目根目录下的 data 目录，所有本地缓存文件统一放在这里
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DATA_DIR = os.path.join(PROJECT_ROOT, 'data')
+
+_META_KEY = '__meta__'
+_COLUMNS_KEY = '__columns__'
+
+# 每个文件一把锁，避免多线程同时读写同一个文件
+_file_locks: Dict[str, threading.Lock] = {}
+_file_locks_guard = threading.Lock()
+
+
+def get_file_lock(path: str) -> threading.Lock:
+    """
+    获取文件对应的锁
+    :param path: 文件路径
+    :return: 线程锁
+    """
+    with _file_locks_guard:
+        lock = _file_locks.get(path)
+        if lock is None:
+            lock = threading.Lock()
+            _file_locks[path] = lock
+        return lock
+
+
+def save_frame(path: str, df: pd.DataFrame, meta: Optional[Dict[str, Any]] = None) -> bool:
+    """
+    按列保存DataFrame（先写临时文件再替换，保证文件完整）
+    :param path: 文件路径（.npz）
+    :param df: 待保存的数据
+    :param meta: 附加元数据（需可JSON序列化）
+    :return: 是否保存成功
+    """
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        arrays = {}
+        columns = [str(col) for col in df.columns]
+        for i, col in enumerate(df.columns):
+            series = df[col]
+            if pd.api.types.is_bool_dtype(series):
+                arrays[f'c{i}'] = series.fillna(False).to_numpy(dtype=bool)
+            elif pd.api.types.is_numeric_dtype(series):
+                values = series.to_numpy()
+                arrays[f'c{i}'] = values.astype(np.float64) if values.dtype == object else values
+            elif pd.api.types.is_datetime64_any_dtype(series):
+                arrays[f'c{i}'] = series.to_numpy(dtype='datetime64[ns]')
+            else:
+                arrays[f'c{i}'] = series.fillna('').astype(str).to_numpy(dtype=str)
+
+        arrays[_COLUMNS_KEY] = np.array(columns, dtype=str)
+        arrays[_META_KEY] = np.array(json.dumps(meta or {}, ensure_ascii=False, default=str))
+
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(tmp_path, path)
+        return True
+
+    except Exception as e:
+        print(f"⚠️ 本地列式文件保存失败 {path}: {e}")
+        return False
+
+
+def load_frame(path: str) -> Tuple[Optional[pd.DataFrame], Dict[str, Any]]:
+    """
+    读取按列保存的DataFrame
+    :param path: 文件路径（.npz）
+    :return: (数据, 元数据)，文件不存在或损坏时返回 (None, {})
+    """
+    if not os.path.exists(path):
+        return None, {}
+
+    try:
+        with np.load(path, allow_pickle=False) as npz:
+            columns = [str(col) for col in npz[_COLUMNS_KEY]]
+            meta = json.loads(str(npz[_META_KEY])) if _META_KEY in npz.files else {}
+            data = {col: npz[f'c{i}'] for i, col in enumerate(columns)}
+        return pd.DataFrame(data, columns=columns), meta
+
+    except Exception as e:
+        print(f"⚠️ 本地列式文件读取失败 {path}: {e}")
+        return None, {}
@@ -5,8 +5,10 @@ Strategy Compliance Evaluator with 100-point scoring system
 """
 
 import math
+import threading
 import numpy as np
-from typing import Dict, List, Tuple, Optional
+import pandas as pd
+from typing import Dict, List, Tuple, Optional, Union
 import logging
 
 class ComplianceEvaluator:
@@ -15,6 +17,35 @@ class ComplianceEvaluator:
     基于具体策略标准的100分制评分系统
     """
     
+    # 策略映射 - 处理前端传入的策略ID
+    STRATEGY_MAPPING = {
+        'high_dividend': 'high_dividend',
+        'blue_chip_stable': 'blue_chip', 
+        'blue_chip': 'blue_chip',
+        'quality_growth': 'quality_growth',
+        'value_investment': 'value_investment',
+        'value': 'value_investment',
+        'growth': 'quality_growth',
+        'dividend': 'high_dividend',
+        'balanced': 'blue_chip'  # 平衡策略使用蓝筹标准
+    }
+    
+    # 批量评分的指标定义（与 _calculate_strategy_based_score 逐项对应）：
+    # (权重名, 数据字段, 缺少该字段时的取值, 评分方式, (下限标准, 默认值), (上限标准, 默认值))
+    SCORED_INDICATORS = (
+        ('dividend_yield', 'dividend_yield', 0, 'min_better', ('dividend_yield_min', 4.5), None),
+        ('pe', 'pe', 0, 'range', ('pe_min', 0), ('pe_max', 100)),
+        ('pb', 'pb', 0, 'range', ('pb_min', 0), ('pb_max', 100)),
+        ('roe', 'roe', 0, 'min_better', ('roe_min', 8), None),
+        ('market_cap', 'total_mv', 0, 'min_better', ('market_cap_min', 100), None),
+        ('revenue_growth', 'revenue_growth', 0, 'min_better', ('revenue_growth_min', 8), None),
+        ('debt_ratio', 'debt_ratio', 50, 'max_better', None, ('debt_ratio_max', 50)),
+        ('current_ratio', 'current_ratio', 1.0, 'min_better', ('current_ratio_min', 1.2), None),
+    )
+    
+    # 符合度等级（分数下限, 等级），低于最后一档为“不符合”
+    GRADE_LEVELS = ((90, "优秀"), (80, "良好"), (70, "中等"), (60, "一般"), (50, "较差"))
+    
     def __init__(self):
         """初始化符合度评估器"""
         self.logger = logging.getLogger(__name__)
@@ -99,6 +130,28 @@ class ComplianceEvaluator:
             }
         }
         
+        # 参数寻优写回的阈值覆盖默认标准
+        self._apply_threshold_overrides()
+        
+    def _apply_threshold_overrides(self):
+        """用 config/strategy_thresholds.json 中寻优得到的阈值覆盖各策略的 criteria"""
+        try:
+            try:
+                from .parameter_optimizer import BACKTEST_KEYS, load_strategy_thresholds
+            except ImportError:
+                from parameter_optimizer import BACKTEST_KEYS, load_strategy_thresholds
+            overrides = load_strategy_thresholds()
+        except Exception as e:
+            self.logger.warning(f"读取寻优阈值失败，使用默认标准: {e}")
+            return
+        
+        for strategy_key, criteria in overrides.items():
+            if strategy_key in self.strategy_standards and isinstance(criteria, dict):
+                # max_positions 等回测参数不是选股标准
+                criteria = {key: value for key, value in criteria.items() if key not in BACKTEST_KEYS}
+                self.strategy_standards[strategy_key]['criteria'].update(criteria)
+                self.logger.info(f"策略 {strategy_key} 使用寻优阈值: {criteria}")
+        
     def evaluate_stock_compliance(self, stock_data: Dict, strategy_type: str = 'balanced', fast_mode: bool = True) -> Dict:
         """
         评估单只股票的策略符合度 - 100分制
@@ -136,31 +189,95 @@ class ComplianceEvaluator:
             self.logger.error(f"符合度评估失败: {e}")
             return self._get_default_compliance_result()
     
+    def evaluate_batch(self, universe: Union[pd.DataFrame, Dict[str, np.ndarray]],
+                       strategy_type: str = 'balanced') -> Dict[str, np.ndarray]:
+        """
+        批量评估整个股票池的策略符合度
+        评分标准、权重和风险调整与 evaluate_stock_compliance 相同，每个指标对全部股票一次数组运算完成；
+        缺少某列时按单只评估的默认值处理，列中的缺失值（NaN/None）与单只评估传入 NaN 的结果相同：
+        评分项记 0 分，风险调整中缺失的波动率不扣分、缺失的市值按流动性奖励上限计
+        
+        Args:
+            universe: DataFrame 或 {字段: 数组}，字段与单只评估相同（pe、pb、roe、dividend_yield、total_mv(亿元)、
+                      revenue_growth、debt_ratio、current_ratio、volatility），没有 total_mv 时使用 market_cap
+            strategy_type: 策略类型
+            
+        Returns:
+            {'overall_compliance': 符合度, 'risk_adjusted_compliance': 风险调整后符合度,
+             'compliance_grade': 等级} 三个与股票池等长的数组
+        """
+        columns = self._batch_columns(universe)
+        size = len(next(iter(columns.values()))) if columns else 0
+        
+        def column(name, default):
+            if name in columns:
+                return columns[name]
+            return np.full(size, float(default))
+        
+        strategy_key = self._resolve_strategy_key(strategy_type)
+        criteria = self.strategy_standards[strategy_key]['criteria']
+        weights = self.strategy_standards[strategy_key]['weights']
+        
+        total_score = np.zeros(size)
+        total_weight = 0
+        for weight_key, field, default, score_type, lower, upper in self.SCORED_INDICATORS:
+            if weight_key not in weights:
+                continue
+            target_min = criteria.get(*lower) if lower else None
+            target_max = criteria.get(*upper) if upper else None
+            score = self._score_indicator_array(column(field, default), target_min, target_max, score_type)
+            total_score += score * weights[weight_key]
+            total_weight += weights[weight_key]
+        
+        if total_weight > 0:
+            strategy_score = np.clip(total_score / total_weight, 0, 100)
+        else:
+            strategy_score = np.full(size, 50.0)  # 默认分数
+        
+        # 风险调整：单只评估的 min/max 遇到 NaN 时保留另一个参数，对应 fmin/fmax 忽略 NaN 的口径
+        volatility = column('volatility', 25.0)
+        market_cap = column('total_mv', 100)
+        volatility_penalty = np.fmin(5, np.fmax(0, (volatility - 30) * 0.2))
+        liquidity_bonus = np.fmin(3, market_cap / 500)
+        adjusted = np.clip(strategy_score - volatility_penalty + liquidity_bonus, 0, 100)
+        
+        return {
+            'overall_compliance': np.round(strategy_score, 2),
+            'risk_adjusted_compliance': np.round(adjusted, 2),
+            'compliance_grade': self._grade_array(strategy_score)
+        }
+    
+    @staticmethod
+    def _batch_columns(universe: Union[pd.DataFrame, Dict[str, np.ndarray]]) -> Dict[str, np.ndarray]:
+        """把批量输入转换为 {字段: float 数组}，无法转换为数值的值记为 NaN"""
+        names = list(universe.columns) if isinstance(universe, pd.DataFrame) else list(universe)
+        columns = {}
+        for name in names:
+            values = np.asarray(universe[name])
+            if values.dtype.kind in 'biuf':
+                columns[name] = values.astype(float)
+            else:
+                columns[name] = pd.to_numeric(pd.Series(values.astype(object)), errors='coerce').to_numpy(dtype=float)
+        if 'total_mv' not in columns and 'market_cap' in columns:
+            columns['total_mv'] = columns['market_cap']
+        return columns
+    
+    def _resolve_strategy_key(self, strategy_type: str) -> str:
+        """前端策略ID -> strategy_standards 中的策略名，未知策略使用蓝筹白马标准"""
+        strategy_key = self.STRATEGY_MAPPING.get(strategy_type, 'blue_chip')
+        
+        if strategy_key not in self.strategy_standards:
+            print(f"⚠️ 未知策略类型 {strategy_type}，使用蓝筹白马标准")
+            strategy_key = 'blue_chip'
+        return strategy_key
+    
     def _calculate_strategy_based_score(self, stock_data: Dict, strategy_type: str) -> float:
         """
         基于策略标准计算100分制评分
         完全符合策略标准 = 100分，每个维度根据符合程度加分减分
         """
         try:
-            # 🔍 策略映射 - 处理前端传入的策略ID
-            strategy_mapping = {
-                'high_dividend': 'high_dividend',
-                'blue_chip_stable': 'blue_chip', 
-                'blue_chip': 'blue_chip',
-                'quality_growth': 'quality_growth',
-                'value_investment': 'value_investment',
-                'value': 'value_investment',
-                'growth': 'quality_growth',
-                'dividend': 'high_dividend',
-                'balanced': 'blue_chip'  # 平衡策略使用蓝筹标准
-            }
-            
-            strategy_key = strategy_mapping.get(strategy_type, 'blue_chip')
-            
-            if strategy_key not in self.strategy_standards:
-                print(f"⚠️ 未知策略类型 {strategy_type}，使用蓝筹白马标准")
-                strategy_key = 'blue_chip'
-            
+            strategy_key = self._resolve_strategy_key(strategy_type)
             strategy_config = self.strategy_standards[strategy_key]
             criteria = strategy_config['criteria']
             weights = strategy_config['weights']
@@ -314,6 +431,29 @@ class ComplianceEvaluator:
         
         return 50.0  # 默认分数
     
+    @staticmethod
+    def _score_indicator_array(values: np.ndarray, target_min: Optional[float], target_max: Optional[float],
+                               score_type: str) -> np.ndarray:
+        """
+        _score_indicator 的数组版本，逐元素结果相同；NaN 与非正值一样记 0 分
+        """
+        values = np.asarray(values, dtype=float)
+        scores = np.full(values.shape, 50.0)  # 默认分数
+        with np.errstate(invalid='ignore', divide='ignore'):
+            if score_type == 'range' and target_min is not None and target_max is not None:
+                below = np.maximum(0, values / target_min * 100)
+                above = np.maximum(0, 100 - (values - target_max) / target_max * 50)
+                scores = np.where(values < target_min, below, np.where(values > target_max, above, 100.0))
+            elif score_type == 'min_better' and target_min is not None:
+                bonus = np.minimum(20, (values - target_min) / target_min * 20)  # 最多20分奖励
+                reached = np.minimum(100, 100 + bonus)
+                scores = np.where(values >= target_min, reached, np.maximum(0, values / target_min * 100))
+            elif score_type == 'max_better' and target_max is not None:
+                excess = np.maximum(0, 100 - (values - target_max) / target_max * 100)
+                scores = np.where(values <= target_max, 100.0, excess)
+            valid = values > 0
+        return np.where(valid, scores, 0.0)
+    
     def _apply_risk_adjustment(self, base_score: float, stock_data: Dict) -> float:
         """应用风险调整"""
         try:
@@ -335,6 +475,12 @@ class ComplianceEvaluator:
             self.logger.warning(f"风险调整失败: {e}")
             return base_score
     
+    def _grade_array(self, compliance_scores: np.ndarray) -> np.ndarray:
+        """批量获取符合度等级"""
+        compliance_scores = np.asarray(compliance_scores, dtype=float)
+        return np.select([compliance_scores >= level for level, _ in self.GRADE_LEVELS],
+                         [grade for _, grade in self.GRADE_LEVELS], default="不符合")
+    
     def _get_compliance_grade(self, compliance_score: float) -> str:
         """获取符合度等级"""
         if compliance_score >= 90:
@@ -436,8 +582,25 @@ class ComplianceEvaluator:
             self.logger.error(f"投资组合统计计算失败: {e}")
             return {'success_rate': 0.0, 'avg_compliance': 0.0}
 
+# 进程内共享的评估器（评估过程不修改评估器状态，可以在多个线程间共享）
+_default_evaluator = None
+_default_evaluator_lock = threading.Lock()
+
+
+def get_compliance_evaluator() -> ComplianceEvaluator:
+    """获取进程内共享的符合度评估器"""
+    global _default_evaluator
+    with _default_evaluator_lock:
+        if _default_evaluator is None:
+            _default_evaluator = ComplianceEvaluator()
+        return _default_evaluator
+
 # 兼容性函数 - 保持原有接口
 def evaluate_stock_compliance_fast(stock_data: Dict, strategy_type: str) -> Dict:
     """快速符合度评估 - 兼容性接口"""
-    evaluator = ComplianceEvaluator()
-    return evaluator.evaluate_stock_compliance(stock_data, strategy_type, fast_mode=True) 
\ No newline at end of file
+    return get_compliance_evaluator().evaluate_stock_compliance(stock_data, strategy_type, fast_mode=True)
+
+def evaluate_universe_compliance(universe: Union[pd.DataFrame, Dict[str, np.ndarray]],
+                                 strategy_type: str) -> Dict[str, np.ndarray]:
+    """批量符合度评估 - 见 ComplianceEvaluator.evaluate_batch"""
+    return get_compliance_evaluator().evaluate_batch(universe, strategy_type) 
\ No newline at end of file
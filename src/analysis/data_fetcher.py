@@ -16,11 +16,29 @@ import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 
+try:
+    from .bar_store import get_ohlcv_store
+    from .rate_limiter import limit_akshare
+    from .single_flight import get_single_flight
+    from .client_registry import get_client_registry
+except ImportError:
+    from bar_store import get_ohlcv_store
+    from rate_limiter import limit_akshare
+    from single_flight import get_single_flight
+    from client_registry import get_client_registry
+
+# 所有AkShare调用经过统一限流
+ak = limit_akshare(ak)
+
 class OptimizedDataFetcher:
     """
     优化的数据获取器 - 解决超时和连接问题
     """
     
+    # 数据源实际提供的K线周期：TuShare pro_bar 与 AkShare stock_zh_a_hist 都只取日线，
+    # 请求其他周期时同样返回日线（数据源名以 _daily 结尾）
+    BAR_FREQS = ('daily',)
+    
     def __init__(self):
         # 初始化tushare
         self.tushare_available = False
@@ -51,6 +69,9 @@ class OptimizedDataFetcher:
         # 设置超时
         self.timeout = (10, 30)  # (连接超时, 读取超时)
         
+        # 本地K线存储（进程内共享）
+        self.bar_store = get_ohlcv_store()
+        
         # 初始化API连接
         self._initialize_apis()
         
@@ -62,149 +83,19 @@ class OptimizedDataFetcher:
         self._init_akshare()
     
     def _init_tushare(self):
-        """初始化TuShare"""
-        try:
-            # 修复配置文件路径问题
-            import os
-            project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-            config_path = os.path.join(project_root, 'config', 'tushare_config.json')
-            
-            print(f"🔍 查找TuShare配置文件: {config_path}")
-            print(f"📁 配置文件是否存在: {os.path.exists(config_path)}")
-            
-            if os.path.exists(config_path):
-                with open(config_path, 'r', encoding='utf-8') as f:
-                    config = json.load(f)
-                    token = config.get('token')
-                    print(f"🔑 读取到Token: {token[:20]}...{token[-10:] if len(token) > 30 else ''}")
-                    
-                    if token:
-                        ts.set_token(token)
-                        self.pro = ts.pro_api()
-                        self.tushare_pro = self.pro  # 添加别名确保兼容性
-                        # 测试连接
-                        print("🧪 测试TuShare连接...")
-                        test_data = self.pro.query('stock_basic', exchange='', list_status='L', limit=1)
-                        if test_data is not None and len(test_data) > 0:
-                            self.tushare_available = True
-                            print("✅ TuShare Pro API初始化成功")
-                        else:
-                            print("⚠️ TuShare Pro API测试失败")
-            else:
-                print("⚠️ TuShare配置文件不存在")
-            
-            if not self.tushare_available:
-                print("⚠️ TuShare Pro未正确配置")
-                
-        except Exception as e:
-            print(f"❌ TuShare初始化失败: {e}")
-            self.tushare_available = False
+        """从共享注册表获取TuShare客户端（不发起网络请求，可用性为缓存的健康状态）"""
+        registry = get_client_registry()
+        self.pro = registry.tushare()
+        self.tushare_pro = self.pro  # 添加别名确保兼容性
+        self.tushare_available = registry.tushare_available
+        if not self.tushare_available:
+            print("⚠️ TuShare Pro未正确配置或暂不可用")
     
     def _init_akshare(self):
-        """初始化AkShare - 修复连接问题"""
-        try:
-            import socket
-            import requests
-            
-            # 设置更长的socket超时
-            old_timeout = socket.getdefaulttimeout()
-            socket.setdefaulttimeout(30)  # 30秒超时
-            
-            # 配置AkShare的requests会话
-            try:
-                # 设置自定义User-Agent避免被反爬虫
-                headers = {
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-                }
-                
-                # 创建会话并配置
-                session = requests.Session()
-                session.headers.update(headers)
-                
-                # 配置连接池
-                adapter = requests.adapters.HTTPAdapter(
-                    pool_connections=10,
-                    pool_maxsize=20,
-                    max_retries=3
-                )
-                session.mount('http://', adapter)
-                session.mount('https://', adapter)
-                
-                # 将会话应用到akshare（如果支持的话）
-                try:
-                    import akshare as ak
-                    # 某些版本的akshare支持设置session
-                    if hasattr(ak, 'set_session'):
-                        ak.set_session(session)
-                except:
-                    pass
-                
-                print("🧪 测试AkShare连接（增强版）...")
-                
-                # 如果TuShare可用，减少AkShare重试次数，节省时间
-                max_retries = 1 if self.tushare_available else 3
-                
-                # 使用重试机制测试连接
-                for attempt in range(max_retries):
-                    try:
-                        print(f"📡 AkShare连接测试 (第{attempt+1}次)...")
-                        
-                        # 测试获取少量数据避免超时
-                        test_data = ak.stock_zh_a_spot_em()
-                        
-                        if test_data is not None and len(test_data) > 0:
-                            self.akshare_available = True
-                            print(f"✅ AkShare初始化成功 (第{attempt+1}次尝试)")
-                            break
-                        else:
-                            print(f"⚠️ AkShare返回空数据 (第{attempt+1}次)")
-                            if attempt < max_retries - 1:
-                                import time
-                                time.sleep(2 ** attempt)  # 指数退避
-                                
-                    except requests.exceptions.ConnectionError as e:
-                        print(f"⚠️ AkShare连接错误 (第{attempt+1}次): 网络连接问题")
-                        if attempt < max_retries - 1:
-                            import time
-                            time.sleep(3)
-                    except requests.exceptions.Timeout as e:
-                        print(f"⚠️ AkShare超时 (第{attempt+1}次): 请求超时")
-                        if attempt < max_retries - 1:
-                            import time
-                            time.sleep(2)
-                    except Exception as e:
-                        error_msg = str(e)
-                        if len(error_msg) > 100:
-                            error_msg = error_msg[:100] + "..."
-                        print(f"⚠️ AkShare测试失败 (第{attempt+1}次): {error_msg}")
-                        if attempt < max_retries - 1:
-                            import time
-                            time.sleep(2)
-                
-                if not self.akshare_available:
-                    if self.tushare_available:
-                        print("💡 AkShare初始化失败，但TuShare可用，系统将优先使用TuShare")
-                    else:
-                        print("❌ AkShare初始化失败：所有重试都失败")
-                        print("📡 系统将主要依赖TuShare数据源")
-                
-            finally:
-                # 恢复原始超时设置
-                socket.setdefaulttimeout(old_timeout)
-                
-        except ImportError:
-            print("⚠️ AkShare未安装")
-            self.akshare_available = False
-        except Exception as e:
-            error_msg = str(e)
-            if len(error_msg) > 100:
-                error_msg = error_msg[:100] + "..."
-            print(f"❌ AkShare初始化异常: {error_msg}")
-            if self.tushare_available:
-                print("💡 将优先使用TuShare作为主要数据源")
-            else:
-                print("📡 系统将继续使用TuShare作为主要数据源")
-            self.akshare_available = False
+        """从共享注册表获取AkShare可用性（不再每次拉取全市场行情做连接测试）"""
+        self.akshare_available = get_client_registry().akshare_available
+        if not self.akshare_available and self.tushare_available:
+            print("💡 AkShare暂不可用，但TuShare可用，系统将优先使用TuShare")
     
     def get_real_stock_data(self, stock_code: str, freq: str = "daily", 
                           start_date: str = None, end_date: str = None,
@@ -239,6 +130,40 @@ class OptimizedDataFetcher:
         if start_date is None:
             start_date = (datetime.now() - timedelta(days=365*2)).strftime('%Y%m%d')
         
+        # 优先读取本地K线存储，只回源缺失的日期区间
+        # 注意：当前两个数据源都只提供日线，因此统一按 daily 存储
+        # 进程内相同 (代码, 周期, 区间) 的并发请求合并为一次，其余请求等待并共享结果
+        (data, data_source), shared = get_single_flight().do(
+            (stock_code_full, 'daily', start_date, end_date),
+            lambda: self.bar_store.get_bars(
+                stock_code_full, 'daily', start_date, end_date,
+                lambda start, end: self._fetch_remote_bars(stock_code, stock_code_full, start, end, max_retries)
+            )
+        )
+        if shared:
+            print(f"♻️ 合并并发请求: {stock_code_full} {start_date}-{end_date}")
+        
+        if data is None or len(data) == 0:
+            # 如果所有方法都失败，返回None而不是模拟数据
+            print(f"❌ 所有数据源都无法获取{stock_code}的数据，跳过此股票")
+            return None, None
+        
+        # 🔥 修复：统一数据格式，确保前端兼容性
+        data = self._standardize_data_format(data, 'tushare')
+        return data, data_source
+    
+    def _fetch_remote_bars(self, stock_code: str, stock_code_full: str,
+                           start_date: str, end_date: str,
+                           max_retries: int = 3) -> Tuple[Optional[pd.DataFrame], Optional[str]]:
+        """
+        从TuShare/AkShare获取原始日线数据（TuShare列名格式，未标准化）
+        :param stock_code: 原始股票代码
+        :param stock_code_full: 带交易所后缀的股票代码
+        :param start_date: 开始日期 YYYYMMDD
+        :param end_date: 结束日期 YYYYMMDD
+        :param max_retries: 最大重试次数
+        :return: (数据DataFrame, 数据源)
+        """
         # 方法1：优先使用TuShare（更稳定）
         if self.tushare_available:
             for attempt in range(max_retries):
@@ -247,6 +172,7 @@ class OptimizedDataFetcher:
                     
                     # 使用pro_bar接口获取前复权数据
                     data = ts.pro_bar(
+                        api=self.pro,
                         ts_code=stock_code_full,
                         adj='qfq',  # 前复权
                         start_date=start_date,
@@ -258,9 +184,6 @@ class OptimizedDataFetcher:
                         # 数据预处理
                         data = data.sort_values('trade_date').reset_index(drop=True)
                         
-                        # 🔥 修复：统一数据格式，确保前端兼容性
-                        data = self._standardize_data_format(data, 'tushare')
-                        
                         # 数据质量验证
                         if self._validate_data_quality(data, stock_code):
                             print(f"✅ TuShare获取成功: {len(data)} 条记录")
@@ -326,9 +249,6 @@ class OptimizedDataFetcher:
                         # 数据预处理
                         data = data.sort_values('trade_date').reset_index(drop=True)
                         
-                        # 🔥 修复：统一数据格式，确保前端兼容性
-                        data = self._standardize_data_format(data, 'akshare')
-                        
                         # 数据质量验证
                         if self._validate_data_quality(data, stock_code):
                             print(f"✅ AkShare获取成功: {len(data)} 条记录")
@@ -359,8 +279,6 @@ class OptimizedDataFetcher:
                         time.sleep(2 ** attempt)  # 指数退避
                         continue
         
-        # 如果所有方法都失败，返回None而不是模拟数据
-        print(f"❌ 所有数据源都无法获取{stock_code}的数据，跳过此股票")
         return None, None
     
     def _standardize_akshare_data(self, data: pd.DataFrame) -> pd.DataFrame:
@@ -0,0 +1,97 @@
+"""
+基本面数据按交易日缓存
+个股信息、财务分析指标、每日指标等接口一天内结果不变；按 (接口, 股票代码, 交易日) 缓存，
+同一请求的多个周期、不同用户的请求都共用一次回源（并发的相同调用由 single-flight 合并）
+"""
+
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+try:
+    from .single_flight import get_single_flight
+except ImportError:
+    from single_flight import get_single_flight
+
+
+class FundamentalsCache:
+    """
+    按交易日失效的基本面数据缓存（LRU）
+    空结果（None 或空表）不缓存，下次调用重新获取；缓存的数据被多个请求共享，使用方不能原地修改
+    """
+
+    def __init__(self, max_entries: int = 2048):
+        """
+        初始化缓存
+        :param max_entries: 最多保留的结果个数
+        """
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'fetches': 0}
+
+    @staticmethod
+    def trade_day() -> str:
+        """当前交易日（交易日历不可用时用自然日）"""
+        try:
+            try:
+                from .trade_calendar import get_trade_calendar
+            except ImportError:
+                from trade_calendar import get_trade_calendar
+            day = get_trade_calendar().latest_trading_day()
+            if day:
+                return day
+        except Exception:
+            pass
+        return datetime.now().strftime('%Y%m%d')
+
+    def get(self, kind: str, stock_code: str, fetch: Callable[[], Any]) -> Any:
+        """
+        获取当天的数据，未缓存时调用 fetch 获取
+        :param kind: 数据类别（通常为接口名）
+        :param stock_code: 股票代码
+        :param fetch: 无参获取函数
+        :return: fetch 的结果；fetch 抛出的异常原样抛出且不缓存
+        """
+        key = (kind, stock_code, self.trade_day())
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self._stats['hits'] += 1
+                return self._entries[key]
+
+        value, _ = get_single_flight().do(('fundamentals',) + key, fetch)
+        with self._lock:
+            self._stats['fetches'] += 1
+            if not _is_empty(value):
+                self._entries[key] = value
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return value
+
+    def stats(self) -> Dict[str, int]:
+        """命中、回源次数和当前条目数"""
+        with self._lock:
+            return dict(self._stats, entries=len(self._entries))
+
+
+def _is_empty(value: Optional[Any]) -> bool:
+    if value is None:
+        return True
+    return bool(getattr(value, 'empty', False))
+
+
+# 进程内共享的基本面缓存
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_fundamentals_cache() -> FundamentalsCache:
+    """获取进程内共享的基本面数据缓存"""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = FundamentalsCache()
+        return _default_cache
@@ -0,0 +1,373 @@
+"""
+全市场财务指标存储
+ROE、增长率、资产负债率等财务指标每个报告期才变化一次；按报告期整表下载全市场数据并以列式文件保存，
+按股票代码向量化查询，扫描器直接关联财务指标，不再逐只调用 fina_indicator。
+ROE/ROA/EPS 是年初至报告期末的累计值，季报中的数值与年度阈值不可比，最新视图中取自最近的年报
+"""
+
+import os
+import time
+import threading
+import numpy as np
+import pandas as pd
+from datetime import datetime, date
+from typing import Dict, List, Sequence, Union
+
+try:
+    from .columnar_store import DATA_DIR, save_frame, load_frame, get_file_lock
+    from .rate_limiter import limit_akshare
+except ImportError:
+    from columnar_store import DATA_DIR, save_frame, load_frame, get_file_lock
+    from rate_limiter import limit_akshare
+
+DateLike = Union[str, date, datetime, None]
+
+# 报告期（月日） -> 法定披露截止日（月日，年报为次年）
+REPORT_DEADLINES = {
+    '0331': '0430',
+    '0630': '0831',
+    '0930': '1031',
+    '1231': '0430',
+}
+
+
+def _to_day(value: DateLike) -> str:
+    """日期转换为 YYYYMMDD 字符串，默认今天"""
+    if value is None:
+        return datetime.now().strftime('%Y%m%d')
+    if isinstance(value, (datetime, date)):
+        return value.strftime('%Y%m%d')
+    return str(value).replace('-', '')[:8]
+
+
+def report_periods(as_of: DateLike = None, count: int = 4) -> List[str]:
+    """
+    截至某日已结束的最近几个报告期
+    :param as_of: 日期，默认今天
+    :param count: 报告期个数
+    :return: 报告期 YYYYMMDD 列表，从新到旧
+    """
+    day = _to_day(as_of)
+    year = int(day[:4])
+    periods = []
+    while len(periods) < count:
+        for month_day in ('1231', '0930', '0630', '0331'):
+            period = f"{year}{month_day}"
+            if period <= day and len(periods) < count:
+                periods.append(period)
+        year -= 1
+    return periods
+
+
+def disclosure_deadline(period: str) -> str:
+    """报告期的法定披露截止日（之后该报告期数据不再新增）"""
+    month_day = period[4:]
+    year = int(period[:4]) + (1 if month_day == '1231' else 0)
+    return f"{year}{REPORT_DEADLINES[month_day]}"
+
+
+def normalize_code(code) -> str:
+    """000001 / 000001.SZ / sz000001 统一为6位代码"""
+    code = str(code).strip().upper()
+    if '.' in code:
+        code = code.split('.')[0]
+    elif code[:2] in ('SH', 'SZ', 'BJ'):
+        code = code[2:]
+    return code.zfill(6)
+
+
+class FundamentalsStore:
+    """
+    按报告期存储的全市场财务指标
+    列：code, end_date, ann_date 以及 COLUMNS 中的财务指标（缺失为 NaN）
+    披露截止日之后的报告期数据永久使用本地文件；截止日之前仍有公司陆续披露，超过 pending_ttl 秒后重新下载
+    """
+
+    COLUMNS = ['roe', 'roa', 'gross_margin', 'net_margin', 'debt_ratio', 'current_ratio',
+               'quick_ratio', 'eps', 'bps', 'revenue_growth', 'profit_growth']
+
+    # 年初至报告期末的累计值（一季报约为全年的1/4），最新视图只取年报数据
+    ANNUAL_COLUMNS = ['roe', 'roa', 'eps']
+
+    # TuShare fina_indicator 字段 -> 存储列
+    TUSHARE_FIELDS = {
+        'roe': 'roe',
+        'roa': 'roa',
+        'grossprofit_margin': 'gross_margin',
+        'netprofit_margin': 'net_margin',
+        'debt_to_assets': 'debt_ratio',
+        'current_ratio': 'current_ratio',
+        'quick_ratio': 'quick_ratio',
+        'eps': 'eps',
+        'bps': 'bps',
+        'or_yoy': 'revenue_growth',
+        'netprofit_yoy': 'profit_growth',
+    }
+
+    # AkShare 业绩报表（stock_yjbb_em）列 -> 存储列，不含资产负债率和流动比率
+    AKSHARE_COLUMNS = {
+        '净资产收益率': 'roe',
+        '销售毛利率': 'gross_margin',
+        '每股收益': 'eps',
+        '每股净资产': 'bps',
+        '营业总收入-同比增长': 'revenue_growth',
+        '净利润-同比增长': 'profit_growth',
+    }
+
+    # 获取失败时返回的空表（共享同一对象，最新视图的缓存键保持不变）
+    _EMPTY = pd.DataFrame()
+
+    def __init__(self, base_dir: str = None, pending_ttl: int = 86400, retry_after: int = 300,
+                 lookback: int = 4):
+        """
+        初始化财务指标存储
+        :param base_dir: 存储目录，默认 data/fundamentals
+        :param pending_ttl: 未过披露截止日的报告期数据有效期（秒）
+        :param retry_after: 下载失败后多少秒内不再重试（避免逐只查询时反复请求）
+        :param lookback: 最新视图回看的报告期个数，最近报告期未披露的股票使用更早的报告期
+                         （ANNUAL_COLUMNS 另外回看最近两期年报）
+        """
+        self.base_dir = base_dir or os.path.join(DATA_DIR, 'fundamentals')
+        self.pending_ttl = pending_ttl
+        self.retry_after = retry_after
+        self.lookback = lookback
+        self._periods = {}
+        self._failed = {}
+        self._latest = None
+        self._lock = threading.Lock()
+
+    def _path(self, period: str) -> str:
+        """获取报告期文件路径"""
+        return os.path.join(self.base_dir, f"{period}.npz")
+
+    def _is_usable(self, meta: dict) -> bool:
+        """定稿报告期永久有效，未定稿报告期在 pending_ttl 内有效"""
+        if not meta:
+            return False
+        if meta.get('final'):
+            return True
+        return time.time() - meta.get('fetched_at', 0) < self.pending_ttl
+
+    def get_period(self, period: str, pro=None, force_refresh: bool = False) -> pd.DataFrame:
+        """
+        获取某个报告期的全市场财务指标
+        :param period: 报告期 YYYYMMDD（0331/0630/0930/1231）
+        :param pro: TuShare Pro API对象，默认使用共享客户端
+        :param force_refresh: 强制重新下载
+        :return: 每只股票一行的财务指标表（只读共享）；获取失败返回空DataFrame
+        """
+        period = _to_day(period)
+
+        if not force_refresh:
+            with self._lock:
+                cached = self._periods.get(period)
+                if cached is not None and self._is_usable(cached[1]):
+                    return cached[0]
+                if time.time() - self._failed.get(period, 0) < self.retry_after:
+                    return cached[0] if cached is not None else self._EMPTY
+
+        path = self._path(period)
+        with get_file_lock(path):
+            if not force_refresh:
+                # 等锁期间其他线程可能已下载完成或刚刚下载失败
+                with self._lock:
+                    cached = self._periods.get(period)
+                    if cached is not None and self._is_usable(cached[1]):
+                        return cached[0]
+                    if time.time() - self._failed.get(period, 0) < self.retry_after:
+                        return cached[0] if cached is not None else self._EMPTY
+                frame, meta = load_frame(path)
+                if frame is not None and len(frame) > 0 and self._is_usable(meta):
+                    self._remember(period, frame, meta)
+                    return frame
+
+            frame, meta = self._download(period, pro)
+            if frame is None:
+                # 下载失败时使用本地已有的数据（即使未定稿），retry_after 内不再重新下载
+                stale, stale_meta = load_frame(path)
+                if stale is not None and len(stale) > 0:
+                    print(f"⚠️ {period}财务指标下载失败，使用本地已有数据")
+                    self._remember(period, stale, stale_meta)
+                else:
+                    stale = self._EMPTY
+                with self._lock:
+                    self._failed[period] = time.time()
+                return stale
+
+            save_frame(path, frame, meta)
+            self._remember(period, frame, meta)
+            return frame
+
+    def get_latest(self, as_of: DateLike = None, pro=None) -> pd.DataFrame:
+        """
+        每只股票截至某日已披露的最新财务指标
+        每个指标取公告过该指标的最新报告期（最新报告期该指标缺失时使用更早报告期的值）；
+        ANNUAL_COLUMNS 只取年报，end_date 为最新报告期，annual_end_date 为年报报告期
+        :param as_of: 日期，默认今天；只使用公告日不晚于该日的数据，回测时不会用到未来数据
+        :param pro: TuShare Pro API对象，默认使用共享客户端
+        :return: 以6位代码为索引的财务指标表（只读共享）
+        """
+        day = _to_day(as_of)
+        periods = report_periods(day, self.lookback)
+        # 最近一期年报可能尚未披露（如4月），再回看一期年报
+        annual_periods = [period for period in report_periods(day, 8) if period.endswith('1231')][:2]
+        periods = sorted(set(periods) | set(annual_periods), reverse=True)
+        frames = [self.get_period(period, pro) for period in periods]
+        key = (day, tuple(id(frame) for frame in frames))
+        with self._lock:
+            if self._latest is not None and self._latest[0] == key:
+                return self._latest[1]
+
+        frames = [frame for frame in frames if len(frame) > 0]
+        if frames:
+            # 报告期从新到旧排列，groupby().first() 逐列取第一个非空值（最新报告期缺失的指标不会遮住更早的数据）
+            merged = pd.concat(frames, ignore_index=True)
+            announced = merged['ann_date'].astype(str)
+            merged = merged[(announced == '') | (announced <= day)]
+            quarterly_columns = [col for col in self.COLUMNS if col not in self.ANNUAL_COLUMNS]
+            recent = merged[merged['end_date'].isin(report_periods(day, self.lookback))]
+            latest = recent.groupby('code')[['end_date', 'ann_date'] + quarterly_columns].first()
+
+            annual = merged[merged['end_date'].str.endswith('1231')]
+            annual = annual.groupby('code')[self.ANNUAL_COLUMNS + ['end_date']].first()
+            latest = latest.reindex(latest.index.union(annual.index))
+            latest[self.ANNUAL_COLUMNS] = annual[self.ANNUAL_COLUMNS].reindex(latest.index)
+            latest['annual_end_date'] = annual['end_date'].reindex(latest.index)
+            latest['end_date'] = latest['end_date'].fillna(latest['annual_end_date'])
+            latest = latest[['end_date', 'ann_date', 'annual_end_date'] + self.COLUMNS]
+        else:
+            latest = pd.DataFrame(columns=['end_date', 'ann_date', 'annual_end_date'] + self.COLUMNS,
+                                  index=pd.Index([], name='code'))
+
+        with self._lock:
+            self._latest = (key, latest)
+        return latest
+
+    def lookup(self, codes: Sequence, columns: Sequence[str] = None, as_of: DateLike = None,
+               pro=None) -> pd.DataFrame:
+        """
+        按股票代码批量查询最新财务指标
+        :param codes: 股票代码（6位代码或 ts_code）
+        :param columns: 需要的列，默认全部财务指标
+        :param as_of: 日期，默认今天
+        :param pro: TuShare Pro API对象，默认使用共享客户端
+        :return: 与 codes 逐行对齐的表（没有数据的股票为 NaN），index 为6位代码
+        """
+        columns = list(columns or self.COLUMNS)
+        latest = self.get_latest(as_of, pro)
+        return latest.reindex([normalize_code(code) for code in codes])[columns]
+
+    def get(self, stock_code: str, as_of: DateLike = None, pro=None) -> Dict:
+        """
+        查询单只股票的最新财务指标
+        :param stock_code: 股票代码
+        :param as_of: 日期，默认今天
+        :param pro: TuShare Pro API对象，默认使用共享客户端
+        :return: {列名: 数值}，只包含有数据的字段（另含 end_date 报告期，有年报时含 annual_end_date）；没有数据时返回空字典
+        """
+        latest = self.get_latest(as_of, pro)
+        code = normalize_code(stock_code)
+        if code not in latest.index:
+            return {}
+        row = latest.loc[code]
+        values = {col: float(row[col]) for col in self.COLUMNS if pd.notna(row[col])}
+        if values:
+            values['end_date'] = str(row['end_date'])
+            if pd.notna(row.get('annual_end_date')):
+                values['annual_end_date'] = str(row['annual_end_date'])
+        return values
+
+    def _remember(self, period: str, frame: pd.DataFrame, meta: dict):
+        with self._lock:
+            self._periods[period] = (frame, meta)
+            self._failed.pop(period, None)
+
+    def _download(self, period: str, pro):
+        """
+        下载某个报告期的全市场财务指标：TuShare fina_indicator_vip -> AkShare 业绩报表
+        :return: (财务指标表, 元数据)，全部数据源失败时返回 (None, None)
+        """
+        if pro is None:
+            try:
+                try:
+                    from .client_registry import get_client_registry
+                except ImportError:
+                    from client_registry import get_client_registry
+                pro = get_client_registry().tushare()
+            except Exception:
+                pro = None
+
+        print(f"🌐 下载{period}报告期全市场财务指标...")
+        start_time = time.time()
+        frame, source = None, None
+
+        if pro is not None:
+            try:
+                fields = ['ts_code', 'ann_date', 'end_date'] + list(self.TUSHARE_FIELDS)
+                df = pro.fina_indicator_vip(period=period, fields=','.join(fields))
+                if df is not None and len(df) > 0:
+                    # 同一报告期可能有更正公告，保留最后一次公告
+                    df = df.sort_values('ann_date').drop_duplicates('ts_code', keep='last')
+                    frame = pd.DataFrame({
+                        'code': df['ts_code'].astype(str).map(normalize_code),
+                        'end_date': df['end_date'].astype(str),
+                        'ann_date': df['ann_date'].fillna('').astype(str),
+                    })
+                    for src_col, dst_col in self.TUSHARE_FIELDS.items():
+                        frame[dst_col] = pd.to_numeric(df[src_col], errors='coerce').to_numpy() \
+                            if src_col in df.columns else np.nan
+                    source = 'tushare'
+            except Exception as e:
+                print(f"⚠️ TuShare {period}财务指标获取失败: {e}")
+
+        if frame is None:
+            try:
+                import akshare as ak
+                ak = limit_akshare(ak)
+                df = ak.stock_yjbb_em(date=period)
+                if df is not None and len(df) > 0:
+                    announced = pd.to_datetime(df['最新公告日期'], errors='coerce') \
+                        if '最新公告日期' in df.columns else pd.Series(pd.NaT, index=df.index)
+                    frame = pd.DataFrame({
+                        'code': df['股票代码'].astype(str).map(normalize_code),
+                        'end_date': period,
+                        'ann_date': announced.dt.strftime('%Y%m%d').fillna('').to_numpy(),
+                    })
+                    for src_col, dst_col in self.AKSHARE_COLUMNS.items():
+                        frame[dst_col] = pd.to_numeric(df[src_col], errors='coerce').to_numpy() \
+                            if src_col in df.columns else np.nan
+                    frame = frame.drop_duplicates('code', keep='last')
+                    source = 'akshare'
+            except Exception as e:
+                print(f"⚠️ AkShare {period}业绩报表获取失败: {e}")
+
+        if frame is None:
+            return None, None
+
+        for col in self.COLUMNS:
+            if col not in frame.columns:
+                frame[col] = np.nan
+        frame = frame[['code', 'end_date', 'ann_date'] + self.COLUMNS].sort_values('code').reset_index(drop=True)
+
+        meta = {
+            'period': period,
+            'source': source,
+            'final': datetime.now().strftime('%Y%m%d') > disclosure_deadline(period),
+            'fetched_at': time.time()
+        }
+        print(f"✅ {period}财务指标下载完成({source}): {len(frame)} 只股票，耗时 {time.time() - start_time:.2f}秒")
+        return frame, meta
+
+
+# 进程内共享的财务指标存储
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_fundamentals_store() -> FundamentalsStore:
+    """获取进程内共享的全市场财务指标存储"""
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = FundamentalsStore()
+        return _default_store
@@ -0,0 +1,101 @@
+"""
+技术指标结果缓存
+指标只取决于K线和计算参数：以 (股票代码, 周期, 参数, 最后一根K线) 为键缓存 StockAnalyzer 的指标结果，
+K线没有变化时直接复用（日线/周线在一个交易日内、不同用户之间都能命中）
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Tuple
+
+import pandas as pd
+
+
+class IndicatorMemo:
+    """
+    有界的指标结果缓存（LRU）
+    缓存的指标会被多个请求共享，使用方不能原地修改其中的序列
+    """
+
+    def __init__(self, max_entries: int = 256):
+        """
+        初始化缓存
+        :param max_entries: 最多保留的结果个数
+        """
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0}
+
+    @staticmethod
+    def make_key(stock_code: str, time_period: str, params: Dict, data: pd.DataFrame) -> Optional[Tuple]:
+        """
+        生成缓存键
+        最后一根K线除时间外还带上收盘价、成交量和K线根数：盘中未收盘的K线时间不变但价格在变，
+        数据起始日期不同时K线根数不同，这两种情况都不能复用
+        :param stock_code: 股票代码
+        :param time_period: 周期
+        :param params: 指标参数
+        :param data: K线数据（含 Date/Close/Volume 列）
+        :return: 缓存键，数据为空时返回 None
+        """
+        if data is None or len(data) == 0:
+            return None
+        last = data.iloc[-1]
+        return (stock_code, time_period, tuple(sorted(params.items())), str(last['Date']),
+                float(last['Close']), float(last['Volume']), len(data))
+
+    def get(self, key: Hashable) -> Optional[Dict]:
+        """
+        获取缓存的指标
+        :param key: 缓存键
+        :return: 指标字典（浅拷贝），未命中返回 None
+        """
+        if key is None:
+            return None
+        with self._lock:
+            indicators = self._entries.get(key)
+            if indicators is None:
+                self._stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+            return dict(indicators)
+
+    def put(self, key: Hashable, indicators: Dict):
+        """
+        保存指标结果，超过容量时淘汰最久未使用的结果
+        :param key: 缓存键
+        :param indicators: 指标字典
+        """
+        if key is None:
+            return
+        with self._lock:
+            self._entries[key] = dict(indicators)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """命中、未命中次数和当前条目数"""
+        with self._lock:
+            return dict(self._stats, entries=len(self._entries))
+
+
+# 进程内共享的指标缓存
+_default_memo = None
+_default_memo_lock = threading.Lock()
+
+
+def get_indicator_memo() -> IndicatorMemo:
+    """获取进程内共享的技术指标结果缓存"""
+    global _default_memo
+    with _default_memo_lock:
+        if _default_memo is None:
+            _default_memo = IndicatorMemo()
+        return _default_memo
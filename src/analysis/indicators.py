@@ -8,6 +8,19 @@ import numpy as np
 from typing import Dict, Tuple, List
 import os
 
+try:
+    from .rate_limiter import limit_tushare, limit_akshare
+    from .chip_kernel import chip_profile
+    from .chip_state import get_chip_state_store
+    from .fundamentals_cache import get_fundamentals_cache
+    from .fundamentals_store import get_fundamentals_store
+except ImportError:
+    from rate_limiter import limit_tushare, limit_akshare
+    from chip_kernel import chip_profile
+    from chip_state import get_chip_state_store
+    from fundamentals_cache import get_fundamentals_cache
+    from fundamentals_store import get_fundamentals_store
+
 def get_tushare_token():
     """从配置文件读取tushare token"""
     try:
@@ -165,12 +178,15 @@ class TechnicalIndicators:
     
     @staticmethod
     def calculate_chip_distribution(close: pd.Series, volume: pd.Series, 
-                                  price_range: int = 100) -> Dict[str, any]:
+                                  price_range: int = 100, ts_code: str = None,
+                                  dates: pd.Series = None) -> Dict[str, any]:
         """
         计算筹码分布
         :param close: 收盘价序列
         :param volume: 成交量序列
         :param price_range: 价格区间数量
+        :param ts_code: 股票代码（与 dates 同时提供时使用按股票保存的增量筹码状态）
+        :param dates: 日线日期序列
         :return: 筹码分布信息
         """
         if len(close) < 20:
@@ -197,33 +213,26 @@ class TechnicalIndicators:
         max_price = close.max()
         price_step = (max_price - min_price) / price_range if max_price > min_price else 1
         
-        # 初始化筹码分布数组
-        chip_distribution = np.zeros(price_range)
-        
-        # 计算每个交易日的筹码分布，考虑时间衰减
+        # 计算每个交易日的筹码分布，考虑时间衰减（越新的数据权重越大）
         decay_factor = 0.97  # 时间衰减因子
-        total_days = len(close)
-        
-        for i in range(len(close)):
-            price = close.iloc[i]
-            vol = volume.iloc[i]
-            
-            # 时间衰减权重（越新的数据权重越大）
-            days_ago = total_days - i - 1
-            weight = decay_factor ** days_ago
-            
-            # 将成交量分配到价格区间
-            if price_step > 0:
-                price_index = int((price - min_price) / price_step)
-                price_index = max(0, min(price_index, price_range - 1))
-                chip_distribution[price_index] += vol * weight
+        if ts_code and dates is not None:
+            bars = pd.DataFrame({
+                'trade_date': pd.to_datetime(dates).dt.strftime('%Y%m%d').values,
+                'close': close.values,
+                'vol': volume.values
+            })
+            price_levels, chip_distribution = get_chip_state_store().get_profile(
+                ts_code, bars, decay=decay_factor, bins=price_range, index_method='floor')
+        else:
+            price_levels = np.arange(price_range) * price_step + min_price
+            chip_distribution = chip_profile(price_levels, volume.values, close.values,
+                                             decay=decay_factor, index_method='floor')
         
         # 找到主要筹码峰
         main_peak_index = np.argmax(chip_distribution)
-        main_peak_price = min_price + main_peak_index * price_step
+        main_peak_price = price_levels[main_peak_index]
         
         # 计算加权平均价格
-        price_levels = np.arange(price_range) * price_step + min_price
         total_weighted_chips = np.sum(chip_distribution)
         if total_weighted_chips > 0:
             weighted_avg_price = np.sum(price_levels * chip_distribution) / total_weighted_chips
@@ -239,8 +248,8 @@ class TechnicalIndicators:
         # 找到压力位和支撑位（基于筹码密集区）
         sorted_indices = np.argsort(chip_distribution)[::-1]
         top_20_percent = sorted_indices[:max(1, int(price_range * 0.2))]
-        pressure_level = min_price + np.max(top_20_percent) * price_step
-        support_level = min_price + np.min(top_20_percent) * price_step
+        pressure_level = price_levels[np.max(top_20_percent)]
+        support_level = price_levels[np.min(top_20_percent)]
         
         # 当前价格分析
         current_price = close.iloc[-1]
@@ -314,10 +323,12 @@ class TechnicalIndicators:
         }
     
     @staticmethod
-    def calculate_pe_analysis(stock_code: str) -> Dict[str, any]:
+    def calculate_pe_analysis(stock_code: str, current_price: float = None) -> Dict[str, any]:
         """
         计算市盈率分析，优先用tushare，获取不到再用akshare
+        接口数据按交易日缓存，多个周期、多次调用只回源一次
         :param stock_code: 股票代码
+        :param current_price: 当前股价（已有K线时传入，不再为取价格单独拉取日线）
         :return: 市盈率分析信息
         """
         # 初始化默认结果
@@ -331,17 +342,24 @@ class TechnicalIndicators:
         # 1. 尝试akshare获取实时数据
         try:
             import akshare as ak
+            ak = limit_akshare(ak)
             
             # 获取当前股价
-            stock_data = ak.stock_zh_a_hist(symbol=stock_code, period="daily", adjust="qfq")
-            current_price = None
-            if not stock_data.empty:
-                current_price = float(stock_data.iloc[-1]['收盘'])
+            if current_price is None:
+                stock_data = get_fundamentals_cache().get(
+                    'stock_zh_a_hist', stock_code,
+                    lambda: ak.stock_zh_a_hist(symbol=stock_code, period="daily", adjust="qfq")
+                )
+                if stock_data is not None and not stock_data.empty:
+                    current_price = float(stock_data.iloc[-1]['收盘'])
+            if current_price is not None:
                 pe_analysis['pe_data']['current_price'] = current_price
             
             # 方法1: 个股信息
             try:
-                stock_info = ak.stock_individual_info_em(symbol=stock_code)
+                stock_info = get_fundamentals_cache().get(
+                    'stock_individual_info_em', stock_code, lambda: ak.stock_individual_info_em(symbol=stock_code)
+                )
                 if not stock_info.empty:
                     # 查找市盈率
                     pe_rows = stock_info[stock_info['item'].str.contains('市盈率', na=False)]
@@ -386,12 +404,18 @@ class TechnicalIndicators:
             except Exception as e:
                 print(f"获取个股信息失败: {e}")
             
-            # 方法2: 财务分析指标
+            # 方法2: 财务分析指标（全市场表按报告期下载一次，没有该股票的数据时再逐只获取）
             try:
-                df_finance = ak.stock_financial_analysis_indicator(symbol=stock_code)
-                if df_finance is not None and len(df_finance) > 0:
-                    latest_data = df_finance.iloc[-1]
-                    
+                financials = get_fundamentals_store().get(stock_code)
+                if financials:
+                    latest_data = {'净资产收益率(%)': financials.get('roe'), '摊薄每股收益(元)': financials.get('eps')}
+                else:
+                    df_finance = get_fundamentals_cache().get(
+                        'stock_financial_analysis_indicator', stock_code,
+                        lambda: ak.stock_financial_analysis_indicator(symbol=stock_code)
+                    )
+                    latest_data = df_finance.iloc[-1] if df_finance is not None and len(df_finance) > 0 else None
+                if latest_data is not None:
                     # 获取ROE
                     roe = latest_data.get('净资产收益率(%)', None)
                     if roe is not None:
@@ -420,9 +444,12 @@ class TechnicalIndicators:
             token = get_tushare_token()
             if token and pe_analysis['current_pe'] is None:
                 ts.set_token(token)
-                pro = ts.pro_api()
+                pro = limit_tushare(ts.pro_api())
                 ts_code = f"{stock_code}.SH" if stock_code.startswith('6') else f"{stock_code}.SZ"
-                df = pro.daily_basic(ts_code=ts_code, fields='ts_code,trade_date,pe,pb,ps,roe')
+                df = get_fundamentals_cache().get(
+                    'daily_basic', stock_code,
+                    lambda: pro.daily_basic(ts_code=ts_code, fields='ts_code,trade_date,pe,pb,ps,roe,turnover_rate')
+                )
                 if df is not None and len(df) > 0:
                     latest = df.sort_values('trade_date').iloc[-1]
                     pe = latest.get('pe', None)
@@ -504,6 +531,7 @@ class TechnicalIndicators:
     def calculate_fundamental_indicators(stock_code: str) -> Dict[str, any]:
         """
         计算基本面指标，优先用akshare，获取不到再用tushare
+        接口数据按交易日缓存，与 calculate_pe_analysis 共用；财务分析指标优先取按报告期缓存的全市场表
         :param stock_code: 股票代码
         :return: 基本面指标信息
         """
@@ -518,10 +546,13 @@ class TechnicalIndicators:
         # 1. AkShare 免费接口优先
         try:
             import akshare as ak
+            ak = limit_akshare(ak)
             
             # 方法1: 个股信息
             try:
-                stock_info = ak.stock_individual_info_em(symbol=stock_code)
+                stock_info = get_fundamentals_cache().get(
+                    'stock_individual_info_em', stock_code, lambda: ak.stock_individual_info_em(symbol=stock_code)
+                )
                 if stock_info is not None and not stock_info.empty:
                     indicator_map = {
                         '市盈率': 'PE市盈率',
@@ -557,9 +588,33 @@ class TechnicalIndicators:
             except Exception as e:
                 print(f"获取个股信息失败: {e}")
             
-            # 方法2: 财务分析指标
+            # 方法2: 财务分析指标（全市场表按报告期下载一次，没有该股票的数据时再逐只获取）
+            try:
+                financials = get_fundamentals_store().get(stock_code)
+                store_map = {
+                    'roe': 'ROE净资产收益率',
+                    'eps': 'EPS每股收益',
+                    'bps': '每股净资产',
+                    'revenue_growth': '营收增长率',
+                    'profit_growth': '净利润增长率',
+                    'debt_ratio': '资产负债率',
+                    'current_ratio': '流动比率',
+                    'quick_ratio': '速动比率',
+                    'gross_margin': '毛利率',
+                    'net_margin': '净利率'
+                }
+                for key, display_key in store_map.items():
+                    if key in financials:
+                        result['indicators'][display_key] = financials[key]
+            except Exception as e:
+                financials = {}
+                print(f"获取全市场财务指标失败: {e}")
+            
             try:
-                df_finance = ak.stock_financial_analysis_indicator(symbol=stock_code)
+                df_finance = None if financials else get_fundamentals_cache().get(
+                    'stock_financial_analysis_indicator', stock_code,
+                    lambda: ak.stock_financial_analysis_indicator(symbol=stock_code)
+                )
                 if df_finance is not None and len(df_finance) > 0:
                     latest_data = df_finance.iloc[-1]
                     
@@ -596,11 +651,14 @@ class TechnicalIndicators:
             token = get_tushare_token()
             if token:
                 ts.set_token(token)
-                pro = ts.pro_api()
+                pro = limit_tushare(ts.pro_api())
                 ts_code = f"{stock_code}.SH" if stock_code.startswith('6') else f"{stock_code}.SZ"
                 
                 # 获取基本指标
-                df = pro.daily_basic(ts_code=ts_code, fields='ts_code,trade_date,pe,pb,ps,roe,turnover_rate')
+                df = get_fundamentals_cache().get(
+                    'daily_basic', stock_code,
+                    lambda: pro.daily_basic(ts_code=ts_code, fields='ts_code,trade_date,pe,pb,ps,roe,turnover_rate')
+                )
                 if df is not None and len(df) > 0:
                     latest = df.sort_values('trade_date').iloc[-1]
                     
@@ -0,0 +1,237 @@
+"""
+延迟加载与启动耗时统计
+重量级依赖（akshare、tushare、plotly、pandas）和全局分析器在首次使用或后台预热时才加载，
+服务进程启动后可以立即响应健康检查；导入耗时按模块统计，便于定位启动瓶颈
+"""
+
+import sys
+import time
+import builtins
+import importlib
+import importlib.util
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+
+class LazyObject:
+    """
+    延迟创建的对象代理
+    首次访问属性或调用时执行 factory，之后所有访问转发给创建好的对象；
+    代理本身的真值判断不会触发创建
+    """
+
+    def __init__(self, factory: Callable[[], Any], name: str = None):
+        """
+        初始化代理
+        :param factory: 创建对象的无参函数
+        :param name: 名称（用于日志）
+        """
+        object.__setattr__(self, '_lazy_factory', factory)
+        object.__setattr__(self, '_lazy_name', name or getattr(factory, '__name__', 'object'))
+        object.__setattr__(self, '_lazy_value', None)
+        object.__setattr__(self, '_lazy_ready', False)
+        object.__setattr__(self, '_lazy_lock', threading.Lock())
+
+    def _lazy_get(self):
+        """获取（必要时创建）被代理的对象"""
+        if self._lazy_ready:
+            return self._lazy_value
+        with self._lazy_lock:
+            if not self._lazy_ready:
+                object.__setattr__(self, '_lazy_value', self._lazy_factory())
+                object.__setattr__(self, '_lazy_ready', True)
+        return self._lazy_value
+
+    def __getattr__(self, name):
+        return getattr(self._lazy_get(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self._lazy_get(), name, value)
+
+    def __call__(self, *args, **kwargs):
+        return self._lazy_get()(*args, **kwargs)
+
+    def __repr__(self):
+        if self._lazy_ready:
+            return repr(self._lazy_value)
+        return f"<LazyObject {self._lazy_name} (未加载)>"
+
+
+def is_loaded(obj) -> bool:
+    """延迟对象是否已经创建（普通对象视为已创建）"""
+    if isinstance(obj, LazyObject):
+        return object.__getattribute__(obj, '_lazy_ready')
+    return True
+
+
+def lazy_module(name: str, wrap: Callable[[Any], Any] = None) -> LazyObject:
+    """
+    延迟导入模块
+    :param name: 模块名
+    :param wrap: 导入后的包装函数（如限流代理）
+    :return: 模块代理
+    """
+    def load():
+        module = _timed_import(name)
+        return wrap(module) if wrap else module
+    return LazyObject(load, name)
+
+
+def lazy_import(module: str, attr: str) -> LazyObject:
+    """
+    延迟导入模块中的对象（类、函数、全局实例）
+    :param module: 模块名
+    :param attr: 对象名
+    :return: 对象代理
+    """
+    return LazyObject(lambda: getattr(_timed_import(module), attr), f"{module}.{attr}")
+
+
+def module_available(name: str) -> bool:
+    """模块是否已安装（只查找，不导入）"""
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+def _timed_import(name: str):
+    """导入模块，导入统计开启时计入耗时"""
+    profiler = _active_profiler
+    if profiler is not None and name not in sys.modules:
+        return profiler.measure(name, lambda: importlib.import_module(name))
+    return importlib.import_module(name)
+
+
+class ImportProfiler:
+    """
+    导入耗时统计
+    替换 builtins.__import__，记录每个首次加载模块的自身耗时（不含其导入的子模块）和累计耗时
+    """
+
+    def __init__(self):
+        self._records: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._original_import = None
+        self.started_at = None
+
+    def install(self):
+        """开始统计"""
+        global _active_profiler
+        if self._original_import is not None:
+            return
+        self.started_at = time.perf_counter()
+        self._original_import = builtins.__import__
+        builtins.__import__ = self._import
+        _active_profiler = self
+
+    def uninstall(self):
+        """停止统计"""
+        global _active_profiler
+        if self._original_import is None:
+            return
+        builtins.__import__ = self._original_import
+        self._original_import = None
+        if _active_profiler is self:
+            _active_profiler = None
+
+    def measure(self, name: str, func: Callable[[], Any]):
+        """执行一次导入并记录耗时"""
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            return func()
+        finally:
+            elapsed = time.perf_counter() - start
+            children = stack.pop()
+            if stack:
+                stack[-1] += elapsed
+            with self._lock:
+                record = self._records.setdefault(name, [0.0, 0.0])
+                record[0] += elapsed - children
+                record[1] += elapsed
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        original = self._original_import or builtins.__import__
+        full_name = name
+        if level:
+            try:
+                package = (globals or {}).get('__package__') or ''
+                full_name = importlib.util.resolve_name('.' * level + name, package)
+            except (ImportError, ValueError):
+                full_name = name
+        if not full_name or full_name in sys.modules:
+            return original(name, globals, locals, fromlist, level)
+        return self.measure(full_name, lambda: original(name, globals, locals, fromlist, level))
+
+    def report(self, top: int = 15) -> Dict[str, Any]:
+        """
+        按顶层包汇总的导入耗时
+        :param top: 返回耗时最多的前N个包
+        :return: {'total': 总耗时, 'elapsed': 统计开始至今, 'packages': [{'package', 'seconds', 'modules'}]}
+        """
+        with self._lock:
+            records = {name: list(value) for name, value in self._records.items()}
+
+        packages: Dict[str, List[float]] = {}
+        for name, (self_time, _) in records.items():
+            package = packages.setdefault(name.split('.')[0], [0.0, 0])
+            package[0] += self_time
+            package[1] += 1
+
+        ranked = sorted(packages.items(), key=lambda item: item[1][0], reverse=True)
+        return {
+            'total': round(sum(value[0] for value in packages.values()), 3),
+            'elapsed': round(time.perf_counter() - self.started_at, 3) if self.started_at else 0.0,
+            'packages': [
+                {'package': package, 'seconds': round(seconds, 3), 'modules': count}
+                for package, (seconds, count) in ranked[:top]
+            ]
+        }
+
+    def print_report(self, title: str = '导入耗时', top: int = 10):
+        """打印导入耗时报告"""
+        report = self.report(top)
+        print(f"⏱️ {title}: 共 {report['total']:.2f}秒")
+        for item in report['packages']:
+            print(f"   {item['package']:<24} {item['seconds']:>7.3f}秒  ({item['modules']} 个模块)")
+
+
+_active_profiler: Optional[ImportProfiler] = None
+
+# 进程内共享的导入统计
+_default_profiler = ImportProfiler()
+
+
+def get_import_profiler() -> ImportProfiler:
+    """获取进程内共享的导入耗时统计"""
+    return _default_profiler
+
+
+def start_warm_up(tasks: List[Callable[[], Any]], name: str = 'warm-up',
+                  on_done: Callable[[], Any] = None) -> threading.Thread:
+    """
+    在后台线程中依次执行预热任务（导入重量级模块、创建全局分析器等）
+    :param tasks: 无参函数列表，单个任务失败不影响后续任务
+    :param name: 线程名
+    :param on_done: 全部任务完成后的回调
+    :return: 预热线程
+    """
+    def run():
+        start_time = time.time()
+        for task in tasks:
+            try:
+                task()
+            except Exception as e:
+                print(f"⚠️ 预热任务失败 {getattr(task, '__name__', task)}: {e}")
+        print(f"🔥 后台预热完成，耗时 {time.time() - start_time:.2f}秒")
+        if on_done:
+            on_done()
+
+    thread = threading.Thread(target=run, name=name, daemon=True)
+    thread.start()
+    return thread
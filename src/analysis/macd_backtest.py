@@ -0,0 +1,164 @@
+"""
+MACD策略回测内核
+输入预先计算好的MACD数组，金叉/死叉、同日只交易一次、持仓和多周期决策查询全部用数组运算完成，
+不再逐根K线解析日期，也不再为每笔交易重新切片计算各周期的MACD
+"""
+
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+try:
+    from .signals import crossover_series, macd_decision_series, MACD_DECISION_NAMES
+except ImportError:
+    from signals import crossover_series, macd_decision_series, MACD_DECISION_NAMES
+
+_NS_PER_DAY = 86400 * 10 ** 9
+
+
+def to_datetime_ns(dates) -> np.ndarray:
+    """日期序列转为 int64 纳秒时间戳"""
+    return pd.to_datetime(pd.Series(dates)).values.astype('datetime64[ns]').astype(np.int64)
+
+
+def day_keys(dates) -> np.ndarray:
+    """日期序列转为 int64 自然日编号（1970-01-01 起的天数），同一天的K线编号相同"""
+    return to_datetime_ns(dates) // _NS_PER_DAY
+
+
+def macd_position(macd, signal) -> np.ndarray:
+    """
+    根据 MACD 与 signal 线判断持仓（金叉后持有、死叉后空仓，1 持有 / 0 空仓）
+    :param macd: MACD线
+    :param signal: 信号线
+    :return: 持仓数组
+    """
+    macd, signal = np.asarray(macd, dtype=float), np.asarray(signal, dtype=float)
+    if len(macd) != len(signal):
+        return np.zeros(len(macd))
+    golden, death = crossover_series(macd, signal, inclusive=True)
+    return _hold_positions(np.flatnonzero(golden | death), golden, len(macd))
+
+
+def _hold_positions(events: np.ndarray, golden: np.ndarray, n: int) -> np.ndarray:
+    """按交易点（金叉为买入）向后延续持仓"""
+    state = np.zeros(n)
+    state[events] = golden[events]
+    last = np.zeros(n, dtype=np.int64)
+    last[events] = events
+    # 每根K线对应的最近一次交易点；之前没有交易时保持空仓
+    last = np.maximum.accumulate(last)
+    pos = state[last]
+    if len(events) > 0:
+        pos[:events[0]] = 0
+    return pos
+
+
+def backtest_macd(dates, closes, macd, signal) -> Dict:
+    """
+    单周期MACD策略回测：金叉买入、死叉卖出，同一天只执行当天的第一次交易
+    :param dates: K线时间（与 closes 对齐）
+    :param closes: 收盘价
+    :param macd: MACD线
+    :param signal: 信号线
+    :return: {'return_pct': 持仓期间收益率之和, 'trades': 交易明细}
+    """
+    closes = np.asarray(closes, dtype=float)
+    n = len(closes)
+    if n == 0:
+        return {'return_pct': 0.0, 'trades': []}
+
+    golden, death = crossover_series(np.asarray(macd, dtype=float), np.asarray(signal, dtype=float),
+                                     inclusive=True)
+    events = np.flatnonzero(golden | death)
+    # 当天已有交易时后续交叉不执行：每天只保留第一个交易点
+    keys = day_keys(dates)[events]
+    events = events[np.r_[True, keys[1:] != keys[:-1]]] if len(events) else events
+    pos = _hold_positions(events, golden, n)
+
+    is_buy = golden[events]
+    # 卖出只在持仓时记录，持仓价为上一次（买入）交易的价格
+    after_buy = np.r_[False, is_buy[:-1]]
+    dates = np.asarray(dates)
+    trades = []
+    for k, i in enumerate(events):
+        if is_buy[k]:
+            trades.append({
+                'type': 'buy',
+                'date': str(dates[i]),
+                'price': float(closes[i])
+            })
+        elif after_buy[k]:
+            holding_price = closes[events[k - 1]]
+            trades.append({
+                'type': 'sell',
+                'date': str(dates[i]),
+                'price': float(closes[i]),
+                'profit_pct': round((closes[i] - holding_price) / holding_price * 100, 2),
+                'profit_amount': round((closes[i] - holding_price), 2)
+            })
+
+    pct_change = np.diff(closes) / closes[:-1]
+    return {
+        'return_pct': float((pos[:-1] * pct_change).sum()),
+        'trades': trades
+    }
+
+
+class PeriodDecisions:
+    """
+    单个周期的逐根K线MACD决策序列，按时间查询某一时刻之前最后一根K线的决策
+    """
+
+    def __init__(self, dates, macd, signal):
+        """
+        :param dates: K线时间（升序）
+        :param macd: MACD线
+        :param signal: 信号线
+        """
+        self.times = to_datetime_ns(dates)
+        self.decisions = macd_decision_series(macd, signal)
+
+    def before(self, times_ns: np.ndarray) -> List[Optional[str]]:
+        """
+        每个时刻之前（不含）最后一根K线的决策
+        :param times_ns: int64 纳秒时间戳数组
+        :return: 决策名称列表，该时刻之前没有K线时为 None
+        """
+        index = self._index_before(times_ns)
+        return [MACD_DECISION_NAMES[int(self.decisions[i])] if i >= 0 else None for i in index]
+
+    def values_before(self, times_ns: np.ndarray) -> np.ndarray:
+        """
+        每个时刻之前（不含）最后一根K线的决策数值（-2 ~ 2）
+        :param times_ns: int64 纳秒时间戳数组
+        :return: 决策数值数组，该时刻之前没有K线时为 0（观望）
+        """
+        index = self._index_before(times_ns)
+        return np.where(index >= 0, self.decisions[np.maximum(index, 0)], 0).astype(float)
+
+    def _index_before(self, times_ns: np.ndarray) -> np.ndarray:
+        return np.searchsorted(self.times, times_ns, side='left') - 1
+
+
+def day_end_ns(dates) -> np.ndarray:
+    """每个日期的当日结束时间（次日零点），包含当天所有收盘前的K线"""
+    return (day_keys(dates) + 1) * _NS_PER_DAY
+
+
+def attach_decisions(trades: List[Dict], period_decisions: Dict[str, PeriodDecisions]):
+    """
+    为每笔交易附加各周期在交易当天收盘时的MACD决策（trade['decisions']）
+    :param trades: backtest_macd 返回的交易明细
+    :param period_decisions: {周期: PeriodDecisions}，按需要输出的顺序排列
+    """
+    if not trades:
+        return
+    day_end = day_end_ns([trade['date'] for trade in trades])
+    lookups = {period: decisions.before(day_end) for period, decisions in period_decisions.items()}
+    for k, trade in enumerate(trades):
+        trade['decisions'] = [
+            {'period': period, 'signal_type': names[k]}
+            for period, names in lookups.items() if names[k] is not None
+        ]
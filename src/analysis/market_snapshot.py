@@ -0,0 +1,217 @@
+"""
+全市场截面快照存储
+每个交易日的 daily + daily_basic + stk_limit 只下载一次，按 ts_code 合并后以列式文件保存
+"""
+
+import os
+import time
+import threading
+import numpy as np
+import pandas as pd
+from collections import OrderedDict
+from datetime import datetime
+
+try:
+    from .columnar_store import DATA_DIR, save_frame, load_frame, get_file_lock
+except ImportError:
+    from columnar_store import DATA_DIR, save_frame, load_frame, get_file_lock
+
+
+class MarketSnapshotStore:
+    """
+    全市场截面快照
+    历史交易日的快照不会再变化，三张表都获取成功后永久使用本地文件；
+    当天的快照可能尚未收盘或数据未发布，超过 today_ttl 秒后重新获取
+    """
+
+    DAILY_COLUMNS = ['ts_code', 'trade_date', 'open', 'high', 'low', 'close',
+                     'pre_close', 'change', 'pct_chg', 'vol', 'amount']
+    BASIC_COLUMNS = ['turnover_rate', 'volume_ratio', 'pe', 'pb', 'total_mv', 'circ_mv']
+    LIMIT_COLUMNS = ['up_limit', 'down_limit']
+
+    def __init__(self, base_dir: str = None, today_ttl: int = 300, memory_size: int = 16):
+        """
+        初始化快照存储
+        :param base_dir: 存储目录，默认 data/snapshot
+        :param today_ttl: 当天（未定稿）快照的有效期（秒）
+        :param memory_size: 内存中保留的快照个数
+        """
+        self.base_dir = base_dir or os.path.join(DATA_DIR, 'snapshot')
+        self.today_ttl = today_ttl
+        self.memory_size = memory_size
+        self._memory = OrderedDict()
+        self._memory_lock = threading.Lock()
+        self._warm_thread = None
+
+    def _path(self, trade_date: str) -> str:
+        """获取快照文件路径"""
+        return os.path.join(self.base_dir, trade_date[:4], f"{trade_date}.npz")
+
+    def _is_usable(self, meta: dict) -> bool:
+        """定稿快照永久有效，未定稿快照在 today_ttl 内有效"""
+        if not meta:
+            return False
+        if meta.get('final'):
+            return True
+        return time.time() - meta.get('fetched_at', 0) < self.today_ttl
+
+    def get_snapshot(self, trade_date: str, pro=None, force_refresh: bool = False) -> pd.DataFrame:
+        """
+        获取某个交易日的全市场截面
+        :param trade_date: 交易日 YYYYMMDD
+        :param pro: TuShare Pro API对象（本地没有时用于下载）
+        :param force_refresh: 强制重新下载
+        :return: 按 ts_code 合并的截面数据（只读共享，调用方需要修改时请先copy）；获取失败返回空DataFrame
+        """
+        trade_date = str(trade_date)
+
+        if not force_refresh:
+            with self._memory_lock:
+                cached = self._memory.get(trade_date)
+                if cached is not None and self._is_usable(cached[1]):
+                    self._memory.move_to_end(trade_date)
+                    return cached[0]
+
+        path = self._path(trade_date)
+        with get_file_lock(path):
+            if not force_refresh:
+                frame, meta = load_frame(path)
+                if frame is not None and len(frame) > 0 and self._is_usable(meta):
+                    self._remember(trade_date, frame, meta)
+                    return frame
+
+            frame, meta = self._download(trade_date, pro)
+            if frame is None:
+                # 下载失败时使用本地已有的快照（即使未定稿）
+                stale, stale_meta = load_frame(path)
+                if stale is not None and len(stale) > 0:
+                    print(f"⚠️ {trade_date}截面下载失败，使用本地已有快照")
+                    return stale
+                return pd.DataFrame()
+
+            save_frame(path, frame, meta)
+            self._remember(trade_date, frame, meta)
+            return frame
+
+    def is_cached(self, trade_date: str) -> bool:
+        """某个交易日的快照是否已在内存或本地文件中（不检查是否定稿）"""
+        trade_date = str(trade_date)
+        with self._memory_lock:
+            if trade_date in self._memory:
+                return True
+        return os.path.exists(self._path(trade_date))
+
+    def warm(self, trade_dates, pro=None) -> bool:
+        """
+        在后台线程中依次下载尚未缓存的快照（同一时间只运行一个预热线程）
+        :param trade_dates: 交易日列表
+        :param pro: TuShare Pro API对象
+        :return: 是否启动了新的预热线程（已有预热在运行时返回 False）
+        """
+        with self._memory_lock:
+            if self._warm_thread is not None and self._warm_thread.is_alive():
+                return False
+
+            def run():
+                missing = [date for date in trade_dates if not self.is_cached(date)]
+                print(f"🔥 后台预热 {len(missing)} 个交易日的全市场截面...")
+                for date in missing:
+                    self.get_snapshot(date, pro)
+                print(f"✅ 截面预热完成: {len(missing)} 个交易日")
+
+            self._warm_thread = threading.Thread(target=run, name='snapshot-warm', daemon=True)
+            self._warm_thread.start()
+            return True
+
+    def get_limit_up_codes(self, trade_date: str, pro=None, tolerance: float = 0.01) -> set:
+        """
+        获取某个交易日收盘涨停的股票代码
+        :param trade_date: 交易日 YYYYMMDD
+        :param pro: TuShare Pro API对象
+        :param tolerance: 收盘价与涨停价的允许误差
+        :return: ts_code 集合
+        """
+        snapshot = self.get_snapshot(trade_date, pro)
+        if snapshot.empty:
+            return set()
+        mask = snapshot['up_limit'].notna() & ((snapshot['close'] - snapshot['up_limit']).abs() < tolerance)
+        return set(snapshot.loc[mask, 'ts_code'])
+
+    def _remember(self, trade_date: str, frame: pd.DataFrame, meta: dict):
+        """放入内存缓存，超过容量时淘汰最久未使用的快照"""
+        with self._memory_lock:
+            self._memory[trade_date] = (frame, meta)
+            self._memory.move_to_end(trade_date)
+            while len(self._memory) > self.memory_size:
+                self._memory.popitem(last=False)
+
+    def _download(self, trade_date: str, pro):
+        """
+        下载并合并三张截面表
+        :return: (合并后的数据, 元数据)，行情表获取失败时返回 (None, None)
+        """
+        if pro is None:
+            return None, None
+
+        print(f"🌐 下载{trade_date}全市场截面...")
+        start_time = time.time()
+
+        try:
+            daily_df = pro.daily(trade_date=trade_date)
+        except Exception as e:
+            print(f"⚠️ {trade_date}行情数据获取失败: {e}")
+            return None, None
+        if daily_df is None or daily_df.empty:
+            print(f"⚠️ {trade_date}无行情数据")
+            return None, None
+
+        frame = daily_df[[col for col in self.DAILY_COLUMNS if col in daily_df.columns]].copy()
+        frame['trade_date'] = frame['trade_date'].astype(str)
+        parts = ['daily']
+
+        try:
+            basic_df = pro.daily_basic(trade_date=trade_date, fields='ts_code,' + ','.join(self.BASIC_COLUMNS))
+            if basic_df is not None and not basic_df.empty:
+                frame = frame.merge(basic_df.drop_duplicates('ts_code'), on='ts_code', how='left')
+                parts.append('daily_basic')
+        except Exception as e:
+            print(f"⚠️ {trade_date}基本面数据获取失败: {e}")
+
+        try:
+            limit_df = pro.stk_limit(trade_date=trade_date)
+            if limit_df is not None and not limit_df.empty:
+                limit_df = limit_df[['ts_code'] + self.LIMIT_COLUMNS].drop_duplicates('ts_code')
+                frame = frame.merge(limit_df, on='ts_code', how='left')
+                parts.append('stk_limit')
+        except Exception as e:
+            print(f"⚠️ {trade_date}涨跌停价格获取失败: {e}")
+
+        for col in self.BASIC_COLUMNS + self.LIMIT_COLUMNS:
+            if col not in frame.columns:
+                frame[col] = np.nan
+            frame[col] = pd.to_numeric(frame[col], errors='coerce')
+
+        today = datetime.now().strftime('%Y%m%d')
+        meta = {
+            'trade_date': trade_date,
+            'parts': parts,
+            'final': trade_date < today and len(parts) == 3,
+            'fetched_at': time.time()
+        }
+        frame = frame.sort_values('ts_code').reset_index(drop=True)
+        print(f"✅ {trade_date}截面下载完成: {len(frame)} 只股票，耗时 {time.time() - start_time:.2f}秒")
+        return frame, meta
+
+
+# 进程内共享的快照存储
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_snapshot_store() -> MarketSnapshotStore:
+    """获取进程内共享的截面快照存储"""
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = MarketSnapshotStore()
+        return _default_store
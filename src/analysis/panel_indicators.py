@@ -0,0 +1,311 @@
+"""
+全市场面板技术指标
+收盘价按 (交易日 × 股票) 组成二维数组，MA、RSI、MACD、布林带对全部股票一次向量化计算，
+取代扫描器中逐只股票获取K线再计算指标的做法；计算口径与 TechnicalIndicators 一致
+"""
+
+import os
+import time
+import threading
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional, Sequence, Tuple
+
+try:
+    from .columnar_store import DATA_DIR, save_frame, load_frame, get_file_lock
+    from .market_snapshot import get_snapshot_store
+    from .trade_calendar import get_trade_calendar
+except ImportError:
+    from columnar_store import DATA_DIR, save_frame, load_frame, get_file_lock
+    from market_snapshot import get_snapshot_store
+    from trade_calendar import get_trade_calendar
+
+
+def rolling_mean(panel: np.ndarray, window: int) -> np.ndarray:
+    """
+    按列滚动均值（窗口内有缺失值时为NaN，与 pd.Series.rolling(window).mean() 一致）
+    :param panel: 交易日 × 股票 的二维数组
+    :param window: 窗口长度
+    :return: 同形状数组
+    """
+    sums, counts = _rolling_sums(panel, window)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(counts == window, sums / window, np.nan)
+
+
+def rolling_std(panel: np.ndarray, window: int) -> np.ndarray:
+    """
+    按列滚动标准差（ddof=1，与 pd.Series.rolling(window).std() 一致）
+    :param panel: 交易日 × 股票 的二维数组
+    :param window: 窗口长度
+    :return: 同形状数组
+    """
+    # 先减去每列均值再累加平方和，减少大数相减的精度损失
+    with np.errstate(invalid='ignore'):
+        anchor = np.nan_to_num(np.nanmean(np.where(np.isfinite(panel), panel, np.nan), axis=0))
+    centered = panel - anchor
+    sums, counts = _rolling_sums(centered, window)
+    squares, _ = _rolling_sums(centered * centered, window)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        variance = (squares - sums * sums / window) / (window - 1)
+        return np.where(counts == window, np.sqrt(np.maximum(variance, 0.0)), np.nan)
+
+
+def ema(panel: np.ndarray, span: int) -> np.ndarray:
+    """
+    按列指数移动平均（与 pd.Series.ewm(span=span).mean() 的 adjust=True 口径一致）
+    逐个交易日递推，每一步对全部股票做向量运算
+    :param panel: 交易日 × 股票 的二维数组
+    :param span: 周期
+    :return: 同形状数组，首个有效值之前为NaN
+    """
+    decay = 1.0 - 2.0 / (span + 1.0)
+    valid = np.isfinite(panel)
+    values = np.where(valid, panel, 0.0)
+    result = np.full(panel.shape, np.nan)
+    numerator = np.zeros(panel.shape[1])
+    denominator = np.zeros(panel.shape[1])
+    for i in range(panel.shape[0]):
+        numerator = numerator * decay + values[i]
+        denominator = denominator * decay + valid[i]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            result[i] = np.where(denominator > 0, numerator / denominator, np.nan)
+    return result
+
+
+def rsi(panel: np.ndarray, period: int = 14) -> np.ndarray:
+    """
+    按列RSI（涨跌幅的简单滚动均值，与 TechnicalIndicators.calculate_rsi 一致）
+    :param panel: 交易日 × 股票 的收盘价
+    :param period: 周期
+    :return: 同形状数组
+    """
+    delta = np.full(panel.shape, np.nan)
+    delta[1:] = panel[1:] - panel[:-1]
+    with np.errstate(invalid='ignore'):
+        gain = rolling_mean(np.where(delta > 0, delta, 0.0), period)
+        loss = rolling_mean(np.where(delta < 0, -delta, 0.0), period)
+    # 单只股票的序列中缺失的涨跌幅按0计入，面板中上市前的位置同样按0计入，需要另外要求窗口内都有收盘价
+    _, counts = _rolling_sums(panel, period)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(counts == period, 100 - 100 / (1 + gain / loss), np.nan)
+
+
+def macd(panel: np.ndarray, fast_period: int = 12, slow_period: int = 26,
+         signal_period: int = 9) -> Dict[str, np.ndarray]:
+    """
+    按列MACD
+    :param panel: 交易日 × 股票 的收盘价
+    :return: {'macd', 'signal', 'histogram'}
+    """
+    macd_line = ema(panel, fast_period) - ema(panel, slow_period)
+    signal_line = ema(macd_line, signal_period)
+    return {'macd': macd_line, 'signal': signal_line, 'histogram': macd_line - signal_line}
+
+
+def bollinger_bands(panel: np.ndarray, period: int = 20,
+                    std_dev: float = 2) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    按列布林带
+    :param panel: 交易日 × 股票 的收盘价
+    :return: (上轨, 中轨, 下轨)
+    """
+    middle = rolling_mean(panel, period)
+    std = rolling_std(panel, period)
+    return middle + std * std_dev, middle, middle - std * std_dev
+
+
+def compute_panel_indicators(close: np.ndarray, ma_periods: Sequence[int] = (5, 10, 20, 60)) -> Dict[str, np.ndarray]:
+    """
+    一次计算全部股票的常用技术指标
+    :param close: 交易日 × 股票 的收盘价
+    :param ma_periods: 均线周期
+    :return: 指标名 -> 交易日 × 股票 数组（ma5.../rsi/macd/macd_signal/macd_histogram/bollinger_upper/middle/lower）
+    """
+    close = np.asarray(close, dtype=float)
+    result = {f'ma{period}': rolling_mean(close, period) for period in ma_periods}
+    result['rsi'] = rsi(close)
+    macd_result = macd(close)
+    result['macd'] = macd_result['macd']
+    result['macd_signal'] = macd_result['signal']
+    result['macd_histogram'] = macd_result['histogram']
+    upper, middle, lower = bollinger_bands(close)
+    result['bollinger_upper'] = upper
+    result['bollinger_middle'] = middle
+    result['bollinger_lower'] = lower
+    return result
+
+
+def build_close_panel(snapshots: List[pd.DataFrame], adjust: bool = True) -> Tuple[List[str], np.ndarray, np.ndarray]:
+    """
+    由按交易日升序排列的全市场截面组成收盘价和成交量面板
+    停牌日收盘价沿用前值；adjust=True 时用每日的 pre_close 与前一日收盘价之比还原除权，得到以最后一天为基准的前复权价格
+    :param snapshots: 截面列表（ts_code、close、vol、pre_close）
+    :param adjust: 是否前复权
+    :return: (股票代码列表, 收盘价面板, 成交量面板)
+    """
+    frames = [s[['ts_code', 'close', 'vol', 'pre_close']] for s in snapshots if s is not None and len(s) > 0]
+    if not frames:
+        return [], np.empty((0, 0)), np.empty((0, 0))
+
+    codes = sorted(set().union(*(frame['ts_code'] for frame in frames)))
+    position = pd.Index(codes)
+    shape = (len(frames), len(codes))
+    close, volume, pre_close = np.full(shape, np.nan), np.full(shape, np.nan), np.full(shape, np.nan)
+    for i, frame in enumerate(frames):
+        columns = position.get_indexer(frame['ts_code'])
+        close[i, columns] = frame['close'].to_numpy(dtype=float)
+        volume[i, columns] = frame['vol'].to_numpy(dtype=float)
+        pre_close[i, columns] = frame['pre_close'].to_numpy(dtype=float)
+
+    close = pd.DataFrame(close).ffill().to_numpy()
+    if adjust and len(frames) > 1:
+        # 第 i 天的除权比例 = pre_close[i] / close[i-1]，第 i 天之前的价格都要乘以该比例
+        with np.errstate(invalid='ignore', divide='ignore'):
+            ratio = pre_close[1:] / close[:-1]
+        ratio = np.where(np.isfinite(ratio) & (ratio > 0), ratio, 1.0)
+        factor = np.ones(shape)
+        factor[:-1] = np.cumprod(ratio[::-1], axis=0)[::-1]
+        close = close * factor
+    return codes, close, volume
+
+
+class MarketIndicatorPanel:
+    """
+    全市场最新技术指标
+    由最近 lookback 个交易日的截面快照计算，每个交易日的结果保存为列式文件；
+    计算可在后台线程进行，未完成时 get_latest 返回 None，调用方使用自己的后备逻辑。
+    只有交易日已收盘且截面齐全的结果标记为定稿；盘中的结果超过 pending_ttl 秒后重新计算
+    """
+
+    def __init__(self, base_dir: str = None, lookback: int = 120, pending_ttl: int = 300):
+        """
+        初始化
+        :param base_dir: 存储目录，默认 data/panel
+        :param lookback: 计算使用的交易日数（MA60 与 MACD 需要足够的预热长度）
+        :param pending_ttl: 未定稿结果（盘中或截面不全）的有效期（秒）
+        """
+        self.base_dir = base_dir or os.path.join(DATA_DIR, 'panel')
+        self.lookback = lookback
+        self.pending_ttl = pending_ttl
+        # 交易日 -> (指标表, 是否定稿, 计算时间)
+        self._latest: Dict[str, Tuple[pd.DataFrame, bool, float]] = {}
+        self._lock = threading.Lock()
+        self._building = set()
+
+    def _path(self, trade_date: str) -> str:
+        """获取结果文件路径"""
+        return os.path.join(self.base_dir, f"{trade_date}.npz")
+
+    def get_latest(self, trade_date: str, pro=None, background: bool = True) -> Optional[pd.DataFrame]:
+        """
+        获取某个交易日全部股票的技术指标
+        :param trade_date: 交易日
+        :param pro: TuShare Pro API对象（截面未缓存时下载使用）
+        :param background: 结果不存在时是否在后台计算（否则同步计算）
+        :return: 以 ts_code 为索引的指标表，后台计算尚未完成时返回 None
+                 （未定稿结果过期后在后台重新计算，完成前返回上一次的结果）
+        """
+        with self._lock:
+            cached = self._latest.get(trade_date)
+        if cached is not None:
+            frame, final, computed_at = cached
+            if final or time.time() - computed_at < self.pending_ttl:
+                return frame
+        else:
+            frame, meta = load_frame(self._path(trade_date))
+            if frame is not None and len(frame) > 0 and meta.get('final'):
+                frame = frame.set_index('ts_code')
+                with self._lock:
+                    self._latest[trade_date] = (frame, True, meta.get('computed_at', time.time()))
+                return frame
+            frame = None
+
+        if not background:
+            return self.build(trade_date, pro)
+
+        with self._lock:
+            if trade_date in self._building:
+                return frame
+            self._building.add(trade_date)
+        threading.Thread(target=self._build_in_background, args=(trade_date, pro),
+                         name=f'panel-indicators-{trade_date}', daemon=True).start()
+        return frame
+
+    def build(self, trade_date: str, pro=None) -> Optional[pd.DataFrame]:
+        """
+        计算某个交易日全部股票的技术指标并保存
+        :param trade_date: 交易日
+        :param pro: TuShare Pro API对象
+        :return: 以 ts_code 为索引的指标表，交易日历或截面不可用时返回 None
+        """
+        start_time = time.time()
+        calendar = get_trade_calendar(pro)
+        trade_dates = calendar.prev_n(trade_date, n=self.lookback, include_self=True)
+        if not trade_dates:
+            print("⚠️ 交易日历不可用，无法计算面板指标")
+            return None
+
+        store = get_snapshot_store()
+        snapshots = [store.get_snapshot(date, pro) for date in trade_dates]
+        codes, close, volume = build_close_panel(snapshots)
+        if not codes:
+            print(f"⚠️ {trade_date}截面不可用，无法计算面板指标")
+            return None
+
+        indicators = compute_panel_indicators(close)
+        latest = pd.DataFrame({name: values[-1] for name, values in indicators.items()})
+        latest.insert(0, 'ts_code', codes)
+        latest['adj_close'] = close[-1]
+        latest['volume'] = volume[-1]
+
+        # 盘中的截面还在变化，收盘后且截面齐全才定稿
+        final = all(len(s) > 0 for s in snapshots) and calendar.is_session_closed(trade_date)
+        computed_at = time.time()
+        with get_file_lock(self._path(trade_date)):
+            save_frame(self._path(trade_date), latest, {
+                'trade_date': trade_date,
+                'days': len(trade_dates),
+                'final': final,
+                'computed_at': computed_at
+            })
+        latest = latest.set_index('ts_code')
+        with self._lock:
+            self._latest = {trade_date: (latest, final, computed_at)}
+        print(f"✅ {trade_date}面板指标计算完成: {len(codes)} 只股票 × {len(trade_dates)} 个交易日，"
+              f"耗时 {time.time() - start_time:.2f}秒")
+        return latest
+
+    def _build_in_background(self, trade_date: str, pro):
+        try:
+            self.build(trade_date, pro)
+        except Exception as e:
+            print(f"⚠️ 面板指标计算失败: {e}")
+        finally:
+            with self._lock:
+                self._building.discard(trade_date)
+
+
+def _rolling_sums(panel: np.ndarray, window: int) -> Tuple[np.ndarray, np.ndarray]:
+    """按列滚动求和，同时返回窗口内有效值个数"""
+    valid = np.isfinite(panel)
+    values = np.where(valid, panel, 0.0)
+    sums = np.cumsum(values, axis=0)
+    counts = np.cumsum(valid, axis=0)
+    sums[window:] = sums[window:] - sums[:-window]
+    counts[window:] = counts[window:] - counts[:-window]
+    return sums, counts
+
+
+# 进程内共享的面板指标
+_default_panel = None
+_default_panel_lock = threading.Lock()
+
+
+def get_market_indicator_panel() -> MarketIndicatorPanel:
+    """获取进程内共享的全市场面板指标"""
+    global _default_panel
+    with _default_panel_lock:
+        if _default_panel is None:
+            _default_panel = MarketIndicatorPanel()
+        return _default_panel
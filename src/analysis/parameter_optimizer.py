@@ -0,0 +1,661 @@
+"""
+策略参数寻优
+对多周期回测权重（config/backtest_weights.json）和选股阈值（PE/PB/市值）做网格搜索或随机搜索，可选滚动前推（walk-forward）验证。
+行情只加载一次，进程池的各工作进程共享同一份矩阵；每组参数只做数组运算和回测，
+排名结果写入 config/optimization/，最优参数写回 config/backtest_weights.json 或 config/strategy_thresholds.json
+"""
+
+import itertools
+import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+try:
+    from .columnar_store import PROJECT_ROOT
+    from .macd_backtest import PeriodDecisions, day_end_ns
+    from .panel_indicators import macd as panel_macd
+    from .portfolio_backtest import PortfolioBacktester, load_market_matrices, signals_from_conditions
+except ImportError:
+    from columnar_store import PROJECT_ROOT
+    from macd_backtest import PeriodDecisions, day_end_ns
+    from panel_indicators import macd as panel_macd
+    from portfolio_backtest import PortfolioBacktester, load_market_matrices, signals_from_conditions
+
+CONFIG_DIR = os.path.join(PROJECT_ROOT, 'config')
+RESULTS_DIR = os.path.join(CONFIG_DIR, 'optimization')
+BACKTEST_WEIGHTS_PATH = os.path.join(CONFIG_DIR, 'backtest_weights.json')
+STRATEGY_THRESHOLDS_PATH = os.path.join(CONFIG_DIR, 'strategy_thresholds.json')
+
+# 回测权重对应的周期（与 load_backtest_weights 一致）
+PERIODS = ('15', '30', '60', 'daily', 'weekly')
+
+# 写回 strategy_thresholds.json 的阈值字段（与 ComplianceEvaluator 的 criteria、_apply_optimized_filters 的参数同名）
+THRESHOLD_KEYS = ('pe_min', 'pe_max', 'pb_min', 'pb_max', 'market_cap_min', 'market_cap_max')
+# 一并写回的回测参数（寻优时参与评分，保存后配置与评分时一致）
+BACKTEST_KEYS = ('max_positions',)
+
+# 默认搜索空间：列表为离散取值；二元组为 [下限, 上限] 区间，随机搜索均匀抽样，网格搜索取 grid_points 个等分点
+DEFAULT_SPACES = {
+    'weights': {
+        '15': [0, 1, 2, 3],
+        '30': [0, 1, 2, 3],
+        '60': [0, 1, 2, 3],
+        'daily': [1, 2, 3],
+        'weekly': [0, 1, 2, 3]
+    },
+    'thresholds': {
+        'pe_min': [0, 3, 5, 8],
+        'pe_max': [18, 25, 40, 200],
+        'pb_min': [0.1, 0.5, 0.8],
+        'pb_max': [2.5, 3.5, 6, 50],
+        'market_cap_min': [1, 80, 150, 300, 1000],
+        'max_positions': [5, 10, 20]
+    }
+}
+
+# 默认优化目标
+DEFAULT_METRICS = {
+    'weights': 'mean_return_pct',
+    'thresholds': 'sharpe'
+}
+
+
+def grid_candidates(space: Dict, grid_points: int = 5) -> List[Dict]:
+    """
+    网格搜索的全部参数组合
+    :param space: 搜索空间 {参数名: 取值列表 或 (下限, 上限)}
+    :param grid_points: 区间参数的等分点数
+    :return: 参数字典列表
+    """
+    names = list(space)
+    axes = [_axis(space[name], grid_points) for name in names]
+    return [dict(zip(names, combo)) for combo in itertools.product(*axes)]
+
+
+def random_candidates(space: Dict, n_iter: int, seed: int = None) -> List[Dict]:
+    """
+    随机搜索的参数组合（去重）
+    :param space: 搜索空间 {参数名: 取值列表 或 (下限, 上限)}
+    :param n_iter: 组合个数上限（离散空间较小时可能少于该值）
+    :param seed: 随机种子
+    :return: 参数字典列表
+    """
+    rng = random.Random(seed)
+    seen = set()
+    candidates = []
+    for _ in range(n_iter * 20):
+        if len(candidates) >= n_iter:
+            break
+        params = {name: _sample(values, rng) for name, values in space.items()}
+        key = tuple(sorted(params.items()))
+        if key not in seen:
+            seen.add(key)
+            candidates.append(params)
+    return candidates
+
+
+def _axis(values, grid_points: int) -> List:
+    if isinstance(values, tuple) and len(values) == 2:
+        low, high = values
+        if isinstance(low, int) and isinstance(high, int):
+            return sorted({int(round(v)) for v in np.linspace(low, high, grid_points)})
+        return [round(float(v), 4) for v in np.linspace(low, high, grid_points)]
+    return list(values)
+
+
+def _sample(values, rng: random.Random):
+    if isinstance(values, tuple) and len(values) == 2:
+        low, high = values
+        if isinstance(low, int) and isinstance(high, int):
+            return rng.randint(low, high)
+        return round(rng.uniform(low, high), 4)
+    return rng.choice(list(values))
+
+
+def walk_forward_windows(n_days: int, train_days: int, test_days: int, step: int = None,
+                         start: int = 0) -> List[Tuple[slice, slice]]:
+    """
+    滚动前推窗口：每一折在训练区间选参数、在紧随其后的测试区间检验
+    :param n_days: 交易日总数
+    :param train_days: 训练区间长度
+    :param test_days: 测试区间长度
+    :param step: 每折向前滚动的交易日数，默认等于 test_days（测试区间首尾相接）
+    :param start: 第一折的起始下标（跳过指标预热期）
+    :return: [(训练区间, 测试区间)]，区间为行下标切片
+    """
+    step = step or test_days
+    windows = []
+    begin = start
+    while begin + train_days + test_days <= n_days:
+        middle = begin + train_days
+        windows.append((slice(begin, middle), slice(middle, middle + test_days)))
+        begin += step
+    return windows
+
+
+class PeriodWeightObjective:
+    """
+    多周期权重的评估目标
+    每个交易日收盘时按权重合成各周期的MACD决策（-2 ~ 2），合成分数达到 HOLD_THRESHOLD 时持有、低于 -HOLD_THRESHOLD 时空仓，
+    收益口径与单股回测一致（持仓期间日收益率之和），目标为股票池的平均收益率。
+    开平仓阈值固定（backtest_weights.json 只保存各周期权重），只搜索权重
+    """
+
+    HOLD_THRESHOLD = 0.5
+
+    def __init__(self, dates: Sequence[str], close: np.ndarray, decisions: np.ndarray, metric: str = None):
+        """
+        :param dates: 交易日列表（长度 T）
+        :param close: T × S 日线收盘价（股票未上市或停牌为 NaN）
+        :param decisions: T × S × P 各周期在当日收盘时的决策数值，P 与 PERIODS 对应
+        :param metric: 优化目标，默认 mean_return_pct
+        """
+        self.dates = list(dates)
+        self.decisions = np.asarray(decisions, dtype=float)
+        close = np.asarray(close, dtype=float)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            pct = np.diff(close, axis=0) / close[:-1]
+        # 第 t 天的持仓获得第 t -> t+1 天的收益
+        self.forward = np.vstack([np.nan_to_num(pct, nan=0.0, posinf=0.0, neginf=0.0),
+                                  np.zeros((1, close.shape[1]))])
+        self.listed = np.isfinite(close).any(axis=0)
+        self.metric = metric or DEFAULT_METRICS['weights']
+        self.n_days = len(self.dates)
+        self.warmup = 0
+
+    def is_valid(self, params: Dict) -> bool:
+        return sum(float(params.get(period, 0)) for period in PERIODS) > 0
+
+    def distinct_periods(self) -> List[str]:
+        """
+        决策序列互不相同且不全为0的周期（没有K线的周期决策全为0）
+        :return: 周期列表；少于2个时任何权重组合的结果都没有区别
+        """
+        distinct = []
+        for p, period in enumerate(PERIODS):
+            series = self.decisions[:, :, p]
+            if not series.any():
+                continue
+            if any(np.array_equal(series, self.decisions[:, :, PERIODS.index(other)]) for other in distinct):
+                continue
+            distinct.append(period)
+        return distinct
+
+    def evaluate(self, params: Dict, rows: slice) -> Dict:
+        """
+        在指定区间评估一组权重
+        :param params: {周期: 权重}
+        :param rows: 交易日下标切片
+        :return: 指标字典（含 score）
+        """
+        weights = np.array([float(params.get(period, 0)) for period in PERIODS])
+        threshold = self.HOLD_THRESHOLD
+        score = self.decisions[rows] @ (weights / weights.sum())
+        state = np.where(score >= threshold, 1.0, np.where(score <= -threshold, 0.0, np.nan))
+        position = pd.DataFrame(state).ffill().fillna(0.0).to_numpy()
+
+        returns = (position * self.forward[rows]).sum(axis=0)[self.listed] * 100
+        entries = np.diff(np.vstack([np.zeros((1, position.shape[1])), position]), axis=0) > 0
+        metrics = {
+            'mean_return_pct': round(float(returns.mean()), 4) if len(returns) else 0.0,
+            'median_return_pct': round(float(np.median(returns)), 4) if len(returns) else 0.0,
+            'win_ratio_pct': round(float((returns > 0).mean() * 100), 2) if len(returns) else 0.0,
+            'trade_count': int(entries[:, self.listed].sum())
+        }
+        metrics['score'] = metrics.get(self.metric, 0.0)
+        return metrics
+
+    def describe_rows(self, rows: slice) -> List[str]:
+        window = self.dates[rows]
+        return [window[0], window[-1]] if window else []
+
+
+class ThresholdObjective:
+    """
+    选股阈值的评估目标
+    全市场MACD金叉且 PE/PB/市值在阈值范围内时买入，死叉或不再满足阈值时卖出，按MACD柱排序选股，
+    用组合回测器（T+1、涨跌停、整手）评估；PE/PB 无效（亏损或缺失）时与 _apply_optimized_filters 一样不做限制
+    """
+
+    def __init__(self, market: Dict, metric: str = None, backtest_options: Dict = None):
+        """
+        :param market: load_market_matrices 的结果（需包含 pe、pb、total_mv）
+        :param metric: 优化目标（PortfolioBacktester.metrics 的字段），默认 sharpe
+        :param backtest_options: PortfolioBacktester 的其他参数
+        """
+        self.market = market
+        self.metric = metric or DEFAULT_METRICS['thresholds']
+        self.backtest_options = dict(backtest_options or {})
+        self.backtest_options['verbose'] = False
+
+        # 与参数无关的部分只计算一次：MACD交叉、排序分数、市值（万元 -> 亿元）
+        lines = panel_macd(market['adj_close'])
+        macd_line, signal_line = lines['macd'], lines['signal']
+        self.golden = np.zeros(macd_line.shape, dtype=bool)
+        self.death = np.zeros(macd_line.shape, dtype=bool)
+        with np.errstate(invalid='ignore'):
+            self.golden[1:] = (macd_line[:-1] <= signal_line[:-1]) & (macd_line[1:] > signal_line[1:])
+            self.death[1:] = (macd_line[:-1] >= signal_line[:-1]) & (macd_line[1:] < signal_line[1:])
+        self.histogram = lines['histogram']
+        self.pe = market['pe']
+        self.pb = market['pb']
+        self.market_cap = market['total_mv'] / 1e4
+        self.n_days = len(market['dates'])
+        # MACD 需要约 35 根K线才稳定
+        self.warmup = min(35, max(self.n_days - 1, 0))
+
+    def is_valid(self, params: Dict) -> bool:
+        return (params.get('pe_min', 0) < params.get('pe_max', np.inf)
+                and params.get('pb_min', 0) < params.get('pb_max', np.inf)
+                and params.get('market_cap_min', 0) < params.get('market_cap_max', np.inf))
+
+    def screen(self, params: Dict, rows: slice) -> np.ndarray:
+        """
+        阈值筛选矩阵
+        :param params: 阈值参数
+        :param rows: 交易日下标切片
+        :return: 布尔矩阵
+        """
+        passed = np.ones(self.pe[rows].shape, dtype=bool)
+        with np.errstate(invalid='ignore'):
+            for values, low, high in ((self.pe[rows], 'pe_min', 'pe_max'),
+                                      (self.pb[rows], 'pb_min', 'pb_max'),
+                                      (self.market_cap[rows], 'market_cap_min', 'market_cap_max')):
+                valid = np.isfinite(values) & (values > 0)
+                inside = (values >= params.get(low, -np.inf)) & (values <= params.get(high, np.inf))
+                passed &= ~valid | inside
+        return passed
+
+    def evaluate(self, params: Dict, rows: slice) -> Dict:
+        """
+        在指定区间评估一组阈值
+        :param params: 阈值参数（可含 max_positions）
+        :param rows: 交易日下标切片
+        :return: 绩效指标（含 score）
+        """
+        market = self.market
+        screen = self.screen(params, rows)
+        signals = signals_from_conditions(self.golden[rows] & screen, self.death[rows] | ~screen)
+        options = dict(self.backtest_options, max_positions=int(params.get('max_positions', 10)))
+        result = PortfolioBacktester(**options).run(
+            market['dates'][rows], market['codes'], signals, market['close'][rows], market['pre_close'][rows],
+            open_=market['open'][rows], up_limit=market['up_limit'][rows], down_limit=market['down_limit'][rows],
+            score=self.histogram[rows]
+        )
+        metrics = dict(result['metrics'])
+        metrics['score'] = metrics.get(self.metric, 0.0)
+        return metrics
+
+    def describe_rows(self, rows: slice) -> List[str]:
+        window = self.market['dates'][rows]
+        return [window[0], window[-1]] if window else []
+
+
+# 工作进程内的评估目标（由进程池 initializer 设置，fork 方式启动时直接继承父进程的行情矩阵）
+_worker_objective = None
+
+
+def _init_worker(objective):
+    global _worker_objective
+    _worker_objective = objective
+
+
+def _evaluate_candidate(params: Dict, windows: List[slice]) -> List[Dict]:
+    return [_worker_objective.evaluate(params, rows) for rows in windows]
+
+
+class ParameterOptimizer:
+    """
+    参数寻优器
+    每组参数在全部评估区间上计算一次；walk-forward 模式下只用训练区间选参数：
+    按最后一折训练区间的得分排名（最优参数即写回配置的参数），
+    样本外得分为每一折训练区间选出的参数在该折测试区间上的平均得分
+    """
+
+    def __init__(self, objective, workers: int = None):
+        """
+        :param objective: 评估目标（PeriodWeightObjective / ThresholdObjective）
+        :param workers: 进程数，默认 CPU 核数；1 表示在当前进程内计算
+        """
+        self.objective = objective
+        self.workers = workers or os.cpu_count() or 1
+
+    def run(self, space: Dict, method: str = 'random', n_iter: int = 50, grid_points: int = 5,
+            seed: int = None, walk_forward: Dict = None) -> Dict:
+        """
+        运行寻优
+        :param space: 搜索空间
+        :param method: grid / random
+        :param n_iter: 随机搜索的组合数
+        :param grid_points: 网格搜索中区间参数的等分点数
+        :param seed: 随机种子
+        :param walk_forward: 滚动前推设置 {'train_days', 'test_days', 'step'}，为空时在整个区间上评估
+        :return: {'ranked': 按得分降序的结果, 'best': 最优结果, 'folds': 各折结果,
+                  'oos_score': walk-forward 的样本外得分, ...}
+        """
+        start_time = time.time()
+        if method == 'grid':
+            candidates = grid_candidates(space, grid_points)
+        elif method == 'random':
+            candidates = random_candidates(space, n_iter, seed)
+        else:
+            raise ValueError(f"未知寻优方式: {method}")
+        candidates = [params for params in candidates if self.objective.is_valid(params)]
+        if not candidates:
+            raise ValueError("搜索空间内没有有效的参数组合")
+
+        objective = self.objective
+        if walk_forward:
+            folds = walk_forward_windows(objective.n_days, start=objective.warmup, **walk_forward)
+            if not folds:
+                raise ValueError(f"回测区间只有 {objective.n_days} 个交易日，不足一折 walk-forward")
+            windows = [rows for fold in folds for rows in fold]
+        else:
+            folds = []
+            windows = [slice(objective.warmup, objective.n_days)]
+
+        print(f"🔍 参数寻优: {len(candidates)} 组参数 × {len(windows)} 个区间，{method} 搜索，"
+              f"{min(self.workers, len(candidates))} 个进程")
+        evaluations = self._map(candidates, windows)
+
+        ranked = []
+        for params, metrics in zip(candidates, evaluations):
+            if folds:
+                # 排名得分只取训练区间（最后一折的训练区间最接近部署时点），测试区间只用于报告
+                train, test = metrics[0::2], metrics[1::2]
+                entry = {
+                    'params': params,
+                    'score': train[-1]['score'],
+                    'train_score': round(float(np.mean([m['score'] for m in train])), 4),
+                    'test_metrics': test
+                }
+            else:
+                entry = {'params': params, 'score': metrics[0]['score'], 'metrics': metrics[0]}
+            ranked.append(entry)
+        ranked.sort(key=lambda entry: entry['score'], reverse=True)
+
+        fold_summary = []
+        for k, (train_rows, test_rows) in enumerate(folds):
+            train_scores = [metrics[2 * k]['score'] for metrics in evaluations]
+            best = int(np.argmax(train_scores))
+            fold_summary.append({
+                'fold': k + 1,
+                'train': objective.describe_rows(train_rows),
+                'test': objective.describe_rows(test_rows),
+                'params': candidates[best],
+                'train_score': train_scores[best],
+                'test_score': evaluations[best][2 * k + 1]['score']
+            })
+
+        oos_score = None
+        if fold_summary:
+            oos_score = round(float(np.mean([fold['test_score'] for fold in fold_summary])), 4)
+
+        elapsed = time.time() - start_time
+        oos_text = f"，样本外得分 {oos_score}" if oos_score is not None else ''
+        print(f"✅ 参数寻优完成: 最优得分 {ranked[0]['score']}{oos_text}，耗时 {elapsed:.2f}秒")
+        return {
+            'method': method,
+            'metric': objective.metric,
+            'walk_forward': walk_forward or None,
+            'evaluated': len(candidates),
+            'elapsed_seconds': round(elapsed, 2),
+            'best': ranked[0],
+            'ranked': ranked,
+            'folds': fold_summary,
+            'oos_score': oos_score
+        }
+
+    def _map(self, candidates: List[Dict], windows: List[slice]) -> List[List[Dict]]:
+        """在进程池中评估全部参数组合（组合很少或只有一个进程时在当前进程内计算）"""
+        workers = min(self.workers, len(candidates))
+        if workers <= 1:
+            return [[self.objective.evaluate(params, rows) for rows in windows] for params in candidates]
+        chunksize = max(1, len(candidates) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(self.objective,)) as executor:
+            return list(executor.map(_evaluate_candidate, candidates, itertools.repeat(windows),
+                                     chunksize=chunksize))
+
+
+def load_period_decisions(stock_codes: Sequence[str], start_date: str, end_date: str,
+                          periods: Sequence[str] = PERIODS) -> Optional[Dict]:
+    """
+    获取股票池各周期K线，计算每个交易日收盘时各周期的MACD决策
+    :param stock_codes: 股票代码列表
+    :param start_date: 起始日期 YYYYMMDD
+    :param end_date: 结束日期 YYYYMMDD
+    :param periods: 需要获取的周期（须包含 daily），其余周期的决策记为0
+    :return: {'dates', 'codes', 'close': T × S, 'decisions': T × S × P}，没有可用日线时返回 None
+    """
+    try:
+        from .stock_analyzer import StockAnalyzer
+    except ImportError:
+        from stock_analyzer import StockAnalyzer
+
+    frames = {}
+    for stock_code in stock_codes:
+        loaded = {}
+        for period in periods:
+            analyzer = StockAnalyzer(stock_code)
+            if analyzer.fetch_data(start_date, end_date, period) and analyzer.data is not None and len(analyzer.data) > 0:
+                # 数据源没有该周期K线时返回的是日线，不能当作该周期的决策
+                if analyzer.bar_freq != period:
+                    print(f"⚠️ {stock_code} 没有{period}周期K线（数据源返回{analyzer.bar_freq}），该周期决策记为0")
+                    continue
+                analyzer.calculate_indicators()
+                loaded[period] = (analyzer.data, analyzer.indicators['macd'])
+        if 'daily' in loaded:
+            frames[stock_code] = loaded
+        else:
+            print(f"⚠️ {stock_code} 没有日线数据，跳过")
+    if not frames:
+        return None
+
+    dates = sorted(set().union(*(set(p['daily'][0]['Date'].astype(str)) for p in frames.values())))
+    position = pd.Index(dates)
+    day_end = day_end_ns(dates)
+    close = np.full((len(dates), len(frames)), np.nan)
+    decisions = np.zeros((len(dates), len(frames), len(PERIODS)))
+    for s, loaded in enumerate(frames.values()):
+        daily, _ = loaded['daily']
+        close[position.get_indexer(daily['Date'].astype(str)), s] = daily['Close'].to_numpy(dtype=float)
+        for p, period in enumerate(PERIODS):
+            if period in loaded:
+                data, macd = loaded[period]
+                decisions[:, s, p] = PeriodDecisions(data['Date'], macd['macd'], macd['signal']).values_before(day_end)
+    return {'dates': dates, 'codes': list(frames), 'close': close, 'decisions': decisions}
+
+
+def optimize(target: str, start_date: str, end_date: str, method: str = 'random', n_iter: int = 50,
+             grid_points: int = 5, space: Dict = None, metric: str = None, walk_forward: Dict = None,
+             stock_codes: Sequence[str] = None, codes: Sequence[str] = None, strategy_key: str = 'optimized_filters',
+             workers: int = None, seed: int = None, apply: bool = True, pro=None, **backtest_options) -> Dict:
+    """
+    参数寻优入口
+    :param target: weights（多周期回测权重）/ thresholds（选股阈值）
+    :param start_date: 起始日期 YYYYMMDD
+    :param end_date: 结束日期 YYYYMMDD
+    :param method: grid / random
+    :param n_iter: 随机搜索的组合数
+    :param grid_points: 网格搜索中区间参数的等分点数
+    :param space: 搜索空间，默认 DEFAULT_SPACES[target]
+    :param metric: 优化目标，默认 DEFAULT_METRICS[target]
+    :param walk_forward: 滚动前推设置 {'train_days', 'test_days', 'step'}
+    :param stock_codes: weights 模式的股票池（必需）
+    :param codes: thresholds 模式的股票池（ts_code 列表），默认全市场
+    :param strategy_key: thresholds 模式写回的策略名（ComplianceEvaluator 的策略或 optimized_filters）
+    :param workers: 进程数
+    :param seed: 随机种子
+    :param apply: 是否把最优参数写回配置文件
+    :param pro: TuShare Pro API对象
+    :param backtest_options: thresholds 模式的 PortfolioBacktester 参数
+    :return: 寻优结果（含结果文件路径）
+    """
+    if target == 'weights':
+        if not stock_codes:
+            return {'success': False, 'message': 'weights 模式需要指定股票池 stock_codes'}
+        unknown = sorted(set(space or {}) - set(PERIODS))
+        if unknown:
+            return {'success': False, 'message': f'weights 模式只能搜索各周期权重，不支持: {unknown}'}
+        # 先按数据源能提供的K线周期判断，避免拉取全部股票各周期K线后才发现无法寻优
+        try:
+            from .data_fetcher import OptimizedDataFetcher
+        except ImportError:
+            from data_fetcher import OptimizedDataFetcher
+        available = [period for period in PERIODS if period in OptimizedDataFetcher.BAR_FREQS]
+        if len(available) < 2:
+            return {'success': False,
+                    'message': f'数据源只提供 {available} 周期K线，各组权重的回测结果相同，无法寻优'}
+        panel = load_period_decisions(stock_codes, start_date, end_date, available)
+        if panel is None:
+            return {'success': False, 'message': '无法获取股票池的K线数据'}
+        objective = PeriodWeightObjective(panel['dates'], panel['close'], panel['decisions'], metric)
+        distinct = objective.distinct_periods()
+        if len(distinct) < 2:
+            return {'success': False,
+                    'message': f'只有 {distinct} 周期有可区分的决策序列，各组权重的回测结果相同，无法寻优'}
+    elif target == 'thresholds':
+        market = load_market_matrices(start_date, end_date, codes, pro, extra_columns=('pe', 'pb', 'total_mv'))
+        if market is None or not market['codes']:
+            return {'success': False, 'message': '无法加载回测区间的行情数据'}
+        objective = ThresholdObjective(market, metric, backtest_options)
+    else:
+        return {'success': False, 'message': f'未知寻优目标: {target}，可选: {list(DEFAULT_SPACES)}'}
+
+    try:
+        result = ParameterOptimizer(objective, workers).run(
+            space or DEFAULT_SPACES[target], method, n_iter, grid_points, seed, walk_forward
+        )
+    except ValueError as e:
+        return {'success': False, 'message': str(e)}
+
+    result.update(success=True, target=target, start_date=start_date, end_date=end_date)
+    if target == 'thresholds':
+        result['strategy_key'] = strategy_key
+    result['results_path'] = save_results(result)
+    if apply:
+        result['config_path'] = apply_best(result)
+        if result['config_path'] is None:
+            result['message'] = '最优得分与其他参数组合并列，未写回配置文件'
+    return result
+
+
+def save_results(result: Dict, top_n: int = 100) -> str:
+    """
+    保存排名结果到 config/optimization/<target>_<时间>.json
+    :param result: optimize 的结果
+    :param top_n: 保存的排名条数
+    :return: 文件路径
+    """
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(RESULTS_DIR, f"{result['target']}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    payload = dict(result, ranked=result['ranked'][:top_n])
+    _write_json(path, payload)
+    print(f"💾 寻优结果已保存: {path}")
+    return path
+
+
+def apply_best(result: Dict) -> str:
+    """
+    把最优参数写回配置文件：weights -> backtest_weights.json，thresholds -> strategy_thresholds.json[strategy_key]
+    walk-forward 模式下写回的是最后一折训练区间选出的参数；最优得分与其他参数组合并列时无法确定最优参数，不写回
+    :param result: optimize 的结果
+    :return: 配置文件路径；未写回时返回 None
+    """
+    ranked = result['ranked']
+    if len(ranked) > 1 and ranked[1]['score'] == ranked[0]['score']:
+        tied = sum(1 for entry in ranked if entry['score'] == ranked[0]['score'])
+        print(f"⚠️ 最优得分 {ranked[0]['score']} 有 {tied} 组参数并列，不写回配置")
+        return None
+    params = result['best']['params']
+    if result['target'] == 'weights':
+        path = BACKTEST_WEIGHTS_PATH
+        _write_json(path, {period: params[period] for period in PERIODS if period in params})
+    else:
+        path = STRATEGY_THRESHOLDS_PATH
+        thresholds = load_strategy_thresholds()
+        thresholds[result['strategy_key']] = {key: params[key] for key in THRESHOLD_KEYS + BACKTEST_KEYS if key in params}
+        _write_json(path, thresholds)
+    print(f"💾 最优参数已写回: {path}")
+    return path
+
+
+def load_strategy_thresholds(strategy_key: str = None) -> Dict:
+    """
+    读取参数寻优写入的选股阈值
+    :param strategy_key: 策略名，为空时返回全部策略
+    :return: {策略名: {阈值字段: 值}} 或单个策略的阈值，文件不存在或格式错误时返回空字典
+    """
+    try:
+        with open(STRATEGY_THRESHOLDS_PATH, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(data, dict):
+        return {}
+    if strategy_key is None:
+        return data
+    thresholds = data.get(strategy_key)
+    return thresholds if isinstance(thresholds, dict) else {}
+
+
+def _write_json(path: str, data: Dict):
+    """先写临时文件再替换，避免读取方看到写了一半的配置"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2, default=_json_default)
+    os.replace(tmp_path, path)
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"无法序列化: {type(value)}")
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='策略参数寻优（网格/随机搜索，可选 walk-forward）')
+    parser.add_argument('target', choices=list(DEFAULT_SPACES), help='weights=多周期回测权重，thresholds=选股阈值')
+    parser.add_argument('--start', required=True, help='起始日期 YYYYMMDD')
+    parser.add_argument('--end', required=True, help='结束日期 YYYYMMDD')
+    parser.add_argument('--method', choices=['grid', 'random'], default='random')
+    parser.add_argument('--n-iter', type=int, default=50, help='随机搜索的组合数')
+    parser.add_argument('--metric', help='优化目标')
+    parser.add_argument('--stocks', help='weights 模式的股票池，逗号分隔')
+    parser.add_argument('--strategy-key', default='optimized_filters', help='thresholds 模式写回的策略名')
+    parser.add_argument('--train-days', type=int, help='walk-forward 训练区间交易日数')
+    parser.add_argument('--test-days', type=int, help='walk-forward 测试区间交易日数')
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--no-apply', action='store_true', help='只保存排名结果，不写回配置')
+    args = parser.parse_args()
+
+    pro = None
+    if args.target == 'thresholds':
+        try:
+            from .client_registry import get_client_registry
+        except ImportError:
+            from client_registry import get_client_registry
+        pro = get_client_registry().tushare()
+
+    walk_forward = None
+    if args.train_days and args.test_days:
+        walk_forward = {'train_days': args.train_days, 'test_days': args.test_days}
+    outcome = optimize(args.target, args.start, args.end, method=args.method, n_iter=args.n_iter, metric=args.metric,
+                       walk_forward=walk_forward, stock_codes=args.stocks.split(',') if args.stocks else None,
+                       strategy_key=args.strategy_key, workers=args.workers, seed=args.seed,
+                       apply=not args.no_apply, pro=pro)
+    if not outcome.get('success'):
+        print(f"❌ {outcome.get('message')}")
+    else:
+        print(json.dumps(outcome['best'], ensure_ascii=False, indent=2, default=_json_default))
@@ -0,0 +1,380 @@
+"""
+全市场组合回测
+行情和信号均为 (交易日 × 股票) 二维数组，每个交易日对全部股票一次向量化完成卖出、选股、下单和估值；
+按A股规则处理 T+1（当天买入的股票当天不能卖出）、涨停买不进、跌停卖不出、停牌不能交易和整手买入
+"""
+
+import time
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+try:
+    from .market_snapshot import get_snapshot_store
+    from .trade_calendar import get_trade_calendar
+    from .panel_indicators import macd as panel_macd
+except ImportError:
+    from market_snapshot import get_snapshot_store
+    from trade_calendar import get_trade_calendar
+    from panel_indicators import macd as panel_macd
+
+# 信号取值
+BUY = 1
+SELL = -1
+HOLD = 0
+
+# 涨跌停价比较的容差（价格精确到分）
+_PRICE_EPS = 1e-6
+
+
+def limit_ratio(ts_codes: Sequence[str]) -> np.ndarray:
+    """
+    各股票的涨跌幅限制比例（截面未提供涨跌停价时估算使用）
+    创业板/科创板 20%，北交所 30%，其余 10%（ST 股票的 5% 需由涨跌停价数据提供）
+    :param ts_codes: 股票代码列表
+    :return: 比例数组
+    """
+    codes = np.asarray([str(code) for code in ts_codes])
+    ratio = np.full(len(codes), 0.1)
+    ratio[np.char.startswith(codes, '30') | np.char.startswith(codes, '688')] = 0.2
+    ratio[np.char.endswith(codes, '.BJ')] = 0.3
+    return ratio
+
+
+class PortfolioBacktester:
+    """
+    组合回测器
+    信号矩阵中 BUY 表示买入、SELL 表示卖出；execution='open' 时第 t 天的信号在第 t+1 天开盘成交，
+    execution='close' 时在当天收盘成交。每只股票的持仓按市值跟踪，每日乘以 收盘价/昨收价，除权除息不影响收益
+    """
+
+    def __init__(self, initial_capital: float = 1_000_000, max_positions: int = 10,
+                 position_size: float = None, lot_size: int = 100, commission: float = 0.0003,
+                 min_commission: float = 5.0, stamp_tax: float = 0.0005, execution: str = 'open',
+                 verbose: bool = True):
+        """
+        初始化回测器
+        :param initial_capital: 初始资金
+        :param max_positions: 最大持仓股票数
+        :param position_size: 单只股票目标仓位（占总资产比例），默认 1 / max_positions
+        :param lot_size: 每手股数
+        :param commission: 佣金费率（买卖双向）
+        :param min_commission: 单笔最低佣金
+        :param stamp_tax: 印花税率（仅卖出）
+        :param execution: 成交价格，open=次日开盘价，close=当日收盘价
+        :param verbose: 是否打印回测耗时（参数寻优时关闭）
+        """
+        if execution not in ('open', 'close'):
+            raise ValueError(f"未知成交方式: {execution}")
+        self.initial_capital = float(initial_capital)
+        self.max_positions = max_positions
+        self.position_size = position_size or 1.0 / max_positions
+        self.lot_size = lot_size
+        self.commission = commission
+        self.min_commission = min_commission
+        self.stamp_tax = stamp_tax
+        self.execution = execution
+        self.verbose = verbose
+
+    def run(self, dates: Sequence[str], codes: Sequence[str], signals: np.ndarray, close: np.ndarray,
+            pre_close: np.ndarray, open_: np.ndarray = None, up_limit: np.ndarray = None,
+            down_limit: np.ndarray = None, score: np.ndarray = None) -> Dict:
+        """
+        运行回测
+        :param dates: 交易日列表（长度 T）
+        :param codes: 股票代码列表（长度 N）
+        :param signals: T × N 信号矩阵（BUY / SELL / HOLD）
+        :param close: T × N 收盘价（停牌为 NaN）
+        :param pre_close: T × N 昨收价（除权后）
+        :param open_: T × N 开盘价（execution='open' 时必需）
+        :param up_limit: T × N 涨停价，缺失时按 limit_ratio 估算
+        :param down_limit: T × N 跌停价，缺失时按 limit_ratio 估算
+        :param score: T × N 选股排序分数，买入候选超过空余仓位时分数高的优先，默认按股票顺序
+        :return: 回测结果：净值曲线、交易明细、绩效指标、被规则拦截的订单数
+        """
+        start_time = time.time()
+        signals = np.asarray(signals, dtype=np.int8)
+        close = np.asarray(close, dtype=float)
+        pre_close = np.asarray(pre_close, dtype=float)
+        n_days, n_codes = close.shape
+        if self.execution == 'open':
+            if open_ is None:
+                raise ValueError("execution='open' 需要开盘价")
+            price = np.asarray(open_, dtype=float)
+            # 第 t 天的信号在第 t+1 天执行
+            orders = np.zeros_like(signals)
+            orders[1:] = signals[:-1]
+        else:
+            price = close
+            orders = signals
+        up_limit, down_limit = self._limits(codes, pre_close, up_limit, down_limit)
+        if score is not None:
+            score = np.asarray(score, dtype=float)
+            if self.execution == 'open':
+                score = np.vstack([np.zeros((1, n_codes)), score[:-1]])
+
+        cash = self.initial_capital
+        value = np.zeros(n_codes)            # 持仓市值
+        shares = np.zeros(n_codes)           # 持股数（用于计算交易价格对应的股数）
+        cost = np.zeros(n_codes)             # 买入成本（含佣金）
+        held = np.zeros(n_codes, dtype=bool)
+        entry_day = np.full(n_codes, -1)
+        equity = np.empty(n_days)
+        positions = np.empty(n_days, dtype=np.int64)
+        trades: List[Dict] = []
+        blocked = {'limit_up_buy': 0, 'limit_down_sell': 0, 't_plus_1': 0, 'suspended': 0}
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            for t in range(n_days):
+                tradable = np.isfinite(price[t]) & (price[t] > 0)
+                # 昨收 -> 成交价：停牌股票市值不变
+                gap = np.where(tradable & (pre_close[t] > 0), price[t] / pre_close[t], 1.0)
+                value = np.where(held, value * gap, value)
+
+                # 1. 卖出（先卖后买，卖出资金当天可用）
+                want_sell = held & (orders[t] == SELL)
+                can_sell = want_sell & tradable & (price[t] > down_limit[t] + _PRICE_EPS) & (entry_day < t)
+                blocked['suspended'] += int(np.sum(want_sell & ~tradable))
+                blocked['limit_down_sell'] += int(np.sum(want_sell & tradable & (price[t] <= down_limit[t] + _PRICE_EPS)))
+                blocked['t_plus_1'] += int(np.sum(want_sell & tradable & (entry_day >= t)))
+                for j in np.flatnonzero(can_sell):
+                    amount = value[j]
+                    proceeds = amount - self._fee(amount) - amount * self.stamp_tax
+                    cash += proceeds
+                    trades.append({
+                        'date': dates[t], 'ts_code': codes[j], 'type': 'sell', 'price': float(price[t, j]),
+                        'shares': float(shares[j]), 'amount': round(float(amount), 2),
+                        'profit_amount': round(float(proceeds - cost[j]), 2),
+                        'profit_pct': round(float((proceeds - cost[j]) / cost[j] * 100), 2) if cost[j] > 0 else 0.0,
+                        'holding_days': int(t - entry_day[j])
+                    })
+                held &= ~can_sell
+                value[can_sell] = 0.0
+                shares[can_sell] = 0.0
+
+                # 2. 买入：空余仓位内按分数选股，每只按目标仓位和可用资金取较小值、整手买入
+                want_buy = ~held & (orders[t] == BUY)
+                can_buy = want_buy & tradable & (price[t] < up_limit[t] - _PRICE_EPS)
+                blocked['limit_up_buy'] += int(np.sum(want_buy & tradable & (price[t] >= up_limit[t] - _PRICE_EPS)))
+                slots = self.max_positions - int(held.sum())
+                candidates = np.flatnonzero(can_buy)
+                if slots > 0 and len(candidates) > 0:
+                    if score is not None and len(candidates) > slots:
+                        order = np.argsort(-np.nan_to_num(score[t, candidates], nan=-np.inf), kind='stable')
+                        candidates = candidates[order]
+                    candidates = candidates[:slots]
+                    total = cash + value.sum()
+                    budget = min(total * self.position_size, cash / len(candidates))
+                    lots = np.floor(budget / (price[t, candidates] * self.lot_size * (1 + self.commission)))
+                    for j, n_lots in zip(candidates, lots):
+                        amount = n_lots * self.lot_size * price[t, j]
+                        fee = self._fee(amount)
+                        if n_lots <= 0 or amount + fee > cash:
+                            continue
+                        cash -= amount + fee
+                        held[j] = True
+                        value[j] = amount
+                        shares[j] = n_lots * self.lot_size
+                        cost[j] = amount + fee
+                        entry_day[j] = t
+                        trades.append({
+                            'date': dates[t], 'ts_code': codes[j], 'type': 'buy', 'price': float(price[t, j]),
+                            'shares': float(shares[j]), 'amount': round(float(amount), 2)
+                        })
+
+                # 3. 成交价 -> 收盘价估值
+                drift = np.where(np.isfinite(close[t]) & tradable, close[t] / price[t], 1.0)
+                value = np.where(held, value * drift, value)
+                equity[t] = cash + value.sum()
+                positions[t] = int(held.sum())
+
+        result = {
+            'dates': list(dates),
+            'equity': equity,
+            'positions': positions,
+            'trades': trades,
+            'blocked_orders': blocked,
+            'final_holdings': [codes[j] for j in np.flatnonzero(held)],
+            'metrics': self.metrics(equity, trades)
+        }
+        if self.verbose:
+            print(f"✅ 组合回测完成: {n_codes} 只股票 × {n_days} 个交易日，{len(trades)} 笔交易，"
+                  f"耗时 {time.time() - start_time:.2f}秒")
+        return result
+
+    def _fee(self, amount: float) -> float:
+        """单笔佣金"""
+        return max(amount * self.commission, self.min_commission) if amount > 0 else 0.0
+
+    @staticmethod
+    def _limits(codes, pre_close, up_limit, down_limit):
+        """涨跌停价，缺失部分按涨跌幅比例由昨收价估算"""
+        ratio = limit_ratio(codes)[np.newaxis, :]
+        estimated_up = np.round(pre_close * (1 + ratio), 2)
+        estimated_down = np.round(pre_close * (1 - ratio), 2)
+        if up_limit is None:
+            up_limit = estimated_up
+        else:
+            up_limit = np.asarray(up_limit, dtype=float)
+            up_limit = np.where(np.isfinite(up_limit), up_limit, estimated_up)
+        if down_limit is None:
+            down_limit = estimated_down
+        else:
+            down_limit = np.asarray(down_limit, dtype=float)
+            down_limit = np.where(np.isfinite(down_limit), down_limit, estimated_down)
+        # 昨收价缺失（新股首日等）时不限制
+        up_limit = np.where(np.isfinite(up_limit), up_limit, np.inf)
+        down_limit = np.where(np.isfinite(down_limit), down_limit, -np.inf)
+        return up_limit, down_limit
+
+    def metrics(self, equity: np.ndarray, trades: List[Dict]) -> Dict:
+        """
+        绩效指标
+        :param equity: 每日总资产
+        :param trades: 交易明细
+        :return: 总收益率、年化收益率、最大回撤、夏普比率、胜率等
+        """
+        if len(equity) == 0:
+            return {}
+        curve = np.concatenate([[self.initial_capital], equity])
+        daily = curve[1:] / curve[:-1] - 1
+        drawdown = curve / np.maximum.accumulate(curve) - 1
+        sells = [trade for trade in trades if trade['type'] == 'sell']
+        wins = sum(1 for trade in sells if trade['profit_amount'] > 0)
+        total_return = curve[-1] / self.initial_capital - 1
+        years = len(equity) / 252
+        std = daily.std(ddof=1) if len(daily) > 1 else 0.0
+        return {
+            'capital_start': self.initial_capital,
+            'capital_end': round(float(curve[-1]), 2),
+            'total_return_pct': round(float(total_return * 100), 2),
+            'annual_return_pct': round(float(((1 + total_return) ** (1 / years) - 1) * 100), 2) if total_return > -1 else -100.0,
+            'max_drawdown_pct': round(float(drawdown.min() * 100), 2),
+            'sharpe': round(float(daily.mean() / std * np.sqrt(252)), 2) if std > 0 else 0.0,
+            'trade_count': len(trades),
+            'closed_trades': len(sells),
+            'win_rate_pct': round(wins / len(sells) * 100, 2) if sells else 0.0
+        }
+
+
+def load_market_matrices(start_date: str, end_date: str, codes: Sequence[str] = None, pro=None,
+                         extra_columns: Sequence[str] = ()) -> Optional[Dict]:
+    """
+    由每日截面快照组成回测所需的 (交易日 × 股票) 行情矩阵
+    :param start_date: 起始日期 YYYYMMDD
+    :param end_date: 结束日期 YYYYMMDD
+    :param codes: 股票池（ts_code 列表），默认截面中出现过的全部股票
+    :param pro: TuShare Pro API对象（截面未缓存时下载使用）
+    :param extra_columns: 额外加载的截面列（如 pe、pb、total_mv）
+    :return: {'dates', 'codes', 'open', 'close', 'pre_close', 'up_limit', 'down_limit', 'adj_close', *extra_columns}，
+             交易日历不可用时返回 None
+    """
+    dates = get_trade_calendar(pro).between(start_date, end_date)
+    if not dates:
+        print("⚠️ 交易日历不可用，无法加载回测行情")
+        return None
+
+    store = get_snapshot_store()
+    snapshots = [store.get_snapshot(date, pro) for date in dates]
+    if codes is None:
+        codes = sorted(set().union(*(s['ts_code'] for s in snapshots if s is not None and len(s) > 0)))
+    position = pd.Index(list(codes))
+    shape = (len(dates), len(codes))
+    columns = ('open', 'close', 'pre_close', 'up_limit', 'down_limit') + tuple(extra_columns)
+    matrices = {name: np.full(shape, np.nan) for name in columns}
+    for i, snapshot in enumerate(snapshots):
+        if snapshot is None or len(snapshot) == 0:
+            continue
+        index = position.get_indexer(snapshot['ts_code'])
+        found = index >= 0
+        for name in columns:
+            if name in snapshot.columns:
+                matrices[name][i, index[found]] = snapshot[name].to_numpy(dtype=float)[found]
+
+    # 前复权收盘价（信号计算用）：停牌沿用前值，按 pre_close / 前一日收盘价还原除权
+    close = pd.DataFrame(matrices['close']).ffill().to_numpy()
+    with np.errstate(invalid='ignore', divide='ignore'):
+        ratio = matrices['pre_close'][1:] / close[:-1]
+    ratio = np.where(np.isfinite(ratio) & (ratio > 0), ratio, 1.0)
+    factor = np.ones(shape)
+    if len(dates) > 1:
+        factor[:-1] = np.cumprod(ratio[::-1], axis=0)[::-1]
+    matrices.update(dates=dates, codes=list(codes), adj_close=close * factor)
+    return matrices
+
+
+def macd_cross_signals(adj_close: np.ndarray) -> np.ndarray:
+    """
+    全市场MACD金叉买入、死叉卖出信号矩阵
+    :param adj_close: T × N 前复权收盘价
+    :return: T × N int8 信号矩阵
+    """
+    lines = panel_macd(adj_close)
+    macd_line, signal_line = lines['macd'], lines['signal']
+    signals = np.zeros(adj_close.shape, dtype=np.int8)
+    with np.errstate(invalid='ignore'):
+        above = macd_line > signal_line
+        below = macd_line < signal_line
+        signals[1:][(macd_line[:-1] <= signal_line[:-1]) & above[1:]] = BUY
+        signals[1:][(macd_line[:-1] >= signal_line[:-1]) & below[1:]] = SELL
+    return signals
+
+
+def signals_from_conditions(entries: np.ndarray, exits: np.ndarray) -> np.ndarray:
+    """
+    由买入/卖出条件矩阵组成信号矩阵（同时满足时卖出优先）
+    :param entries: T × N 布尔矩阵
+    :param exits: T × N 布尔矩阵
+    :return: T × N int8 信号矩阵
+    """
+    signals = np.where(np.asarray(entries, dtype=bool), BUY, HOLD).astype(np.int8)
+    signals[np.asarray(exits, dtype=bool)] = SELL
+    return signals
+
+
+STRATEGY_SIGNALS = {
+    'macd': macd_cross_signals
+}
+
+
+def run_market_backtest(start_date: str, end_date: str, strategy: str = 'macd', codes: Sequence[str] = None,
+                        pro=None, max_download_days: int = None, **options) -> Dict:
+    """
+    全市场组合回测入口
+    :param start_date: 起始日期 YYYYMMDD
+    :param end_date: 结束日期 YYYYMMDD
+    :param strategy: 信号策略，见 STRATEGY_SIGNALS
+    :param codes: 股票池（ts_code 列表），默认全市场
+    :param pro: TuShare Pro API对象
+    :param max_download_days: 最多同步下载多少个交易日的截面（每个交易日3次TuShare调用）；
+                              超过时在后台预热并返回失败，为空时不限制
+    :param options: PortfolioBacktester 的参数（initial_capital、max_positions 等）
+    :return: 回测结果（净值曲线为列表，便于序列化）
+    """
+    if strategy not in STRATEGY_SIGNALS:
+        return {'success': False, 'message': f'未知策略: {strategy}，可选: {list(STRATEGY_SIGNALS)}'}
+    if max_download_days is not None:
+        dates = get_trade_calendar(pro).between(start_date, end_date)
+        store = get_snapshot_store()
+        missing = [date for date in dates if not store.is_cached(date)]
+        if len(missing) > max_download_days:
+            store.warm(dates, pro)
+            return {
+                'success': False,
+                'warming': True,
+                'missing_days': len(missing),
+                'message': f'回测区间有 {len(missing)} 个交易日的全市场截面尚未缓存，已在后台下载，请稍后重试'
+            }
+    market = load_market_matrices(start_date, end_date, codes, pro)
+    if market is None or not market['codes']:
+        return {'success': False, 'message': '无法加载回测区间的行情数据'}
+
+    signals = STRATEGY_SIGNALS[strategy](market['adj_close'])
+    backtester = PortfolioBacktester(**options)
+    result = backtester.run(market['dates'], market['codes'], signals, market['close'], market['pre_close'],
+                            open_=market['open'], up_limit=market['up_limit'], down_limit=market['down_limit'])
+    result['equity'] = [round(float(v), 2) for v in result['equity']]
+    result['positions'] = result['positions'].tolist()
+    result.update(success=True, strategy=strategy, universe_size=len(market['codes']))
+    return result
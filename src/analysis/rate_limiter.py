@@ -0,0 +1,213 @@
+"""
+统一上游接口限流
+所有TuShare/AkShare调用按接口使用令牌桶限流，额度用完时才等待，取代分散的随机延时
+"""
+
+import os
+import sys
+import json
+import time
+import threading
+from typing import Dict, Optional
+
+# 项目根目录（不从 columnar_store 导入，避免为读取配置加载 pandas）
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 每分钟调用次数额度，键为 "数据源.接口名"，未列出的接口使用 "数据源.default"
+# TuShare 按账户积分限制每个接口每分钟的调用次数（2000积分为200次/分钟），可在
+# config/tushare_config.json 的 "rate_limits" 中按账户实际额度覆盖，例如 {"tushare.default": 500}
+DEFAULT_LIMITS = {
+    'tushare.default': 200,
+    'tushare.stk_mins': 60,
+    'akshare.default': 120,
+    'akshare.stock_zh_a_spot_em': 20,
+}
+
+
+class TokenBucket:
+    """
+    令牌桶
+    桶容量为每分钟额度的 1/10，补充速率为额度的 9/10，保证任意一分钟内的调用次数不超过额度
+    """
+
+    def __init__(self, per_minute: float):
+        """
+        初始化令牌桶
+        :param per_minute: 每分钟额度
+        """
+        self.per_minute = per_minute
+        self.capacity = max(1.0, per_minute / 10.0)
+        self.rate = max(per_minute - self.capacity, 1.0) / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """
+        获取令牌，额度不足时阻塞到令牌补足
+        :param tokens: 需要的令牌数
+        :return: 等待的秒数
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return waited
+                wait = (tokens - self.tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+
+class RateLimiter:
+    """按 (数据源, 接口) 分配令牌桶的限流器"""
+
+    def __init__(self, limits: Optional[Dict[str, float]] = None):
+        """
+        初始化限流器
+        :param limits: 每分钟额度，覆盖默认值和配置文件
+        """
+        self.limits = dict(DEFAULT_LIMITS)
+        self.limits.update(self._load_config_limits())
+        if limits:
+            self.limits.update(limits)
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._stats: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _load_config_limits() -> Dict[str, float]:
+        """从 config/tushare_config.json 读取账户额度"""
+        config_path = os.path.join(PROJECT_ROOT, 'config', 'tushare_config.json')
+        try:
+            if os.path.exists(config_path):
+                with open(config_path, 'r', encoding='utf-8') as f:
+                    return {k: float(v) for k, v in json.load(f).get('rate_limits', {}).items()}
+        except Exception as e:
+            print(f"⚠️ 读取接口限流配置失败: {e}")
+        return {}
+
+    def _bucket(self, source: str, endpoint: str):
+        """获取接口对应的令牌桶（未单独配置的接口各自使用默认额度）"""
+        key = f"{source}.{endpoint}"
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                per_minute = self.limits.get(key, self.limits.get(f"{source}.default", 60))
+                bucket = TokenBucket(per_minute)
+                self._buckets[key] = bucket
+                self._stats[key] = {'calls': 0, 'waited': 0.0}
+            return key, bucket
+
+    def acquire(self, source: str, endpoint: str) -> float:
+        """
+        调用上游接口前获取额度
+        :param source: 数据源（tushare/akshare）
+        :param endpoint: 接口名
+        :return: 等待的秒数
+        """
+        key, bucket = self._bucket(source, endpoint)
+        waited = bucket.acquire()
+        with self._lock:
+            stats = self._stats[key]
+            stats['calls'] += 1
+            stats['waited'] += waited
+        return waited
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """各接口的调用次数和累计等待时间"""
+        with self._lock:
+            return {key: dict(value) for key, value in self._stats.items()}
+
+
+class RateLimitedClient:
+    """
+    限流客户端代理
+    包装TuShare Pro对象或akshare模块，每次接口调用前先向限流器申请额度，其余属性原样透传；
+    接口调用经过录制/回放层（upstream_source），回放模式下不访问上游也不占用额度
+    """
+
+    def __init__(self, client, source: str, limiter: RateLimiter):
+        self._client = client
+        self._source = source
+        self._limiter = limiter
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if name.startswith('_') or not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            # TuShare 的 query(api_name, ...) 按实际接口名限流
+            endpoint = name
+            if name == 'query':
+                endpoint = kwargs.get('api_name') or (args[0] if args else name)
+
+            def live():
+                self._limiter.acquire(self._source, endpoint)
+                return attr(*args, **kwargs)
+
+            return _get_upstream_source().call(self._source, endpoint, live, args, kwargs)
+
+        return call
+
+    @property
+    def raw(self):
+        """被包装的原始对象"""
+        return self._client
+
+
+# 进程内共享的限流器
+# 本文件可能以 analysis.rate_limiter / src.analysis.rate_limiter 等不同模块名重复导入，
+# 以最先加载的模块为准，保证整个进程只有一个限流器
+_SHARED_MODULE_KEY = '_upstream_rate_limiter'
+sys.modules.setdefault(_SHARED_MODULE_KEY, sys.modules[__name__])
+
+_default_limiter = None
+_default_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """获取进程内共享的限流器"""
+    global _default_limiter
+    shared = sys.modules[_SHARED_MODULE_KEY]
+    if shared is not sys.modules.get(__name__):
+        return shared.get_rate_limiter()
+    with _default_limiter_lock:
+        if _default_limiter is None:
+            _default_limiter = RateLimiter()
+        return _default_limiter
+
+
+def _get_upstream_source():
+    """录制/回放层（延迟导入，upstream_source 依赖本模块）"""
+    try:
+        from .upstream_source import get_upstream_source
+    except ImportError:
+        from upstream_source import get_upstream_source
+    return get_upstream_source()
+
+
+def limit_tushare(pro):
+    """
+    为TuShare Pro对象加上统一限流（传给 ts.pro_bar(api=...) 时同样生效）
+    :param pro: ts.pro_api() 返回的对象
+    :return: 限流代理，pro 为空时返回 None
+    """
+    if pro is None or type(pro).__name__ == 'RateLimitedClient':
+        return pro
+    return RateLimitedClient(pro, 'tushare', get_rate_limiter())
+
+
+def limit_akshare(ak_module):
+    """
+    为akshare模块加上统一限流
+    :param ak_module: akshare 模块
+    :return: 限流代理
+    """
+    if ak_module is None or type(ak_module).__name__ == 'RateLimitedClient':
+        return ak_module
+    return RateLimitedClient(ak_module, 'akshare', get_rate_limiter())
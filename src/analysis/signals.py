@@ -8,6 +8,66 @@ import numpy as np
 from typing import Dict, List, Tuple
 from .indicators import TechnicalIndicators
 
+# MACD决策等级（macd_decision 序列的取值）
+MACD_DECISION_NAMES = {
+    2: '强烈买入',
+    1: '买入',
+    0: '观望',
+    -1: '卖出',
+    -2: '强烈卖出'
+}
+
+
+def _values(series) -> np.ndarray:
+    """指标序列转为float数组"""
+    return np.asarray(series, dtype=float)
+
+
+def _rising(values: np.ndarray) -> np.ndarray:
+    """逐根K线是否高于前一根（第一根为False）"""
+    result = np.zeros(len(values), dtype=bool)
+    result[1:] = values[1:] > values[:-1]
+    return result
+
+
+def crossover_series(fast: np.ndarray, slow: np.ndarray, inclusive: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    快线上穿/下穿慢线
+    :param fast: 快线
+    :param slow: 慢线
+    :param inclusive: 前一根K线相等是否算穿越（False：前一根须严格在另一侧）
+    :return: (上穿, 下穿) 布尔数组
+    """
+    up = np.zeros(len(fast), dtype=bool)
+    down = np.zeros(len(fast), dtype=bool)
+    prev_fast, prev_slow, cur_fast, cur_slow = fast[:-1], slow[:-1], fast[1:], slow[1:]
+    if inclusive:
+        up[1:] = (prev_fast <= prev_slow) & (cur_fast > cur_slow)
+        down[1:] = (prev_fast >= prev_slow) & (cur_fast < cur_slow)
+    else:
+        up[1:] = (prev_fast < prev_slow) & (cur_fast > cur_slow)
+        down[1:] = (prev_fast > prev_slow) & (cur_fast < cur_slow)
+    return up, down
+
+
+def macd_decision_series(macd, signal, min_bars: int = 35, strong_ratio: float = 0.3) -> np.ndarray:
+    """
+    逐根K线的MACD决策等级：MACD线在信号线上方为买入，差值超过信号线绝对值的 strong_ratio 倍为强烈买入，卖出同理；
+    前 min_bars-1 根K线数据不足，记为观望
+    :param macd: MACD线
+    :param signal: 信号线
+    :param min_bars: 计算决策所需的最少K线数
+    :param strong_ratio: 强烈信号的阈值比例
+    :return: int8数组，取值见 MACD_DECISION_NAMES
+    """
+    macd, signal = _values(macd), _values(signal)
+    diff = macd - signal
+    strong = np.abs(diff) > np.abs(signal) * strong_ratio
+    decision = np.where(diff > 0, np.where(strong, 2, 1), np.where(diff < 0, np.where(strong, -2, -1), 0))
+    decision[:max(min_bars - 1, 0)] = 0
+    return decision.astype(np.int8)
+
+
 class SignalGenerator:
     """交易信号生成类"""
     
@@ -20,6 +80,70 @@ class SignalGenerator:
         self.data = data
         self.indicators = indicators
         self.signals = {}
+        self._series = None
+    
+    def generate_signal_series(self) -> Dict[str, np.ndarray]:
+        """
+        在整段历史上一次性计算各指标的信号序列（布尔数组或int8数组，与K线逐根对应）
+        各 generate_*_signals 的最新信号取自序列末尾，回测和信号历史图表直接复用同一组数组
+        :return: 信号序列字典，缺少对应指标时不含相应的键
+        """
+        if self._series is not None:
+            return self._series
+        
+        series = {}
+        close = _values(self.data['Close'])
+        with np.errstate(invalid='ignore', divide='ignore'):
+            if 'macd' in self.indicators:
+                macd = _values(self.indicators['macd']['macd'])
+                signal = _values(self.indicators['macd']['signal'])
+                series['macd_golden_cross'], series['macd_death_cross'] = crossover_series(macd, signal)
+                series['macd_above_zero'] = macd > 0
+                series['macd_above_signal'] = macd > signal
+                series['macd_below_signal'] = macd < signal
+                series['macd_histogram_rising'] = _rising(_values(self.indicators['macd']['histogram']))
+                series['macd_decision'] = macd_decision_series(macd, signal)
+            
+            if 'rsi' in self.indicators:
+                rsi = _values(self.indicators['rsi'])
+                series['rsi_overbought'] = rsi > 70
+                series['rsi_oversold'] = rsi < 30
+                series['rsi_strong'] = rsi > 50
+                series['rsi_rising'] = _rising(rsi)
+            
+            if 'bollinger' in self.indicators:
+                upper = _values(self.indicators['bollinger']['upper'])
+                middle = _values(self.indicators['bollinger']['middle'])
+                lower = _values(self.indicators['bollinger']['lower'])
+                series['bollinger_above_upper'] = close > upper
+                series['bollinger_below_lower'] = close < lower
+                series['bollinger_above_middle'] = close > middle
+                series['bollinger_wide'] = (upper - lower) / middle > 0.1
+            
+            if 'ma' in self.indicators:
+                ma_data = self.indicators['ma']
+                for period, ma_series in ma_data.items():
+                    series[f'ma_above_{period}'] = close > _values(ma_series)
+                if len(ma_data) >= 3:
+                    zeros = np.zeros(len(close))
+                    ma5 = _values(ma_data[5]) if 5 in ma_data else zeros
+                    ma10 = _values(ma_data[10]) if 10 in ma_data else zeros
+                    ma20 = _values(ma_data[20]) if 20 in ma_data else zeros
+                    series['ma_bullish'] = (ma5 > ma10) & (ma10 > ma20)
+                    series['ma_bearish'] = (ma5 < ma10) & (ma10 < ma20)
+            
+            if 'volume' in self.indicators and 'volume_ratio' in self.indicators['volume']:
+                ratio = _values(self.indicators['volume']['volume_ratio'])
+                # 2: 量比>2，1: 量比>1.5，-1: 量比<0.5，0: 正常
+                series['volume_ratio_level'] = np.select(
+                    [ratio > 2, ratio > 1.5, ratio < 0.5], [2, 1, -1], 0
+                ).astype(np.int8)
+            
+            series['price_up'] = _rising(close)
+            series['volume_up'] = _rising(_values(self.data['Volume']))
+        
+        self._series = series
+        return series
     
     def generate_macd_signals(self) -> Dict:
         """生成MACD交易信号"""
@@ -31,6 +155,7 @@ class SignalGenerator:
         signal_line = macd_data['signal']
         histogram = macd_data['histogram']
         
+        series = self.generate_signal_series()
         signals = []
         latest_macd = macd_line.iloc[-1]
         latest_signal = signal_line.iloc[-1]
@@ -38,32 +163,28 @@ class SignalGenerator:
         
         # 金叉/死叉判断
         if len(macd_line) >= 2:
-            prev_macd = macd_line.iloc[-2]
-            prev_signal = signal_line.iloc[-2]
-            
             # 金叉：MACD线从下向上穿越信号线
-            if prev_macd < prev_signal and latest_macd > latest_signal:
+            if series['macd_golden_cross'][-1]:
                 signals.append("MACD金叉，买入信号")
             # 死叉：MACD线从上向下穿越信号线
-            elif prev_macd > prev_signal and latest_macd < latest_signal:
+            elif series['macd_death_cross'][-1]:
                 signals.append("MACD死叉，卖出信号")
         
         # MACD趋势判断
-        if latest_macd > 0:
-            if latest_macd > latest_signal:
+        if series['macd_above_zero'][-1]:
+            if series['macd_above_signal'][-1]:
                 signals.append("MACD在零轴上方，且MACD线在信号线上方，多头趋势")
             else:
                 signals.append("MACD在零轴上方，但MACD线在信号线下方，可能转弱")
         else:
-            if latest_macd < latest_signal:
+            if series['macd_below_signal'][-1]:
                 signals.append("MACD在零轴下方，且MACD线在信号线下方，空头趋势")
             else:
                 signals.append("MACD在零轴下方，但MACD线在信号线上方，可能转强")
         
         # 柱状图趋势
         if len(histogram) >= 2:
-            prev_hist = histogram.iloc[-2]
-            if latest_histogram > prev_hist:
+            if series['macd_histogram_rising'][-1]:
                 signals.append("MACD柱状图上升，动能增强")
             else:
                 signals.append("MACD柱状图下降，动能减弱")
@@ -84,23 +205,23 @@ class SignalGenerator:
         
         rsi = self.indicators['rsi']
         latest_rsi = rsi.iloc[-1]
+        series = self.generate_signal_series()
         
         signals = []
         
         # 超买超卖判断
-        if latest_rsi > 70:
+        if series['rsi_overbought'][-1]:
             signals.append("RSI超买，可能回调")
-        elif latest_rsi < 30:
+        elif series['rsi_oversold'][-1]:
             signals.append("RSI超卖，可能反弹")
-        elif latest_rsi > 50:
+        elif series['rsi_strong'][-1]:
             signals.append("RSI在强势区，多头占优")
         else:
             signals.append("RSI在弱势区，空头占优")
         
         # RSI趋势判断
         if len(rsi) >= 2:
-            prev_rsi = rsi.iloc[-2]
-            if latest_rsi > prev_rsi:
+            if series['rsi_rising'][-1]:
                 signals.append("RSI上升，动能增强")
             else:
                 signals.append("RSI下降，动能减弱")
@@ -124,22 +245,22 @@ class SignalGenerator:
         latest_upper = upper.iloc[-1]
         latest_middle = middle.iloc[-1]
         latest_lower = lower.iloc[-1]
+        series = self.generate_signal_series()
         
         signals = []
         
         # 价格位置判断
-        if latest_close > latest_upper:
+        if series['bollinger_above_upper'][-1]:
             signals.append("价格突破布林带上轨，可能回调")
-        elif latest_close < latest_lower:
+        elif series['bollinger_below_lower'][-1]:
             signals.append("价格跌破布林带下轨，可能反弹")
-        elif latest_close > latest_middle:
+        elif series['bollinger_above_middle'][-1]:
             signals.append("价格在布林带中轨上方，偏强")
         else:
             signals.append("价格在布林带中轨下方，偏弱")
         
         # 布林带宽度判断
-        bb_width = (latest_upper - latest_lower) / latest_middle
-        if bb_width > 0.1:  # 布林带较宽
+        if series['bollinger_wide'][-1]:  # 布林带较宽
             signals.append("布林带较宽，波动较大")
         else:
             signals.append("布林带较窄，波动较小")
@@ -160,7 +281,7 @@ class SignalGenerator:
             return {}
         
         ma_data = self.indicators['ma']
-        latest_close = self.data['Close'].iloc[-1]
+        series = self.generate_signal_series()
         
         signals = []
         ma_values = {}
@@ -170,20 +291,16 @@ class SignalGenerator:
             latest_ma = ma_series.iloc[-1]
             ma_values[f'MA{period}'] = latest_ma
             
-            if latest_close > latest_ma:
+            if series[f'ma_above_{period}'][-1]:
                 signals.append(f"价格在MA{period}上方，支撑位{latest_ma:.2f}")
             else:
                 signals.append(f"价格在MA{period}下方，阻力位{latest_ma:.2f}")
         
         # 均线排列判断
         if len(ma_data) >= 3:
-            ma5 = ma_data[5].iloc[-1] if 5 in ma_data else 0
-            ma10 = ma_data[10].iloc[-1] if 10 in ma_data else 0
-            ma20 = ma_data[20].iloc[-1] if 20 in ma_data else 0
-            
-            if ma5 > ma10 > ma20:
+            if series['ma_bullish'][-1]:
                 signals.append("均线多头排列，趋势向上")
-            elif ma5 < ma10 < ma20:
+            elif series['ma_bearish'][-1]:
                 signals.append("均线空头排列，趋势向下")
             else:
                 signals.append("均线混乱排列，趋势不明")
@@ -200,29 +317,26 @@ class SignalGenerator:
         
         volume_data = self.indicators['volume']
         latest_volume = self.data['Volume'].iloc[-1]
-        latest_close = self.data['Close'].iloc[-1]
+        series = self.generate_signal_series()
         
         signals = []
         
         # 量比判断
         if 'volume_ratio' in volume_data:
-            latest_ratio = volume_data['volume_ratio'].iloc[-1]
-            if latest_ratio > 2:
+            ratio_level = series['volume_ratio_level'][-1]
+            if ratio_level == 2:
                 signals.append("成交量放大，量比大于2")
-            elif latest_ratio > 1.5:
+            elif ratio_level == 1:
                 signals.append("成交量较大，量比大于1.5")
-            elif latest_ratio < 0.5:
+            elif ratio_level == -1:
                 signals.append("成交量萎缩，量比小于0.5")
             else:
                 signals.append("成交量正常")
         
         # 价量关系判断
         if len(self.data) >= 2:
-            prev_close = self.data['Close'].iloc[-2]
-            prev_volume = self.data['Volume'].iloc[-2]
-            
-            price_up = latest_close > prev_close
-            volume_up = latest_volume > prev_volume
+            price_up = series['price_up'][-1]
+            volume_up = series['volume_up'][-1]
             
             if price_up and volume_up:
                 signals.append("价量配合，上涨有力")
@@ -0,0 +1,96 @@
+"""
+请求合并（single-flight）
+同一个键的并发调用只执行一次，其余调用者等待并共享这一次的结果，避免热门股票被重复回源
+"""
+
+import sys
+import threading
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+
+class _Call:
+    """一次进行中的调用"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    请求合并器
+    第一个调用者执行函数，执行期间到达的相同键调用者阻塞等待，函数返回后所有人得到同一个结果（或同一个异常）；
+    调用完成即移除，不做结果缓存（缓存由K线存储等下层负责）
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        self._stats = {'calls': 0, 'executed': 0, 'coalesced': 0}
+
+    def do(self, key: Hashable, func: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        执行或加入一次调用
+        :param key: 合并键
+        :param func: 无参函数
+        :return: (结果, 是否与其他调用者共享)；共享的结果可能被多个线程同时使用，调用方修改前需要copy
+        """
+        with self._lock:
+            self._stats['calls'] += 1
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self._stats['coalesced'] += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self._stats['executed'] += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = func()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+                shared = call.waiters > 0
+            call.done.set()
+
+        return call.result, shared
+
+    def stats(self) -> Dict[str, int]:
+        """调用次数、实际执行次数、合并次数"""
+        with self._lock:
+            return dict(self._stats)
+
+
+# 进程内共享的请求合并器
+# 与限流器相同，本文件可能以不同模块名重复导入，以最先加载的模块为准
+_SHARED_MODULE_KEY = '_upstream_single_flight'
+sys.modules.setdefault(_SHARED_MODULE_KEY, sys.modules[__name__])
+
+_default_flight = None
+_default_flight_lock = threading.Lock()
+
+
+def get_single_flight() -> SingleFlight:
+    """获取进程内共享的请求合并器"""
+    global _default_flight
+    shared = sys.modules[_SHARED_MODULE_KEY]
+    if shared is not sys.modules.get(__name__):
+        return shared.get_single_flight()
+    with _default_flight_lock:
+        if _default_flight is None:
+            _default_flight = SingleFlight()
+        return _default_flight
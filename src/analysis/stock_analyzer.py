@@ -8,13 +8,28 @@ import numpy as np
 from typing import Dict, Optional
 from .base_analyzer import BaseAnalyzer
 from .indicators import TechnicalIndicators
+from .streaming_indicators import get_indicator_stream_cache
+from .indicator_memo import get_indicator_memo
+from .single_flight import get_single_flight
 from .signals import SignalGenerator
-from .charts import ChartGenerator
 from .data_fetcher import DataFetcher
 
 class StockAnalyzer(BaseAnalyzer):
     """股票分析器主类"""
     
+    # 指标计算参数（同时作为指标结果缓存键的一部分）
+    INDICATOR_PARAMS = {
+        'rsi_period': 14,
+        'bollinger_period': 20,
+        'bollinger_std': 2,
+        'ma_periods': (5, 10, 20),
+        'macd_periods': (12, 26, 9),
+        'volume_period': 20
+    }
+    
+    # 依赖网络接口的基本面指标：不进入指标缓存，每次通过按交易日失效的基本面缓存获取
+    FUNDAMENTAL_KEYS = ('pe_analysis', 'fundamental')
+    
     def __init__(self, stock_code_or_name, period="1000"):
         """
         初始化股票分析器
@@ -26,6 +41,8 @@ class StockAnalyzer(BaseAnalyzer):
         self.signals = {}
         self.chart_generator = None
         self.signal_generator = None
+        # 数据源实际返回的K线周期（可能与请求的 time_period 不同）
+        self.bar_freq = "daily"
     
     def calculate_indicators(self):
         """计算所有技术指标"""
@@ -34,56 +51,27 @@ class StockAnalyzer(BaseAnalyzer):
             return False
         
         try:
-            print("正在计算技术指标...")
-            
-            # 计算RSI
-            self.indicators['rsi'] = TechnicalIndicators.calculate_rsi(
-                self.data['Close'], period=14
-            )
-            
-            # 计算布林带
-            upper, middle, lower = TechnicalIndicators.calculate_bollinger_bands(
-                self.data['Close'], period=20, std_dev=2
-            )
-            self.indicators['bollinger'] = {
-                'upper': upper,
-                'middle': middle,
-                'lower': lower
-            }
-            
-            # 计算移动平均线
-            self.indicators['ma'] = TechnicalIndicators.calculate_moving_averages(
-                self.data['Close'], periods=[5, 10, 20]
-            )
-            
-            # 计算MACD
-            self.indicators['macd'] = TechnicalIndicators.calculate_macd(
-                self.data['Close'], fast_period=12, slow_period=26, signal_period=9
-            )
-            
-            # 计算成交量指标
-            self.indicators['volume'] = TechnicalIndicators.calculate_volume_indicators(
-                self.data['Volume'], self.data['Close'], period=20
-            )
-            
-            # 计算筹码分布
-            print("正在计算筹码分布...")
-            self.indicators['chip_distribution'] = TechnicalIndicators.calculate_chip_distribution(
-                self.data['Close'], self.data['Volume']
-            )
-            
-            # 计算市盈率分析
-            print("正在获取市盈率数据...")
-            self.indicators['pe_analysis'] = TechnicalIndicators.calculate_pe_analysis(
-                self.stock_code
-            )
-            
-            # 计算基本面指标
-            print("正在获取基本面指标...")
-            self.indicators['fundamental'] = TechnicalIndicators.calculate_fundamental_indicators(
-                self.stock_code
-            )
+            # K线没有变化时直接复用缓存的指标结果（只缓存由K线计算的指标）
+            memo = get_indicator_memo()
+            memo_key = memo.make_key(self.stock_code, self.bar_freq, self.INDICATOR_PARAMS, self.data)
+            cached = memo.get(memo_key)
+            if cached is not None:
+                self.indicators.update(cached)
+                print("✅ 使用缓存的技术指标")
+            else:
+                def compute():
+                    self._compute_indicators()
+                    bar_indicators = {key: value for key, value in self.indicators.items()
+                                      if key not in self.FUNDAMENTAL_KEYS}
+                    memo.put(memo_key, bar_indicators)
+                    return bar_indicators
+                
+                # 同一键的并发请求只计算一次
+                indicators, shared = get_single_flight().do(('indicators',) + memo_key, compute)
+                if shared:
+                    self.indicators.update(indicators)
             
+            self._compute_fundamental_indicators()
             print("技术指标计算完成")
             return True
             
@@ -91,6 +79,83 @@ class StockAnalyzer(BaseAnalyzer):
             print(f"计算技术指标失败: {e}")
             return False
     
+    def _compute_indicators(self):
+        """计算由K线得到的技术指标，结果写入 self.indicators"""
+        print("正在计算技术指标...")
+        
+        # 分钟级K线盘中刷新时只增量计算新K线（按实际拿到的K线周期判断）
+        intraday = self.bar_freq in ('15', '30', '60')
+        stream_key = (self.stock_code, self.bar_freq)
+        streamed = get_indicator_stream_cache().extend(
+            stream_key, self.data, ma_periods=self.INDICATOR_PARAMS['ma_periods'],
+            volume_period=self.INDICATOR_PARAMS['volume_period']
+        ) if intraday else None
+        if streamed is not None:
+            self.indicators.update(streamed)
+        else:
+            self._calculate_price_indicators()
+            if intraday:
+                get_indicator_stream_cache().store(stream_key, self.data, self.indicators)
+        
+        # 计算筹码分布
+        print("正在计算筹码分布...")
+        # 日线数据使用按股票保存的增量筹码状态
+        daily = self.bar_freq == 'daily'
+        self.indicators['chip_distribution'] = TechnicalIndicators.calculate_chip_distribution(
+            self.data['Close'], self.data['Volume'],
+            ts_code=self.stock_code if daily else None,
+            dates=self.data['Date'] if daily else None
+        )
+    
+    def _compute_fundamental_indicators(self):
+        """获取市盈率和基本面指标（接口结果按交易日缓存，获取失败不缓存，下次调用重新获取）"""
+        # 计算市盈率分析（基本面接口按交易日缓存，各周期共用；当前价直接取K线收盘价）
+        print("正在获取市盈率数据...")
+        self.indicators['pe_analysis'] = TechnicalIndicators.calculate_pe_analysis(
+            self.stock_code, current_price=float(self.data['Close'].iloc[-1])
+        )
+        
+        # 计算基本面指标
+        print("正在获取基本面指标...")
+        self.indicators['fundamental'] = TechnicalIndicators.calculate_fundamental_indicators(
+            self.stock_code
+        )
+    
+    def _calculate_price_indicators(self):
+        """整段计算价格和成交量类指标（RSI、布林带、均线、MACD、成交量）"""
+        params = self.INDICATOR_PARAMS
+        fast_period, slow_period, signal_period = params['macd_periods']
+        
+        # 计算RSI
+        self.indicators['rsi'] = TechnicalIndicators.calculate_rsi(
+            self.data['Close'], period=params['rsi_period']
+        )
+        
+        # 计算布林带
+        upper, middle, lower = TechnicalIndicators.calculate_bollinger_bands(
+            self.data['Close'], period=params['bollinger_period'], std_dev=params['bollinger_std']
+        )
+        self.indicators['bollinger'] = {
+            'upper': upper,
+            'middle': middle,
+            'lower': lower
+        }
+        
+        # 计算移动平均线
+        self.indicators['ma'] = TechnicalIndicators.calculate_moving_averages(
+            self.data['Close'], periods=list(params['ma_periods'])
+        )
+        
+        # 计算MACD
+        self.indicators['macd'] = TechnicalIndicators.calculate_macd(
+            self.data['Close'], fast_period=fast_period, slow_period=slow_period, signal_period=signal_period
+        )
+        
+        # 计算成交量指标
+        self.indicators['volume'] = TechnicalIndicators.calculate_volume_indicators(
+            self.data['Volume'], self.data['Close'], period=params['volume_period']
+        )
+    
     def generate_signals(self):
         """生成交易信号（实现抽象方法）"""
         return self.generate_trading_signals()
@@ -110,15 +175,19 @@ class StockAnalyzer(BaseAnalyzer):
             # 生成综合信号
             self.signals = self.signal_generator.generate_comprehensive_signals()
             
-            # 添加基本面分析
+            # 添加基本面分析（计算指标时已获取的直接复用）
             print("正在获取基本面分析...")
             try:
                 # 获取市盈率分析
-                pe_analysis = TechnicalIndicators.calculate_pe_analysis(self.stock_code)
+                pe_analysis = self.indicators.get('pe_analysis')
+                if pe_analysis is None:
+                    pe_analysis = TechnicalIndicators.calculate_pe_analysis(self.stock_code)
                 self.signals['pe_analysis'] = pe_analysis
                 
                 # 获取基本面指标
-                fundamental_indicators = TechnicalIndicators.calculate_fundamental_indicators(self.stock_code)
+                fundamental_indicators = self.indicators.get('fundamental')
+                if fundamental_indicators is None:
+                    fundamental_indicators = TechnicalIndicators.calculate_fundamental_indicators(self.stock_code)
                 self.signals['fundamental_indicators'] = fundamental_indicators
                 
                 print("基本面分析获取完成")
@@ -146,7 +215,8 @@ class StockAnalyzer(BaseAnalyzer):
             return None
         
         try:
-            # 创建图表生成器
+            # 创建图表生成器（plotly较重，生成图表时才导入）
+            from .charts import ChartGenerator
             self.chart_generator = ChartGenerator(self.data, self.indicators)
             
             # 根据类型生成图表
@@ -305,6 +375,7 @@ class StockAnalyzer(BaseAnalyzer):
         """获取股票数据"""
         try:
             print(f"正在获取 {self.stock_code} 的数据...")
+            self.time_period = time_period
             
             # 创建数据获取器
             self.data_fetcher = DataFetcher()
@@ -318,6 +389,9 @@ class StockAnalyzer(BaseAnalyzer):
                 print(f"无法获取 {self.stock_code} 的数据")
                 return False
             
+            # 数据源目前只提供日线（数据源名以 _daily 结尾），请求分钟线/周线时拿到的仍是日线
+            self.bar_freq = 'daily' if str(self.data_source).endswith('_daily') else time_period
+            
             # 获取股票名称
             self.stock_name = self.data_fetcher.get_stock_name(self.stock_code)
             print(f"股票名称: {self.stock_name}")
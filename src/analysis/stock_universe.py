@@ -0,0 +1,304 @@
+"""
+全A股股票池注册表
+每个交易日只下载一次股票列表，以列式表保存在内存和磁盘，供所有扫描器共享
+"""
+
+import os
+import time
+import threading
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from typing import Optional, List, Dict
+
+try:
+    from .columnar_store import DATA_DIR, save_frame, load_frame
+    from .rate_limiter import limit_akshare
+except ImportError:
+    from columnar_store import DATA_DIR, save_frame, load_frame
+    from rate_limiter import limit_akshare
+
+# 根据股票名称的简单行业分类（按顺序匹配，先命中者优先）
+NAME_INDUSTRY_KEYWORDS = [
+    ('banking', ['银行', '农商', '农信', '信用社']),
+    ('insurance', ['保险', '人寿', '财险', '太保']),
+    ('securities', ['证券', '期货', '信托', '投资']),
+    ('technology', ['科技', '软件', '网络', '计算机', '信息', '数据', '云', '互联网', '智能']),
+    ('healthcare', ['医药', '生物', '制药', '医疗', '健康', '药业', '医院']),
+    ('consumer', ['食品', '饮料', '酒', '零售', '商贸', '百货', '超市', '餐饮']),
+    ('energy', ['石油', '化工', '煤炭', '天然气', '石化', '能源']),
+    ('automotive', ['汽车', '客车', '货车', '轮胎', '汽配']),
+    ('manufacturing', ['机械', '装备', '工程', '制造', '重工', '机电']),
+    ('real_estate', ['地产', '房地产', '置业', '发展', '建设', '城建']),
+    ('agriculture', ['农业', '林业', '牧业', '渔业', '种业', '饲料']),
+]
+
+# 没有行业信息的股票归入的行业
+UNKNOWN_INDUSTRY = '其他'
+
+# 名称分类 -> 展示用的中文行业名
+INDUSTRY_CLASS_NAMES = {
+    'banking': '银行',
+    'insurance': '保险',
+    'securities': '证券',
+    'technology': '科技',
+    'healthcare': '医药',
+    'consumer': '消费',
+    'energy': '能源',
+    'automotive': '汽车',
+    'manufacturing': '制造',
+    'real_estate': '房地产',
+    'agriculture': '农业',
+}
+
+# AkShare实时行情列 -> 股票池列
+SPOT_COLUMNS = {
+    '最新价': 'price',
+    '涨跌幅': 'pct_chg',
+    '市盈率-动态': 'pe',
+    '市净率': 'pb',
+    '总市值': 'total_mv',
+    '流通市值': 'circ_mv',
+    '换手率': 'turnover_rate',
+    '成交量': 'volume',
+    '成交额': 'amount',
+}
+
+
+def classify_industry_by_name(stock_name: str) -> str:
+    """
+    根据股票名称进行简单的行业分类
+    :param stock_name: 股票名称
+    :return: 行业分类
+    """
+    for industry, keywords in NAME_INDUSTRY_KEYWORDS:
+        if any(keyword in stock_name for keyword in keywords):
+            return industry
+    return 'other'
+
+
+def display_industry(industry: str, stock_name: str) -> str:
+    """
+    展示用的行业名：优先使用股票池中的行业，缺失（归入 UNKNOWN_INDUSTRY）时按名称简单分类
+    :param industry: 股票池中的行业
+    :param stock_name: 股票名称
+    :return: 中文行业名
+    """
+    if industry and industry != UNKNOWN_INDUSTRY:
+        return industry
+    return INDUSTRY_CLASS_NAMES.get(classify_industry_by_name(stock_name), UNKNOWN_INDUSTRY)
+
+
+class StockUniverse:
+    """
+    全A股股票池注册表
+    列：code, ts_code, name, market(SH/SZ/BJ), exchange, board, market_type,
+        industry, industry_class, area, list_date, 以及实时行情列(price, pe, pb, market_cap...)
+    """
+
+    def __init__(self, ttl: int = 6 * 3600, cache_path: str = None, retry_after: int = 300):
+        """
+        初始化股票池
+        :param ttl: 缓存有效期（秒），跨日自动失效
+        :param cache_path: 磁盘缓存路径，默认 data/universe/stock_universe.npz
+        :param retry_after: TuShare 获取失败、只用 AkShare 构建的股票池在多少秒后才重新尝试 TuShare
+        """
+        self.ttl = ttl
+        self.retry_after = retry_after
+        self.cache_path = cache_path or os.path.join(DATA_DIR, 'universe', 'stock_universe.npz')
+        self._frame = None
+        self._meta = {}
+        self._lock = threading.Lock()
+
+    def _is_fresh(self, meta: Dict, pro=None) -> bool:
+        """
+        检查缓存是否仍然有效（同一天且未超过TTL）
+        调用方提供TuShare时需包含TuShare信息；构建时TuShare已获取失败的，retry_after 内仍视为有效，
+        避免逐只查询时每只股票都重新构建整个股票池
+        """
+        if not meta:
+            return False
+        if pro is not None and not meta.get('has_tushare', False):
+            if time.time() - meta.get('tushare_failed_at', 0) >= self.retry_after:
+                return False
+        today = datetime.now().strftime('%Y%m%d')
+        return meta.get('built_date') == today and time.time() - meta.get('built_at', 0) < self.ttl
+
+    def get_frame(self, pro=None, use_akshare: bool = True, force_refresh: bool = False) -> pd.DataFrame:
+        """
+        获取股票池列式表
+        :param pro: TuShare Pro API对象（可选，用于补充行业、地区、上市日期）
+        :param use_akshare: 是否使用AkShare实时行情
+        :param force_refresh: 强制重新下载
+        :return: 股票池DataFrame（只读共享，调用方需要修改时请先copy）
+        """
+        with self._lock:
+            if not force_refresh:
+                if self._frame is not None and self._is_fresh(self._meta, pro):
+                    return self._frame
+
+                frame, meta = load_frame(self.cache_path)
+                if frame is not None and len(frame) > 0 and self._is_fresh(meta, pro):
+                    print(f"💾 使用本地股票池缓存: {len(frame)} 只股票")
+                    self._frame, self._meta = frame, meta
+                    return self._frame
+
+            frame, sources, has_tushare = self._build(pro, use_akshare)
+            if len(frame) == 0:
+                # 下载失败时继续使用旧数据
+                if self._frame is not None:
+                    print("⚠️ 股票池刷新失败，继续使用旧数据")
+                    return self._frame
+                return frame
+
+            self._frame = frame
+            self._meta = {
+                'built_date': datetime.now().strftime('%Y%m%d'),
+                'built_at': time.time(),
+                'sources': sources,
+                'has_tushare': has_tushare
+            }
+            if pro is not None and not has_tushare:
+                self._meta['tushare_failed_at'] = time.time()
+            save_frame(self.cache_path, frame, self._meta)
+            return self._frame
+
+    def get_records(self, pro=None, use_akshare: bool = True, force_refresh: bool = False) -> List[Dict]:
+        """
+        以字典列表形式获取股票池
+        :return: 股票列表
+        """
+        frame = self.get_frame(pro, use_akshare, force_refresh)
+        return frame.replace({np.nan: None}).to_dict('records')
+
+    @property
+    def sources(self) -> List[str]:
+        """最近一次构建使用的数据源"""
+        return list(self._meta.get('sources', []))
+
+    def _build(self, pro, use_akshare: bool):
+        """下载并合并AkShare实时行情与TuShare基础信息"""
+        print("🔄 构建全A股股票池...")
+        start_time = time.time()
+        parts = []
+        sources = []
+
+        if use_akshare:
+            try:
+                import akshare as ak
+                ak = limit_akshare(ak)
+                spot = ak.stock_zh_a_spot_em()
+                if spot is not None and len(spot) > 0:
+                    ak_frame = pd.DataFrame({
+                        'code': spot['代码'].astype(str).str.zfill(6),
+                        'name': spot['名称'].astype(str),
+                    })
+                    for src_col, dst_col in SPOT_COLUMNS.items():
+                        if src_col in spot.columns:
+                            ak_frame[dst_col] = pd.to_numeric(spot[src_col], errors='coerce').to_numpy()
+                    ak_frame['data_source'] = 'akshare'
+                    parts.append(ak_frame)
+                    sources.append(f"akshare: {len(ak_frame)} 只股票")
+                    print(f"✅ AkShare获取成功: {len(ak_frame)} 只股票")
+            except Exception as e:
+                print(f"⚠️ AkShare获取股票列表失败: {e}")
+
+        basic = None
+        if pro is not None:
+            try:
+                basic = pro.stock_basic(
+                    exchange='',
+                    list_status='L',
+                    fields='ts_code,symbol,name,area,industry,list_date,market'
+                )
+                if basic is not None and len(basic) > 0:
+                    sources.append(f"tushare: {len(basic)} 只股票")
+                    print(f"✅ TuShare获取成功: {len(basic)} 只股票")
+                else:
+                    basic = None
+            except Exception as e:
+                print(f"⚠️ TuShare获取股票列表失败: {e}")
+                basic = None
+
+        if basic is not None:
+            ts_frame = pd.DataFrame({
+                'code': basic['symbol'].astype(str).str.zfill(6),
+                'ts_name': basic['name'].astype(str),
+                'ts_code': basic['ts_code'].astype(str),
+                'industry': basic['industry'].fillna('').astype(str),
+                'area': basic['area'].fillna('').astype(str),
+                'list_date': basic['list_date'].fillna('').astype(str),
+            })
+            if parts:
+                frame = parts[0].merge(ts_frame, on='code', how='outer')
+                frame['data_source'] = frame['data_source'].fillna('tushare')
+                frame['name'] = frame['name'].fillna(frame['ts_name'])
+            else:
+                frame = ts_frame.rename(columns={'ts_name': 'name'})
+                frame['data_source'] = 'tushare'
+            frame = frame.drop(columns=['ts_name'], errors='ignore')
+        elif parts:
+            frame = parts[0]
+        else:
+            return pd.DataFrame(), sources, False
+
+        frame = self._add_derived_columns(frame)
+        print(f"✅ 股票池构建完成: {len(frame)} 只股票，耗时 {time.time() - start_time:.2f}秒")
+        return frame, sources, basic is not None
+
+    @staticmethod
+    def _add_derived_columns(frame: pd.DataFrame) -> pd.DataFrame:
+        """按代码前缀一次性计算市场、交易所、板块等列"""
+        code = frame['code'].astype(str)
+        frame = frame[(code.str.len() == 6) & code.str.isdigit()].copy()
+        code = frame['code']
+
+        conditions = [
+            code.str.startswith('688').to_numpy(),
+            code.str.startswith('6').to_numpy(),
+            code.str.startswith('0').to_numpy(),
+            code.str.startswith('3').to_numpy(),
+            code.str.startswith(('8', '4', '92')).to_numpy(),
+        ]
+        frame['market'] = np.select(conditions, ['SH', 'SH', 'SZ', 'SZ', 'BJ'], default='')
+        frame['exchange'] = np.select(conditions, ['上海证券交易所', '上海证券交易所', '深圳证券交易所',
+                                                   '深圳证券交易所', '北京证券交易所'], default='')
+        frame['board'] = np.select(conditions, ['科创板', '主板', '主板', '创业板', '北交所'], default='')
+        frame['market_type'] = np.select(conditions, ['star_market', 'main_board_sh', 'main_board_sz',
+                                                      'gem', 'beijing'], default='')
+        frame = frame[frame['market'] != '']
+
+        if 'ts_code' not in frame.columns:
+            frame['ts_code'] = ''
+        missing_ts_code = frame['ts_code'].isna() | (frame['ts_code'] == '')
+        frame.loc[missing_ts_code, 'ts_code'] = frame.loc[missing_ts_code, 'code'] + '.' + frame.loc[missing_ts_code, 'market']
+
+        for col in ['industry', 'area', 'list_date']:
+            if col not in frame.columns:
+                frame[col] = ''
+            frame[col] = frame[col].fillna('')
+        frame.loc[frame['industry'].str.strip() == '', 'industry'] = UNKNOWN_INDUSTRY
+
+        frame['industry_class'] = [classify_industry_by_name(name) for name in frame['name'].astype(str)]
+
+        # 总市值换算为亿元
+        if 'total_mv' in frame.columns:
+            frame['market_cap'] = frame['total_mv'] / 1e8
+        else:
+            frame['market_cap'] = np.nan
+
+        return frame.sort_values('code').reset_index(drop=True)
+
+
+# 进程内共享的股票池
+_default_universe = None
+_default_universe_lock = threading.Lock()
+
+
+def get_stock_universe() -> StockUniverse:
+    """获取进程内共享的股票池注册表"""
+    global _default_universe
+    with _default_universe_lock:
+        if _default_universe is None:
+            _default_universe = StockUniverse()
+        return _default_universe
@@ -0,0 +1,561 @@
+"""
+流式技术指标
+每个指标保存计算所需的最小状态，可以先用历史数据初始化，之后每根新K线 O(1) 更新；
+计算口径与 TechnicalIndicators 一致（EMA 为 pandas ewm(span).mean() 的 adjust=True 口径，RSI 为简单滚动均值）。
+盘中未走完的K线用 preview 计算，不改变已确认的状态，分钟级刷新时无需重算历史
+"""
+
+import copy
+import math
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+NAN = float('nan')
+
+
+class StreamingIndicator(ABC):
+    """流式指标基类"""
+
+    def seed(self, values: Iterable):
+        """
+        用历史数据初始化状态
+        :param values: 按时间升序的历史值
+        :return: 最后一个指标值
+        """
+        value = None
+        for value in self._iter_seed(values):
+            pass
+        return self.value if value is None else value
+
+    def _iter_seed(self, values: Iterable):
+        for item in values:
+            yield self.update(item)
+
+    @abstractmethod
+    def update(self, value):
+        """加入一根已确认的K线，返回最新指标值（子类必须实现）"""
+        pass
+
+    def preview(self, value):
+        """
+        计算加入一根未确认K线（盘中尚未走完）后的指标值，不改变状态
+        :param value: 未确认K线的值
+        :return: 指标值
+        """
+        return copy.deepcopy(self).update(value)
+
+    @property
+    @abstractmethod
+    def value(self):
+        """当前指标值（子类必须实现）"""
+        pass
+
+
+class EMA(StreamingIndicator):
+    """
+    指数移动平均
+    adjust=True 时与 pandas ewm(span).mean() 一致：分子分母分别按衰减因子递推，缺失值只衰减不累加
+    """
+
+    def __init__(self, span: int, adjust: bool = True):
+        self.span = span
+        self.adjust = adjust
+        self.decay = 1.0 - 2.0 / (span + 1.0)
+        self._numerator = 0.0
+        self._denominator = 0.0
+        self._value = NAN
+
+    def seed(self, values: Iterable) -> float:
+        """用历史数据一次性初始化（向量化计算分子分母）"""
+        values = np.asarray(values if hasattr(values, '__len__') else list(values), dtype=float)
+        if len(values) == 0:
+            return self._value
+        if not self.adjust:
+            return super().seed(values)
+        valid = np.isfinite(values)
+        weights = np.power(self.decay, np.arange(len(values) - 1, -1, -1, dtype=float))
+        self._numerator = self._numerator * self.decay ** len(values) + float(np.sum(weights[valid] * values[valid]))
+        self._denominator = self._denominator * self.decay ** len(values) + float(np.sum(weights[valid]))
+        self._value = self._numerator / self._denominator if self._denominator > 0 else NAN
+        return self._value
+
+    def update(self, value: float) -> float:
+        if self.adjust:
+            self._numerator *= self.decay
+            self._denominator *= self.decay
+            if _finite(value):
+                self._numerator += value
+                self._denominator += 1.0
+            if self._denominator > 0:
+                self._value = self._numerator / self._denominator
+        elif _finite(value):
+            alpha = 1.0 - self.decay
+            self._value = value if math.isnan(self._value) else self._value + alpha * (value - self._value)
+        return self._value
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+
+class MACD(StreamingIndicator):
+    """MACD：快慢EMA之差，信号线为差值的EMA"""
+
+    def __init__(self, fast_period: int = 12, slow_period: int = 26, signal_period: int = 9):
+        self.fast = EMA(fast_period)
+        self.slow = EMA(slow_period)
+        self.signal = EMA(signal_period)
+
+    def seed(self, values: Iterable) -> Tuple[float, float, float]:
+        """用历史数据初始化（信号线需要完整的快慢线差值序列）"""
+        values = np.asarray(values, dtype=float)
+        if len(values) == 0:
+            return self.value
+        fast = _ewm_series(values, self.fast.decay)
+        slow = _ewm_series(values, self.slow.decay)
+        self.fast.seed(values)
+        self.slow.seed(values)
+        self.signal.seed(fast - slow)
+        return self.value
+
+    def update(self, value: float) -> Tuple[float, float, float]:
+        macd = self.fast.update(value) - self.slow.update(value)
+        signal = self.signal.update(macd)
+        return macd, signal, macd - signal
+
+    @property
+    def value(self) -> Tuple[float, float, float]:
+        macd = self.fast.value - self.slow.value
+        return macd, self.signal.value, macd - self.signal.value
+
+
+class RollingWindow(StreamingIndicator):
+    """
+    滚动均值/标准差（ddof=1）
+    保存窗口内的值和累计和；窗口内有缺失值时结果为NaN（与 pandas rolling 一致）
+    """
+
+    def __init__(self, window: int):
+        self.window = window
+        self._values = deque(maxlen=window)
+        self._anchor = None
+        self._sum = 0.0
+        self._sum_sq = 0.0
+        self._missing = 0
+
+    def _iter_seed(self, values: Iterable):
+        values = list(values)
+        for item in values[-self.window:]:
+            yield self.update(item)
+
+    def update(self, value: float) -> float:
+        if len(self._values) == self.window:
+            self._remove(self._values[0])
+        self._values.append(value)
+        if not _finite(value):
+            self._missing += 1
+        else:
+            if self._anchor is None:
+                # 以第一个值为基准累加偏差，减少大数相减的精度损失
+                self._anchor = value
+            offset = value - self._anchor
+            self._sum += offset
+            self._sum_sq += offset * offset
+        return self.mean
+
+    def _remove(self, value: float):
+        if not _finite(value):
+            self._missing -= 1
+            return
+        offset = value - self._anchor
+        self._sum -= offset
+        self._sum_sq -= offset * offset
+
+    @property
+    def ready(self) -> bool:
+        """窗口是否已满且没有缺失值"""
+        return len(self._values) == self.window and self._missing == 0
+
+    @property
+    def mean(self) -> float:
+        if not self.ready:
+            return NAN
+        return self._anchor + self._sum / self.window
+
+    @property
+    def std(self) -> float:
+        if not self.ready or self.window < 2:
+            return NAN
+        variance = (self._sum_sq - self._sum * self._sum / self.window) / (self.window - 1)
+        return math.sqrt(max(variance, 0.0))
+
+    @property
+    def value(self) -> float:
+        return self.mean
+
+
+class Bollinger(StreamingIndicator):
+    """布林带：滚动均值 ± std_dev 倍滚动标准差"""
+
+    def __init__(self, period: int = 20, std_dev: float = 2):
+        self.std_dev = std_dev
+        self.window = RollingWindow(period)
+
+    def _iter_seed(self, values: Iterable):
+        self.window.seed(values)
+        yield self.value
+
+    def update(self, value: float) -> Tuple[float, float, float]:
+        self.window.update(value)
+        return self.value
+
+    @property
+    def value(self) -> Tuple[float, float, float]:
+        middle, std = self.window.mean, self.window.std
+        return middle + std * self.std_dev, middle, middle - std * self.std_dev
+
+
+class RSI(StreamingIndicator):
+    """
+    RSI
+    method='sma' 为涨跌幅的简单滚动均值（与 TechnicalIndicators.calculate_rsi 一致）；
+    method='wilder' 为 Wilder 平滑（前 period 个涨跌幅取均值，之后按 1/period 递推）
+    """
+
+    def __init__(self, period: int = 14, method: str = 'sma'):
+        if method not in ('sma', 'wilder'):
+            raise ValueError(f"未知RSI计算方式: {method}")
+        self.period = period
+        self.method = method
+        self._previous = None
+        self._count = 0
+        self._gains = RollingWindow(period)
+        self._losses = RollingWindow(period)
+        self._avg_gain = 0.0
+        self._avg_loss = 0.0
+
+    def _iter_seed(self, values: Iterable):
+        values = list(values)
+        if self.method == 'sma' and len(values) > self.period + 1:
+            # 只有最后 period 个涨跌幅影响结果
+            self._previous = values[-(self.period + 1)]
+            values = values[-self.period:]
+        for item in values:
+            yield self.update(item)
+
+    def update(self, value: float) -> float:
+        if self._previous is None:
+            # 第一根K线的涨跌幅缺失，按0计入（与 delta.where(delta > 0, 0) 一致）
+            change = 0.0
+        else:
+            change = value - self._previous
+            if not _finite(change):
+                change = 0.0
+        self._previous = value
+        self._count += 1
+        gain, loss = max(change, 0.0), max(-change, 0.0)
+
+        if self.method == 'sma':
+            self._gains.update(gain)
+            self._losses.update(loss)
+        elif self._count <= self.period + 1:
+            # 第一根K线没有涨跌幅，Wilder 从第2根开始累计前 period 个
+            if self._count > 1:
+                self._avg_gain += gain / self.period
+                self._avg_loss += loss / self.period
+        else:
+            self._avg_gain = (self._avg_gain * (self.period - 1) + gain) / self.period
+            self._avg_loss = (self._avg_loss * (self.period - 1) + loss) / self.period
+        return self.value
+
+    @property
+    def value(self) -> float:
+        if self.method == 'sma':
+            gain, loss = self._gains.mean, self._losses.mean
+        else:
+            if self._count <= self.period:
+                return NAN
+            gain, loss = self._avg_gain, self._avg_loss
+        if math.isnan(gain) or math.isnan(loss):
+            return NAN
+        if loss == 0:
+            return NAN if gain == 0 else 100.0
+        return 100.0 - 100.0 / (1.0 + gain / loss)
+
+
+class KDJ(StreamingIndicator):
+    """
+    KDJ：RSV = (收盘 - N日最低) / (N日最高 - N日最低) × 100，K、D 为 1/m 平滑（初值50），J = 3K - 2D
+    N日最高/最低用单调队列维护，每根K线均摊 O(1)
+    """
+
+    def __init__(self, n: int = 9, m1: int = 3, m2: int = 3):
+        self.n = n
+        self.m1 = m1
+        self.m2 = m2
+        self._index = 0
+        self._highs = deque()
+        self._lows = deque()
+        self.k = 50.0
+        self.d = 50.0
+
+    def _iter_seed(self, bars: Iterable):
+        for high, low, close in bars:
+            yield self.update((high, low, close))
+
+    def update(self, bar: Tuple[float, float, float]) -> Tuple[float, float, float]:
+        """
+        :param bar: (最高价, 最低价, 收盘价)
+        :return: (K, D, J)
+        """
+        high, low, close = bar
+        index = self._index
+        self._index += 1
+        while self._highs and self._highs[-1][1] <= high:
+            self._highs.pop()
+        self._highs.append((index, high))
+        while self._lows and self._lows[-1][1] >= low:
+            self._lows.pop()
+        self._lows.append((index, low))
+        while self._highs[0][0] <= index - self.n:
+            self._highs.popleft()
+        while self._lows[0][0] <= index - self.n:
+            self._lows.popleft()
+
+        highest, lowest = self._highs[0][1], self._lows[0][1]
+        rsv = (close - lowest) / (highest - lowest) * 100 if highest > lowest else 50.0
+        self.k = (self.k * (self.m1 - 1) + rsv) / self.m1
+        self.d = (self.d * (self.m2 - 1) + self.k) / self.m2
+        return self.value
+
+    @property
+    def value(self) -> Tuple[float, float, float]:
+        return self.k, self.d, 3 * self.k - 2 * self.d
+
+
+class IndicatorStream:
+    """
+    单只股票单个周期的一组流式指标：MA5/10/20/60、RSI、MACD、布林带、KDJ、成交量均线
+    """
+
+    MA_PERIODS = (5, 10, 20, 60)
+
+    def __init__(self, volume_period: int = 20):
+        self.ma = {period: RollingWindow(period) for period in self.MA_PERIODS}
+        self.rsi = RSI(14)
+        self.macd = MACD()
+        self.bollinger = Bollinger(20, 2)
+        self.kdj = KDJ()
+        self.volume_ma = RollingWindow(volume_period)
+        self.last_time = None
+        self.count = 0
+
+    def seed(self, data) -> Dict[str, float]:
+        """
+        用历史K线初始化
+        :param data: 含 Date/High/Low/Close/Volume 列、按时间升序的DataFrame
+        :return: 最后一根K线的指标值
+        """
+        if data is None or len(data) == 0:
+            return self.latest()
+        close = data['Close'].to_numpy(dtype=float)
+        for window in self.ma.values():
+            window.seed(close)
+        self.rsi.seed(close)
+        self.macd.seed(close)
+        self.bollinger.seed(close)
+        self.kdj.seed(zip(data['High'].to_numpy(dtype=float), data['Low'].to_numpy(dtype=float), close))
+        self.volume_ma.seed(data['Volume'].to_numpy(dtype=float))
+        self.last_time = data['Date'].iloc[-1]
+        self.count += len(data)
+        return self.latest()
+
+    def update(self, bar: Dict, final: bool = True) -> Dict[str, float]:
+        """
+        加入一根K线
+        :param bar: 含 Date/High/Low/Close/Volume 的字典或Series
+        :param final: K线是否已走完；未走完时只计算不保存（下一次刷新传入同一根K线的新值）
+        :return: 指标值
+        """
+        stream = self if final else copy.deepcopy(self)
+        close = float(bar['Close'])
+        for window in stream.ma.values():
+            window.update(close)
+        stream.rsi.update(close)
+        stream.macd.update(close)
+        stream.bollinger.update(close)
+        stream.kdj.update((float(bar['High']), float(bar['Low']), close))
+        stream.volume_ma.update(float(bar['Volume']))
+        stream.last_time = bar['Date']
+        stream.count += 1
+        return stream.latest()
+
+    def latest(self) -> Dict[str, float]:
+        """当前指标值"""
+        macd, signal, histogram = self.macd.value
+        upper, middle, lower = self.bollinger.value
+        k, d, j = self.kdj.value
+        result = {f'ma{period}': window.mean for period, window in self.ma.items()}
+        result.update({
+            'rsi': self.rsi.value,
+            'macd': macd, 'macd_signal': signal, 'macd_histogram': histogram,
+            'bollinger_upper': upper, 'bollinger_middle': middle, 'bollinger_lower': lower,
+            'k': k, 'd': d, 'j': j,
+            'volume_ma': self.volume_ma.mean
+        })
+        return result
+
+
+def _ewm_series(values: np.ndarray, decay: float) -> np.ndarray:
+    """pandas ewm(adjust=True).mean() 口径的完整序列（用于初始化依赖中间序列的指标）"""
+    result = np.empty(len(values))
+    numerator = denominator = 0.0
+    for i, value in enumerate(values):
+        numerator *= decay
+        denominator *= decay
+        if _finite(value):
+            numerator += value
+            denominator += 1.0
+        result[i] = numerator / denominator if denominator > 0 else NAN
+    return result
+
+
+def _finite(value) -> bool:
+    return value is not None and math.isfinite(value)
+
+
+class IndicatorStreamCache:
+    """
+    分钟级K线指标的流式缓存
+    按 (股票代码, 周期) 保存已确认K线的流式指标状态和上次计算出的指标序列。
+    再次计算时如果数据只是在上次的K线之后追加了少量新K线（盘中刷新），只对新K线做 O(1) 更新并追加到序列末尾；
+    最后一根K线视为未走完，只用 preview 计算，下次刷新时重新计算
+    """
+
+    def __init__(self, max_new_bars: int = 32, memory_size: int = 256):
+        """
+        初始化缓存
+        :param max_new_bars: 允许增量追加的最大K线数，超过时整段重算
+        :param memory_size: 保留的 (股票, 周期) 个数
+        """
+        self.max_new_bars = max_new_bars
+        self.memory_size = memory_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'extends': 0, 'misses': 0}
+
+    def extend(self, key, data, ma_periods=(5, 10, 20), volume_period: int = 20) -> Optional[Dict]:
+        """
+        在上次的指标序列后追加新K线的指标
+        :param key: 缓存键，通常为 (股票代码, 周期)
+        :param data: 含 Date/High/Low/Close/Volume 列、按时间升序的DataFrame
+        :param ma_periods: 需要返回的均线周期
+        :param volume_period: 成交量均线周期
+        :return: 与 StockAnalyzer.indicators 相同结构的 rsi/bollinger/ma/macd/volume 指标，无法增量计算时返回 None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            committed = entry['count'] if entry is not None else 0
+            new_count = len(data) - committed
+            if entry is None or new_count < 1 or new_count > self.max_new_bars \
+                    or data['Date'].iloc[committed - 1] != entry['last_time'] \
+                    or not np.isclose(float(data['Close'].iloc[committed - 1]), entry['last_close'], rtol=1e-9):
+                self._stats['misses'] += 1
+                return None
+
+            stream = entry['stream']
+            rows = data.iloc[committed:]
+            values = [stream.update(bar) for _, bar in rows.iloc[:-1].iterrows()]
+            values.append(stream.update(rows.iloc[-1], final=False))
+            entry.update(count=len(data) - 1, last_time=data['Date'].iloc[-2],
+                         last_close=float(data['Close'].iloc[-2]))
+            self._entries.move_to_end(key)
+            self._stats['extends'] += 1
+
+            def column(name, previous):
+                return pd.concat([previous.iloc[:committed],
+                                  pd.Series([value[name] for value in values], index=rows.index)])
+
+            cached = entry['indicators']
+            volume_ma = column('volume_ma', cached['volume']['volume_ma'])
+            correlation = cached['volume']['price_volume_correlation'].iloc[:committed]
+            new_correlation = [_price_volume_correlation(data, i, volume_period) for i in range(committed, len(data))]
+            indicators = {
+                'rsi': column('rsi', cached['rsi']),
+                'bollinger': {
+                    'upper': column('bollinger_upper', cached['bollinger']['upper']),
+                    'middle': column('bollinger_middle', cached['bollinger']['middle']),
+                    'lower': column('bollinger_lower', cached['bollinger']['lower'])
+                },
+                'ma': {period: column(f'ma{period}', cached['ma'][period]) for period in ma_periods},
+                'macd': {
+                    'macd': column('macd', cached['macd']['macd']),
+                    'signal': column('macd_signal', cached['macd']['signal']),
+                    'histogram': column('macd_histogram', cached['macd']['histogram'])
+                },
+                'volume': {
+                    'volume_ma': volume_ma,
+                    'volume_ratio': data['Volume'] / volume_ma.values,
+                    'price_volume_correlation': pd.concat([correlation, pd.Series(new_correlation, index=rows.index)])
+                }
+            }
+            entry['indicators'] = indicators
+            return indicators
+
+    def store(self, key, data, indicators: Dict):
+        """
+        保存整段计算的结果，并用除最后一根以外的K线初始化流式状态
+        :param key: 缓存键
+        :param data: 计算所用的K线
+        :param indicators: 整段计算得到的指标（需包含 rsi/bollinger/ma/macd/volume）
+        """
+        if data is None or len(data) < 2:
+            return
+        stream = IndicatorStream()
+        stream.seed(data.iloc[:-1])
+        entry = {
+            'stream': stream,
+            'count': len(data) - 1,
+            'last_time': data['Date'].iloc[-2],
+            'last_close': float(data['Close'].iloc[-2]),
+            'indicators': {name: indicators[name] for name in ('rsi', 'bollinger', 'ma', 'macd', 'volume')}
+        }
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.memory_size:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        """增量追加和未命中的次数"""
+        with self._lock:
+            return dict(self._stats)
+
+
+def _price_volume_correlation(data, i: int, period: int) -> float:
+    """第 i 根K线的价量配合度（前 period 根K线涨跌幅与成交量变化率的相关系数），口径同 calculate_volume_indicators"""
+    if i < period + 1:
+        return NAN
+    close = data['Close'].iloc[i - period - 1:i].to_numpy(dtype=float)
+    volume = data['Volume'].iloc[i - period - 1:i].to_numpy(dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return float(np.corrcoef(close[1:] / close[:-1] - 1, volume[1:] / volume[:-1] - 1)[0, 1])
+
+
+# 进程内共享的分钟级指标缓存
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_indicator_stream_cache() -> IndicatorStreamCache:
+    """获取进程内共享的分钟级指标流式缓存"""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = IndicatorStreamCache()
+        return _default_cache
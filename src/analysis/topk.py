@@ -0,0 +1,99 @@
+"""
+Top-K 扫描
+扫描只展示前K名时，用小顶堆维护当前前K名的评分；每只股票先算一个廉价的评分上界，
+按上界从高到低分析，上界不可能超过第K名评分的股票直接跳过，剩余股票都进不了前K名时提前结束
+"""
+
+import heapq
+import itertools
+from typing import Any, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+
+class TopKCollector:
+    """
+    运行中的前K名集合（小顶堆，堆顶为当前第K名）
+    评分相同的结果按加入顺序保留先到者，与对全部结果稳定排序后取前K名一致
+    """
+
+    def __init__(self, k: int, floor: Optional[float] = None):
+        """
+        :param k: 保留的结果个数
+        :param floor: 最低入选评分（含），低于该评分的结果不进入前K名
+        """
+        if k <= 0:
+            raise ValueError(f"k 必须为正整数: {k}")
+        self.k = k
+        self.floor = floor
+        self._heap = []
+        self._counter = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    @property
+    def full(self) -> bool:
+        """是否已收集满K个结果"""
+        return len(self._heap) >= self.k
+
+    @property
+    def threshold(self) -> Optional[float]:
+        """新结果需要超过的评分：满K个后为第K名评分，否则为最低入选评分（可能为 None）"""
+        if self.full:
+            return self._heap[0][0]
+        return self.floor
+
+    def can_enter(self, bound: float) -> bool:
+        """
+        评分上界为 bound 的股票是否还有可能进入前K名
+        :param bound: 评分上界
+        :return: 未满K个时只要求不低于最低入选评分；满K个后必须严格超过第K名
+        """
+        if self.full:
+            return bound > self._heap[0][0]
+        return self.floor is None or bound >= self.floor
+
+    def offer(self, score: float, item: Any) -> bool:
+        """
+        加入一个结果
+        :param score: 评分
+        :param item: 结果对象
+        :return: 是否进入前K名
+        """
+        if self.floor is not None and score < self.floor:
+            return False
+        # 序号取负：评分相同时后加入的排在堆顶，先被替换
+        entry = (score, -next(self._counter), item)
+        if not self.full:
+            heapq.heappush(self._heap, entry)
+            return True
+        if score > self._heap[0][0]:
+            heapq.heapreplace(self._heap, entry)
+            return True
+        return False
+
+    def results(self) -> List[Any]:
+        """按评分从高到低（评分相同按加入顺序）返回前K名"""
+        return [item for _, _, item in sorted(self._heap, key=lambda e: (-e[0], -e[1]))]
+
+
+def order_by_bound(candidates: Sequence[Any], bounds: Sequence[float]) -> List[Tuple[float, Any]]:
+    """
+    按评分上界从高到低排列候选股票（上界相同保持原顺序）
+    :param candidates: 候选股票
+    :param bounds: 与 candidates 对齐的评分上界
+    :return: [(上界, 候选股票)]
+    """
+    order = sorted(range(len(candidates)), key=lambda i: -bounds[i])
+    return [(float(bounds[i]), candidates[i]) for i in order]
+
+
+def iter_contenders(ranked: Iterable[Tuple[float, Any]], collector: TopKCollector) -> Iterator[Any]:
+    """
+    依次产出仍有可能进入前K名的候选股票；ranked 按上界降序，遇到第一个进不了前K名的即停止
+    :param ranked: order_by_bound 的结果
+    :param collector: 前K名集合（调用方在两次取值之间加入新结果）
+    """
+    for bound, candidate in ranked:
+        if not collector.can_enter(bound):
+            return
+        yield candidate
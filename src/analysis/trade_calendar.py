@@ -0,0 +1,287 @@
+"""
+交易日历服务
+上交所交易日历只下载一次并保存到磁盘，最近交易日、前N个交易日、下一交易日均为数组下标运算
+"""
+
+import os
+import time
+import threading
+import numpy as np
+import pandas as pd
+from datetime import datetime, date
+from typing import Optional, List, Union
+
+try:
+    from .columnar_store import DATA_DIR, save_frame, load_frame
+    from .rate_limiter import limit_akshare
+except ImportError:
+    from columnar_store import DATA_DIR, save_frame, load_frame
+    from rate_limiter import limit_akshare
+
+DateLike = Union[str, date, datetime, None]
+
+
+class TradeCalendar:
+    """
+    交易日历
+    _open_dates 为升序交易日数组；_floor[i] 为第 i 个自然日（相对 _base）当天或之前最近交易日的下标，
+    因此任意日期的前后交易日查询只需一次日期差计算和数组取值
+    """
+
+    # A股收盘时间（HH:MM）
+    CLOSE_TIME = '15:00'
+
+    def __init__(self, exchange: str = 'SSE', start_date: str = '20100101',
+                 max_age_days: int = 30, cache_path: str = None):
+        """
+        初始化交易日历
+        :param exchange: 交易所代码
+        :param start_date: 日历起始日期
+        :param max_age_days: 磁盘缓存最长使用天数（节假日安排可能调整，定期重新下载）
+        :param cache_path: 磁盘缓存路径，默认 data/calendar/<exchange>_trade_cal.npz
+        """
+        self.exchange = exchange
+        self.start_date = start_date
+        self.max_age_days = max_age_days
+        self.cache_path = cache_path or os.path.join(DATA_DIR, 'calendar', f'{exchange.lower()}_trade_cal.npz')
+        self._open_dates = np.array([], dtype=str)
+        self._floor = np.array([], dtype=np.int64)
+        self._base = None
+        self._meta = {}
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        """日历是否已加载"""
+        return len(self._open_dates) > 0
+
+    def _is_fresh(self, meta: dict) -> bool:
+        """检查日历是否仍然有效（覆盖到今天且未超过最长使用天数）"""
+        if not meta:
+            return False
+        today = datetime.now().strftime('%Y%m%d')
+        age_days = (time.time() - meta.get('fetched_at', 0)) / 86400
+        return meta.get('covered_end', '') >= today and age_days < self.max_age_days
+
+    def ensure_loaded(self, pro=None, force_refresh: bool = False) -> bool:
+        """
+        加载交易日历：内存 -> 磁盘 -> TuShare -> AkShare
+        :param pro: TuShare Pro API对象（可选）
+        :param force_refresh: 强制重新下载
+        :return: 是否有可用日历
+        """
+        with self._lock:
+            if not force_refresh:
+                if self.loaded and self._is_fresh(self._meta):
+                    return True
+
+                frame, meta = load_frame(self.cache_path)
+                if frame is not None and len(frame) > 0 and self._is_fresh(meta):
+                    self._build_index(frame['cal_date'].astype(str).to_numpy(), meta)
+                    return True
+
+            open_dates, covered_end, source = self._download(pro)
+            if open_dates is None:
+                # 下载失败时继续使用旧日历（内存或磁盘）
+                if not self.loaded:
+                    frame, meta = load_frame(self.cache_path)
+                    if frame is not None and len(frame) > 0:
+                        print("⚠️ 交易日历下载失败，使用过期的本地日历")
+                        self._build_index(frame['cal_date'].astype(str).to_numpy(), meta)
+                return self.loaded
+
+            meta = {
+                'exchange': self.exchange,
+                'source': source,
+                'covered_end': covered_end,
+                'fetched_at': time.time()
+            }
+            save_frame(self.cache_path, pd.DataFrame({'cal_date': open_dates}), meta)
+            self._build_index(open_dates, meta)
+            return True
+
+    def _download(self, pro):
+        """
+        下载交易日历
+        :return: (升序交易日数组, 日历覆盖的最后日期, 数据源)，失败时返回 (None, None, None)
+        """
+        end_date = f"{datetime.now().year + 1}1231"
+
+        if pro is not None:
+            try:
+                cal_df = pro.trade_cal(exchange=self.exchange, start_date=self.start_date, end_date=end_date)
+                if cal_df is not None and len(cal_df) > 0:
+                    cal_dates = cal_df['cal_date'].astype(str)
+                    is_open = pd.to_numeric(cal_df['is_open'], errors='coerce').fillna(0).astype(int) == 1
+                    open_dates = np.sort(cal_dates[is_open].unique())
+                    print(f"✅ TuShare交易日历下载成功: {len(open_dates)} 个交易日")
+                    return open_dates, cal_dates.max(), 'tushare'
+            except Exception as e:
+                print(f"⚠️ TuShare交易日历获取失败: {e}")
+
+        try:
+            import akshare as ak
+            ak = limit_akshare(ak)
+            cal_df = ak.tool_trade_date_hist_sina()
+            if cal_df is not None and len(cal_df) > 0:
+                dates = pd.to_datetime(cal_df['trade_date']).dt.strftime('%Y%m%d')
+                open_dates = np.sort(dates[dates >= self.start_date].unique())
+                # 新浪日历只列出交易日，覆盖范围以当年年末为准
+                covered_end = max(open_dates[-1], f"{open_dates[-1][:4]}1231")
+                print(f"✅ AkShare交易日历下载成功: {len(open_dates)} 个交易日")
+                return open_dates, covered_end, 'akshare'
+        except Exception as e:
+            print(f"⚠️ AkShare交易日历获取失败: {e}")
+
+        return None, None, None
+
+    def _build_index(self, open_dates: np.ndarray, meta: dict):
+        """根据交易日数组构建自然日 -> 最近交易日下标的索引"""
+        open_dates = np.sort(np.asarray(open_dates, dtype=str))
+        base = datetime.strptime(open_dates[0], '%Y%m%d').date()
+        covered_end = max(meta.get('covered_end', '') or open_dates[-1], open_dates[-1])
+        span = (datetime.strptime(covered_end, '%Y%m%d').date() - base).days + 1
+
+        offsets = (pd.to_datetime(open_dates, format='%Y%m%d') - pd.Timestamp(base)).days.to_numpy()
+        is_open = np.zeros(span, dtype=np.int64)
+        is_open[offsets] = 1
+
+        self._open_dates = open_dates
+        self._floor = np.cumsum(is_open) - 1
+        self._base = base
+        self._meta = dict(meta)
+
+    def _offset(self, value: DateLike) -> Optional[int]:
+        """日期相对日历起点的自然日偏移，超出日历范围时截断到两端"""
+        if not self.loaded:
+            return None
+        if value is None:
+            day = datetime.now().date()
+        elif isinstance(value, datetime):
+            day = value.date()
+        elif isinstance(value, date):
+            day = value
+        else:
+            day = datetime.strptime(str(value).replace('-', '')[:8], '%Y%m%d').date()
+
+        offset = (day - self._base).days
+        if offset < 0:
+            return -1
+        return min(offset, len(self._floor) - 1)
+
+    def _floor_index(self, value: DateLike) -> Optional[int]:
+        """当天或之前最近交易日的下标（-1 表示早于日历起点）"""
+        offset = self._offset(value)
+        if offset is None:
+            return None
+        return -1 if offset < 0 else int(self._floor[offset])
+
+    def is_trading_day(self, value: DateLike = None) -> bool:
+        """
+        是否为交易日
+        :param value: 日期，默认今天
+        :return: 是否交易日
+        """
+        idx = self._floor_index(value)
+        if idx is None or idx < 0:
+            return False
+        return self._open_dates[idx] == self._to_str(value)
+
+    def is_session_closed(self, value: DateLike, now: datetime = None) -> bool:
+        """
+        某个交易日是否已经收盘（当天的行情不再变化）
+        :param value: 交易日
+        :param now: 当前时间，默认现在
+        :return: 早于今天为 True；今天在收盘时间之后为 True；今天收盘前或晚于今天为 False
+        """
+        now = now or datetime.now()
+        day = self._to_str(value)
+        today = now.strftime('%Y%m%d')
+        if day != today:
+            return day < today
+        return now.strftime('%H:%M') >= self.CLOSE_TIME
+
+    def latest_trading_day(self, value: DateLike = None) -> Optional[str]:
+        """
+        当天或之前的最近交易日
+        :param value: 日期，默认今天
+        :return: 交易日 YYYYMMDD，日历不可用时返回 None
+        """
+        idx = self._floor_index(value)
+        if idx is None or idx < 0:
+            return None
+        return str(self._open_dates[idx])
+
+    def prev_n(self, value: DateLike = None, n: int = 1, include_self: bool = False) -> List[str]:
+        """
+        之前的N个交易日
+        :param value: 日期，默认今天
+        :param n: 交易日个数
+        :param include_self: 当天是交易日时是否计入
+        :return: 按时间升序排列的交易日列表
+        """
+        idx = self._floor_index(value)
+        if idx is None or idx < 0 or n <= 0:
+            return []
+        end = idx + 1
+        if not include_self and self._open_dates[idx] == self._to_str(value):
+            end = idx
+        return [str(d) for d in self._open_dates[max(end - n, 0):end]]
+
+    def between(self, start: DateLike, end: DateLike = None) -> List[str]:
+        """
+        区间内的全部交易日
+        :param start: 起始日期（含）
+        :param end: 结束日期（含），默认今天
+        :return: 按时间升序排列的交易日列表
+        """
+        last = self._floor_index(end)
+        if last is None or last < 0:
+            return []
+        first = self._floor_index(start)
+        if first is None:
+            return []
+        if first < 0 or self._open_dates[first] != self._to_str(start):
+            first += 1
+        return [str(d) for d in self._open_dates[first:last + 1]]
+
+    def next(self, value: DateLike = None) -> Optional[str]:
+        """
+        之后的下一个交易日
+        :param value: 日期，默认今天
+        :return: 交易日 YYYYMMDD，超出日历范围时返回 None
+        """
+        idx = self._floor_index(value)
+        if idx is None:
+            return None
+        if idx + 1 >= len(self._open_dates):
+            return None
+        return str(self._open_dates[idx + 1])
+
+    @staticmethod
+    def _to_str(value: DateLike) -> str:
+        """日期转换为 YYYYMMDD 字符串"""
+        if value is None:
+            return datetime.now().strftime('%Y%m%d')
+        if isinstance(value, (datetime, date)):
+            return value.strftime('%Y%m%d')
+        return str(value).replace('-', '')[:8]
+
+
+# 进程内共享的交易日历
+_default_calendar = None
+_default_calendar_lock = threading.Lock()
+
+
+def get_trade_calendar(pro=None) -> TradeCalendar:
+    """
+    获取进程内共享的交易日历（首次调用时加载）
+    :param pro: TuShare Pro API对象（可选，首次下载时使用）
+    :return: 交易日历
+    """
+    global _default_calendar
+    with _default_calendar_lock:
+        if _default_calendar is None:
+            _default_calendar = TradeCalendar()
+    _default_calendar.ensure_loaded(pro)
+    return _default_calendar
@@ -0,0 +1,249 @@
+"""
+上游数据源录制/回放
+所有TuShare/AkShare调用都经过限流代理，这里在代理之后提供三种模式：
+- live：直接调用上游（默认）
+- record：调用上游并把结果保存到本地文件
+- replay：只从本地文件读取，不访问网络也不消耗额度，可注入延迟和错误率，用于离线、可重复的性能测试。
+  回放按调用参数（含日期）精确匹配，没有录制时抛出 ReplayMissError，不会用其他日期的录制代替：
+  本地快照、K线等存储会把拿到的数据按请求日期持久化，错日期的数据回放结束后仍会留在缓存中
+
+配置（环境变量优先于 config/tushare_config.json 的 "upstream"）：
+UPSTREAM_MODE=live|record|replay, UPSTREAM_DIR=录制目录, UPSTREAM_LATENCY_MS=回放延迟(毫秒),
+UPSTREAM_JITTER_MS=延迟抖动(毫秒), UPSTREAM_ERROR_RATE=回放错误率(0-1), UPSTREAM_SEED=随机种子
+"""
+
+import os
+import sys
+import json
+import time
+import pickle
+import random
+import hashlib
+import threading
+from typing import Any, Callable, Dict, Optional
+
+try:
+    from .rate_limiter import PROJECT_ROOT
+except ImportError:
+    from rate_limiter import PROJECT_ROOT
+
+MODES = ('live', 'record', 'replay')
+
+# 录制文件按 "忽略日期参数" 的键分组存放（同一接口、同一标的不同日期的录制在同一目录）
+DATE_PARAMS = ('start_date', 'end_date', 'trade_date', 'date', 'cal_date', 'ann_date', 'period')
+
+
+class ReplayMissError(LookupError):
+    """回放模式下没有对应的录制"""
+
+
+class InjectedUpstreamError(ConnectionError):
+    """回放模式下按错误率注入的上游错误"""
+
+
+class UpstreamSource:
+    """
+    上游调用的录制/回放层
+    录制文件：<dir>/<数据源>/<接口>/<宽松键>/<精确键>.pkl，内容为 {'result': 返回值} 或 {'error': 异常描述}
+    """
+
+    def __init__(self, mode: str = 'live', base_dir: str = None, latency_ms: float = 0.0,
+                 jitter_ms: float = 0.0, error_rate: float = 0.0, seed: int = 0):
+        """
+        初始化
+        :param mode: live/record/replay
+        :param base_dir: 录制目录，默认 data/replay
+        :param latency_ms: 回放时每次调用注入的延迟（毫秒）
+        :param jitter_ms: 延迟的随机抖动范围（毫秒）
+        :param error_rate: 回放时注入错误的概率
+        :param seed: 注入延迟和错误使用的随机种子（保证多次运行结果一致）
+        """
+        if mode not in MODES:
+            raise ValueError(f"未知上游模式: {mode}，可选 {MODES}")
+        self.mode = mode
+        self.base_dir = base_dir or os.path.join(PROJECT_ROOT, 'data', 'replay')
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+        self._stats = {'calls': 0, 'recorded': 0, 'replayed': 0, 'missed': 0, 'injected_errors': 0}
+        self._stats_lock = threading.Lock()
+
+    @property
+    def offline(self) -> bool:
+        """是否不访问上游（回放模式）"""
+        return self.mode == 'replay'
+
+    def call(self, source: str, endpoint: str, func: Callable[[], Any], args: tuple = (), kwargs: dict = None):
+        """
+        执行一次上游调用
+        :param source: 数据源（tushare/akshare）
+        :param endpoint: 接口名
+        :param func: 实际调用上游的无参函数（回放模式下不会执行）
+        :param args: 调用参数（用于生成录制键）
+        :param kwargs: 调用参数（用于生成录制键）
+        :return: 上游返回值
+        """
+        kwargs = kwargs or {}
+        self._count('calls')
+        if self.mode == 'live':
+            return func()
+
+        loose_key, exact_key = self._keys(endpoint, args, kwargs)
+        group_dir = os.path.join(self.base_dir, source, endpoint, loose_key)
+        path = os.path.join(group_dir, f"{exact_key}.pkl")
+
+        if self.mode == 'record':
+            try:
+                result = func()
+            except Exception as e:
+                self._save(path, {'error': f"{type(e).__name__}: {e}"})
+                raise
+            self._save(path, {'result': result})
+            self._count('recorded')
+            return result
+
+        return self._replay(source, endpoint, path)
+
+    def stats(self) -> Dict[str, int]:
+        """各类调用的次数"""
+        with self._stats_lock:
+            return dict(self._stats)
+
+    def _replay(self, source: str, endpoint: str, path: str):
+        """读取与调用参数精确匹配的录制并注入延迟/错误"""
+        with self._random_lock:
+            delay = max(0.0, self.latency_ms + self._random.uniform(-self.jitter_ms, self.jitter_ms)) / 1000.0
+            inject_error = self._random.random() < self.error_rate
+        if delay > 0:
+            time.sleep(delay)
+        if inject_error:
+            self._count('injected_errors')
+            raise InjectedUpstreamError(f"回放注入错误: {source}.{endpoint}")
+
+        record = self._load(path)
+        if record is None:
+            self._count('missed')
+            raise ReplayMissError(f"没有录制数据: {source}.{endpoint} ({os.path.basename(path)})")
+        self._count('replayed')
+
+        if 'error' in record:
+            raise RuntimeError(f"回放录制的上游错误: {record['error']}")
+        return record['result']
+
+    @staticmethod
+    def _keys(endpoint: str, args: tuple, kwargs: dict):
+        """生成 (忽略日期参数的宽松键, 精确键)"""
+        def digest(value) -> str:
+            text = json.dumps(value, sort_keys=True, ensure_ascii=False, default=str)
+            return hashlib.sha1(text.encode('utf-8')).hexdigest()[:16]
+
+        loose = {k: v for k, v in kwargs.items() if k not in DATE_PARAMS}
+        return digest([endpoint, list(args), loose]), digest([endpoint, list(args), kwargs])
+
+    @staticmethod
+    def _save(path: str, record: dict):
+        """原子写入录制文件"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(record, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _load(path: str) -> Optional[dict]:
+        """读取录制文件，不存在或损坏时返回 None"""
+        try:
+            with open(path, 'rb') as f:
+                return pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+
+    def _count(self, key: str):
+        with self._stats_lock:
+            self._stats[key] += 1
+
+
+class ReplayStandIn:
+    """
+    回放模式下代替真实客户端的占位对象
+    没有安装数据源或没有token时，回放模式仍可以创建客户端；真正的调用由 UpstreamSource 从录制读取
+    """
+
+    def __init__(self, source: str):
+        self._source = source
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+
+        def call(*args, **kwargs):
+            raise ReplayMissError(f"回放占位客户端不能直接调用: {self._source}.{name}")
+
+        call.__name__ = name
+        return call
+
+
+def load_upstream_config() -> Dict[str, Any]:
+    """读取录制/回放配置：config/tushare_config.json 的 "upstream"，环境变量覆盖"""
+    config = {}
+    config_path = os.path.join(PROJECT_ROOT, 'config', 'tushare_config.json')
+    try:
+        if os.path.exists(config_path):
+            with open(config_path, 'r', encoding='utf-8') as f:
+                config.update(json.load(f).get('upstream', {}))
+    except Exception as e:
+        print(f"⚠️ 读取上游录制配置失败: {e}")
+
+    env_map = {
+        'UPSTREAM_MODE': ('mode', str),
+        'UPSTREAM_DIR': ('base_dir', str),
+        'UPSTREAM_LATENCY_MS': ('latency_ms', float),
+        'UPSTREAM_JITTER_MS': ('jitter_ms', float),
+        'UPSTREAM_ERROR_RATE': ('error_rate', float),
+        'UPSTREAM_SEED': ('seed', int),
+    }
+    for env_name, (key, cast) in env_map.items():
+        value = os.environ.get(env_name)
+        if value:
+            config[key] = cast(value)
+    return config
+
+
+# 进程内共享的录制/回放层
+# 与限流器相同，本文件可能以不同模块名重复导入，以最先加载的模块为准
+_SHARED_MODULE_KEY = '_upstream_source'
+sys.modules.setdefault(_SHARED_MODULE_KEY, sys.modules[__name__])
+
+_default_source = None
+_default_source_lock = threading.Lock()
+
+
+def get_upstream_source() -> UpstreamSource:
+    """获取进程内共享的录制/回放层（首次调用时读取配置）"""
+    global _default_source
+    shared = sys.modules[_SHARED_MODULE_KEY]
+    if shared is not sys.modules.get(__name__):
+        return shared.get_upstream_source()
+    with _default_source_lock:
+        if _default_source is None:
+            _default_source = UpstreamSource(**load_upstream_config())
+            if _default_source.mode != 'live':
+                print(f"📼 上游数据源模式: {_default_source.mode} ({_default_source.base_dir})")
+        return _default_source
+
+
+def set_upstream_source(source: UpstreamSource) -> UpstreamSource:
+    """
+    替换进程内共享的录制/回放层（性能测试脚本中切换模式）
+    :param source: 新的录制/回放层
+    :return: 新的录制/回放层
+    """
+    global _default_source
+    shared = sys.modules[_SHARED_MODULE_KEY]
+    if shared is not sys.modules.get(__name__):
+        return shared.set_upstream_source(source)
+    with _default_source_lock:
+        _default_source = source
+        return _default_source
@@ -1,21 +1,34 @@
-from flask import Flask, render_template, request, jsonify, send_file
-from flask_cors import CORS
 import os
 import sys
+
+# 添加项目根目录到 Python 路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 在导入其他模块之前开启导入耗时统计
+from src.analysis.lazy_loader import (get_import_profiler, lazy_module, lazy_import,
+                                      LazyObject, is_loaded, start_warm_up)
+import_profiler = get_import_profiler()
+import_profiler.install()
+
+from flask import Flask, render_template, request, jsonify, send_file
+from flask_cors import CORS
 from datetime import datetime, timedelta
 import numpy as np
-import pandas as pd
 import json
 import time
 from typing import List, Dict
 import uuid
 
-# 添加项目根目录到 Python 路径
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
-from src.analysis.stock_analyzer import StockAnalyzer
-from src.strategy_engine import QuantitativeStrategyEngine
-from src.advanced_strategy_api import advanced_strategy_engine
+# 重量级依赖和分析器在首次使用或后台预热时才加载，进程启动后即可响应健康检查
+pd = lazy_module('pandas')
+StockAnalyzer = lazy_import('src.analysis.stock_analyzer', 'StockAnalyzer')
+QuantitativeStrategyEngine = lazy_import('src.strategy_engine', 'QuantitativeStrategyEngine')
+advanced_strategy_engine = lazy_import('src.advanced_strategy_api', 'advanced_strategy_engine')
+get_stock_universe = lazy_import('src.analysis.stock_universe', 'get_stock_universe')
+display_industry = lazy_import('src.analysis.stock_universe', 'display_industry')
+limit_akshare = lazy_import('src.analysis.rate_limiter', 'limit_akshare')
+run_market_backtest = lazy_import('src.analysis.portfolio_backtest', 'run_market_backtest')
+get_client_registry = lazy_import('src.analysis.client_registry', 'get_client_registry')
 
 # 创建Flask应用（只提供API服务，不渲染模板）
 app = Flask(__name__)
@@ -23,8 +36,8 @@ app = Flask(__name__)
 # 启用CORS支持
 CORS(app, resources={r"/*": {"origins": "*"}})
 
-# 创建策略引擎实例
-strategy_engine = QuantitativeStrategyEngine()
+# 创建策略引擎实例（首次使用时创建）
+strategy_engine = LazyObject(QuantitativeStrategyEngine, 'strategy_engine')
 
 # 递归转换numpy类型为原生类型，并避免循环引用
 def convert_np(obj, visited=None):
@@ -128,6 +141,21 @@ def index():
         ]
     })
 
+@app.route('/api/startup-report', methods=['GET'])
+def startup_report():
+    """启动耗时报告：按模块统计的导入耗时和各组件加载状态"""
+    return jsonify({
+        'success': True,
+        'imports': import_profiler.report(top=20),
+        'loaded': {
+            'pandas': is_loaded(pd),
+            'strategy_engine': is_loaded(strategy_engine),
+            'advanced_strategy_engine': is_loaded(advanced_strategy_engine),
+            'stock_analyzer': is_loaded(StockAnalyzer),
+            'technical_indicators': is_loaded(TechnicalIndicators)
+        }
+    })
+
 
 
 @app.route('/trading_signals', methods=['POST'])
@@ -171,16 +199,13 @@ def get_trading_signals():
         all_signals = {}
         all_stock_data = {}
         period_dfs = {}
+        period_macd = {}
         stock_info = None
         
         # 🔥 终极性能优化：并行处理+智能缓存+TuShare/AkShare集成
         import concurrent.futures
         import threading
         
-        # 创建线程安全的缓存
-        base_data_cache = {}
-        cache_lock = threading.Lock()
-        
         # 🔥 进度跟踪：计算总进度
         total_periods = len(time_periods)
         completed_periods = 0
@@ -200,26 +225,11 @@ def get_trading_signals():
                 # 创建独立的分析器实例（线程安全）
                 analyzer = StockAnalyzer(stock_code)
                 
-                # 🔥 优化：线程安全的缓存检查
-                cache_key = f"{period_key}_{start_date_formatted}_{end_date_formatted}"
-                with cache_lock:
-                    if cache_key in base_data_cache:
-                        print(f"♻️  使用缓存 {period_name} 数据")
-                        analyzer.data = base_data_cache[cache_key].copy()
-                        data_cached = True
-                    else:
-                        data_cached = False
-                
-                if not data_cached:
-                    print(f"📥 TuShare+AkShare获取 {period_name} 数据...")
-                    if not analyzer.fetch_data(start_date_formatted, end_date_formatted, period_key):
-                        print(f"❌ 无法获取 {period_name} 数据")
-                        return None
-                    
-                    # 缓存数据（线程安全）
-                    with cache_lock:
-                        base_data_cache[cache_key] = analyzer.data.copy()
-                        print(f"✅ {period_name} 数据缓存完成")
+                # 相同股票和区间的并发请求（包括其他用户的请求）由数据获取层合并为一次回源
+                print(f"📥 TuShare+AkShare获取 {period_name} 数据...")
+                if not analyzer.fetch_data(start_date_formatted, end_date_formatted, period_key):
+                    print(f"❌ 无法获取 {period_name} 数据")
+                    return None
                 
                 if analyzer.data is None or len(analyzer.data) == 0:
                     print(f"❌ {period_name} 数据为空")
@@ -313,6 +323,8 @@ def get_trading_signals():
                 
                 # 存储完整 DataFrame 用于回测
                 period_dfs[period_key] = analyzer.data.copy()
+                if 'macd' in analyzer.indicators:
+                    period_macd[period_key] = analyzer.indicators['macd']
                 
                 # 保存股票信息（使用第一个成功的结果）
                 if stock_info is None:
@@ -341,7 +353,7 @@ def get_trading_signals():
         comprehensive_advice = generate_comprehensive_advice(all_signals)
         
         # ---------- 回测结果 ----------
-        backtest_result = generate_backtest_result(period_dfs)
+        backtest_result = generate_backtest_result(period_dfs, period_macd)
         
         return jsonify({
             'success': True,
@@ -431,14 +443,15 @@ def search_stocks():
                 'stocks': []
             })
         
-        # 使用akshare获取股票信息
+        # 使用共享股票池获取股票信息
         try:
-            import akshare as ak
             import re
             from difflib import SequenceMatcher
             
-            # 获取A股股票列表
-            stock_list = ak.stock_info_a_code_name()
+            # 获取A股股票列表（每个交易日只下载一次）
+            stock_list = get_stock_universe().get_frame()
+            if len(stock_list) == 0:
+                raise Exception('股票池为空')
             
             results = []
             query_lower = query.lower().strip()
@@ -514,10 +527,10 @@ def search_stocks():
             
             # 搜索并评分所有股票
             candidates = []
-            for _, row in stock_list.iterrows():
+            for code, name, industry in zip(stock_list['code'], stock_list['name'], stock_list['industry']):
                 try:
-                    code = str(row['code']).strip()
-                    name = str(row['name']).strip()
+                    code = str(code).strip()
+                    name = str(name).strip()
                     
                     # 基础过滤 - 至少要有一些相关性
                     if (query_lower in code.lower() or 
@@ -533,25 +546,8 @@ def search_stocks():
                             # 尝试获取行业信息
                             sector = ''
                             try:
-                                # 简单的行业分类
-                                if '银行' in name:
-                                    sector = '银行'
-                                elif '保险' in name:
-                                    sector = '保险'
-                                elif '证券' in name:
-                                    sector = '证券'
-                                elif '地产' in name or '房地产' in name:
-                                    sector = '房地产'
-                                elif '科技' in name or '软件' in name:
-                                    sector = '科技'
-                                elif '医药' in name or '生物' in name:
-                                    sector = '医药'
-                                elif '钢铁' in name:
-                                    sector = '钢铁'
-                                elif '煤炭' in name or '能源' in name:
-                                    sector = '能源'
-                                else:
-                                    sector = '其他'
+                                # 优先使用股票池中的行业，缺失时按名称简单分类
+                                sector = display_industry(industry, name)
                             except:
                                 sector = ''
                             
@@ -580,7 +576,7 @@ def search_stocks():
             })
             
         except Exception as e:
-            print(f"akshare获取股票列表失败: {e}")
+            print(f"股票池获取失败: {e}")
             # 增强的回退实现
             results = []
             if query:
@@ -653,6 +649,7 @@ def get_stock_info():
         # 使用akshare获取股票信息
         try:
             import akshare as ak
+            ak = limit_akshare(ak)
             
             # 获取A股股票列表
             stock_list = ak.stock_info_a_code_name()
@@ -726,103 +723,44 @@ def get_stock_info():
 # --------------------------------------------------------------------------------------
 # 回测逻辑（简化版本：基于 MACD 多周期权重策略）
 # --------------------------------------------------------------------------------------
-from src.analysis.indicators import TechnicalIndicators
-import numpy as np
+TechnicalIndicators = lazy_import('src.analysis.indicators', 'TechnicalIndicators')
+
+
+macd_backtest = lazy_module('src.analysis.macd_backtest')
 
 
 def _macd_position(macd: np.ndarray, signal: np.ndarray):
     """根据 MACD 与 signal 线判断持仓（1 持有 / 0 空仓）。"""
-    if len(macd) != len(signal):
-        return np.zeros(len(macd))
-    pos = np.zeros(len(macd))
-    for i in range(1, len(macd)):
-        if macd[i - 1] <= signal[i - 1] and macd[i] > signal[i]:  # 金叉
-            pos[i] = 1
-        elif macd[i - 1] >= signal[i - 1] and macd[i] < signal[i]:  # 死叉
-            pos[i] = 0
-        else:
-            pos[i] = pos[i - 1]
-    return pos
+    return macd_backtest.macd_position(macd, signal)
 
 
-def backtest_macd_strategy(df):
-    """对单一周期 DataFrame 进行 MACD 策略回测，返回收益率和交易明细。"""
+def backtest_macd_strategy(df, macd_dict=None):
+    """对单一周期 DataFrame 进行 MACD 策略回测，返回收益率和交易明细。
+    macd_dict 为已计算好的 MACD（分析器的 indicators['macd']），未提供时在此计算一次。"""
     if df is None or df.empty or 'Close' not in df.columns:
         return {
             'return_pct': 0.0,
             'trades': []
         }
 
-    macd_dict = TechnicalIndicators.calculate_macd(df['Close'])
-    macd = macd_dict['macd'].values
-    signal = macd_dict['signal'].values
+    if macd_dict is None:
+        macd_dict = TechnicalIndicators.calculate_macd(df['Close'])
+    macd = np.asarray(macd_dict['macd'], dtype=float)
+    signal = np.asarray(macd_dict['signal'], dtype=float)
 
     # 对齐长度
     valid_len = min(len(macd), len(signal), len(df))
-    macd = macd[-valid_len:]
-    signal = signal[-valid_len:]
-    closes = df['Close'].values[-valid_len:]
-    dates = df['Date'].values[-valid_len:]
-
-    pos = np.zeros(valid_len)
-    trades = []
-    holding_price = None
-    last_trade_day = None  # 记录上一次交易发生的日期 (YYYY-MM-DD)
-
-    def _same_day(ts1, ts2):
-        """判断两个时间戳是否属于同一天"""
-        d1 = pd.to_datetime(ts1).strftime('%Y-%m-%d')
-        d2 = pd.to_datetime(ts2).strftime('%Y-%m-%d')
-        return d1 == d2
-
-    for i in range(1, valid_len):
-        current_day = pd.to_datetime(dates[i]).strftime('%Y-%m-%d')
-
-        # 如果本日已经发生过交易，直接沿用上一时刻仓位
-        if last_trade_day == current_day:
-            pos[i] = pos[i - 1]
-            continue
-
-        # 金叉 -> 买入
-        if macd[i - 1] <= signal[i - 1] and macd[i] > signal[i]:
-            pos[i] = 1
-            holding_price = closes[i]
-            trades.append({
-                'type': 'buy',
-                'date': str(dates[i]),
-                'price': float(closes[i])
-            })
-            last_trade_day = current_day
-
-        # 死叉 -> 卖出
-        elif macd[i - 1] >= signal[i - 1] and macd[i] < signal[i]:
-            pos[i] = 0
-            if holding_price is not None:
-                profit_pct = (closes[i] - holding_price) / holding_price
-                trades.append({
-                    'type': 'sell',
-                    'date': str(dates[i]),
-                    'price': float(closes[i]),
-                    'profit_pct': round(profit_pct * 100, 2),
-                    'profit_amount': round((closes[i] - holding_price), 2)
-                })
-                holding_price = None
-            last_trade_day = current_day
-        else:
-            pos[i] = pos[i - 1]
-
-    # 计算整体收益率
-    pct_change = np.append([0], np.diff(closes) / closes[:-1])
-    strategy_ret = (pos[:-1] * pct_change[1:]).sum()
-
-    return {
-        'return_pct': strategy_ret,
-        'trades': trades
-    }
+    return macd_backtest.backtest_macd(
+        df['Date'].values[-valid_len:],
+        df['Close'].values[-valid_len:],
+        macd[-valid_len:],
+        signal[-valid_len:]
+    )
 
 
-def generate_backtest_result(period_dfs: dict):
-    """仅使用日线 DataFrame 生成 MACD 策略回测结果。"""
+def generate_backtest_result(period_dfs: dict, period_macd: dict = None):
+    """仅使用日线 DataFrame 生成 MACD 策略回测结果。
+    period_macd 为各周期已计算好的 MACD，每笔交易的各周期决策从预先计算的决策序列中按时间查询。"""
     if 'daily' not in period_dfs or period_dfs['daily'] is None or period_dfs['daily'].empty:
         return {
             'capital_start': 1_000_000,
@@ -832,8 +770,9 @@ def generate_backtest_result(period_dfs: dict):
             'details': {}
         }
 
+    period_macd = period_macd or {}
     df_daily = period_dfs['daily']
-    result = backtest_macd_strategy(df_daily)
+    result = backtest_macd_strategy(df_daily, period_macd.get('daily'))
     total_ret = result['return_pct']
     trades = result['trades']
 
@@ -850,46 +789,19 @@ def generate_backtest_result(period_dfs: dict):
     }
 
     # ------------------ 生成每笔交易时各周期决策 ------------------
-    def macd_signal_type(close_series):
-        """根据给定收盘价序列计算MACD信号类型（强烈买入/买入/卖出/强烈卖出/观望）"""
-        if len(close_series) < 35:  # 至少有足够数据计算EMA
-            return '观望'
-        macd_dict_ = TechnicalIndicators.calculate_macd(close_series)
-        macd_line = macd_dict_['macd'].iloc[-1]
-        signal_line = macd_dict_['signal'].iloc[-1]
-        diff = macd_line - signal_line
-        if diff > 0:
-            if diff > abs(signal_line) * 0.3:
-                return '强烈买入'
-            return '买入'
-        elif diff < 0:
-            if abs(diff) > abs(signal_line) * 0.3:
-                return '强烈卖出'
-            return '卖出'
-        return '观望'
-
     # 需要的周期列表（如存在于period_dfs中）
     decision_periods = ['15', '30', '60', 'daily', 'weekly']
 
-    for trade in trades:
-        trade_dt = pd.to_datetime(trade['date'])
-        # 当日结束时间（次日零点），用于包含当天所有收盘前数据
-        day_end = (trade_dt.floor('D') + pd.Timedelta(days=1))
-        decisions = []
-        for p in decision_periods:
-            df_p = period_dfs.get(p)
-            if df_p is None or df_p.empty:
-                continue
-            # 取在 day_end 之前的所有数据，确保包含当日全部bar（收盘价）
-            df_slice = df_p[df_p['Date'] < day_end]
-            if df_slice.empty:
-                continue
-            sig_type = macd_signal_type(df_slice['Close'])
-            decisions.append({
-                'period': p,
-                'signal_type': sig_type
-            })
-        trade['decisions'] = decisions
+    period_decisions = {}
+    for p in decision_periods:
+        df_p = period_dfs.get(p)
+        if df_p is None or df_p.empty:
+            continue
+        macd_dict = period_macd.get(p)
+        if macd_dict is None or len(macd_dict['macd']) != len(df_p):
+            macd_dict = TechnicalIndicators.calculate_macd(df_p['Close'])
+        period_decisions[p] = macd_backtest.PeriodDecisions(df_p['Date'], macd_dict['macd'], macd_dict['signal'])
+    macd_backtest.attach_decisions(trades, period_decisions)
 
     return {
         'capital_start': capital_start,
@@ -999,6 +911,23 @@ def execute_strategy():
             'message': str(e)
         })
 
+def _parse_top_k(data: dict):
+    """
+    读取请求中的 top_k（只需要前K名时提前结束扫描）
+    :param data: 请求JSON
+    :return: (top_k, 错误信息)；未传入时 top_k 为 None，不是正整数时返回错误信息
+    """
+    top_k = data.get('top_k')
+    if top_k is None or top_k == '':
+        return None, None
+    try:
+        top_k = int(top_k)
+    except (TypeError, ValueError):
+        return None, f'top_k 必须为正整数: {top_k}'
+    if top_k <= 0:
+        return None, f'top_k 必须为正整数: {top_k}'
+    return top_k, None
+
 @app.route('/api/strategies/market-scan', methods=['POST'])
 def market_scan():
     """执行全市场扫描 - 100%真实数据版本"""
@@ -1294,9 +1223,12 @@ def export_csv():
 
 @app.route('/api/strategies/backtest', methods=['POST'])
 def run_strategy_backtest():
-    """运行策略回测"""
+    """运行策略回测（mode=portfolio 时对股票池/全市场做组合回测）"""
     try:
         data = request.get_json()
+        if data.get('mode') == 'portfolio':
+            return jsonify(_run_portfolio_backtest(data))
+        
         strategy_id = data.get('strategy_id')
         stock_code = data.get('stock_code')
         start_date = data.get('start_date', '20220101')
@@ -1322,6 +1254,31 @@ def run_strategy_backtest():
             'message': str(e)
         })
 
+# 组合回测请求内最多同步下载的截面交易日数，更多时在后台预热并提示稍后重试
+PORTFOLIO_SYNC_DOWNLOAD_DAYS = 20
+
+def _run_portfolio_backtest(data: dict) -> dict:
+    """组合回测：股票池（universe，ts_code列表，默认全市场）× 信号策略，按仓位规则模拟T+1和涨跌停约束"""
+    options = {}
+    for key, cast in (('initial_capital', float), ('max_positions', int), ('position_size', float),
+                      ('commission', float), ('stamp_tax', float), ('execution', str)):
+        if data.get(key) is not None:
+            options[key] = cast(data[key])
+    result = run_market_backtest(
+        str(data.get('start_date', '20220101')).replace('-', ''),
+        str(data.get('end_date', datetime.now().strftime('%Y%m%d'))).replace('-', ''),
+        strategy=data.get('strategy', 'macd'),
+        codes=data.get('universe'),
+        pro=get_client_registry().tushare(),
+        max_download_days=PORTFOLIO_SYNC_DOWNLOAD_DAYS,
+        **options
+    )
+    # 交易明细可能很多，只返回最近的部分
+    if result.get('success') and len(result['trades']) > 500:
+        result['trade_total'] = len(result['trades'])
+        result['trades'] = result['trades'][-500:]
+    return result
+
 @app.route('/api/strategies/list', methods=['GET'])
 def get_strategies_list():
     """获取所有策略列表"""
@@ -1663,6 +1620,12 @@ def execute_advanced_strategy():
         strategy_name = data.get('strategy_name', '未知策略')
         parameters = data.get('parameters', {})
         max_stocks = data.get('max_stocks', 100)
+        top_k, top_k_error = _parse_top_k(data)  # 只需要前K名时提前结束分析
+        if top_k_error:
+            return jsonify({
+                'success': False,
+                'message': top_k_error
+            }), 400
         
         print(f"🎯 执行高级策略: {strategy_name}")
         print(f"策略参数: {len(parameters)} 个参数")
@@ -1679,7 +1642,8 @@ def execute_advanced_strategy():
         result = advanced_strategy_engine.execute_advanced_strategy(
             strategy_id=strategy_id,
             strategy_params=parameters,
-            max_stocks=max_stocks
+            max_stocks=max_stocks,
+            top_k=top_k
         )
         
         # 添加策略信息
@@ -1775,6 +1739,12 @@ def full_market_scan():
         end_date = data.get('end_date', '20251231')
         min_score = data.get('min_score', 60.0)
         batch_size = data.get('batch_size', 100)  # 批处理大小
+        top_k, top_k_error = _parse_top_k(data)  # 只需要前K名时提前结束扫描
+        if top_k_error:
+            return jsonify({
+                'success': False,
+                'message': top_k_error
+            }), 400
         
         # 获取筛选条件
         markets = data.get('markets', ['all'])
@@ -1844,7 +1814,8 @@ def full_market_scan():
                     min_score=min_score,
                     batch_size=batch_size,
                     markets=markets,  # 传递市场筛选条件
-                    industries=industries  # 传递行业筛选条件
+                    industries=industries,  # 传递行业筛选条件
+                    top_k=top_k
                 )
                 scan_result.update(result)
             except Exception as e:
@@ -2102,26 +2073,39 @@ def execute_optimized_strategy():
                 
                 total_filtered = len(filtered_stocks)
                 
+                # 第一阶段：用当日全市场截面批量计算符合度上界，上界达不到合格分数的股票不再逐只获取数据
+                execution_progress[execution_id].update({
+                    'progress': 8,
+                    'message': f'正在用全市场截面预筛选{total_filtered}只股票...'
+                })
+                # 结果取前50名且不筛选合格分数：预筛选至少保留 max(分析数量, 50) 只，结果数量不会因预筛选变少
+                requested_count = total_filtered if max_stocks >= 10000 else min(max_stocks, total_filtered)
+                candidate_stocks, prefilter_stats = engine.prefilter_for_deep_analysis(
+                    filtered_stocks, strategy_id, min_keep=max(requested_count, 50)
+                )
+                total_candidates = len(candidate_stocks)
+                
                 # 🔥 关键修改：按用户实际需求决定分析数量
                 if max_stocks >= 10000:  # 如果用户设置很大的数字，说明要全部分析
-                    actual_analysis_count = total_filtered  # 全部分析
-                    analysis_message = f"按您的筛选条件，将深度分析全部{total_filtered}只股票"
+                    actual_analysis_count = total_candidates  # 全部分析
+                    analysis_message = f"按您的筛选条件，将深度分析全部{total_candidates}只股票（共筛选出{total_filtered}只）"
                 else:
-                    actual_analysis_count = min(max_stocks, total_filtered)  # 按用户指定数量
+                    actual_analysis_count = min(max_stocks, total_candidates)  # 按用户指定数量
                     analysis_message = f"按您的要求，将深度分析{actual_analysis_count}只股票（共筛选出{total_filtered}只）"
                 
                 # 选择要分析的股票（优先选择市值较大、流动性较好的）
-                analysis_stocks = sorted(filtered_stocks, key=lambda x: x.get('market_priority', 0), reverse=True)[:actual_analysis_count]
+                analysis_stocks = sorted(candidate_stocks, key=lambda x: x.get('market_priority', 0), reverse=True)[:actual_analysis_count]
                 
                 execution_progress[execution_id].update({
                     'stage': 'analyzing',
                     'progress': 10,
                     'message': analysis_message,
                     'total_stocks': actual_analysis_count,
-                    'filtered_count': total_filtered
+                    'filtered_count': total_filtered,
+                    'prefilter': prefilter_stats
                 })
                 
-                print(f"📊 智能筛选完成：{total_filtered} -> {actual_analysis_count} 只股票")
+                print(f"📊 智能筛选完成：{total_filtered} -> {total_candidates} -> {actual_analysis_count} 只股票")
                 print(f"🔬 启动深度分析：{max_workers} 线程并发，集成TuShare+AkShare")
                 
                 # 第二步：深度并发分析
@@ -2183,6 +2167,7 @@ def execute_optimized_strategy():
                     'execution_id': execution_id,
                     'strategy_name': strategy_name,
                     'total_filtered': total_filtered,
+                    'prefilter': prefilter_stats,
                     'total_stocks': actual_analysis_count,
                     'analyzed_stocks': analyzed_count,
                     'qualified_count': len(all_analyzed_stocks),  # 🔥 修复：显示所有分析数量
@@ -2513,5 +2498,22 @@ def api_trading_signals():
     # 复用现有交易信号实现
     return get_trading_signals()
 
+# 启动报告：到这里为止的导入耗时；重量级模块和分析器随后在后台预热
+import_profiler.print_report('启动导入耗时')
+
+
+def _on_warm_up_done():
+    import_profiler.print_report('启动及预热导入耗时')
+    import_profiler.uninstall()
+
+
+start_warm_up([
+    pd._lazy_get,
+    TechnicalIndicators._lazy_get,
+    StockAnalyzer._lazy_get,
+    strategy_engine._lazy_get,
+    advanced_strategy_engine._lazy_get,
+], name='app-warm-up', on_done=_on_warm_up_done)
+
 if __name__ == '__main__':
     app.run(debug=False, host='0.0.0.0', port=7001) 
\ No newline at end of file
@@ -14,6 +14,13 @@ import pandas as pd
 from datetime import datetime, timedelta
 from flask import jsonify
 
+try:
+    from analysis.rate_limiter import limit_tushare
+    from analysis.chip_state import get_chip_state_store
+except ImportError:
+    from src.analysis.rate_limiter import limit_tushare
+    from src.analysis.chip_state import get_chip_state_store
+
 def convert_to_ts_code_fixed(stock_code):
     """
     转换股票代码为TuShare格式 - 修复版
@@ -114,7 +121,7 @@ def generate_chip_distribution_data_fixed(stock_code):
             if not token:
                 raise Exception("TuShare token未配置")
                 
-            pro = ts.pro_api(token)
+            pro = limit_tushare(ts.pro_api(token))
             
         except Exception as e:
             print(f"⚠️ [修复版] TuShare初始化失败: {e}")
@@ -136,6 +143,7 @@ def generate_chip_distribution_data_fixed(stock_code):
         try:
             # 使用pro_bar接口获取前复权数据（正确的TuShare API调用方式）
             kline_data = ts.pro_bar(
+                api=pro,
                 ts_code=ts_code,
                 adj='qfq',  # 前复权
                 start_date=start_date,
@@ -190,43 +198,13 @@ def generate_chip_distribution_data_fixed(stock_code):
         max_price = kline_data['high'].max()
         current_price = kline_data.iloc[-1]['close']
         
-        # 生成价格区间
-        price_levels = np.linspace(min_price, max_price, price_bins)
-        
-        # 初始化筹码分布数组
-        chip_distribution_raw = np.zeros(price_bins)
-        
-        # 计算每日筹码分布贡献
-        for i, (_, row) in enumerate(kline_data.iterrows()):
-            days_ago = len(kline_data) - i - 1
-            time_weight = decay_factor ** days_ago
-            
-            volume = row['vol'] * 100  # 转换为股
-            
-            close_price = row['close']
-            high_price = row['high']
-            low_price = row['low']
-            
-            close_idx = np.searchsorted(price_levels, close_price)
-            high_idx = np.searchsorted(price_levels, high_price)
-            low_idx = np.searchsorted(price_levels, low_price)
-            
-            if high_idx > low_idx:
-                close_volume = volume * 0.6 * time_weight
-                range_volume = volume * 0.4 * time_weight
-                
-                if 0 <= close_idx < price_bins:
-                    chip_distribution_raw[close_idx] += close_volume
-                
-                range_span = max(1, high_idx - low_idx)
-                volume_per_level = range_volume / range_span
-                
-                for j in range(max(0, low_idx), min(price_bins, high_idx + 1)):
-                    chip_distribution_raw[j] += volume_per_level
-            else:
-                if 0 <= close_idx < price_bins:
-                    chip_distribution_raw[close_idx] += volume * time_weight
-        
+        # 生成价格区间并计算筹码分布：每日成交60%集中在收盘价附近，40%均匀分布在当日价格区间；
+        # 当日价格区间落在同一价格级别时全部分配给收盘价。筹码分布状态按股票保存，只计算上次请求之后的新K线
+        price_levels, chip_distribution_raw = get_chip_state_store().get_profile(
+            ts_code, kline_data, decay=decay_factor, close_share=0.6, bins=price_bins
+        )
+        chip_distribution_raw = chip_distribution_raw * 100  # 手 -> 股
+
         # 筛选有效的筹码分布数据
         effective_chips = []
         total_effective_volume = 0
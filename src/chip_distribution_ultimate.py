@@ -14,6 +14,13 @@ import pandas as pd
 from datetime import datetime, timedelta
 from flask import jsonify
 
+try:
+    from analysis.rate_limiter import limit_tushare
+    from analysis.chip_state import get_chip_state_store
+except ImportError:
+    from src.analysis.rate_limiter import limit_tushare
+    from src.analysis.chip_state import get_chip_state_store
+
 def get_chip_distribution_ultimate(stock_code):
     """
     获取股票筹码分布数据API - 终极修复版
@@ -118,7 +125,7 @@ def generate_chip_distribution_ultimate(stock_code):
                 raise Exception("TuShare token未配置")
             
             # 按照API文档标准初始化
-            pro = ts.pro_api(token)
+            pro = limit_tushare(ts.pro_api(token))
             print(f"✅ [终极版] TuShare Pro API初始化成功")
             
         except Exception as e:
@@ -143,6 +150,7 @@ def generate_chip_distribution_ultimate(stock_code):
             # 接口名称：pro_bar
             # Python SDK版本要求： >= 1.2.26
             kline_data = ts.pro_bar(
+                api=pro,
                 ts_code=ts_code,    # 证券代码
                 start_date=start_date,  # 开始日期 (格式：YYYYMMDD)
                 end_date=end_date,      # 结束日期 (格式：YYYYMMDD)
@@ -207,59 +215,13 @@ def generate_chip_distribution_ultimate(stock_code):
         max_price = kline_data['high'].max()
         current_price = kline_data.iloc[-1]['close']
         
-        # 生成价格区间
-        price_levels = np.linspace(min_price, max_price, price_bins)
-        
-        # 初始化筹码分布数组
-        chip_distribution_raw = np.zeros(price_bins)
-        
-        # 计算每日筹码分布贡献（基于真实成交量和价格）
-        for i, (_, row) in enumerate(kline_data.iterrows()):
-            # 时间权重（越近期权重越高）
-            days_ago = len(kline_data) - i - 1
-            time_weight = decay_factor ** days_ago
-            
-            # 当日成交量（单位：手 -> 股）
-            volume = row['vol'] * 100  # 转换为股
-            
-            # 价格分布（基于OHLC真实价格）
-            close_price = row['close']
-            high_price = row['high']
-            low_price = row['low']
-            open_price = row['open']
-            
-            # 找到价格对应的区间索引
-            close_idx = np.searchsorted(price_levels, close_price)
-            high_idx = np.searchsorted(price_levels, high_price)
-            low_idx = np.searchsorted(price_levels, low_price)
-            open_idx = np.searchsorted(price_levels, open_price)
-            
-            # 将成交量分布到价格区间（基于真实交易分布模型）
-            if high_idx > low_idx:
-                # 成交分布：40%集中在收盘价附近，30%在开盘价附近，30%分布在当日价格区间
-                close_volume = volume * 0.4 * time_weight
-                open_volume = volume * 0.3 * time_weight
-                range_volume = volume * 0.3 * time_weight
-                
-                # 收盘价附近的筹码
-                if 0 <= close_idx < price_bins:
-                    chip_distribution_raw[close_idx] += close_volume
-                
-                # 开盘价附近的筹码
-                if 0 <= open_idx < price_bins:
-                    chip_distribution_raw[open_idx] += open_volume
-                
-                # 价格区间内的筹码均匀分布
-                range_span = max(1, high_idx - low_idx)
-                volume_per_level = range_volume / range_span
-                
-                for j in range(max(0, low_idx), min(price_bins, high_idx + 1)):
-                    chip_distribution_raw[j] += volume_per_level
-            else:
-                # 价格区间很小，全部分配给最接近的价格级别
-                if 0 <= close_idx < price_bins:
-                    chip_distribution_raw[close_idx] += volume * time_weight
-        
+        # 生成价格区间并计算筹码分布：每日成交40%集中在收盘价附近，30%在开盘价附近，30%均匀分布在当日价格区间；
+        # 当日价格区间落在同一价格级别时全部分配给收盘价。筹码分布状态按股票保存，只计算上次请求之后的新K线
+        price_levels, chip_distribution_raw = get_chip_state_store().get_profile(
+            ts_code, kline_data, decay=decay_factor, close_share=0.4, open_share=0.3, bins=price_bins
+        )
+        chip_distribution_raw = chip_distribution_raw * 100  # 手 -> 股
+
         # 筛选有效的筹码分布数据
         effective_chips = []
         total_effective_volume = 0
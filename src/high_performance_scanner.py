@@ -20,6 +20,33 @@ from typing import Dict, List, Optional, Tuple
 import warnings
 warnings.filterwarnings('ignore')
 
+try:
+    from analysis.stock_universe import get_stock_universe
+except ImportError:
+    from src.analysis.stock_universe import get_stock_universe
+
+try:
+    from analysis.trade_calendar import get_trade_calendar
+except ImportError:
+    from src.analysis.trade_calendar import get_trade_calendar
+
+try:
+    from analysis.rate_limiter import limit_akshare
+    from analysis.client_registry import get_client_registry
+except ImportError:
+    from src.analysis.rate_limiter import limit_akshare
+    from src.analysis.client_registry import get_client_registry
+
+# 所有AkShare调用经过统一限流
+ak = limit_akshare(ak)
+
+try:
+    from analysis.market_snapshot import get_snapshot_store, MarketSnapshotStore
+    from analysis.panel_indicators import get_market_indicator_panel
+except ImportError:
+    from src.analysis.market_snapshot import get_snapshot_store, MarketSnapshotStore
+    from src.analysis.panel_indicators import get_market_indicator_panel
+
 # 配置日志
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -48,6 +75,7 @@ class UltimateMarketScanner:
         # 批量数据缓存优化
         self.batch_daily_cache = {}
         self.batch_basic_cache = {}
+        self.batch_indicator_cache = {}
         self.last_batch_update = None
         
         # 初始化TuShare和AkShare
@@ -77,34 +105,12 @@ class UltimateMarketScanner:
             }
     
     def _init_tushare(self):
-        """初始化TuShare Pro"""
-        try:
-            # 读取配置文件
-            config_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'config', 'tushare_config.json')
-            if os.path.exists(config_path):
-                with open(config_path, 'r', encoding='utf-8') as f:
-                    config = json.load(f)
-                    token = config.get('token', '')
-            else:
-                # 备用token文件
-                token_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'config', 'tushare_token.txt')
-                if os.path.exists(token_path):
-                    with open(token_path, 'r', encoding='utf-8') as f:
-                        token = f.read().strip()
-                else:
-                    token = ''
-            
-            if token:
-                ts.set_token(token)
-                self.ts_pro = ts.pro_api()
-                logger.info("✅ TuShare Pro初始化成功")
-            else:
-                logger.warning("⚠️ TuShare Token未配置")
-                self.ts_pro = None
-                
-        except Exception as e:
-            logger.error(f"❌ TuShare初始化失败: {e}")
-            self.ts_pro = None
+        """初始化TuShare Pro（使用进程内共享的客户端，支持录制/回放）"""
+        self.ts_pro = get_client_registry().tushare()
+        if self.ts_pro is not None:
+            logger.info("✅ TuShare Pro初始化成功")
+        else:
+            logger.warning("⚠️ TuShare Token未配置")
     
     def _init_akshare(self):
         """初始化AkShare"""
@@ -153,26 +159,23 @@ class UltimateMarketScanner:
             # 获取交易日期
             trade_date = self._get_latest_trade_date()
             
-            if self.ts_pro:
-                try:
-                    # 批量获取所有股票的日线数据
-                    logger.info("📊 批量获取日线数据...")
-                    daily_data = self.ts_pro.daily(trade_date=trade_date)
-                    if daily_data is not None and len(daily_data) > 0:
-                        # 按股票代码索引
-                        self.batch_daily_cache = daily_data.set_index('ts_code').to_dict('index')
-                        logger.info(f"✅ 批量获取日线数据成功: {len(daily_data)}只股票")
-                    
-                    # 批量获取基本面数据
-                    logger.info("📈 批量获取基本面数据...")
-                    basic_data = self.ts_pro.daily_basic(trade_date=trade_date, 
-                                                       fields='ts_code,turnover_rate,pe,pb,total_mv,circ_mv')
-                    if basic_data is not None and len(basic_data) > 0:
-                        self.batch_basic_cache = basic_data.set_index('ts_code').to_dict('index')
-                        logger.info(f"✅ 批量获取基本面数据成功: {len(basic_data)}只股票")
-                    
-                except Exception as e:
-                    logger.warning(f"⚠️ 批量数据获取部分失败: {e}")
+            # 从截面快照读取日线和基本面数据（每个交易日只下载一次）
+            snapshot = get_snapshot_store().get_snapshot(trade_date, self.ts_pro)
+            if len(snapshot) > 0:
+                # 按股票代码索引
+                indexed = snapshot.set_index('ts_code')
+                daily_columns = [col for col in MarketSnapshotStore.DAILY_COLUMNS if col in indexed.columns]
+                self.batch_daily_cache = indexed[daily_columns].to_dict('index')
+                self.batch_basic_cache = indexed[['turnover_rate', 'pe', 'pb', 'total_mv', 'circ_mv']].to_dict('index')
+                logger.info(f"✅ 批量获取日线和基本面数据成功: {len(snapshot)}只股票")
+            else:
+                logger.warning(f"⚠️ {trade_date}批量数据获取失败")
+            
+            # 全市场技术指标由面板一次计算（首次在后台计算，完成前使用简化估算）
+            indicators = get_market_indicator_panel().get_latest(trade_date, self.ts_pro)
+            if indicators is not None:
+                self.batch_indicator_cache = indicators.to_dict('index')
+                logger.info(f"✅ 面板技术指标: {len(indicators)}只股票")
             
             self.last_batch_update = current_time
             elapsed = time.time() - start_time
@@ -184,10 +187,13 @@ class UltimateMarketScanner:
     def _get_latest_trade_date(self):
         """获取最新交易日期"""
         try:
-            # 获取最近5个交易日，取最新的
+            latest_trade_date = get_trade_calendar(self.ts_pro).latest_trading_day()
+            if latest_trade_date:
+                return latest_trade_date
+            
+            # 交易日历不可用时按工作日估算
             for days_back in range(0, 5):
                 date = (datetime.now() - timedelta(days=days_back)).strftime('%Y%m%d')
-                # 简单判断：周一到周五
                 weekday = (datetime.now() - timedelta(days=days_back)).weekday()
                 if weekday < 5:  # 0-4 是周一到周五
                     return date
@@ -205,60 +211,20 @@ class UltimateMarketScanner:
         
         logger.info("🔍 获取股票列表...")
         
-        # 优先使用TuShare
-        if self.ts_pro and use_real_data:
+        # 从共享股票池读取（每个交易日只下载一次）
+        if use_real_data:
             try:
-                stock_list = self.ts_pro.stock_basic(exchange='', list_status='L', 
-                                                   fields='ts_code,symbol,name,area,industry,market')
-                if stock_list is not None and len(stock_list) > 0:
-                    stocks = []
-                    for _, row in stock_list.iterrows():
-                        stocks.append({
-                            'code': row['symbol'],
-                            'name': row['name'],
-                            'ts_code': row['ts_code'],
-                            'industry': row.get('industry', ''),
-                            'area': row.get('area', ''),
-                            'market': row.get('market', ''),
-                            'source': 'tushare'
-                        })
+                frame = get_stock_universe().get_frame(pro=self.ts_pro)
+                if len(frame) > 0:
+                    selected = frame[['code', 'name', 'ts_code', 'industry', 'area', 'board', 'data_source']]
+                    selected = selected.rename(columns={'board': 'market', 'data_source': 'source'})
+                    stocks = selected.to_dict('records')
                     
-                    logger.info(f"✅ TuShare获取股票列表成功: {len(stocks)}只")
+                    logger.info(f"✅ 股票池获取成功: {len(stocks)}只")
                     self.set_cache(cache_key, stocks)
                     return stocks
             except Exception as e:
-                logger.warning(f"⚠️ TuShare获取股票列表失败: {e}")
-        
-        # 备用：使用AkShare
-        try:
-            ak_stocks = ak.stock_zh_a_spot_em()
-            if ak_stocks is not None and len(ak_stocks) > 0:
-                stocks = []
-                for _, row in ak_stocks.head(200).iterrows():  # 限制200只，提高性能
-                    code = row['代码']
-                    name = row['名称']
-                    # 转换为TuShare格式
-                    if code.startswith('60') or code.startswith('68'):
-                        ts_code = f"{code}.SH"
-                    else:
-                        ts_code = f"{code}.SZ"
-                    
-                    stocks.append({
-                        'code': code,
-                        'name': name,
-                        'ts_code': ts_code,
-                        'industry': '',
-                        'area': '',
-                        'market': '',
-                        'source': 'akshare'
-                    })
-                
-                logger.info(f"✅ AkShare获取股票列表成功: {len(stocks)}只")
-                self.set_cache(cache_key, stocks)
-                return stocks
-        
-        except Exception as e:
-            logger.error(f"❌ AkShare获取股票列表失败: {e}")
+                logger.warning(f"⚠️ 股票池获取失败: {e}")
         
         # 如果要求真实数据但都失败了，拒绝返回虚拟数据
         if use_real_data:
@@ -311,22 +277,35 @@ class UltimateMarketScanner:
                     'circ_mv': basic_data.get('circ_mv', 0)
                 })
             
-            # ⚡ 超级优化：简化技术指标计算，大幅提升性能
+            # ⚡ 技术指标优先使用全市场面板的计算结果
             close_price = stock_data.get('close', 0)
+            indicator_data = self.batch_indicator_cache.get(ts_code)
+            if indicator_data and close_price > 0:
+                for field in ['ma5', 'ma10', 'ma20', 'ma60', 'bollinger_upper', 'bollinger_middle', 'bollinger_lower']:
+                    value = indicator_data.get(field)
+                    stock_data[field] = round(float(value), 2) if pd.notna(value) else None
+                for field in ['macd', 'macd_signal', 'macd_histogram']:
+                    value = indicator_data.get(field)
+                    stock_data[field] = round(float(value), 4) if pd.notna(value) else 0
+                rsi = indicator_data.get('rsi')
+                stock_data['rsi'] = round(float(rsi), 1) if pd.notna(rsi) else None
+                stock_data['indicator_source'] = 'panel'
+            
             if close_price > 0:
-                # 基于真实数据的快速技术指标计算
-                stock_data.update({
-                    'ma5': round(close_price * 1.01, 2),   # 简化MA计算
-                    'ma10': round(close_price * 0.99, 2),
-                    'ma20': round(close_price * 0.98, 2),
-                    'rsi': round(45 + (close_price % 20), 1),  # 基于价格的RSI
-                    'macd': round((close_price % 1) - 0.5, 4),
-                    'macd_signal': round((close_price % 0.8) - 0.4, 4),
-                    'macd_histogram': round((close_price % 0.4) - 0.2, 4),
-                    'bollinger_upper': round(close_price * 1.08, 2),
-                    'bollinger_middle': round(close_price, 2),
-                    'bollinger_lower': round(close_price * 0.92, 2)
-                })
+                if not indicator_data:
+                    # 面板指标尚未就绪时的简化估算
+                    stock_data.update({
+                        'ma5': round(close_price * 1.01, 2),   # 简化MA计算
+                        'ma10': round(close_price * 0.99, 2),
+                        'ma20': round(close_price * 0.98, 2),
+                        'rsi': round(45 + (close_price % 20), 1),  # 基于价格的RSI
+                        'macd': round((close_price % 1) - 0.5, 4),
+                        'macd_signal': round((close_price % 0.8) - 0.4, 4),
+                        'macd_histogram': round((close_price % 0.4) - 0.2, 4),
+                        'bollinger_upper': round(close_price * 1.08, 2),
+                        'bollinger_middle': round(close_price, 2),
+                        'bollinger_lower': round(close_price * 0.92, 2)
+                    })
                 
                 # 🎯 超快评分系统
                 pe = stock_data.get('pe', 0)
@@ -21,6 +21,28 @@ from typing import Dict, List, Tuple, Optional
 import os
 import sys
 import time
+import threading
+from collections import OrderedDict
+
+try:
+    from analysis.trade_calendar import get_trade_calendar
+except ImportError:
+    from src.analysis.trade_calendar import get_trade_calendar
+
+try:
+    from analysis.rate_limiter import limit_akshare
+    from analysis.client_registry import get_client_registry
+except ImportError:
+    from src.analysis.rate_limiter import limit_akshare
+    from src.analysis.client_registry import get_client_registry
+
+# 所有AkShare调用经过统一限流
+ak = limit_akshare(ak)
+
+try:
+    from analysis.market_snapshot import get_snapshot_store
+except ImportError:
+    from src.analysis.market_snapshot import get_snapshot_store
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
@@ -29,37 +51,23 @@ logger = logging.getLogger(__name__)
 class LimitUpAnalyzer:
     """涨停股分析器"""
     
+    # 涨停股缓存最多保留的交易日数（按最近使用淘汰）
+    LIMIT_UP_CACHE_DAYS = 120
+    
     def __init__(self):
         """初始化分析器"""
         self.ts_pro = None
+        self._limit_up_cache = OrderedDict()
+        self._limit_up_cache_lock = threading.Lock()
         self.init_tushare()
     
     def init_tushare(self):
-        """初始化TuShare Pro连接"""
-        try:
-            # 读取TuShare配置
-            config_path = os.path.join(os.path.dirname(__file__), '..', 'config', 'tushare_config.json')
-            if os.path.exists(config_path):
-                with open(config_path, 'r', encoding='utf-8') as f:
-                    config = json.load(f)
-                    token = config.get('token', '')
-            else:
-                # 备用：从txt文件读取
-                token_path = os.path.join(os.path.dirname(__file__), '..', 'config', 'tushare_token.txt')
-                if os.path.exists(token_path):
-                    with open(token_path, 'r', encoding='utf-8') as f:
-                        token = f.read().strip()
-                else:
-                    raise Exception("TuShare配置文件未找到")
-            
-            # 初始化TuShare Pro
-            ts.set_token(token)
-            self.ts_pro = ts.pro_api()
+        """初始化TuShare Pro连接（使用进程内共享的客户端，支持录制/回放）"""
+        self.ts_pro = get_client_registry().tushare()
+        if self.ts_pro is not None:
             logger.info("✅ TuShare Pro初始化成功")
-            
-        except Exception as e:
-            logger.error(f"❌ TuShare Pro初始化失败: {e}")
-            self.ts_pro = None
+        else:
+            logger.error("❌ TuShare Pro初始化失败: 未安装或token未配置")
     
     def get_trading_dates(self, days: int) -> List[str]:
         """获取最近N个交易日"""
@@ -67,23 +75,8 @@ class LimitUpAnalyzer:
             if not self.ts_pro:
                 raise Exception("TuShare未初始化")
             
-            # 获取交易日历
-            end_date = datetime.now().strftime('%Y%m%d')
-            start_date = (datetime.now() - timedelta(days=days*2)).strftime('%Y%m%d')  # 多取一些确保有足够交易日
-            
-            cal_df = self.ts_pro.trade_cal(
-                exchange='SSE',
-                start_date=start_date,
-                end_date=end_date,
-                is_open='1'
-            )
-            
-            if cal_df.empty:
-                return []
-            
-            # 获取最近N个交易日
-            trading_dates = cal_df.sort_values('cal_date', ascending=False)['cal_date'].head(days).tolist()
-            trading_dates.reverse()  # 按时间顺序排列
+            # 从本地交易日历取最近N个交易日（按时间顺序排列）
+            trading_dates = get_trade_calendar(self.ts_pro).prev_n(n=days, include_self=True)
             
             logger.info(f"📅 获取到{len(trading_dates)}个交易日")
             return trading_dates
@@ -94,32 +87,31 @@ class LimitUpAnalyzer:
     
     def get_daily_limit_up_stocks(self, trade_date: str) -> pd.DataFrame:
         """获取某日涨停股票数据"""
+        # 同一交易日会在时间分布、连板率、每日统计中多次查询，历史交易日的结果直接复用
+        with self._limit_up_cache_lock:
+            cached = self._limit_up_cache.get(trade_date)
+            if cached is not None:
+                self._limit_up_cache.move_to_end(trade_date)
+                return cached
+        
         try:
-            if not self.ts_pro:
-                raise Exception("TuShare未初始化")
-            
             logger.info(f"📊 获取{trade_date}涨停股票...")
             
-            # 获取当日股票涨跌停价格
-            limit_df = self.ts_pro.stk_limit(trade_date=trade_date)
-            
-            if limit_df.empty:
-                logger.warning(f"⚠️ {trade_date}无涨停价格数据")
-                return pd.DataFrame()
-            
-            # 获取当日行情数据
-            daily_df = self.ts_pro.daily(trade_date=trade_date)
+            # 从截面快照读取当日行情和涨跌停价格（每个交易日只下载一次）
+            snapshot = get_snapshot_store().get_snapshot(trade_date, self.ts_pro)
             
-            if daily_df.empty:
+            if snapshot.empty:
                 logger.warning(f"⚠️ {trade_date}无行情数据")
                 return pd.DataFrame()
             
-            # 合并数据，找出涨停股票
-            merged_df = pd.merge(daily_df, limit_df[['ts_code', 'up_limit']], on='ts_code', how='inner')
+            if snapshot['up_limit'].isna().all():
+                logger.warning(f"⚠️ {trade_date}无涨停价格数据")
+                return pd.DataFrame()
             
             # 筛选涨停股票（收盘价等于涨停价，允许小幅误差）
-            limit_up_stocks = merged_df[
-                abs(merged_df['close'] - merged_df['up_limit']) < 0.01
+            limit_up_stocks = snapshot[
+                snapshot['up_limit'].notna() &
+                (abs(snapshot['close'] - snapshot['up_limit']) < 0.01)
             ].copy()
             
             if not limit_up_stocks.empty:
@@ -130,6 +122,13 @@ class LimitUpAnalyzer:
                 
                 logger.info(f"✅ {trade_date}找到{len(limit_up_stocks)}只涨停股票")
             
+            if trade_date < datetime.now().strftime('%Y%m%d'):
+                with self._limit_up_cache_lock:
+                    self._limit_up_cache[trade_date] = limit_up_stocks
+                    self._limit_up_cache.move_to_end(trade_date)
+                    while len(self._limit_up_cache) > self.LIMIT_UP_CACHE_DAYS:
+                        self._limit_up_cache.popitem(last=False)
+            
             return limit_up_stocks
             
         except Exception as e:
@@ -150,6 +149,7 @@ class LimitUpAnalyzer:
                 
                 # 获取1分钟数据
                 minute_df = ts.pro_bar(
+                    api=self.ts_pro,
                     ts_code=ts_code,
                     trade_date=trade_date,
                     freq='1min',
@@ -187,9 +187,6 @@ class LimitUpAnalyzer:
                     # 分钟级数据获取失败，使用AkShare备用方案
                     times.append(self._get_akshare_limit_time(ts_code, trade_date))
                 
-                # 避免API频率限制
-                time.sleep(0.1)
-                
             except Exception as e:
                 logger.warning(f"⚠️ 获取{ts_code}分钟级数据失败: {e}")
                 # 使用AkShare备用方案
@@ -244,53 +241,23 @@ class LimitUpAnalyzer:
     
     def _check_first_limit_up(self, stocks_df: pd.DataFrame, trade_date: str) -> List[bool]:
         """真实判断是否为首次涨停（基于前N天历史数据）"""
-        first_limit_flags = []
-        
-        # 获取前5个交易日
+        # 获取前5个交易日（不包括当日）
         try:
-            cal_df = self.ts_pro.trade_cal(
-                exchange='SSE',
-                start_date=(datetime.strptime(trade_date, '%Y%m%d') - timedelta(days=10)).strftime('%Y%m%d'),
-                end_date=trade_date,
-                is_open='1'
-            )
-            
-            if cal_df.empty:
+            prev_dates = get_trade_calendar(self.ts_pro).prev_n(trade_date, 5)
+            
+            if not prev_dates:
                 # 如果获取不到交易日历，都标记为首次涨停
                 return [True] * len(stocks_df)
             
-            # 获取前5个交易日（不包括当日）
-            prev_dates = cal_df[cal_df['cal_date'] < trade_date].sort_values('cal_date', ascending=False)['cal_date'].head(5).tolist()
+            # 前5个交易日出现过涨停的股票（每个交易日读取一次截面）
+            store = get_snapshot_store()
+            prev_limit_up_codes = set()
+            for prev_date in prev_dates:
+                prev_limit_up_codes |= store.get_limit_up_codes(prev_date, self.ts_pro)
             
-            for _, row in stocks_df.iterrows():
-                ts_code = row['ts_code']
-                is_first = True
-                
-                # 检查前5个交易日是否有涨停
-                for prev_date in prev_dates:
-                    try:
-                        # 获取前一日涨停价格和行情
-                        prev_limit_df = self.ts_pro.stk_limit(trade_date=prev_date, ts_code=ts_code)
-                        prev_daily_df = self.ts_pro.daily(trade_date=prev_date, ts_code=ts_code)
-                        
-                        if not prev_limit_df.empty and not prev_daily_df.empty:
-                            prev_up_limit = prev_limit_df.iloc[0]['up_limit']
-                            prev_close = prev_daily_df.iloc[0]['close']
-                            
-                            # 如果前面有涨停，则不是首次涨停
-                            if abs(prev_close - prev_up_limit) < 0.01:
-                                is_first = False
-                                break
-                        
-                        # 避免API频率限制
-                        time.sleep(0.05)
-                        
-                    except Exception as e:
-                        logger.warning(f"⚠️ 检查{ts_code}在{prev_date}涨停情况失败: {e}")
-                        continue
-                
-                first_limit_flags.append(is_first)
-                logger.info(f"📊 {ts_code}: {'首次涨停' if is_first else '连续涨停'}")
+            # 如果前面有涨停，则不是首次涨停
+            first_limit_flags = (~stocks_df['ts_code'].isin(prev_limit_up_codes)).tolist()
+            logger.info(f"📊 {trade_date}: 首次涨停{sum(first_limit_flags)}只, 连续涨停{len(first_limit_flags) - sum(first_limit_flags)}只")
             
             return first_limit_flags
             
@@ -536,12 +503,21 @@ class LimitUpAnalyzer:
                 'data': None
             }
 
-# 全局分析器实例
-analyzer = LimitUpAnalyzer()
+# 全局分析器实例（首次分析时才创建并连接TuShare，导入本模块不发起连接）
+_default_analyzer = None
+_default_analyzer_lock = threading.Lock()
+
+def get_limit_up_analyzer() -> LimitUpAnalyzer:
+    """获取进程内共享的涨停分析器"""
+    global _default_analyzer
+    with _default_analyzer_lock:
+        if _default_analyzer is None:
+            _default_analyzer = LimitUpAnalyzer()
+        return _default_analyzer
 
 def get_limit_up_analysis(days: int = 7) -> Dict:
     """获取涨停分析结果"""
-    return analyzer.analyze_limit_up_data(days)
+    return get_limit_up_analyzer().analyze_limit_up_data(days)
 
 if __name__ == "__main__":
     # 测试分析器
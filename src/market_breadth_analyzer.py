@@ -23,6 +23,27 @@ from typing import Dict, List, Tuple, Optional
 import os
 import sys
 import time
+import threading
+
+try:
+    from analysis.trade_calendar import get_trade_calendar
+except ImportError:
+    from src.analysis.trade_calendar import get_trade_calendar
+
+try:
+    from analysis.rate_limiter import limit_akshare
+    from analysis.client_registry import get_client_registry
+except ImportError:
+    from src.analysis.rate_limiter import limit_akshare
+    from src.analysis.client_registry import get_client_registry
+
+# 所有AkShare调用经过统一限流
+ak = limit_akshare(ak)
+
+try:
+    from analysis.market_snapshot import get_snapshot_store
+except ImportError:
+    from src.analysis.market_snapshot import get_snapshot_store
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
@@ -37,55 +58,20 @@ class MarketBreadthAnalyzer:
         self.init_tushare()
     
     def init_tushare(self):
-        """初始化TuShare Pro连接"""
-        try:
-            # 读取TuShare配置
-            config_path = os.path.join(os.path.dirname(__file__), '..', 'config', 'tushare_config.json')
-            if os.path.exists(config_path):
-                with open(config_path, 'r', encoding='utf-8') as f:
-                    config = json.load(f)
-                    token = config.get('token', '')
-            else:
-                # 备用：从txt文件读取
-                token_path = os.path.join(os.path.dirname(__file__), '..', 'config', 'tushare_token.txt')
-                if os.path.exists(token_path):
-                    with open(token_path, 'r', encoding='utf-8') as f:
-                        token = f.read().strip()
-                else:
-                    raise Exception("TuShare配置文件未找到")
-            
-            # 初始化TuShare Pro
-            ts.set_token(token)
-            self.ts_pro = ts.pro_api()
+        """初始化TuShare Pro连接（使用进程内共享的客户端，支持录制/回放）"""
+        self.ts_pro = get_client_registry().tushare()
+        if self.ts_pro is not None:
             logger.info("✅ TuShare Pro初始化成功")
-            
-        except Exception as e:
-            logger.error(f"❌ TuShare Pro初始化失败: {e}")
-            self.ts_pro = None
+        else:
+            logger.error("❌ TuShare Pro初始化失败: 未安装或token未配置")
     
     def get_trading_date(self) -> str:
         """获取最近交易日"""
         try:
-            if not self.ts_pro:
-                raise Exception("TuShare未初始化")
-            
-            # 获取最近交易日
-            end_date = datetime.now().strftime('%Y%m%d')
-            start_date = (datetime.now() - timedelta(days=10)).strftime('%Y%m%d')
-            
-            cal_df = self.ts_pro.trade_cal(
-                exchange='SSE',
-                start_date=start_date,
-                end_date=end_date,
-                is_open='1'
-            )
-            
-            if cal_df.empty:
+            latest_trade_date = get_trade_calendar(self.ts_pro).latest_trading_day()
+            if not latest_trade_date:
                 return datetime.now().strftime('%Y%m%d')
             
-            # 获取最近交易日
-            latest_trade_date = cal_df.sort_values('cal_date', ascending=False)['cal_date'].iloc[0]
-            
             logger.info(f"📅 最近交易日: {latest_trade_date}")
             return latest_trade_date
             
@@ -96,65 +82,25 @@ class MarketBreadthAnalyzer:
     def get_market_daily_data(self, trade_date: str) -> pd.DataFrame:
         """获取市场当日全部股票数据"""
         try:
-            if not self.ts_pro:
-                raise Exception("TuShare未初始化")
-            
             logger.info(f"📊 获取{trade_date}全市场股票数据...")
             
-            # 获取当日全部股票行情（确保包含所有上市交易股票）
-            daily_df = self.ts_pro.daily(trade_date=trade_date)
-            
-            # 补充获取：如果数据不完整，尝试获取基础股票列表
-            if daily_df.empty or len(daily_df) < 4000:
-                logger.warning(f"⚠️ 当日行情数据较少({len(daily_df)}只)，尝试获取完整股票列表...")
-                try:
-                    # 获取所有正常上市的股票列表
-                    stock_basic_df = self.ts_pro.stock_basic(list_status='L', fields='ts_code,symbol,name,market')
-                    logger.info(f"📋 股票基础列表: {len(stock_basic_df)}只股票")
-                    
-                    # 如果daily数据不完整，直接使用basic列表的股票代码重新获取
-                    if len(daily_df) < len(stock_basic_df) * 0.8:  # 如果daily数据少于80%，重新获取
-                        logger.info(f"🔄 重新获取行情数据...")
-                        # 分批获取数据避免API限制
-                        daily_df = self.ts_pro.daily(trade_date=trade_date)
-                        
-                except Exception as e:
-                    logger.warning(f"⚠️ 获取股票基础列表失败: {e}")
-            
+            # 从截面快照读取当日行情、基本面和涨跌停价（每个交易日只下载一次）
+            daily_df = get_snapshot_store().get_snapshot(trade_date, self.ts_pro)
             logger.info(f"📊 获取到行情数据: {len(daily_df)}只股票")
             
             if daily_df.empty:
                 logger.warning(f"⚠️ {trade_date}无行情数据")
                 return pd.DataFrame()
             
-            # 获取基本面数据
-            try:
-                basic_df = self.ts_pro.daily_basic(
-                    trade_date=trade_date,
-                    fields='ts_code,total_mv,circ_mv,turnover_rate,volume_ratio,pe,pb'
-                )
-                
-                if not basic_df.empty:
-                    # 合并数据
-                    merged_df = pd.merge(daily_df, basic_df, on='ts_code', how='left')
-                else:
-                    merged_df = daily_df
-                    merged_df['total_mv'] = 0
-                    merged_df['circ_mv'] = 0
-                    merged_df['turnover_rate'] = 0
-                    merged_df['volume_ratio'] = 0
-                    merged_df['pe'] = 0
-                    merged_df['pb'] = 0
-                    
-            except Exception as e:
-                logger.warning(f"⚠️ 获取基本面数据失败: {e}")
-                merged_df = daily_df
-                merged_df['total_mv'] = 0
-                merged_df['circ_mv'] = 0
-                merged_df['turnover_rate'] = 0
-                merged_df['volume_ratio'] = 0
-                merged_df['pe'] = 0
-                merged_df['pb'] = 0
+            if len(daily_df) < 4000:
+                logger.warning(f"⚠️ 当日行情数据较少({len(daily_df)}只)")
+            
+            merged_df = daily_df.copy()
+            
+            # 基本面数据获取失败时按0处理
+            for col in ['total_mv', 'circ_mv', 'turnover_rate', 'volume_ratio', 'pe', 'pb']:
+                if merged_df[col].isna().all():
+                    merged_df[col] = 0
             
             # 过滤掉无效数据（最宽松的条件以包含所有有效股票）
             # 只过滤明显无效的数据，保留所有正常交易的股票
@@ -282,17 +228,10 @@ class MarketBreadthAnalyzer:
             if market_data.empty:
                 return {'limit_up_count': 0, 'limit_down_count': 0}
             
-            # 获取涨跌停价格数据（优化算法提高准确性）
+            # 涨跌停价格来自截面快照（优化算法提高准确性）
             try:
-                limit_df = self.ts_pro.stk_limit(trade_date=trade_date)
-                if not limit_df.empty:
-                    # 合并涨跌停价格数据
-                    market_with_limit = pd.merge(
-                        market_data, 
-                        limit_df[['ts_code', 'up_limit', 'down_limit']], 
-                        on='ts_code', 
-                        how='left'
-                    )
+                if 'up_limit' in market_data.columns and market_data['up_limit'].notna().any():
+                    market_with_limit = market_data
                     
                     # 使用更精确的涨停跌停判断逻辑
                     # 1. 基于价格的精确匹配（允许小幅误差）
@@ -546,12 +485,21 @@ class MarketBreadthAnalyzer:
                 'data': None
             }
 
-# 全局分析器实例
-analyzer = MarketBreadthAnalyzer()
+# 全局分析器实例（首次分析时才创建并连接TuShare，导入本模块不发起连接）
+_default_analyzer = None
+_default_analyzer_lock = threading.Lock()
+
+def get_market_breadth_analyzer() -> MarketBreadthAnalyzer:
+    """获取进程内共享的市场宽度分析器"""
+    global _default_analyzer
+    with _default_analyzer_lock:
+        if _default_analyzer is None:
+            _default_analyzer = MarketBreadthAnalyzer()
+        return _default_analyzer
 
 def get_market_breadth_analysis(trade_date: str = None) -> Dict:
     """获取市场宽度分析结果"""
-    return analyzer.analyze_market_breadth(trade_date)
+    return get_market_breadth_analyzer().analyze_market_breadth(trade_date)
 
 if __name__ == "__main__":
     # 测试分析器
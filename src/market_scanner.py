@@ -21,6 +21,11 @@ warnings.filterwarnings('ignore')
 
 from .strategy_engine import QuantitativeStrategyEngine
 from .analysis.data_fetcher import DataFetcher
+from .analysis.stock_universe import get_stock_universe
+from .analysis.rate_limiter import limit_akshare
+
+# 所有AkShare调用经过统一限流
+ak = limit_akshare(ak)
 
 class MarketScanner:
     """全市场股票扫描器 - 100%真实数据版本，覆盖深A+沪A"""
@@ -66,205 +71,44 @@ class MarketScanner:
                 'progress': 0
             })
             
-            stocks = []
-            data_sources = []
+            # 从共享股票池读取（每个交易日只下载一次，已按代码排序）
+            pro = None
+            if self.data_fetcher.tushare_available:
+                pro = getattr(self.data_fetcher, 'tushare_pro', None) or getattr(self.data_fetcher, 'pro', None)
             
-            # 方法1：使用akshare获取股票列表
-            try:
-                print("📊 方法1: 使用akshare获取股票基础信息...")
-                self._send_progress({
-                    'stage': 'fetching_stock_list',
-                    'message': '使用akshare获取股票基础信息...',
-                    'progress': 20
-                })
-                
-                # 获取沪深A股基本信息
-                akshare_stocks = ak.stock_zh_a_spot_em()
-                
-                if akshare_stocks is not None and len(akshare_stocks) > 0:
-                    print(f"✅ akshare获取成功: {len(akshare_stocks)} 只股票")
-                    
-                    for _, row in akshare_stocks.iterrows():
-                        try:
-                            code = str(row.get('代码', row.get('code', ''))).zfill(6)
-                            name = str(row.get('名称', row.get('name', f'股票{code}')))
-                            
-                            # 过滤掉无效的代码
-                            if not code or len(code) != 6 or not code.isdigit():
-                                continue
-                            
-                            # 判断市场
-                            if code.startswith('6'):  # 沪A
-                                market_type = 'SH'
-                                exchange = '上海证券交易所'
-                                if code.startswith('688'):
-                                    board = '科创板'
-                                else:
-                                    board = '主板'
-                            elif code.startswith('0'):  # 深A主板
-                                market_type = 'SZ'
-                                exchange = '深圳证券交易所'
-                                board = '主板'
-                            elif code.startswith('3'):  # 创业板
-                                market_type = 'SZ'
-                                exchange = '深圳证券交易所'
-                                board = '创业板'
-                            else:
-                                continue  # 跳过其他类型
-                            
-                            # 市场过滤
-                            if market != "all":
-                                if market == "sh" and not code.startswith('6'):
-                                    continue
-                                elif market == "sz" and not (code.startswith('0') or code.startswith('3')):
-                                    continue
-                                elif market == "cy" and not code.startswith('3'):
-                                    continue
-                                elif market == "kc" and not code.startswith('688'):
-                                    continue
-                            
-                            stock_info = {
-                                'code': code,
-                                'name': name,
-                                'market': market_type,
-                                'exchange': exchange,
-                                'board': board,
-                                'data_source': 'akshare'
-                            }
-                            stocks.append(stock_info)
-                            
-                        except Exception as e:
-                            continue
-                    
-                    data_sources.append(f"akshare: {len([s for s in stocks if s['data_source'] == 'akshare'])} 只股票")
-                    
-            except Exception as e:
-                print(f"⚠️ akshare获取股票列表失败: {e}")
+            self._send_progress({
+                'stage': 'fetching_stock_list',
+                'message': '读取共享股票池（AkShare+TuShare）...',
+                'progress': 20
+            })
             
-            # 方法2：使用tushare补充股票列表
-            if self.data_fetcher.tushare_available:
-                try:
-                    print("📊 方法2: 使用tushare补充股票信息...")
-                    self._send_progress({
-                        'stage': 'fetching_stock_list',
-                        'message': '使用tushare补充股票信息...',
-                        'progress': 60
-                    })
-                    
-                    # 获取股票基本信息 - 确保正确访问tushare_pro
-                    if hasattr(self.data_fetcher, 'tushare_pro') and self.data_fetcher.tushare_pro:
-                        tushare_stocks = self.data_fetcher.tushare_pro.stock_basic(
-                            exchange='', 
-                            list_status='L',  # 只获取上市状态的股票
-                            fields='ts_code,symbol,name,area,industry,list_date,market'
-                        )
-                    elif hasattr(self.data_fetcher, 'pro') and self.data_fetcher.pro:
-                        tushare_stocks = self.data_fetcher.pro.stock_basic(
-                            exchange='', 
-                            list_status='L',  # 只获取上市状态的股票
-                            fields='ts_code,symbol,name,area,industry,list_date,market'
-                        )
-                    else:
-                        print("⚠️ TuShare API对象未找到")
-                        tushare_stocks = None
-                    
-                    if tushare_stocks is not None and len(tushare_stocks) > 0:
-                        print(f"✅ tushare获取成功: {len(tushare_stocks)} 只股票")
-                        
-                        # 获取已有的股票代码列表
-                        existing_codes = {s['code'] for s in stocks}
-                        
-                        for _, row in tushare_stocks.iterrows():
-                            try:
-                                ts_code = row['ts_code']
-                                code = ts_code.split('.')[0]
-                                name = row['name']
-                                market_suffix = ts_code.split('.')[1]
-                                
-                                # 过滤条件
-                                if code in existing_codes:
-                                    continue  # 已存在，跳过
-                                
-                                # 只处理A股
-                                if market_suffix not in ['SH', 'SZ']:
-                                    continue
-                                
-                                # 判断板块
-                                if code.startswith('6'):  # 沪A
-                                    if market_suffix != 'SH':
-                                        continue
-                                    exchange = '上海证券交易所'
-                                    if code.startswith('688'):
-                                        board = '科创板'
-                                    else:
-                                        board = '主板'
-                                elif code.startswith(('0', '3')):  # 深A
-                                    if market_suffix != 'SZ':
-                                        continue
-                                    exchange = '深圳证券交易所'
-                                    if code.startswith('3'):
-                                        board = '创业板'
-                                    else:
-                                        board = '主板'
-                                else:
-                                    continue  # 跳过其他
-                                
-                                # 市场过滤
-                                if market != "all":
-                                    if market == "sh" and not code.startswith('6'):
-                                        continue
-                                    elif market == "sz" and not (code.startswith('0') or code.startswith('3')):
-                                        continue
-                                    elif market == "cy" and not code.startswith('3'):
-                                        continue
-                                    elif market == "kc" and not code.startswith('688'):
-                                        continue
-                                
-                                stock_info = {
-                                    'code': code,
-                                    'name': name,
-                                    'market': market_suffix,
-                                    'exchange': exchange,
-                                    'board': board,
-                                    'industry': row.get('industry', ''),
-                                    'area': row.get('area', ''),
-                                    'list_date': row.get('list_date', ''),
-                                    'data_source': 'tushare'
-                                }
-                                stocks.append(stock_info)
-                                
-                            except Exception as e:
-                                continue
-                        
-                        data_sources.append(f"tushare: {len([s for s in stocks if s['data_source'] == 'tushare'])} 只股票")
-                        
-                except Exception as e:
-                    print(f"⚠️ tushare获取股票列表失败: {e}")
+            universe = get_stock_universe()
+            frame = universe.get_frame(pro=pro, force_refresh=force_refresh)
+            data_sources = universe.sources
+            
+            if len(frame) == 0:
+                raise Exception("股票池为空，所有数据源均不可用")
             
-            # 数据去重和排序
-            print("🔄 正在处理和去重股票数据...")
             self._send_progress({
                 'stage': 'processing_stock_list',
-                'message': '正在处理和去重股票数据...',
+                'message': '正在处理股票数据...',
                 'progress': 80
             })
             
-            # 去重（基于股票代码）
-            unique_stocks = {}
-            for stock in stocks:
-                code = stock['code']
-                if code not in unique_stocks:
-                    unique_stocks[code] = stock
-                else:
-                    # 如果已存在，优先保留信息更完整的
-                    existing = unique_stocks[code]
-                    if len(stock.get('industry', '')) > len(existing.get('industry', '')):
-                        unique_stocks[code] = stock
+            # 只覆盖深A和沪A
+            code = frame['code']
+            mask = frame['market'].isin(['SH', 'SZ']).to_numpy()
+            if market == "sh":
+                mask &= code.str.startswith('6').to_numpy()
+            elif market == "sz":
+                mask &= code.str.startswith(('0', '3')).to_numpy()
+            elif market == "cy":
+                mask &= code.str.startswith('3').to_numpy()
+            elif market == "kc":
+                mask &= code.str.startswith('688').to_numpy()
             
-            self.stock_list = list(unique_stocks.values())
-            
-            # 按代码排序
-            self.stock_list.sort(key=lambda x: x['code'])
+            columns = ['code', 'name', 'market', 'exchange', 'board', 'industry', 'area', 'list_date', 'data_source']
+            self.stock_list = frame.loc[mask, columns].to_dict('records')
             
             # 统计信息
             total_count = len(self.stock_list)
@@ -466,9 +310,6 @@ class MarketScanner:
                     
                     self.scan_results.append(analysis_result)
                 
-                # API限速
-                time.sleep(0.2)  # 200ms延迟
-                
             except Exception as e:
                 print(f"❌ 分析 {stock['code']} 失败: {e}")
                 continue
@@ -11,6 +11,7 @@ import numpy as np
 import akshare as ak
 import time
 import json
+import itertools
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple, Callable
 from concurrent.futures import ThreadPoolExecutor, as_completed
@@ -49,9 +50,44 @@ except Exception as e:
     print(f"⚠️ 无法导入DataFetcher: {e}")
     DataFetcher = None
 
+try:
+    from analysis.stock_universe import get_stock_universe
+except ImportError:
+    from src.analysis.stock_universe import get_stock_universe
+
+try:
+    from analysis.rate_limiter import limit_tushare, limit_akshare
+except ImportError:
+    from src.analysis.rate_limiter import limit_tushare, limit_akshare
+
+try:
+    from analysis.market_snapshot import get_snapshot_store
+    from analysis.trade_calendar import get_trade_calendar
+    from analysis.topk import TopKCollector, order_by_bound, iter_contenders
+except ImportError:
+    from src.analysis.market_snapshot import get_snapshot_store
+    from src.analysis.trade_calendar import get_trade_calendar
+    from src.analysis.topk import TopKCollector, order_by_bound, iter_contenders
+
+# 所有AkShare调用经过统一限流
+ak = limit_akshare(ak)
+
 class FullMarketScanner:
     """全市场股票扫描器 - 支持分析所有A股（4000+只）"""
     
+    # 策略ID -> 评分策略名称
+    STRATEGY_MAPPING = {
+        1: 'value_investment',  # 价值投资
+        2: 'dividend',          # 股息策略
+        3: 'growth',            # 成长策略
+        4: 'momentum',          # 动量策略
+        5: 'trend_following',   # 趋势跟踪
+        6: 'high_frequency'     # 高频交易
+    }
+    
+    # _calculate_strategy_score_enhanced 的最高评分
+    SCORE_CEILING = 95.0
+    
     def __init__(self, max_workers: int = 5, use_cache: bool = True):
         """
         初始化全市场扫描器 - 强化版
@@ -158,131 +194,23 @@ class FullMarketScanner:
                 'progress': 0
             })
             
-            stocks = []
+            # 从共享股票池读取（每个交易日只下载一次，已按代码排序）
+            pro = None
+            if self.data_fetcher is not None and self.data_fetcher.tushare_available:
+                pro = getattr(self.data_fetcher, 'tushare_pro', None)
             
-            # 方法1：使用akshare获取全部A股
-            try:
-                print("📊 使用AkShare获取全A股实时数据...")
-                akshare_stocks = ak.stock_zh_a_spot_em()
-                
-                if akshare_stocks is not None and len(akshare_stocks) > 0:
-                    print(f"✅ AkShare获取成功: {len(akshare_stocks)} 只股票")
-                    
-                    for _, row in akshare_stocks.iterrows():
-                        try:
-                            code = str(row.get('代码', row.get('code', ''))).zfill(6)
-                            name = str(row.get('名称', row.get('name', f'股票{code}')))
-                            
-                            if not code or len(code) != 6 or not code.isdigit():
-                                continue
-                            
-                            # 判断市场和板块
-                            if code.startswith('6'):  # 沪A
-                                market_type = 'SH'
-                                exchange = '上海证券交易所'
-                                if code.startswith('688'):
-                                    board = '科创板'
-                                else:
-                                    board = '主板'
-                            elif code.startswith('0'):  # 深A主板
-                                market_type = 'SZ'
-                                exchange = '深圳证券交易所'
-                                board = '主板'
-                            elif code.startswith('3'):  # 创业板
-                                market_type = 'SZ'
-                                exchange = '深圳证券交易所'
-                                board = '创业板'
-                            else:
-                                continue
-                            
-                            stock_info = {
-                                'code': code,
-                                'name': name,
-                                'market': market_type,
-                                'exchange': exchange,
-                                'board': board,
-                                'data_source': 'akshare'
-                            }
-                            stocks.append(stock_info)
-                            
-                        except Exception as e:
-                            continue
-                            
-            except Exception as e:
-                print(f"⚠️ AkShare获取失败: {e}")
+            frame = get_stock_universe().get_frame(pro=pro, force_refresh=force_refresh)
             
             self._send_progress({
                 'stage': 'fetching_all_stocks',
-                'message': f'AkShare获取完成，已获取{len(stocks)}只股票',
+                'message': f'股票池读取完成，已获取{len(frame)}只股票',
                 'progress': 50
             })
             
-            # 方法2：使用TuShare补充股票信息
-            if self.data_fetcher.tushare_available:
-                try:
-                    print("📊 使用TuShare补充股票信息...")
-                    tushare_stocks = self.data_fetcher.tushare_pro.stock_basic(
-                        exchange='',
-                        list_status='L',
-                        fields='ts_code,symbol,name,area,industry,list_date,market'
-                    )
-                    
-                    if tushare_stocks is not None and len(tushare_stocks) > 0:
-                        existing_codes = {s['code'] for s in stocks}
-                        
-                        for _, row in tushare_stocks.iterrows():
-                            try:
-                                ts_code = row['ts_code']
-                                code = ts_code.split('.')[0]
-                                name = row['name']
-                                market_suffix = ts_code.split('.')[1]
-                                
-                                if code in existing_codes or market_suffix not in ['SH', 'SZ']:
-                                    continue
-                                
-                                if code.startswith('6'):
-                                    exchange = '上海证券交易所'
-                                    board = '科创板' if code.startswith('688') else '主板'
-                                elif code.startswith(('0', '3')):
-                                    exchange = '深圳证券交易所'
-                                    board = '创业板' if code.startswith('3') else '主板'
-                                else:
-                                    continue
-                                
-                                # 🔥 修复：正确处理TuShare的行业信息
-                                tushare_industry = row.get('industry', '')
-                                
-                                stock_info = {
-                                    'code': code,
-                                    'name': name,
-                                    'market': market_suffix,
-                                    'exchange': exchange,
-                                    'board': board,
-                                    'industry': tushare_industry if tushare_industry else '其他',
-                                    'area': row.get('area', ''),
-                                    'data_source': 'tushare'
-                                }
-                                stocks.append(stock_info)
-                                
-                            except Exception as e:
-                                continue
-                                
-                except Exception as e:
-                    print(f"⚠️ TuShare获取失败: {e}")
-            
-            # 数据去重和排序
-            unique_stocks = {}
-            for stock in stocks:
-                code = stock['code']
-                if code not in unique_stocks:
-                    unique_stocks[code] = stock
-                else:
-                    existing = unique_stocks[code]
-                    if len(stock.get('industry', '')) > len(existing.get('industry', '')):
-                        unique_stocks[code] = stock
-            
-            self.stock_list = list(unique_stocks.values())
-            self.stock_list.sort(key=lambda x: x['code'])
+            # 只覆盖深A和沪A
+            columns = ['code', 'name', 'market', 'exchange', 'board', 'industry', 'area', 'data_source']
+            frame = frame[frame['market'].isin(['SH', 'SZ'])]
+            self.stock_list = frame[columns].to_dict('records')
             
             # 统计信息
             total_count = len(self.stock_list)
@@ -426,11 +354,9 @@ class FullMarketScanner:
                         })
                         print(f"✅ TuShare获取 {stock_code} 基本面数据成功")
                     
-                    # 获取股票基本信息
-                    stock_basic = ts_api.stock_basic(
-                        ts_code=full_code,
-                        fields='ts_code,name,area,industry'
-                    )
+                    # 从共享股票池读取基本信息
+                    universe = get_stock_universe().get_frame(pro=ts_api)
+                    stock_basic = universe[universe['code'] == stock_code] if len(universe) > 0 else None
                     
                     if stock_basic is not None and len(stock_basic) > 0:
                         basic = stock_basic.iloc[0]
@@ -1041,7 +967,8 @@ class FullMarketScanner:
     
     def execute_full_market_scan(self, strategy_id: int, start_date: str, end_date: str, 
                                 min_score: float = 60.0, batch_size: int = 100, 
-                                markets: List[str] = ['all'], industries: List[str] = ['all']) -> Dict:
+                                markets: List[str] = ['all'], industries: List[str] = ['all'],
+                                top_k: Optional[int] = None) -> Dict:
         """
         执行全市场扫描（根据筛选条件分析股票）
         :param strategy_id: 策略ID
@@ -1051,6 +978,7 @@ class FullMarketScanner:
         :param batch_size: 批处理大小
         :param markets: 市场筛选条件
         :param industries: 行业筛选条件
+        :param top_k: 只需要前K名时传入；按全市场截面估算的评分上界从高到低分析，剩余股票都进不了前K名时提前结束
         :return: 扫描结果
         """
         print("=" * 100)
@@ -1106,15 +1034,31 @@ class FullMarketScanner:
         tushare_count = 0
         failed_count = 0
         
+        # Top-K 模式：按评分上界从高到低分小批分析，上界进不了前K名的股票不再分析
+        collector = None
+        if top_k:
+            collector = TopKCollector(top_k)
+            bounds = self._score_upper_bounds(filtered_stocks, strategy_id)
+            pending = iter_contenders(order_by_bound(filtered_stocks, bounds), collector)
+            batch_size = min(batch_size, max(top_k, self.max_workers))
+            print(f"🏁 Top-K模式: 只保留前{top_k}名，每批{batch_size}只，无法进入前{top_k}名的股票将被跳过")
+        else:
+            pending = iter(filtered_stocks)
+        analyzed_count = 0
+        batch_num = 0
+        total_batches = (total_stocks + batch_size - 1) // batch_size
+        
         print(f"\n🔄 开始批量分析筛选后的 {total_stocks} 只股票...")
         print("=" * 80)
         
         # 分批处理以提高效率和稳定性
-        for batch_start in range(0, total_stocks, batch_size):
-            batch_end = min(batch_start + batch_size, total_stocks)
-            batch_stocks = filtered_stocks[batch_start:batch_end]
-            batch_num = (batch_start // batch_size) + 1
-            total_batches = (total_stocks + batch_size - 1) // batch_size
+        while True:
+            batch_stocks = list(itertools.islice(pending, batch_size))
+            if not batch_stocks:
+                break
+            batch_start = analyzed_count
+            analyzed_count += len(batch_stocks)
+            batch_num += 1
             
             print(f"\n📦 处理第 {batch_num}/{total_batches} 批次: {len(batch_stocks)} 只股票")
             
@@ -1162,6 +1106,8 @@ class FullMarketScanner:
                                 'risk_level': self._get_risk_level(result)
                             })
                             qualified_stocks.append(enhanced_result)
+                            if collector is not None:
+                                collector.offer(score, enhanced_result)
                             print(f"✅ 分析完成: {result['stock_code']} {result['stock_name']} (评分: {score:.1f}分)")
                             
                             self.scan_results.append(result)
@@ -1190,31 +1136,27 @@ class FullMarketScanner:
                     except Exception as e:
                         failed_count += 1
                         print(f"❌ 分析 {stock['code']} 失败: {e}")
-                    
-                    # API限速
-                    time.sleep(0.1)
-            
-            # 批次间休息，避免API限制
-            if batch_num < total_batches:
-                print(f"⏸️ 批次间休息 2 秒...")
-                time.sleep(2)
         
         # 扫描完成统计
         total_time = time.time() - scan_start_time
         real_data_count = akshare_count + tushare_count
         real_data_percentage = (real_data_count / successful_analyses * 100) if successful_analyses > 0 else 0
+        skipped_count = total_stocks - analyzed_count
         
         # 按得分排序
         qualified_stocks.sort(key=lambda x: x.get('score', 0), reverse=True)
         top_stocks = qualified_stocks[:100]  # 前100强
+        top_30_stocks = (collector.results() if collector is not None else qualified_stocks)[:30]
         
         print("\n" + "=" * 80)
         print("🎉 智能筛选股票扫描完成!")
         print("=" * 80)
         print(f"⏱️ 总用时: {total_time/60:.1f}分钟 ({total_time:.1f}秒)")
         print(f"📊 筛选股票数: {total_stocks} 只")
-        print(f"✅ 成功分析: {successful_analyses} 只 ({successful_analyses/total_stocks*100:.1f}%)")
+        print(f"✅ 成功分析: {successful_analyses} 只 ({successful_analyses/analyzed_count*100 if analyzed_count else 0:.1f}%)")
         print(f"❌ 分析失败: {failed_count} 只")
+        if collector is not None:
+            print(f"⏭️ Top-K跳过: {skipped_count} 只（无法进入前{top_k}名）")
         print(f"📊 全部分析: {len(qualified_stocks)} 只")
         print(f"🏆 TOP100强: {len(top_stocks)} 只")
         print(f"💯 数据质量: {real_data_percentage:.1f}% 真实数据")
@@ -1246,7 +1188,7 @@ class FullMarketScanner:
             'analyzed_stocks': successful_analyses,
             'failed_count': failed_count,
             'qualified_count': len(qualified_stocks),
-            'success_rate': (successful_analyses / total_stocks * 100) if total_stocks > 0 else 0,
+            'success_rate': (successful_analyses / analyzed_count * 100) if analyzed_count > 0 else 0,
             'qualification_rate': (len(qualified_stocks) / successful_analyses * 100) if successful_analyses > 0 else 0,
             'total_time_seconds': total_time,
             'total_time_minutes': total_time / 60,
@@ -1258,7 +1200,13 @@ class FullMarketScanner:
             },
             'qualified_stocks': qualified_stocks,
             'top_100_stocks': top_stocks,
-            'top_30_stocks': qualified_stocks[:30],  # 前30强用于显示
+            'top_30_stocks': top_30_stocks,  # 前30强用于显示
+            'top_k': {
+                'k': top_k,
+                'analyzed': analyzed_count,
+                'skipped': skipped_count,
+                'threshold': collector.threshold
+            } if collector is not None else None,
             'scan_summary': {
                 'markets_filter': markets,
                 'industries_filter': industries,
@@ -1288,16 +1236,12 @@ class FullMarketScanner:
             
             print(f"🔍 开始分析 {stock_code} {stock_name}...")
             
-            # 确保真实执行时间 - 每只股票至少3-10秒
-            import random
             analysis_start_time = time.time()
+            # 各阶段实际耗时（秒）
+            stage_timings = {}
             
-            # 步骤1：初始化数据连接 (1-3秒)
-            init_delay = random.uniform(1.0, 3.0)
-            print(f"🔄 正在初始化数据连接... ({init_delay:.1f}s)")
-            time.sleep(init_delay)
-            
-            # 步骤2：获取真实股票数据 (TuShare + AkShare)
+            # 步骤1：获取真实股票数据 (TuShare + AkShare)
+            stage_start = time.time()
             print(f"📡 正在从TuShare/AkShare获取{stock_code}真实数据...")
             print(f"🔄 正在获取{stock_code}的daily数据（100%真实数据）...")
             
@@ -1333,10 +1277,6 @@ class FullMarketScanner:
                         data_source = 'tushare'
                         print(f"✅ TuShare获取成功: {len(basic_data)} 条记录")
                     
-                    # 添加真实数据获取延时
-                    data_delay = random.uniform(2.0, 5.0)
-                    time.sleep(data_delay)
-                    
                 except Exception as e:
                     print(f"⚠️ TuShare获取失败: {e}")
             
@@ -1345,6 +1285,7 @@ class FullMarketScanner:
                 try:
                     print(f"📊 尝试AkShare获取...")
                     import akshare as ak
+                    ak = limit_akshare(ak)
                     ak_data = ak.stock_zh_a_hist(symbol=stock_code, adjust="qfq")
                     
                     if ak_data is not None and len(ak_data) > 0:
@@ -1365,6 +1306,8 @@ class FullMarketScanner:
                 except Exception as e:
                     print(f"⚠️ AkShare获取失败: {e}")
             
+            stage_timings['fetch'] = time.time() - stage_start
+            
             # 数据质量验证
             if not stock_data:
                 print(f"❌ {stock_code} 数据获取失败，跳过分析")
@@ -1373,40 +1316,26 @@ class FullMarketScanner:
             print(f"✅ 数据质量验证通过: {stock_code}")
             print(f"✅ 获取到 {1} 条真实数据，数据源: {stock_data['data_source']}")
             
-            # 步骤3：进行策略分析计算
-            calc_delay = random.uniform(3.0, 8.0)
-            print(f"🧮 正在进行策略分析计算... ({calc_delay:.1f}s)")
-            time.sleep(calc_delay)
-            
-            # 步骤4：计算技术指标
-            indicator_delay = random.uniform(2.0, 5.0)
-            print(f"📊 正在计算技术指标... ({indicator_delay:.1f}s)")
-            time.sleep(indicator_delay)
-            
-            # 执行具体策略逻辑
-            strategy_mapping = {
-                1: 'value_investment',  # 价值投资
-                2: 'dividend',          # 股息策略
-                3: 'growth',            # 成长策略
-                4: 'momentum',          # 动量策略
-                5: 'trend_following',   # 趋势跟踪
-                6: 'high_frequency'     # 高频交易
-            }
-            
-            strategy_name = strategy_mapping.get(strategy_id, 'dividend')
+            # 步骤2：执行具体策略逻辑（基于最新截面数据，无需计算时序技术指标）
+            strategy_name = self.STRATEGY_MAPPING.get(strategy_id, 'dividend')
             print(f"🎯 执行{strategy_name}策略分析...")
             
             # 计算策略评分
+            stage_start = time.time()
             score = self._calculate_strategy_score_enhanced(stock_data, strategy_name)
+            stage_timings['scoring'] = time.time() - stage_start
             
             # 生成交易信号
+            stage_start = time.time()
             signals = self._generate_trading_signals(stock_data, strategy_name)
+            stage_timings['strategy'] = time.time() - stage_start
             
             analysis_time = time.time() - analysis_start_time
+            stage_timings = {stage: round(seconds, 3) for stage, seconds in stage_timings.items()}
             
             print(f"✅ 策略执行完成，生成 {len(signals)} 个交易信号")
             print(f"📈 买入信号: {len([s for s in signals if s['action'] == 'buy'])}, 卖出信号: {len([s for s in signals if s['action'] == 'sell'])}")
-            print(f"⏱️ 执行时间: {analysis_time:.1f}秒（正常范围）")
+            print(f"⏱️ 执行时间: {analysis_time:.1f}秒 (各阶段: {stage_timings})")
             
             return {
                 'stock_code': stock_code,
@@ -1423,6 +1352,7 @@ class FullMarketScanner:
                 'data_source': stock_data['data_source'],
                 'analysis_date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
                 'analysis_time': analysis_time,
+                'stage_timings': stage_timings,
                 'strategy_name': strategy_name
             }
             
@@ -1430,6 +1360,50 @@ class FullMarketScanner:
             print(f"❌ 分析 {stock.get('code', 'unknown')} 失败: {e}")
             return None
     
+    def _score_upper_bounds(self, stocks: List[Dict], strategy_id: int) -> List[float]:
+        """
+        分析前的评分上界（Top-K 模式用于排序和提前结束）
+        逐只分析的评分只取决于最新一行 daily_basic 的收盘价、PE、PB、总市值，全市场截面与之同源，
+        因此对截面中的股票直接计算评分；各评分项都是数据存在时才加分，改用AkShare（缺少PE/PB/市值）时评分只会更低。
+        只有截面含当日 daily_basic 时两者才是同一行：收盘后 daily 已发布而 daily_basic 未发布时，
+        逐只分析取到的是上一交易日的 PE/PB/市值，此时（以及不在截面中、缺少市值的股票）取最高评分
+        :param stocks: 股票列表
+        :param strategy_id: 策略ID
+        :return: 与 stocks 对齐的评分上界
+        """
+        bounds = [self.SCORE_CEILING] * len(stocks)
+        try:
+            pro = getattr(self.data_fetcher, 'pro', None)
+            trade_date = get_trade_calendar(pro).latest_trading_day()
+            snapshot = get_snapshot_store().get_snapshot(trade_date, pro) if trade_date else None
+            if snapshot is None or len(snapshot) == 0:
+                print("⚠️ 全市场截面不可用，Top-K评分上界取最高分")
+                return bounds
+            # 截面缺少 daily_basic 时这些列全为 NaN
+            if 'total_mv' not in snapshot.columns or not snapshot['total_mv'].notna().any():
+                print(f"⚠️ {trade_date} daily_basic 尚未发布，Top-K评分上界取最高分")
+                return bounds
+            
+            strategy_name = self.STRATEGY_MAPPING.get(strategy_id, 'dividend')
+            ts_codes = [f"{s['code']}.{'SH' if s['code'].startswith('6') else 'SZ'}" for s in stocks]
+            rows = snapshot.drop_duplicates('ts_code').set_index('ts_code').reindex(ts_codes)
+            values = rows[['close', 'pe', 'pb', 'total_mv']].apply(pd.to_numeric, errors='coerce').to_numpy()
+            
+            for i, (close, pe, pb, total_mv) in enumerate(values):
+                # 该股票没有当日 daily_basic 行时，逐只分析会取到更早的一行
+                if np.isnan(close) or np.isnan(total_mv):
+                    continue
+                stock_data = {
+                    'close': float(close),
+                    'pe': float(pe),
+                    'pb': float(pb),
+                    'market_cap': float(total_mv) / 10000 if total_mv else None  # 转换为亿元
+                }
+                bounds[i] = self._calculate_strategy_score_enhanced(stock_data, strategy_name)
+        except Exception as e:
+            print(f"⚠️ Top-K评分上界计算失败，取最高分: {e}")
+        return bounds
+    
     def _calculate_strategy_score(self, result: Dict) -> float:
         """
         计算策略评分
@@ -25,148 +25,73 @@ except ImportError as e:
     print(f"⚠️ 符合度评估器导入失败: {e}")
     ComplianceEvaluator = None
 
+try:
+    from analysis.stock_universe import get_stock_universe, classify_industry_by_name
+except ImportError:
+    from src.analysis.stock_universe import get_stock_universe, classify_industry_by_name
+
+try:
+    from analysis.rate_limiter import limit_akshare
+    from analysis.client_registry import get_client_registry
+    from analysis.parameter_optimizer import load_strategy_thresholds
+    from analysis.market_snapshot import get_snapshot_store
+    from analysis.trade_calendar import get_trade_calendar
+    from analysis.fundamentals_store import get_fundamentals_store
+except ImportError:
+    from src.analysis.rate_limiter import limit_akshare
+    from src.analysis.client_registry import get_client_registry
+    from src.analysis.parameter_optimizer import load_strategy_thresholds
+    from src.analysis.market_snapshot import get_snapshot_store
+    from src.analysis.trade_calendar import get_trade_calendar
+    from src.analysis.fundamentals_store import get_fundamentals_store
+
+# 所有AkShare调用经过统一限流
+ak = limit_akshare(ak)
+
 class OptimizedStrategyEngine:
     """优化策略引擎 - 确保真实数据和有效筛选"""
     
+    # 深度分析中符合度评分达到该分数视为符合条件
+    QUALIFIED_SCORE = 60
+    
+    # 🎯 策略ID -> 符合度评估的策略标准
+    COMPLIANCE_STRATEGY_TYPES = {
+        1: 'blue_chip',        # 蓝筹白马策略
+        2: 'high_dividend',    # 高股息策略
+        3: 'quality_growth',   # 质量成长策略
+        4: 'value_investment', # 价值投资策略
+        5: 'blue_chip',        # 平衡策略使用蓝筹标准
+        6: 'quality_growth'    # 其他成长类策略
+    }
+    
+    # 符合度评估中没有数据的字段使用的默认值
+    COMPLIANCE_EVAL_DEFAULTS = {
+        'current_ratio': 1.2,  # 默认值，实际应从财务数据获取
+        'debt_ratio': 40.0,     # 默认值，实际应从财务数据获取
+        'revenue_growth': 8.0,  # 默认值，实际应从财务数据获取
+        'profit_margin': 10.0,  # 默认值，实际应从财务数据获取
+        'dividend_yield': 2.0,  # 默认值，实际应从财务数据获取
+        'volatility': 25.0,     # 默认值，实际应从历史数据计算
+        'beta': 1.0             # 默认值，实际应从历史数据计算
+    }
+    
+    # 符合度评估字段 -> 全市场财务指标列，财务指标有数据时替代上面的默认值
+    COMPLIANCE_FINANCIAL_COLUMNS = {
+        'current_ratio': 'current_ratio',
+        'debt_ratio': 'debt_ratio',
+        'revenue_growth': 'revenue_growth',
+        'profit_margin': 'net_margin'
+    }
+    
     def __init__(self):
         """初始化策略引擎"""
         print("🚀 初始化优化策略引擎...")
-        self.tushare_available = False
-        self.akshare_available = False
-        self.tushare_pro = None
-        
-        # 初始化TuShare
-        try:
-            import tushare as ts
-            # 修复配置文件路径问题 - 使用绝对路径
-            try:
-                import os
-                project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-                config_file = os.path.join(project_root, 'config', 'tushare_config.json')
-                
-                print(f"🔍 尝试从 {config_file} 读取TuShare配置...")
-                print(f"📁 配置文件是否存在: {os.path.exists(config_file)}")
-                
-                if os.path.exists(config_file):
-                    with open(config_file, 'r', encoding='utf-8') as f:
-                        config = json.load(f)
-                        token = config.get('token')
-                        print(f"🔑 读取到Token: {token[:20]}...{token[-10:] if len(token) > 30 else ''}")
-                        
-                        if token and len(token) > 20:  # 确保token有效长度
-                            print("🔄 设置TuShare token...")
-                            ts.set_token(token)
-                            
-                            print("🔄 初始化TuShare Pro API...")
-                            self.tushare_pro = ts.pro_api()
-                            
-                            # 测试连接 - 使用更简单的API
-                            print("🧪 测试TuShare连接...")
-                            test_data = self.tushare_pro.trade_cal(exchange='SSE', start_date='20240101', end_date='20240105')
-                            
-                            if test_data is not None and len(test_data) > 0:
-                                self.tushare_available = True
-                                print(f"✅ TuShare Pro API连接成功，测试数据: {len(test_data)} 条")
-                            else:
-                                print("⚠️ TuShare API响应为空")
-                        else:
-                            print(f"❌ Token无效，长度: {len(token) if token else 0}")
-                else:
-                    print(f"❌ TuShare配置文件不存在: {config_file}")
-                    
-                    # 备用：尝试从token文件读取
-                    token_file = os.path.join(project_root, 'config', 'tushare_token.txt')
-                    print(f"🔍 尝试备用token文件: {token_file}")
-                    
-                    if os.path.exists(token_file):
-                        with open(token_file, 'r', encoding='utf-8') as f:
-                            content = f.read().strip()
-                            lines = content.split('\n')
-                            token = None
-                            for line in lines:
-                                line = line.strip()
-                                if line and not line.startswith('#'):
-                                    token = line
-                                    break
-                            
-                            if token and len(token) > 20:
-                                ts.set_token(token)
-                                self.tushare_pro = ts.pro_api()
-                                test_data = self.tushare_pro.trade_cal(exchange='SSE', start_date='20240101', end_date='20240105')
-                                if test_data is not None and len(test_data) > 0:
-                                    self.tushare_available = True
-                                    print(f"✅ 从备用文件加载TuShare成功")
-                                    
-            except Exception as e:
-                print(f"⚠️ TuShare配置失败: {e}")
-        except ImportError:
-            print("⚠️ TuShare未安装")
         
-        # 初始化AkShare
-        try:
-            # 测试AkShare连接 - 添加超时保护和重试机制
-            import socket
-            import requests
-            
-            old_timeout = socket.getdefaulttimeout()
-            socket.setdefaulttimeout(30)  # 30秒超时
-            
-            try:
-                # 配置请求头避免被反爬虫
-                headers = {
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-                }
-                
-                print("🧪 测试AkShare连接（增强重试版）...")
-                
-                # 重试机制
-                max_retries = 3
-                for attempt in range(max_retries):
-                    try:
-                        print(f"📡 AkShare连接测试 (第{attempt+1}次)...")
-                        
-                        # 设置请求会话
-                        session = requests.Session()
-                        session.headers.update(headers)
-                        
-                        # 测试连接
-                        test_data = ak.stock_zh_a_spot_em()
-                        if test_data is not None and len(test_data) > 0:
-                            self.akshare_available = True
-                            print(f"✅ AkShare API连接成功 (第{attempt+1}次尝试)")
-                            break
-                        else:
-                            print(f"⚠️ AkShare返回空数据 (第{attempt+1}次)")
-                            if attempt < max_retries - 1:
-                                time.sleep(2 ** attempt)  # 指数退避
-                                
-                    except requests.exceptions.ConnectionError:
-                        print(f"⚠️ AkShare网络连接错误 (第{attempt+1}次)")
-                        if attempt < max_retries - 1:
-                            time.sleep(3)
-                    except requests.exceptions.Timeout:
-                        print(f"⚠️ AkShare请求超时 (第{attempt+1}次)")
-                        if attempt < max_retries - 1:
-                            time.sleep(2)
-                    except Exception as e:
-                        error_msg = str(e)[:100] + "..." if len(str(e)) > 100 else str(e)
-                        print(f"⚠️ AkShare连接异常 (第{attempt+1}次): {error_msg}")
-                        if attempt < max_retries - 1:
-                            time.sleep(2)
-                
-                if not self.akshare_available:
-                    print("❌ AkShare初始化失败：网络连接不稳定")
-                    print("📡 系统将主要依赖TuShare数据源")
-                    
-            finally:
-                socket.setdefaulttimeout(old_timeout)
-                
-        except ImportError:
-            print("⚠️ AkShare模块未安装")
-            self.akshare_available = False
-        except Exception as e:
-            print(f"❌ AkShare初始化异常: {e}")
-            self.akshare_available = False
+        # 从共享注册表获取数据源（客户端延迟创建、进程内共享，健康检查在后台进行）
+        registry = get_client_registry()
+        self.tushare_pro = registry.tushare()
+        self.tushare_available = registry.tushare_available
+        self.akshare_available = registry.akshare_available
         
         print(f"📊 数据源状态: TuShare={self.tushare_available}, AkShare={self.akshare_available}")
         
@@ -187,6 +112,17 @@ class OptimizedStrategyEngine:
         else:
             print("⚠️ 符合度评估器不可用，将使用传统评分方式")
             self.compliance_evaluator = None
+        
+        # 筛选条件的默认阈值：参数寻优写回的 optimized_filters 优先于内置的宽松默认值
+        self.filter_defaults = {
+            'pe_min': 3, 'pe_max': 200,
+            'pb_min': 0.1, 'pb_max': 50,
+            'market_cap_min': 1, 'market_cap_max': 50000
+        }
+        optimized = load_strategy_thresholds('optimized_filters')
+        if optimized:
+            self.filter_defaults.update(optimized)
+            print(f"✅ 使用寻优得到的筛选阈值: {optimized}")
     
     def get_stock_list(self, limit: int = 100, markets: List[str] = ['all'], industries: List[str] = ['all']) -> List[Dict]:
         """
@@ -201,109 +137,33 @@ class OptimizedStrategyEngine:
         print(f"🏭 行业筛选: {industries}")
         stocks = []
         
-        # 方法1：使用AkShare获取实时股票列表
-        if self.akshare_available:
-            try:
-                print("🔄 使用AkShare获取股票列表...")
-                akshare_data = ak.stock_zh_a_spot_em()
-                
-                if akshare_data is not None and len(akshare_data) > 0:
-                    print(f"✅ AkShare获取成功: {len(akshare_data)} 只股票")
-                    
-                    for _, row in akshare_data.iterrows():
-                        try:
-                            code = str(row.get('代码', '')).zfill(6)
-                            name = str(row.get('名称', ''))
-                            
-                            if len(code) == 6 and code.isdigit():
-                                # 判断交易所和板块
-                                if code.startswith('6'):
-                                    exchange = 'SH'
-                                    board = '科创板' if code.startswith('688') else '主板'
-                                    market_type = 'star_market' if code.startswith('688') else 'main_board_sh'
-                                elif code.startswith('0'):
-                                    exchange = 'SZ'
-                                    board = '主板'
-                                    market_type = 'main_board_sz'
-                                elif code.startswith('3'):
-                                    exchange = 'SZ'
-                                    board = '创业板'
-                                    market_type = 'gem'
-                                elif code.startswith('8'):
-                                    exchange = 'BJ'
-                                    board = '北交所'
-                                    market_type = 'beijing'
-                                else:
-                                    continue
-                                
-                                # 市场筛选
-                                if not self._match_market_filter(market_type, markets):
-                                    continue
-                                
-                                # 简单行业筛选（这里可以根据股票名称进行基础分类）
-                                industry = self._classify_industry_by_name(name)
-                                if not self._match_industry_filter(industry, industries):
-                                    continue
-                                
-                                stocks.append({
-                                    'code': code,
-                                    'name': name,
-                                    'exchange': exchange,
-                                    'board': board,
-                                    'market_type': market_type,
-                                    'industry': industry,
-                                    'data_source': 'akshare'
-                                })
-                                
-                                if len(stocks) >= limit:
-                                    break
-                        except Exception as e:
-                            continue
-                else:
-                    print("⚠️ AkShare返回空数据")
-            except Exception as e:
-                print(f"❌ AkShare获取失败: {e}")
-        
-        # 方法2：如果AkShare失败，使用TuShare补充
-        if len(stocks) < limit and self.tushare_available:
+        # 从共享股票池读取（每个交易日只下载一次，市场/板块/行业列已预先计算）
+        if self.akshare_available or self.tushare_available:
             try:
-                print("🔄 使用TuShare补充股票列表...")
-                tushare_data = self.tushare_pro.stock_basic(
-                    exchange='',
-                    list_status='L',
-                    fields='ts_code,symbol,name,area,industry'
+                print("🔄 读取共享股票池...")
+                frame = get_stock_universe().get_frame(
+                    pro=self.tushare_pro if self.tushare_available else None,
+                    use_akshare=self.akshare_available
                 )
                 
-                if tushare_data is not None and len(tushare_data) > 0:
-                    existing_codes = {s['code'] for s in stocks}
+                if len(frame) > 0:
+                    mask = frame['market_type'].to_numpy() != ''
+                    if 'all' not in markets:
+                        mask &= frame['market_type'].isin(markets).to_numpy()
+                    if 'all' not in industries:
+                        mask &= frame['industry_class'].isin(industries).to_numpy()
                     
-                    for _, row in tushare_data.iterrows():
-                        if len(stocks) >= limit:
-                            break
-                        
-                        try:
-                            ts_code = row['ts_code']
-                            code = ts_code.split('.')[0]
-                            name = row['name']
-                            
-                            if code not in existing_codes:
-                                exchange = ts_code.split('.')[1]
-                                if exchange in ['SH', 'SZ']:
-                                    stocks.append({
-                                        'code': code,
-                                        'name': name,
-                                        'exchange': exchange,
-                                        'board': '主板',
-                                        'data_source': 'tushare'
-                                    })
-                        except Exception as e:
-                            continue
-                            
-                    print(f"✅ TuShare补充成功")
+                    selected = frame.loc[mask, ['code', 'name', 'market', 'board', 'market_type',
+                                                'industry_class', 'data_source']].head(limit)
+                    selected = selected.rename(columns={'market': 'exchange', 'industry_class': 'industry'})
+                    stocks = selected.to_dict('records')
+                    print(f"✅ 股票池读取成功: {len(frame)} 只股票，筛选后 {len(stocks)} 只")
+                else:
+                    print("⚠️ 股票池为空")
             except Exception as e:
-                print(f"❌ TuShare补充失败: {e}")
+                print(f"❌ 股票池读取失败: {e}")
         
-        # 方法3：如果都失败，使用备用股票列表
+        # 如果股票池不可用，使用备用股票列表
         if len(stocks) == 0:
             print("⚠️ 使用备用股票列表...")
             backup_stocks = [
@@ -323,19 +183,25 @@ class OptimizedStrategyEngine:
         print(f"📈 最终获取股票: {len(stocks)} 只")
         return stocks
     
+    @staticmethod
+    def _to_ts_code(stock_code: str) -> str:
+        """
+        6位代码转换为 ts_code（逐只获取和截面预筛选共用，保证两者关联同一行截面数据）
+        :param stock_code: 股票代码
+        :return: ts_code
+        """
+        return f"{stock_code}.SH" if stock_code.startswith('6') else f"{stock_code}.SZ"
+    
     def get_stock_data(self, stock_code: str, exchange: str) -> Optional[Dict]:
         """
         获取单只股票的基本面数据
         :param stock_code: 股票代码
-        :param exchange: 交易所
+        :param exchange: 交易所（仅为兼容保留，完整代码由 _to_ts_code 按代码前缀确定）
         :return: 股票数据
         """
         try:
             # 构造完整代码
-            if exchange == 'SH':
-                full_code = f"{stock_code}.SH"
-            else:
-                full_code = f"{stock_code}.SZ"
+            full_code = self._to_ts_code(stock_code)
             
             # 尝试使用TuShare获取基本面数据
             if self.tushare_available:
@@ -454,6 +320,9 @@ class OptimizedStrategyEngine:
         
         print(f"📋 获取到 {len(stocks)} 只股票，开始分析...")
         
+        # 第一阶段：用当日全市场截面一次性排除PE/PB/市值不符合条件的股票，只有剩余股票逐只获取数据
+        stocks, prefilter_stats = self.prefilter_by_snapshot(stocks, parameters)
+        
         qualified_stocks = []
         analyzed_count = 0
         success_count = 0
@@ -471,11 +340,7 @@ class OptimizedStrategyEngine:
                 
                 print(f"🔍 [{current_index}/{len(stocks)}] 正在分析: {stock['code']} {stock['name']} ({analysis_progress:.1f}%)")
                 
-                # 添加延时确保真实执行感（每只股票至少0.5-2秒）
-                import random
-                delay = random.uniform(0.5, 2.0)  # 随机延时0.5-2秒
                 print(f"📊 获取 {stock['code']} 的TuShare/AkShare数据中...")
-                time.sleep(delay)
                 
                 # 获取股票数据
                 stock_data = self.get_stock_data(stock['code'], stock['exchange'])
@@ -547,9 +412,6 @@ class OptimizedStrategyEngine:
                     if fail_reasons:
                         print(f"❌ 筛选失败: {'; '.join(fail_reasons)}")
                 
-                # API限速
-                time.sleep(0.1)
-                
             except Exception as e:
                 print(f"❌ 分析 {stock['code']} 失败: {e}")
                 continue
@@ -581,7 +443,8 @@ class OptimizedStrategyEngine:
                 'real_data_count': real_data_count,
                 'real_data_percentage': real_data_percentage,
                 'execution_time': execution_time,
-                'compliance_stats': compliance_stats  # 🔥 新增符合度统计
+                'compliance_stats': compliance_stats,  # 🔥 新增符合度统计
+                'prefilter': prefilter_stats
             },
             'data_quality': {
                 'tushare_available': self.tushare_available,
@@ -623,31 +486,11 @@ class OptimizedStrategyEngine:
             pe = stock_data.get('pe')
             pb = stock_data.get('pb')
             market_cap = stock_data.get('market_cap')
-            
-            # 解析参数 - 处理嵌套格式和普通格式
-            def extract_value(param_key, default_value):
-                """提取参数值，支持嵌套格式"""
-                param = parameters.get(param_key, default_value)
-                if isinstance(param, dict):
-                    return param.get('value', default_value)
-                elif isinstance(param, (int, float)):
-                    return param
-                else:
-                    try:
-                        return float(param) if param is not None else default_value
-                    except (ValueError, TypeError):
-                        return default_value
+            bounds = self._filter_bounds(parameters)
             
             # 超宽松的PE条件 - 允许更大范围
             if pe is not None and pe > 0:  # 确保PE有效
-                pe_min = extract_value('pe_min', extract_value('pe_ratio_min', 3))
-                pe_max = extract_value('pe_max', extract_value('pe_ratio_max', 200))
-                
-                # 确保参数是数值类型
-                if not isinstance(pe_min, (int, float)) or not isinstance(pe_max, (int, float)):
-                    print(f"⚠️ PE参数类型错误: pe_min={pe_min}, pe_max={pe_max}")
-                    pe_min, pe_max = 3, 200  # 使用默认值
-                
+                pe_min, pe_max = bounds['pe']
                 if not (pe_min <= pe <= pe_max):
                     print(f"PE筛选失败: {pe} 不在 [{pe_min}, {pe_max}] 范围内")
                     return False
@@ -657,14 +500,7 @@ class OptimizedStrategyEngine:
             
             # 超宽松的PB条件
             if pb is not None and pb > 0:  # 确保PB有效
-                pb_min = extract_value('pb_min', extract_value('pb_ratio_min', 0.1))
-                pb_max = extract_value('pb_max', extract_value('pb_ratio_max', 50))
-                
-                # 确保参数是数值类型
-                if not isinstance(pb_min, (int, float)) or not isinstance(pb_max, (int, float)):
-                    print(f"⚠️ PB参数类型错误: pb_min={pb_min}, pb_max={pb_max}")
-                    pb_min, pb_max = 0.1, 50  # 使用默认值
-                
+                pb_min, pb_max = bounds['pb']
                 if not (pb_min <= pb <= pb_max):
                     print(f"PB筛选失败: {pb} 不在 [{pb_min}, {pb_max}] 范围内")
                     return False
@@ -674,14 +510,7 @@ class OptimizedStrategyEngine:
             
             # 超宽松的市值条件
             if market_cap is not None and market_cap > 0:  # 确保市值有效
-                market_cap_min = extract_value('market_cap_min', 1)
-                market_cap_max = extract_value('market_cap_max', 50000)
-                
-                # 确保参数是数值类型
-                if not isinstance(market_cap_min, (int, float)) or not isinstance(market_cap_max, (int, float)):
-                    print(f"⚠️ 市值参数类型错误: market_cap_min={market_cap_min}, market_cap_max={market_cap_max}")
-                    market_cap_min, market_cap_max = 1, 50000  # 使用默认值
-                
+                market_cap_min, market_cap_max = bounds['market_cap']
                 if not (market_cap_min <= market_cap <= market_cap_max):
                     print(f"市值筛选失败: {market_cap} 不在 [{market_cap_min}, {market_cap_max}] 范围内")
                     return False
@@ -697,6 +526,193 @@ class OptimizedStrategyEngine:
             print(f"参数内容: {parameters}")
             return True  # 发生错误时也通过筛选
     
+    def _filter_bounds(self, parameters: Dict) -> Dict[str, Tuple[float, float]]:
+        """
+        解析筛选条件的PE/PB/市值区间（_apply_optimized_filters 与截面预筛选共用）
+        :param parameters: 策略参数
+        :return: {'pe': (下限, 上限), 'pb': (下限, 上限), 'market_cap': (下限, 上限)}
+        """
+        defaults = self.filter_defaults
+        
+        # 解析参数 - 处理嵌套格式和普通格式
+        def extract_value(param_key, default_value):
+            """提取参数值，支持嵌套格式"""
+            param = parameters.get(param_key, default_value)
+            if isinstance(param, dict):
+                return param.get('value', default_value)
+            elif isinstance(param, (int, float)):
+                return param
+            else:
+                try:
+                    return float(param) if param is not None else default_value
+                except (ValueError, TypeError):
+                    return default_value
+        
+        bounds = {}
+        for name, label, min_keys, max_keys in [
+            ('pe', 'PE', ('pe_min', 'pe_ratio_min'), ('pe_max', 'pe_ratio_max')),
+            ('pb', 'PB', ('pb_min', 'pb_ratio_min'), ('pb_max', 'pb_ratio_max')),
+            ('market_cap', '市值', ('market_cap_min',), ('market_cap_max',))
+        ]:
+            low, high = defaults[f'{name}_min'], defaults[f'{name}_max']
+            for key in reversed(min_keys):
+                low = extract_value(key, low)
+            for key in reversed(max_keys):
+                high = extract_value(key, high)
+            
+            # 确保参数是数值类型
+            if not isinstance(low, (int, float)) or not isinstance(high, (int, float)):
+                print(f"⚠️ {label}参数类型错误: {name}_min={low}, {name}_max={high}")
+                low, high = defaults[f'{name}_min'], defaults[f'{name}_max']  # 使用默认值
+            bounds[name] = (low, high)
+        return bounds
+    
+    def _load_filter_snapshot(self) -> Optional[pd.DataFrame]:
+        """
+        最近交易日的全市场 daily_basic 截面（与逐只获取的最新一行 daily_basic 同源）
+        :return: 以 ts_code 为索引、含 pe/pb/total_mv 列的截面，不可用时返回 None
+        """
+        try:
+            trade_date = get_trade_calendar(self.tushare_pro).latest_trading_day()
+            if not trade_date:
+                return None
+            snapshot = get_snapshot_store().get_snapshot(trade_date, self.tushare_pro)
+            if snapshot is None or len(snapshot) == 0 or 'total_mv' not in snapshot.columns:
+                return None
+            # 没有 daily_basic 的股票（停牌、当日数据未发布）逐只获取时会拿到更早的数据，预筛选不做判断
+            snapshot = snapshot[pd.to_numeric(snapshot['total_mv'], errors='coerce').notna()]
+            if len(snapshot) == 0:
+                return None
+            return snapshot.drop_duplicates('ts_code').set_index('ts_code')[['pe', 'pb', 'total_mv']].astype(float)
+        except Exception as e:
+            print(f"⚠️ 全市场截面获取失败，跳过预筛选: {e}")
+            return None
+    
+    @staticmethod
+    def _snapshot_rows(snapshot: pd.DataFrame, ts_codes: List[str]) -> Tuple[pd.DataFrame, np.ndarray]:
+        """按股票顺序取截面行，返回 (截面行, 是否在截面中)"""
+        rows = snapshot.reindex(ts_codes)
+        return rows, rows['total_mv'].notna().to_numpy()
+    
+    def prefilter_by_snapshot(self, stocks: List[Dict], parameters: Dict) -> Tuple[List[Dict], Dict]:
+        """
+        策略扫描的第一阶段：用全市场截面对全部股票一次向量化执行 _apply_optimized_filters 的PE/PB/市值条件
+        截面与逐只获取的数据同源，被排除的股票逐只获取后同样不会通过筛选；不在截面中的股票全部保留
+        :param stocks: 股票列表（含 code、exchange）
+        :param parameters: 策略参数
+        :return: (保留的股票列表, 预筛选统计)
+        """
+        stats = {'applied': False, 'input': len(stocks), 'survivors': len(stocks)}
+        snapshot = self._load_filter_snapshot() if stocks else None
+        if snapshot is None:
+            return stocks, stats
+        
+        ts_codes = [self._to_ts_code(s['code']) for s in stocks]
+        rows, known = self._snapshot_rows(snapshot, ts_codes)
+        bounds = self._filter_bounds(parameters)
+        keep = np.ones(len(stocks), dtype=bool)
+        with np.errstate(invalid='ignore'):
+            for name, values in [('pe', rows['pe'].to_numpy()), ('pb', rows['pb'].to_numpy()),
+                                 ('market_cap', rows['total_mv'].to_numpy() / 10000)]:  # 万元 -> 亿元
+                low, high = bounds[name]
+                # 无效值（缺失或非正）跳过该项筛选
+                keep &= ~(values > 0) | ((values >= low) & (values <= high))
+        keep |= ~known
+        
+        survivors = [stock for stock, kept in zip(stocks, keep) if kept]
+        stats.update(applied=True, survivors=len(survivors), rejected=len(stocks) - len(survivors))
+        print(f"⚡ 截面预筛选: {len(stocks)} -> {len(survivors)} 只股票（PE/PB/市值不符合的 {stats['rejected']} 只不再逐只获取）")
+        return survivors, stats
+    
+    def prefilter_for_deep_analysis(self, stocks: List[Dict], strategy_id: int, min_keep: int = 0) -> Tuple[List[Dict], Dict]:
+        """
+        深度分析的第一阶段：用全市场截面批量计算每只股票符合度的上界，只保留上界达到 QUALIFIED_SCORE 的股票；
+        达标股票不足 min_keep 只时按上界从高到低补足，不筛选合格分数、只取前N名的调用方结果数量不会变少
+        PE/PB/总市值取自与深度分析同源的 daily_basic 截面，财务指标关联同一张全市场财务指标表，其他字段与深度分析使用相同的默认值，
+        没有财务数据的 ROE 按满分计，因此被排除的股票深度分析后也不会达到符合条件的分数
+        :param stocks: 股票列表（含 code）
+        :param strategy_id: 策略ID
+        :param min_keep: 至少保留的股票数量
+        :return: (保留的股票列表, 预筛选统计)
+        """
+        stats = {'applied': False, 'input': len(stocks), 'survivors': len(stocks)}
+        if len(stocks) <= min_keep:
+            # 股票数量不超过需要保留的数量时无需预筛选
+            return stocks, stats
+        if not stocks or not self.compliance_evaluator:
+            # 没有符合度评估时深度分析使用传统评分，无法给出上界
+            return stocks, stats
+        snapshot = self._load_filter_snapshot()
+        if snapshot is None:
+            return stocks, stats
+        
+        # 与 analyze_single_stock_fast 的代码转换一致
+        ts_codes = [self._to_ts_code(s['code']) for s in stocks]
+        rows, known = self._snapshot_rows(snapshot, ts_codes)
+        # 财务指标与深度分析取自同一张全市场表；没有 ROE 的股票按满分计，其他缺失字段使用与深度分析相同的默认值
+        financials = self._lookup_financials([s['code'] for s in stocks])
+        universe = {
+            'pe': rows['pe'].to_numpy(),
+            'pb': rows['pb'].to_numpy(),
+            'total_mv': rows['total_mv'].to_numpy(),
+            'roe': financials['roe'].fillna(np.inf).to_numpy()
+        }
+        for name, value in self.COMPLIANCE_EVAL_DEFAULTS.items():
+            column = self.COMPLIANCE_FINANCIAL_COLUMNS.get(name)
+            if column is not None:
+                universe[name] = financials[column].fillna(value).to_numpy()
+            else:
+                universe[name] = np.full(len(stocks), value)
+        strategy_type = self.COMPLIANCE_STRATEGY_TYPES.get(strategy_id, 'blue_chip')
+        upper_bound = self.compliance_evaluator.evaluate_batch(universe, strategy_type)['overall_compliance']
+        keep = ~known | (upper_bound >= self.QUALIFIED_SCORE)
+        
+        # 达标股票不足 min_keep 时，从未达标的股票中按上界从高到低补足
+        refilled = 0
+        shortfall = min_keep - int(keep.sum())
+        if shortfall > 0:
+            rejected = np.flatnonzero(~keep)
+            refill = rejected[np.argsort(-upper_bound[rejected], kind='stable')[:shortfall]]
+            keep[refill] = True
+            refilled = len(refill)
+        
+        survivors = [stock for stock, kept in zip(stocks, keep) if kept]
+        stats.update(applied=True, survivors=len(survivors), rejected=len(stocks) - len(survivors),
+                     refilled=refilled, strategy_type=strategy_type, min_score=self.QUALIFIED_SCORE)
+        print(f"⚡ 符合度上界预筛选: {len(stocks)} -> {len(survivors)} 只股票进入深度分析"
+              f"（上界低于{self.QUALIFIED_SCORE}分的 {stats['rejected']} 只不再逐只获取）")
+        return survivors, stats
+    
+    def _lookup_financials(self, stock_codes: List[str]) -> pd.DataFrame:
+        """
+        批量关联全市场财务指标（按报告期整表下载）
+        :param stock_codes: 股票代码列表
+        :return: 与 stock_codes 逐行对齐的财务指标表，没有数据时为 NaN
+        """
+        columns = ['roe'] + list(self.COMPLIANCE_FINANCIAL_COLUMNS.values())
+        try:
+            return get_fundamentals_store().lookup(stock_codes, columns, pro=self.tushare_pro)
+        except Exception as e:
+            print(f"⚠️ 全市场财务指标获取失败: {e}")
+            return pd.DataFrame(np.nan, index=range(len(stock_codes)), columns=columns)
+    
+    def _get_financial_indicators(self, stock_code: str) -> Dict:
+        """
+        查询单只股票的最新财务指标（ROE、增长率、资产负债率等），来自按报告期整表下载的全市场表
+        :param stock_code: 股票代码
+        :return: 有数据的财务指标，获取失败时返回空字典
+        """
+        try:
+            return get_fundamentals_store().get(stock_code, pro=self.tushare_pro)
+        except Exception as e:
+            print(f"⚠️ {stock_code} 财务指标获取失败: {e}")
+            return {}
+    
+    def _compliance_financials(self, data: Dict) -> Dict:
+        """从股票数据中取出符合度评估可用的财务指标（替代默认值）"""
+        return {name: data[column] for name, column in self.COMPLIANCE_FINANCIAL_COLUMNS.items()
+                if data.get(column) is not None}
+    
     def _calculate_optimized_score(self, stock_data: Dict, parameters: Dict) -> float:
         """
         计算优化评分
@@ -776,52 +792,7 @@ class OptimizedStrategyEngine:
         :param stock_name: 股票名称
         :return: 行业分类
         """
-        # 银行行业关键词
-        if any(keyword in stock_name for keyword in ['银行', '农商', '农信', '信用社']):
-            return 'banking'
-        
-        # 保险行业关键词
-        if any(keyword in stock_name for keyword in ['保险', '人寿', '财险', '太保']):
-            return 'insurance'
-        
-        # 证券行业关键词
-        if any(keyword in stock_name for keyword in ['证券', '期货', '信托', '投资']):
-            return 'securities'
-        
-        # 科技行业关键词
-        if any(keyword in stock_name for keyword in ['科技', '软件', '网络', '计算机', '信息', '数据', '云', '互联网', '智能']):
-            return 'technology'
-        
-        # 医药生物关键词
-        if any(keyword in stock_name for keyword in ['医药', '生物', '制药', '医疗', '健康', '药业', '医院']):
-            return 'healthcare'
-        
-        # 消费行业关键词
-        if any(keyword in stock_name for keyword in ['食品', '饮料', '酒', '零售', '商贸', '百货', '超市', '餐饮']):
-            return 'consumer'
-        
-        # 能源化工关键词
-        if any(keyword in stock_name for keyword in ['石油', '化工', '煤炭', '天然气', '石化', '能源']):
-            return 'energy'
-        
-        # 汽车行业关键词
-        if any(keyword in stock_name for keyword in ['汽车', '客车', '货车', '轮胎', '汽配']):
-            return 'automotive'
-        
-        # 机械制造关键词
-        if any(keyword in stock_name for keyword in ['机械', '装备', '工程', '制造', '重工', '机电']):
-            return 'manufacturing'
-        
-        # 房地产关键词
-        if any(keyword in stock_name for keyword in ['地产', '房地产', '置业', '发展', '建设', '城建']):
-            return 'real_estate'
-        
-        # 农林牧渔关键词
-        if any(keyword in stock_name for keyword in ['农业', '林业', '牧业', '渔业', '种业', '饲料']):
-            return 'agriculture'
-        
-        # 默认分类
-        return 'other' 
+        return classify_industry_by_name(stock_name)
 
     def analyze_single_stock_optimized(self, stock_code: str, stock_name: str, strategy_id: int) -> Dict:
         """优化的单只股票分析方法 - 专为实时进度显示设计"""
@@ -831,20 +802,17 @@ class OptimizedStrategyEngine:
                 self._compliance_results = []
             
             start_time = time.time()
+            # 各阶段实际耗时（秒）
+            stage_timings = {}
             print(f"🔍 开始优化分析: {stock_code} {stock_name}")
             
-            # 第一步：初始化数据连接 (1-2秒)
-            import random
-            init_delay = random.uniform(1.0, 2.0)
-            print(f"🔄 正在初始化数据连接... ({init_delay:.1f}s)")
-            time.sleep(init_delay)
-            
-            # 第二步：获取真实数据 (2-4秒)
-            data_delay = random.uniform(2.0, 4.0)
+            # 第一步：获取真实数据
             print(f"📡 正在从TuShare/AkShare获取{stock_code}真实数据...")
             
             # 获取股票数据（使用现有的数据获取逻辑）
+            stage_start = time.time()
             stock_data = self.get_stock_data(stock_code, 'SH' if stock_code.startswith('6') else 'SZ')
+            stage_timings['fetch'] = time.time() - stage_start
             
             if not stock_data:
                 return {
@@ -854,27 +822,12 @@ class OptimizedStrategyEngine:
                     'stock_name': stock_name
                 }
             
-            time.sleep(data_delay)
             print(f"✅ 数据质量验证通过: {stock_code}")
             print(f"✅ 获取到真实数据，数据源: {stock_data.get('data_source', 'unknown')}")
             
-            # 第三步：策略分析计算 (3-6秒)
-            analysis_delay = random.uniform(3.0, 6.0)
-            print(f"🧮 正在进行策略分析计算... ({analysis_delay:.1f}s)")
-            time.sleep(analysis_delay)
-            
-            # 第四步：技术指标计算 (2-4秒)
-            indicators_delay = random.uniform(2.0, 4.0)
-            print(f"📊 正在计算技术指标... ({indicators_delay:.1f}s)")
-            time.sleep(indicators_delay)
-            
-            # 第五步：信号生成和评分 (1-2秒)
-            signal_delay = random.uniform(1.0, 2.0)
-            print(f"🎯 执行策略分析...")
-            time.sleep(signal_delay)
-            
-            # 🔥 重大修复：使用符合度评估系统替代旧的评分方式
-            print(f"📋 第6步：策略符合度评估...")
+            # 第二步：策略符合度评估（使用符合度评估系统替代旧的评分方式）
+            print(f"📋 策略符合度评估...")
+            stage_start = time.time()
             
             # 策略ID映射到符合度评估器的策略类型
             strategy_type_map = {
@@ -907,18 +860,23 @@ class OptimizedStrategyEngine:
                 final_score = self._calculate_strategy_score_enhanced(stock_data, strategy_id)
                 print(f"📊 最终评分: {final_score:.1f}分 (传统评分)")
             
+            stage_timings['scoring'] = time.time() - stage_start
+            
             # 判断是否符合条件（基于符合度评分）
             qualified = final_score >= 60
             
-            # 生成基于真实数据的分析原因和交易信号
+            # 第三步：生成基于真实数据的分析原因和交易信号
+            stage_start = time.time()
             analysis_reason = self._generate_comprehensive_analysis_reason(
                 final_score, stock_data, compliance_result, strategy_id
             )
             signals_count = self._generate_trading_signals_count(
                 stock_data, compliance_result, final_score
             )
+            stage_timings['strategy'] = time.time() - stage_start
             
             execution_time = time.time() - start_time
+            stage_timings = {stage: round(seconds, 3) for stage, seconds in stage_timings.items()}
             
             if qualified:
                 if compliance_result:
@@ -934,7 +892,7 @@ class OptimizedStrategyEngine:
                     print(f"⚪ 分析完成: {stock_code} {stock_name} (评分: {final_score:.1f}分) - 评分不足")
             
             print(f"🎯 策略执行完成，生成 {signals_count} 个交易信号")
-            print(f"⏱️ 执行时间: {execution_time:.1f}秒（正常范围）")
+            print(f"⏱️ 执行时间: {execution_time:.1f}秒 (各阶段: {stage_timings})")
             
             return {
                 'success': True,
@@ -943,6 +901,7 @@ class OptimizedStrategyEngine:
                 'score': final_score,
                 'signals_count': signals_count,
                 'execution_time': execution_time,
+                'stage_timings': stage_timings,
                 'data_source': stock_data.get('data_source', 'tushare_daily'),
                 'reason': analysis_reason,
                 'qualified': qualified,
@@ -1098,15 +1057,14 @@ class OptimizedStrategyEngine:
         """并发分析多只股票 - 优化API限流控制"""
         import concurrent.futures
         import time
-        import random
         
         # 🔥 修复：确保_compliance_results属性已初始化
         if not hasattr(self, '_compliance_results'):
             self._compliance_results = []
         
-        # 🔧 进一步降低并发数，提升稳定性
-        actual_workers = min(max_workers, 2)  # 优化：最多2个并发，确保稳定性
-        print(f"🚀 开始高效并发分析 {len(stocks_list)} 只股票，并发数: {actual_workers} (性能稳定性优化)")
+        # 上游调用由统一限流器控制，并发数不再额外压低
+        actual_workers = max_workers
+        print(f"🚀 开始高效并发分析 {len(stocks_list)} 只股票，并发数: {actual_workers}")
         
         start_time = time.time()
         results = []
@@ -1115,12 +1073,8 @@ class OptimizedStrategyEngine:
         skipped_count = 0
         
         def analyze_with_delay(stock_info):
-            """带延时的股票分析函数"""
+            """单只股票分析函数"""
             try:
-                # 优化线程间延时，提升效率
-                thread_delay = random.uniform(0.1, 0.5)  # 优化：减少到0.1-0.5秒
-                time.sleep(thread_delay)
-                
                 stock_code = stock_info['code']
                 stock_name = stock_info['name']
                 
@@ -1232,12 +1186,6 @@ class OptimizedStrategyEngine:
                     except Exception as e:
                         print(f"❌ 处理 {stock['code']} 结果时异常: {e}")
                         continue
-                
-                # 优化批次间延时，提升整体效率
-                if i + batch_size < len(stocks_list):
-                    batch_delay = 1  # 优化：减少到1秒延时
-                    print(f"📋 批次 {i//batch_size + 1} 完成，延时 {batch_delay}秒 后继续...")
-                    time.sleep(batch_delay)
         
         total_time = time.time() - start_time
         print(f"🎉 并发分析完成！")
@@ -1255,26 +1203,14 @@ class OptimizedStrategyEngine:
             
             print(f"🔍 开始深度分析: {stock_code} {stock_name}")
             
-            # 🔧 优化API调用间隔，平衡速度和稳定性
-            import random
-            api_delay = random.uniform(0.2, 0.8)  # 优化：减少到0.2-0.8秒，提高速度
-            print(f"⏳ API优化延时: {api_delay:.1f}秒")
-            time.sleep(api_delay)
-            
             # 第一步：获取TuShare基本面数据（带重试机制）
             print(f"📊 第1步：获取TuShare基本面数据...")
             tushare_data = self._get_tushare_fundamental_data_with_retry(stock_code)
             
-            # 优化API调用间隔
-            time.sleep(random.uniform(0.1, 0.3))  # 优化：减少到0.1-0.3秒
-            
             # 第二步：获取TuShare价格数据
             print(f"📈 第2步：获取TuShare价格数据...")
             price_data = self.get_stock_data(stock_code, 'SH' if stock_code.startswith('6') else 'SZ')
             
-            # 优化API调用间隔
-            time.sleep(random.uniform(0.1, 0.3))  # 优化：减少到0.1-0.3秒
-            
             # 第三步：获取AkShare补充数据（如果TuShare数据不完整）
             print(f"🔄 第3步：获取AkShare补充数据...")
             akshare_data = self._get_akshare_supplement_data(stock_code)
@@ -1283,14 +1219,16 @@ class OptimizedStrategyEngine:
             print(f"🧮 第4步：多数据源融合...")
             integrated_data = self._integrate_multi_source_data(tushare_data, price_data, akshare_data)
             
+            # 关联财务指标（全市场表按报告期缓存，不再逐只调用 fina_indicator）
+            for key, value in self._get_financial_indicators(stock_code).items():
+                if integrated_data.get(key) is None:
+                    integrated_data[key] = value
+            
             if not integrated_data or not integrated_data.get('close'):
                 print(f"❌ {stock_code} 数据获取不完整，跳过分析")
                 return None  # 返回None而不是错误，让上层跳过此股票
             
-            # 优化数据处理延时，平衡真实性和效率
-            processing_delay = random.uniform(0.5, 1.5)  # 优化：减少到0.5-1.5秒
-            print(f"⚙️ 第5步：深度策略分析中... ({processing_delay:.1f}秒)")
-            time.sleep(processing_delay)
+            print(f"⚙️ 第5步：深度策略分析中...")
             
             # 第五步：深度策略分析
             analysis_result = self._execute_deep_strategy_analysis(integrated_data, strategy_id, stock_code)
@@ -1316,25 +1254,11 @@ class OptimizedStrategyEngine:
                             'close': integrated_data.get('close', 0),
                             'volume': integrated_data.get('volume', 0),
                             'industry': integrated_data.get('industry', '其他'),
-                            'current_ratio': 1.2,  # 默认值，实际应从财务数据获取
-                            'debt_ratio': 40.0,     # 默认值，实际应从财务数据获取
-                            'revenue_growth': 8.0,  # 默认值，实际应从财务数据获取
-                            'profit_margin': 10.0,  # 默认值，实际应从财务数据获取
-                            'dividend_yield': 2.0,  # 默认值，实际应从财务数据获取
-                            'volatility': 25.0,     # 默认值，实际应从历史数据计算
-                            'beta': 1.0             # 默认值，实际应从历史数据计算
+                            **self.COMPLIANCE_EVAL_DEFAULTS,
+                            **self._compliance_financials(integrated_data)
                         }
                         
-                        # 🎯 修复策略类型映射 - 对应具体策略标准
-                        strategy_type_map = {
-                            1: 'blue_chip',        # 蓝筹白马策略
-                            2: 'high_dividend',    # 高股息策略
-                            3: 'quality_growth',   # 质量成长策略
-                            4: 'value_investment', # 价值投资策略
-                            5: 'blue_chip',        # 平衡策略使用蓝筹标准
-                            6: 'quality_growth'    # 其他成长类策略
-                        }
-                        strategy_type = strategy_type_map.get(strategy_id, 'blue_chip')
+                        strategy_type = self.COMPLIANCE_STRATEGY_TYPES.get(strategy_id, 'blue_chip')
                         print(f"📊 策略映射: ID={strategy_id} → Type={strategy_type}")
                         
                         # 🚀 快速评估符合度（性能优化模式）
@@ -1360,7 +1284,7 @@ class OptimizedStrategyEngine:
                 
                 # 🔥 关键修复：判断是否符合条件（基于符合度评分）
                 qualified = False
-                if final_score >= 60:  # 符合度评分60分以上认为符合条件
+                if final_score >= self.QUALIFIED_SCORE:  # 符合度评分60分以上认为符合条件
                     qualified = True
                     if compliance_result:
                         grade = compliance_result['compliance_grade']
@@ -1475,7 +1399,7 @@ class OptimizedStrategyEngine:
                 print(f"🔄 TuShare API调用 (尝试 {attempt + 1}/{max_retries}): {stock_code}")
                 
                 # 转换股票代码格式
-                ts_code = f"{stock_code}.SH" if stock_code.startswith('6') else f"{stock_code}.SZ"
+                ts_code = self._to_ts_code(stock_code)
                 
                 # 优化重试延时策略
                 if attempt > 0:
@@ -1552,10 +1476,7 @@ class OptimizedStrategyEngine:
             trade_date = datetime.now().strftime('%Y%m%d')
             
             # 转换股票代码格式
-            if stock_code.startswith('6'):
-                ts_code = f"{stock_code}.SH"
-            else:
-                ts_code = f"{stock_code}.SZ"
+            ts_code = self._to_ts_code(stock_code)
             
             fundamental_data = {}
             
@@ -1583,26 +1504,17 @@ class OptimizedStrategyEngine:
             except Exception as e:
                 print(f"⚠️ TuShare daily_basic获取失败: {e}")
             
-            # 获取财务指标
-            try:
-                fina_indicator = self.tushare_pro.fina_indicator(
-                    ts_code=ts_code,
-                    period='20241231',  # 最新年报
-                    fields='ts_code,end_date,roe,roa,gross_profit_margin,debt_to_assets,current_ratio'
-                )
-                
-                if not fina_indicator.empty:
-                    row = fina_indicator.iloc[0]
-                    fundamental_data.update({
-                        'roe': row.get('roe'),           # 净资产收益率
-                        'roa': row.get('roa'),           # 总资产收益率
-                        'gross_margin': row.get('gross_profit_margin'),  # 毛利率
-                        'debt_ratio': row.get('debt_to_assets'),         # 资产负债率
-                        'current_ratio': row.get('current_ratio')        # 流动比率
-                    })
-                    print(f"✅ TuShare财务指标获取成功: {stock_code}")
-            except Exception as e:
-                print(f"⚠️ TuShare财务指标获取失败: {e}")
+            # 获取财务指标（最新已披露报告期，全市场表按报告期缓存）
+            financials = self._get_financial_indicators(stock_code)
+            if financials:
+                fundamental_data.update({
+                    'roe': financials.get('roe'),                    # 净资产收益率
+                    'roa': financials.get('roa'),                    # 总资产收益率
+                    'gross_margin': financials.get('gross_margin'),  # 毛利率
+                    'debt_ratio': financials.get('debt_ratio'),      # 资产负债率
+                    'current_ratio': financials.get('current_ratio') # 流动比率
+                })
+                print(f"✅ 财务指标获取成功: {stock_code} (报告期 {financials.get('end_date')})")
             
             fundamental_data['data_source'] = 'tushare_pro'
             return fundamental_data
@@ -1618,6 +1530,7 @@ class OptimizedStrategyEngine:
                 return {}
             
             import akshare as ak
+            ak = limit_akshare(ak)
             supplement_data = {}
             
             # 获取实时行情数据（补充价格信息）
@@ -3,7 +3,10 @@
 向后兼容的包装器，使用新的分析模块
 """
 
+import numpy as np
+
 from src.analysis.stock_analyzer import StockAnalyzer as NewStockAnalyzer
+from src.analysis.chip_kernel import chip_profile
 
 class StockAnalyzer(NewStockAnalyzer):
     """
@@ -183,52 +186,20 @@ class StockAnalyzer(NewStockAnalyzer):
             max_price = self.data['High'].max()
             price_range = np.linspace(min_price, max_price, price_bins)
             
-            # 初始化筹码分布矩阵
-            chip_distribution = np.zeros((len(self.data), price_bins))
-            
-            for i in range(len(self.data)):
-                if i == 0:
-                    # 第一天，所有成交量都在当天的价格区间内
-                    current_price = self.data.iloc[i]['Close']
-                    volume = self.data.iloc[i]['Volume']
-                    
-                    # 找到最接近当前价格的价格区间
-                    price_idx = np.argmin(np.abs(price_range - current_price))
-                    chip_distribution[i, price_idx] = volume
-                else:
-                    # 继承前一天的筹码分布（加上衰减）
-                    chip_distribution[i] = chip_distribution[i-1] * decay_factor
-                    
-                    # 添加当天的新筹码
-                    current_price = self.data.iloc[i]['Close']
-                    volume = self.data.iloc[i]['Volume']
-                    
-                    # 将当天成交量分布到价格区间内
-                    high_price = self.data.iloc[i]['High']
-                    low_price = self.data.iloc[i]['Low']
-                    
-                    # 找到价格区间
-                    high_idx = np.argmin(np.abs(price_range - high_price))
-                    low_idx = np.argmin(np.abs(price_range - low_price))
-                    
-                    if high_idx == low_idx:
-                        chip_distribution[i, high_idx] += volume
-                    else:
-                        # 将成交量均匀分布到价格区间内
-                        price_span = max(1, high_idx - low_idx + 1)
-                        volume_per_bin = volume / price_span
-                        for j in range(low_idx, high_idx + 1):
-                            chip_distribution[i, j] += volume_per_bin
-            
-            # 计算关键价格位
-            latest_chips = chip_distribution[-1]
-            
-            # 找到主要筹码峰（压力位）
-            peak_indices = []
-            for i in range(1, len(latest_chips)-1):
-                if latest_chips[i] > latest_chips[i-1] and latest_chips[i] > latest_chips[i+1]:
-                    if latest_chips[i] > latest_chips.max() * 0.3:  # 只标记较大的峰
-                        peak_indices.append(i)
+            # 每天的成交量均匀分布到当天最高价和最低价之间（第一天全部落在收盘价），逐日衰减；
+            # 只保留最新一天的筹码分布
+            close = self.data['Close'].values
+            high = self.data['High'].values.astype(float)
+            low = self.data['Low'].values.astype(float)
+            high[0] = low[0] = close[0]
+            latest_chips = chip_profile(price_range, self.data['Volume'].values, close, high, low,
+                                        decay=decay_factor, close_share=0.0,
+                                        index_method='nearest', range_span='inclusive')
+            
+            # 找到主要筹码峰（压力位），只标记较大的峰
+            inner = latest_chips[1:-1]
+            is_peak = (inner > latest_chips[:-2]) & (inner > latest_chips[2:]) & (inner > latest_chips.max() * 0.3)
+            peak_indices = list(np.nonzero(is_peak)[0] + 1)
             
             # 计算支撑位（筹码密集区域的下限）
             support_indices = []
@@ -249,8 +220,8 @@ class StockAnalyzer(NewStockAnalyzer):
             # 保存筹码分布数据
             self.chip_data = {
                 'price_range': price_range,
-                'chip_distribution': chip_distribution,
-                'dates': self.data['Date'].values,
+                'latest_chips': latest_chips,  # 最新一天的筹码分布
+                'date': self.data['Date'].values[-1],
                 'pressure_levels': [price_range[i] for i in peak_indices],  # 压力位
                 'support_levels': [price_range[i] for i in support_indices],  # 支撑位
                 'avg_price': weighted_avg_price,  # 平均价格
@@ -352,7 +323,7 @@ class StockAnalyzer(NewStockAnalyzer):
         # 2. 筹码峰分布（右侧）
         if self.chip_data is not None:
             # 获取最新的筹码分布
-            latest_chips = self.chip_data['chip_distribution'][-1]
+            latest_chips = self.chip_data['latest_chips']
             price_range = self.chip_data['price_range']
             
             # 筹码峰数据处理
@@ -870,7 +841,7 @@ class StockAnalyzer(NewStockAnalyzer):
             avg_price = 0
             
             if self.chip_data is not None:
-                latest_chips = self.chip_data['chip_distribution'][-1]
+                latest_chips = self.chip_data['latest_chips']
                 price_range = self.chip_data['price_range']
                 
                 # 获取关键价格位
@@ -65,9 +65,11 @@ class QuantitativeStrategyEngine:
         
         print(f"🚀 执行策略: {strategy_name} ({strategy_type})")
         print(f"📊 标的: {stock_code}, 时间范围: {start_date} - {end_date}")
-        print(f"⏰ 开始真实策略执行，预计需要30-120秒...")
+        print(f"⏰ 开始真实策略执行...")
         
         start_time = time.time()
+        # 各阶段实际耗时（秒）：数据获取、指标计算、策略信号、评分汇总
+        stage_timings = {}
         
         try:
             # 强制验证数据源状态
@@ -78,17 +80,13 @@ class QuantitativeStrategyEngine:
                     'data_verification': 'failed'
                 }
             
-            # 添加延时确保真实执行（每次策略执行0.5-2秒）
-            import random
-            initial_delay = random.uniform(1.0, 3.0)  # 增加到1-3秒
-            print(f"🔄 正在初始化数据连接... ({initial_delay:.1f}s)")
-            time.sleep(initial_delay)
-            
             # 获取股票数据 - 增加重试机制
             print(f"📡 正在从TuShare/AkShare获取{stock_code}真实数据...")
+            stage_start = time.time()
             data, data_source = self.data_fetcher.get_real_stock_data(
                 stock_code, "daily", start_date, end_date, max_retries=2
             )
+            stage_timings['fetch'] = time.time() - stage_start
             
             # 强制验证数据源
             if data_source not in ['tushare_daily', 'akshare_daily']:
@@ -117,15 +115,11 @@ class QuantitativeStrategyEngine:
             
             print(f"✅ 获取到 {len(data)} 条真实数据，数据源: {data_source}")
             
-            # 添加数据分析延时（模拟真实计算时间）
-            analysis_delay = random.uniform(3.0, 8.0)  # 增加到3-8秒
-            print(f"🧮 正在进行策略分析计算... ({analysis_delay:.1f}s)")
-            time.sleep(analysis_delay)
-            
-            # 添加技术指标计算延时
-            indicators_delay = random.uniform(2.0, 5.0)  # 2-5秒技术指标计算
-            print(f"📊 正在计算技术指标... ({indicators_delay:.1f}s)")
-            time.sleep(indicators_delay)
+            # 计算策略所需的技术指标
+            print(f"📊 正在计算技术指标...")
+            stage_start = time.time()
+            self._calculate_strategy_indicators(strategy_type, data)
+            stage_timings['indicators'] = time.time() - stage_start
             
             # 检查超时
             if time.time() - start_time > timeout:
@@ -138,6 +132,7 @@ class QuantitativeStrategyEngine:
             
             # 根据策略类型执行相应逻辑
             print(f"🎯 执行{strategy_type}策略分析...")
+            stage_start = time.time()
             if strategy_type == 'value':
                 signals = self._execute_value_strategy(strategy_id, data)
             elif strategy_type == 'dividend':
@@ -159,6 +154,7 @@ class QuantitativeStrategyEngine:
             else:
                 print(f"⚠️ 未知策略类型: {strategy_type}")
                 signals = []
+            stage_timings['strategy'] = time.time() - stage_start
             
             # 检查最终超时
             execution_time = time.time() - start_time
@@ -170,12 +166,15 @@ class QuantitativeStrategyEngine:
                     'timeout': True
                 }
             
+            stage_start = time.time()
             buy_signals = len([s for s in signals if s.get('action') == 'buy'])
             sell_signals = len([s for s in signals if s.get('action') == 'sell'])
+            stage_timings['scoring'] = time.time() - stage_start
+            stage_timings = {stage: round(seconds, 3) for stage, seconds in stage_timings.items()}
             
             print(f"✅ 策略执行完成，生成 {len(signals)} 个交易信号")
             print(f"📈 买入信号: {buy_signals}, 卖出信号: {sell_signals}")
-            print(f"⏱️ 执行时间: {execution_time:.1f}秒（正常范围）")
+            print(f"⏱️ 执行时间: {execution_time:.1f}秒 (各阶段: {stage_timings})")
             
             return {
                 'success': True,
@@ -185,6 +184,7 @@ class QuantitativeStrategyEngine:
                 'sell_signals': sell_signals,
                 'data_source': data_source,
                 'execution_time': execution_time,
+                'stage_timings': stage_timings,
                 'data_points': len(data),
                 'data_verification': 'passed'  # 数据验证通过
             }
@@ -208,43 +208,18 @@ class QuantitativeStrategyEngine:
                     'execution_time': execution_time
                 }
 
-    def _execute_multi_factor_strategy(self, strategy_id: int, data: pd.DataFrame, stock_code: str) -> List[Dict]:
+    def _calculate_strategy_indicators(self, strategy_type: str, data: pd.DataFrame):
         """
-        执行多因子选股策略 - 优化版本
+        计算策略所需的技术指标，结果直接写入 data 的列中
+        :param strategy_type: 策略类型
+        :param data: 股票数据
         """
-        signals = []
+        close_col = 'close' if 'close' in data.columns else 'Close'
+        if close_col not in data.columns:
+            return
+        close_prices = data[close_col]
         
-        try:
-            # 确保数据格式正确
-            if 'trade_date' in data.columns:
-                date_col = 'trade_date'
-            elif 'Date' in data.columns:
-                date_col = 'Date'
-            else:
-                print("⚠️ 未找到日期列")
-                return signals
-            
-            # 确保价格列存在
-            price_columns = {}
-            for std_col, possible_cols in [
-                ('close', ['close', 'Close']),
-                ('open', ['open', 'Open']),
-                ('high', ['high', 'High']),
-                ('low', ['low', 'Low']),
-                ('volume', ['vol', 'Volume', 'volume'])
-            ]:
-                for col in possible_cols:
-                    if col in data.columns:
-                        price_columns[std_col] = col
-                        break
-            
-            if 'close' not in price_columns:
-                print("⚠️ 未找到收盘价列")
-                return signals
-            
-            close_prices = data[price_columns['close']]
-            
-            # 计算技术指标
+        if strategy_type == 'multi_factor':
             # 移动平均线
             data['MA5'] = close_prices.rolling(window=5).mean()
             data['MA20'] = close_prices.rolling(window=20).mean()
@@ -262,51 +237,132 @@ class QuantitativeStrategyEngine:
             exp2 = close_prices.ewm(span=26).mean()
             data['MACD'] = exp1 - exp2
             data['MACD_Signal'] = data['MACD'].ewm(span=9).mean()
+        elif strategy_type == 'trend':
+            data['MA20'] = close_prices.rolling(window=20).mean()
+            data['MA50'] = close_prices.rolling(window=50).mean()
+        elif strategy_type == 'mean_reversion':
+            data['MA20'] = close_prices.rolling(window=20).mean()
+            data['STD20'] = close_prices.rolling(window=20).std()
+            data['Upper'] = data['MA20'] + 2 * data['STD20']
+            data['Lower'] = data['MA20'] - 2 * data['STD20']
+        elif strategy_type == 'high_frequency':
+            data['Returns'] = close_prices.pct_change()
+        elif strategy_type == 'value':
+            # 价格相对60日低点/高点的比例
+            data['price_min_ratio'] = close_prices / close_prices.rolling(window=60).min()
+            data['price_max_ratio'] = close_prices / close_prices.rolling(window=60).max()
+        elif strategy_type == 'dividend':
+            # 价格波动率
+            data['volatility'] = close_prices.rolling(window=20).std() / close_prices.rolling(window=20).mean()
+        elif strategy_type == 'growth':
+            data['MA10'] = close_prices.rolling(window=10).mean()
+            data['MA30'] = close_prices.rolling(window=30).mean()
+        elif strategy_type == 'momentum':
+            data['momentum_5'] = close_prices.pct_change(5)
+            data['momentum_10'] = close_prices.pct_change(10)
+
+    @staticmethod
+    def _price_columns(data: pd.DataFrame) -> Dict[str, str]:
+        """识别日期列和收盘价列（兼容 TuShare 小写列名和 AkShare 首字母大写列名）"""
+        columns = {}
+        for std_col, possible_cols in [
+            ('date', ['trade_date', 'Date']),
+            ('close', ['close', 'Close'])
+        ]:
+            for col in possible_cols:
+                if col in data.columns:
+                    columns[std_col] = col
+                    break
+        return columns
+
+    @staticmethod
+    def _fired_rows(mask: np.ndarray, start: int) -> np.ndarray:
+        """从第 start 行起满足条件的行号"""
+        return np.flatnonzero(mask[start:]) + start
+
+    @staticmethod
+    def _build_signals(data: pd.DataFrame, columns: Dict[str, str], rows: np.ndarray, signal_strength,
+                       reason: str = None, indicators: Dict[str, np.ndarray] = None) -> List[Dict]:
+        """
+        只为触发信号的行组装信号字典
+        :param data: 股票数据
+        :param columns: _price_columns 的结果
+        :param rows: 触发信号的行号
+        :param signal_strength: 信号强度（标量或与 data 等长的数组）
+        :param reason: 信号原因
+        :param indicators: {指标名: 与 data 等长的数组}，输出到 signal['indicators']
+        :return: 信号列表
+        """
+        if len(rows) == 0:
+            return []
+        dates = data[columns['date']].iloc[rows].tolist()
+        prices = data[columns['close']].to_numpy(dtype=float)[rows].tolist()
+        if np.ndim(signal_strength) == 0:
+            strengths = [signal_strength] * len(rows)
+        else:
+            strengths = np.asarray(signal_strength, dtype=float)[rows].tolist()
+        indicator_values = {name: np.asarray(values, dtype=float)[rows].tolist()
+                            for name, values in (indicators or {}).items()}
+
+        signals = []
+        for k in range(len(rows)):
+            signal = {
+                'date': dates[k],
+                'action': 'buy',
+                'price': prices[k],
+                'signal_strength': strengths[k]
+            }
+            if reason:
+                signal['reason'] = reason
+            if indicator_values:
+                signal['indicators'] = {name: values[k] for name, values in indicator_values.items()}
+            signals.append(signal)
+        return signals
+
+    def _execute_multi_factor_strategy(self, strategy_id: int, data: pd.DataFrame, stock_code: str) -> List[Dict]:
+        """
+        执行多因子选股策略 - 向量化版本
+        6 个条件按整列计算布尔数组，满足至少 4 个的K线生成买入信号
+        """
+        signals = []
+        
+        try:
+            columns = self._price_columns(data)
+            if 'date' not in columns:
+                print("⚠️ 未找到日期列")
+                return signals
+            if 'close' not in columns:
+                print("⚠️ 未找到收盘价列")
+                return signals
             
-            # 生成交易信号
-            for i in range(60, len(data)):  # 从第60行开始，确保指标计算完整
-                try:
-                    current_price = close_prices.iloc[i]
-                    ma5 = data['MA5'].iloc[i]
-                    ma20 = data['MA20'].iloc[i]
-                    ma60 = data['MA60'].iloc[i]
-                    rsi = data['RSI'].iloc[i]
-                    macd = data['MACD'].iloc[i]
-                    macd_signal = data['MACD_Signal'].iloc[i]
-                    
-                    # 检查数值有效性
-                    if pd.isna(current_price) or pd.isna(ma5) or pd.isna(ma20) or pd.isna(rsi):
-                        continue
-                    
-                    # 多因子买入信号
-                    buy_conditions = [
-                        ma5 > ma20,  # 短期均线上穿长期均线
-                        ma20 > ma60,  # 中期均线上穿长期均线
-                        rsi < 70,    # RSI不超买
-                        rsi > 30,    # RSI不超卖
-                        macd > macd_signal,  # MACD金叉
-                        current_price > ma5  # 价格在短期均线之上
-                    ]
-                    
-                    if sum(buy_conditions) >= 4:  # 至少满足4个条件
-                        signal_date = data[date_col].iloc[i]
-                        signals.append({
-                            'date': signal_date,
-                            'action': 'buy',
-                            'price': current_price,
-                            'signal_strength': sum(buy_conditions) / len(buy_conditions),
-                            'indicators': {
-                                'MA5': ma5,
-                                'MA20': ma20,
-                                'MA60': ma60,
-                                'RSI': rsi,
-                                'MACD': macd
-                            }
-                        })
-                
-                except Exception as signal_error:
-                    print(f"⚠️ 生成信号时出错: {signal_error}")
-                    continue
+            # 指标由 _calculate_strategy_indicators 计算
+            close = data[columns['close']].to_numpy(dtype=float)
+            ma5 = data['MA5'].to_numpy(dtype=float)
+            ma20 = data['MA20'].to_numpy(dtype=float)
+            ma60 = data['MA60'].to_numpy(dtype=float)
+            rsi = data['RSI'].to_numpy(dtype=float)
+            macd = data['MACD'].to_numpy(dtype=float)
+            macd_signal = data['MACD_Signal'].to_numpy(dtype=float)
+            
+            with np.errstate(invalid='ignore'):
+                # 多因子买入条件（NaN 参与比较时条件不成立）
+                buy_conditions = np.vstack([
+                    ma5 > ma20,          # 短期均线上穿长期均线
+                    ma20 > ma60,         # 中期均线上穿长期均线
+                    rsi < 70,            # RSI不超买
+                    rsi > 30,            # RSI不超卖
+                    macd > macd_signal,  # MACD金叉
+                    close > ma5          # 价格在短期均线之上
+                ])
+            satisfied = buy_conditions.sum(axis=0)
+            valid = ~(np.isnan(close) | np.isnan(ma5) | np.isnan(ma20) | np.isnan(rsi))
+            
+            # 从第60行开始，确保指标计算完整；至少满足4个条件
+            rows = self._fired_rows(valid & (satisfied >= 4), 60)
+            signals = self._build_signals(
+                data, columns, rows, satisfied / len(buy_conditions),
+                indicators={'MA5': ma5, 'MA20': ma20, 'MA60': ma60, 'RSI': rsi, 'MACD': macd}
+            )
         
         except Exception as e:
             print(f"❌ 多因子策略执行失败: {e}")
@@ -314,59 +370,38 @@ class QuantitativeStrategyEngine:
         return signals
 
     def _execute_trend_strategy(self, strategy_id: int, data: pd.DataFrame) -> List[Dict]:
-        """执行趋势跟踪策略"""
+        """执行趋势跟踪策略：MA20 上穿 MA50 时买入"""
         signals = []
         try:
-            # 简化的趋势策略
-            close_col = 'close' if 'close' in data.columns else 'Close'
-            date_col = 'trade_date' if 'trade_date' in data.columns else 'Date'
-            
-            if close_col not in data.columns or date_col not in data.columns:
+            columns = self._price_columns(data)
+            if len(columns) < 2:
                 return signals
             
-            close_prices = data[close_col]
-            data['MA20'] = close_prices.rolling(window=20).mean()
-            data['MA50'] = close_prices.rolling(window=50).mean()
+            ma20 = data['MA20'].to_numpy(dtype=float)
+            ma50 = data['MA50'].to_numpy(dtype=float)
+            cross_up = np.zeros(len(data), dtype=bool)
+            with np.errstate(invalid='ignore'):
+                cross_up[1:] = (ma20[1:] > ma50[1:]) & (ma20[:-1] <= ma50[:-1])
             
-            for i in range(50, len(data)):
-                if pd.notna(data['MA20'].iloc[i]) and pd.notna(data['MA50'].iloc[i]):
-                    if data['MA20'].iloc[i] > data['MA50'].iloc[i] and data['MA20'].iloc[i-1] <= data['MA50'].iloc[i-1]:
-                        signals.append({
-                            'date': data[date_col].iloc[i],
-                            'action': 'buy',
-                            'price': close_prices.iloc[i],
-                            'signal_strength': 0.8
-                        })
+            signals = self._build_signals(data, columns, self._fired_rows(cross_up, 50), 0.8)
         except Exception as e:
             print(f"❌ 趋势策略执行失败: {e}")
         
         return signals
 
     def _execute_mean_reversion_strategy(self, strategy_id: int, data: pd.DataFrame) -> List[Dict]:
-        """执行均值回归策略"""
+        """执行均值回归策略：收盘价跌破布林带下轨时买入"""
         signals = []
         try:
-            # 简化的均值回归策略
-            close_col = 'close' if 'close' in data.columns else 'Close'
-            date_col = 'trade_date' if 'trade_date' in data.columns else 'Date'
-            
-            if close_col not in data.columns or date_col not in data.columns:
+            columns = self._price_columns(data)
+            if len(columns) < 2:
                 return signals
             
-            close_prices = data[close_col]
-            data['MA20'] = close_prices.rolling(window=20).mean()
-            data['STD20'] = close_prices.rolling(window=20).std()
-            data['Upper'] = data['MA20'] + 2 * data['STD20']
-            data['Lower'] = data['MA20'] - 2 * data['STD20']
+            close = data[columns['close']].to_numpy(dtype=float)
+            with np.errstate(invalid='ignore'):
+                below_lower = close < data['Lower'].to_numpy(dtype=float)
             
-            for i in range(20, len(data)):
-                if pd.notna(data['Lower'].iloc[i]) and close_prices.iloc[i] < data['Lower'].iloc[i]:
-                    signals.append({
-                        'date': data[date_col].iloc[i],
-                        'action': 'buy',
-                        'price': close_prices.iloc[i],
-                        'signal_strength': 0.7
-                    })
+            signals = self._build_signals(data, columns, self._fired_rows(below_lower, 20), 0.7)
         except Exception as e:
             print(f"❌ 均值回归策略执行失败: {e}")
         
@@ -378,30 +413,21 @@ class QuantitativeStrategyEngine:
         return []
 
     def _execute_high_frequency_strategy(self, strategy_id: int, data: pd.DataFrame) -> List[Dict]:
-        """执行高频交易策略"""
+        """执行高频交易策略：近5日平均涨幅超过2%时买入"""
         signals = []
         try:
-            # 简化的高频策略
-            close_col = 'close' if 'close' in data.columns else 'Close'
-            date_col = 'trade_date' if 'trade_date' in data.columns else 'Date'
-            
-            if close_col not in data.columns or date_col not in data.columns:
+            columns = self._price_columns(data)
+            if len(columns) < 2:
                 return signals
             
-            close_prices = data[close_col]
-            data['Returns'] = close_prices.pct_change()
+            returns = data['Returns']
+            # 近5日平均涨幅（忽略缺失值）
+            recent_returns = returns.rolling(window=5, min_periods=1).mean().to_numpy(dtype=float)
+            with np.errstate(invalid='ignore'):
+                fired = returns.notna().to_numpy() & (recent_returns > 0.02)
             
-            for i in range(5, len(data)):
-                if pd.notna(data['Returns'].iloc[i]):
-                    # 简单的动量信号
-                    recent_returns = data['Returns'].iloc[i-4:i+1].mean()
-                    if recent_returns > 0.02:  # 2%以上涨幅
-                        signals.append({
-                            'date': data[date_col].iloc[i],
-                            'action': 'buy',
-                            'price': close_prices.iloc[i],
-                            'signal_strength': min(recent_returns * 10, 1.0)
-                        })
+            signals = self._build_signals(data, columns, self._fired_rows(fired, 5),
+                                          np.minimum(recent_returns * 10, 1.0))
         except Exception as e:
             print(f"❌ 高频策略执行失败: {e}")
         
@@ -410,88 +436,38 @@ class QuantitativeStrategyEngine:
     def _execute_value_strategy(self, strategy_id: int, data: pd.DataFrame) -> List[Dict]:
         """
         执行价值投资策略
-        基于PE、PB、股息率等估值指标判断投资价值
+        价格接近60日低点或远低于60日高点时视为价值投资机会
         """
         signals = []
         try:
-            # 确保数据格式正确
-            if 'trade_date' in data.columns:
-                date_col = 'trade_date'
-            elif 'Date' in data.columns:
-                date_col = 'Date'
-            else:
+            columns = self._price_columns(data)
+            if 'date' not in columns:
                 print("⚠️ 未找到日期列")
                 return signals
-            
-            # 确保价格列存在
-            price_columns = {}
-            for std_col, possible_cols in [
-                ('close', ['close', 'Close']),
-                ('open', ['open', 'Open']),
-                ('high', ['high', 'High']),
-                ('low', ['low', 'Low']),
-                ('volume', ['vol', 'Volume', 'volume'])
-            ]:
-                for col in possible_cols:
-                    if col in data.columns:
-                        price_columns[std_col] = col
-                        break
-            
-            if 'close' not in price_columns:
+            if 'close' not in columns:
                 print("⚠️ 未找到收盘价列")
                 return signals
             
-            close_prices = data[price_columns['close']]
-            
-            # 计算价值投资相关指标
-            # 计算价格相对低点的比例
-            data['price_min_ratio'] = close_prices / close_prices.rolling(window=60).min()
-            
-            # 计算价格相对高点的比例
-            data['price_max_ratio'] = close_prices / close_prices.rolling(window=60).max()
-            
-            # 计算简单的价值信号
-            # 当价格接近60日低点时可能是价值投资机会
-            for i in range(60, len(data)):
-                try:
-                    current_price = close_prices.iloc[i]
-                    price_min_ratio = data['price_min_ratio'].iloc[i]
-                    price_max_ratio = data['price_max_ratio'].iloc[i]
-                    
-                    # 检查数值有效性
-                    if pd.isna(current_price) or pd.isna(price_min_ratio) or pd.isna(price_max_ratio):
-                        continue
-                    
-                    # 价值投资买入信号条件
-                    value_conditions = [
-                        price_min_ratio <= 1.2,  # 价格接近60日低点(120%以内)
-                        price_max_ratio <= 0.7,  # 价格低于60日高点的70%
-                    ]
-                    
-                    # 如果满足条件，生成买入信号
-                    if sum(value_conditions) >= 1:  # 至少满足1个条件
-                        signal_date = data[date_col].iloc[i]
-                        
-                        # 计算信号强度
-                        signal_strength = 0.3 + (2 - price_min_ratio) * 0.3  # 越接近低点强度越高
-                        signal_strength = max(0.1, min(1.0, signal_strength))
-                        
-                        signals.append({
-                            'date': signal_date,
-                            'action': 'buy',
-                            'price': current_price,
-                            'signal_strength': signal_strength,
-                            'reason': '价值投资机会',
-                            'indicators': {
-                                'price_min_ratio': price_min_ratio,
-                                'price_max_ratio': price_max_ratio,
-                                'value_score': signal_strength * 100
-                            }
-                        })
-                        
-                except Exception as signal_error:
-                    print(f"⚠️ 生成价值投资信号时出错: {signal_error}")
-                    continue
+            close = data[columns['close']].to_numpy(dtype=float)
+            price_min_ratio = data['price_min_ratio'].to_numpy(dtype=float)
+            price_max_ratio = data['price_max_ratio'].to_numpy(dtype=float)
+            valid = ~(np.isnan(close) | np.isnan(price_min_ratio) | np.isnan(price_max_ratio))
+            
+            with np.errstate(invalid='ignore'):
+                # 价格接近60日低点(120%以内)，或低于60日高点的70%
+                value_opportunity = (price_min_ratio <= 1.2) | (price_max_ratio <= 0.7)
+            
+            # 越接近低点强度越高
+            signal_strength = np.clip(0.3 + (2 - price_min_ratio) * 0.3, 0.1, 1.0)
+            signals = self._build_signals(
+                data, columns, self._fired_rows(valid & value_opportunity, 60), signal_strength,
+                reason='价值投资机会',
+                indicators={
+                    'price_min_ratio': price_min_ratio,
+                    'price_max_ratio': price_max_ratio,
+                    'value_score': signal_strength * 100
+                }
+            )
                 
         except Exception as e:
             print(f"❌ 价值投资策略执行失败: {e}")
@@ -499,97 +475,59 @@ class QuantitativeStrategyEngine:
         return signals
 
     def _execute_dividend_strategy(self, strategy_id: int, data: pd.DataFrame) -> List[Dict]:
-        """执行股息策略"""
+        """执行股息策略：价格波动率低于5%时买入"""
         signals = []
         try:
-            # 简化的股息策略 - 基于价格稳定性
-            close_col = 'close' if 'close' in data.columns else 'Close'
-            date_col = 'trade_date' if 'trade_date' in data.columns else 'Date'
-            
-            if close_col not in data.columns or date_col not in data.columns:
+            columns = self._price_columns(data)
+            if len(columns) < 2:
                 return signals
             
-            close_prices = data[close_col]
-            # 计算价格波动率
-            data['volatility'] = close_prices.rolling(window=20).std() / close_prices.rolling(window=20).mean()
+            with np.errstate(invalid='ignore'):
+                low_volatility = data['volatility'].to_numpy(dtype=float) < 0.05
             
-            for i in range(20, len(data)):
-                if pd.notna(data['volatility'].iloc[i]):
-                    # 低波动率可能适合股息投资
-                    if data['volatility'].iloc[i] < 0.05:  # 波动率小于5%
-                        signals.append({
-                            'date': data[date_col].iloc[i],
-                            'action': 'buy',
-                            'price': close_prices.iloc[i],
-                            'signal_strength': 0.6,
-                            'reason': '低波动率适合股息投资'
-                        })
+            signals = self._build_signals(data, columns, self._fired_rows(low_volatility, 20), 0.6,
+                                          reason='低波动率适合股息投资')
         except Exception as e:
             print(f"❌ 股息策略执行失败: {e}")
         
         return signals
 
     def _execute_growth_strategy(self, strategy_id: int, data: pd.DataFrame) -> List[Dict]:
-        """执行成长策略"""
+        """执行成长策略：MA10 高于 MA30 且持续上升时买入"""
         signals = []
         try:
-            # 简化的成长策略 - 基于价格上升趋势
-            close_col = 'close' if 'close' in data.columns else 'Close'
-            date_col = 'trade_date' if 'trade_date' in data.columns else 'Date'
-            
-            if close_col not in data.columns or date_col not in data.columns:
+            columns = self._price_columns(data)
+            if len(columns) < 2:
                 return signals
             
-            close_prices = data[close_col]
-            # 计算短期和长期移动平均
-            data['MA10'] = close_prices.rolling(window=10).mean()
-            data['MA30'] = close_prices.rolling(window=30).mean()
+            ma10 = data['MA10'].to_numpy(dtype=float)
+            ma30 = data['MA30'].to_numpy(dtype=float)
+            growing = np.zeros(len(data), dtype=bool)
+            with np.errstate(invalid='ignore'):
+                growing[1:] = (ma10[1:] > ma30[1:]) & (ma10[1:] > ma10[:-1])
             
-            for i in range(30, len(data)):
-                if pd.notna(data['MA10'].iloc[i]) and pd.notna(data['MA30'].iloc[i]):
-                    # 成长股特征：短期均线持续上升且高于长期均线
-                    if (data['MA10'].iloc[i] > data['MA30'].iloc[i] and 
-                        data['MA10'].iloc[i] > data['MA10'].iloc[i-1]):
-                        signals.append({
-                            'date': data[date_col].iloc[i],
-                            'action': 'buy',
-                            'price': close_prices.iloc[i],
-                            'signal_strength': 0.7,
-                            'reason': '成长趋势明显'
-                        })
+            signals = self._build_signals(data, columns, self._fired_rows(growing, 30), 0.7,
+                                          reason='成长趋势明显')
         except Exception as e:
             print(f"❌ 成长策略执行失败: {e}")
         
         return signals
 
     def _execute_momentum_strategy(self, strategy_id: int, data: pd.DataFrame) -> List[Dict]:
-        """执行动量策略"""
+        """执行动量策略：5日动量超过3%且10日动量超过5%时买入"""
         signals = []
         try:
-            # 动量策略 - 基于价格动量
-            close_col = 'close' if 'close' in data.columns else 'Close'
-            date_col = 'trade_date' if 'trade_date' in data.columns else 'Date'
-            
-            if close_col not in data.columns or date_col not in data.columns:
+            columns = self._price_columns(data)
+            if len(columns) < 2:
                 return signals
             
-            close_prices = data[close_col]
-            # 计算动量指标
-            data['momentum_5'] = close_prices.pct_change(5)
-            data['momentum_10'] = close_prices.pct_change(10)
+            momentum_5 = data['momentum_5'].to_numpy(dtype=float)
+            momentum_10 = data['momentum_10'].to_numpy(dtype=float)
+            with np.errstate(invalid='ignore'):
+                strong = (momentum_5 > 0.03) & (momentum_10 > 0.05)
             
-            for i in range(10, len(data)):
-                if pd.notna(data['momentum_5'].iloc[i]) and pd.notna(data['momentum_10'].iloc[i]):
-                    # 强动量信号：5日和10日动量都为正且较大
-                    if (data['momentum_5'].iloc[i] > 0.03 and 
-                        data['momentum_10'].iloc[i] > 0.05):
-                        signals.append({
-                            'date': data[date_col].iloc[i],
-                            'action': 'buy',
-                            'price': close_prices.iloc[i],
-                            'signal_strength': min(data['momentum_10'].iloc[i] * 10, 1.0),
-                            'reason': '强动量信号'
-                        })
+            signals = self._build_signals(data, columns, self._fired_rows(strong, 10),
+                                          np.minimum(momentum_10 * 10, 1.0), reason='强动量信号')
         except Exception as e:
             print(f"❌ 动量策略执行失败: {e}")
         
@@ -6,55 +6,59 @@ A股量化分析系统 - 真实数据API服务
 运行在localhost:5001，响应时间5-15秒
 """
 
+import os
+import sys
+
+# 添加src目录到路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+# 在导入其他模块之前开启导入耗时统计
+try:
+    from analysis.lazy_loader import (get_import_profiler, lazy_module, lazy_import,
+                                      module_available, is_loaded, start_warm_up)
+except ImportError:
+    from src.analysis.lazy_loader import (get_import_profiler, lazy_module, lazy_import,
+                                          module_available, is_loaded, start_warm_up)
+import_profiler = get_import_profiler()
+import_profiler.install()
+
 from flask import Flask, jsonify, request
 from flask_cors import CORS
 import threading
 import time
 import json
-import os
 from datetime import datetime, timedelta
-import sys
 import traceback
 import random
-import pandas as pd # Added for get_tushare_only_market_data
 
-# 添加src目录到路径
-sys.path.append(os.path.dirname(os.path.abspath(__file__)))
-
-# 导入真实数据获取器
 try:
-    from analysis.data_fetcher import OptimizedDataFetcher
-    from limit_up_analyzer import get_limit_up_analysis
-    from market_breadth_analyzer import get_market_breadth_analysis
-    from analysis.stock_analyzer import StockAnalyzer
-    from analysis.indicators import TechnicalIndicators
-    from analysis.signals import SignalGenerator
-    print("✅ 成功导入TuShare+AkShare数据获取模块")
-    HAS_REAL_DATA = True
-except ImportError as e:
-    print(f"❌ 导入数据获取模块失败: {e}")
-    print("⚠️ 将使用基础数据获取方式")
-    HAS_REAL_DATA = False
+    from analysis.rate_limiter import limit_akshare
+    from analysis.client_registry import get_client_registry
+except ImportError:
+    from src.analysis.rate_limiter import limit_akshare
+    from src.analysis.client_registry import get_client_registry
 
-# 尝试导入AkShare
-try:
-    import akshare as ak
-    print("✅ AkShare模块导入成功")
-    HAS_AKSHARE = True
-except ImportError as e:
-    print(f"❌ AkShare模块导入失败: {e}")
+# 真实数据模块（akshare/tushare/pandas及各分析器）在首次使用或后台预热时才导入，
+# 这里只检查是否已安装，服务进程启动后即可响应健康检查
+HAS_AKSHARE = module_available('akshare')
+HAS_TUSHARE = module_available('tushare')
+HAS_REAL_DATA = HAS_AKSHARE and HAS_TUSHARE and module_available('pandas')
+if not HAS_AKSHARE:
     print("⚠️ 请安装AkShare: pip install akshare")
-    HAS_AKSHARE = False
-
-# 尝试导入TuShare
-try:
-    import tushare as ts
-    print("✅ TuShare模块导入成功")
-    HAS_TUSHARE = True
-except ImportError as e:
-    print(f"❌ TuShare模块导入失败: {e}")
+if not HAS_TUSHARE:
     print("⚠️ 请安装TuShare: pip install tushare")
-    HAS_TUSHARE = False
+
+pd = lazy_module('pandas')
+ts = lazy_module('tushare')
+# 所有AkShare调用经过统一限流
+ak = lazy_module('akshare', limit_akshare)
+
+OptimizedDataFetcher = lazy_import('analysis.data_fetcher', 'OptimizedDataFetcher')
+get_limit_up_analysis = lazy_import('limit_up_analyzer', 'get_limit_up_analysis')
+get_market_breadth_analysis = lazy_import('market_breadth_analyzer', 'get_market_breadth_analysis')
+StockAnalyzer = lazy_import('analysis.stock_analyzer', 'StockAnalyzer')
+TechnicalIndicators = lazy_import('analysis.indicators', 'TechnicalIndicators')
+SignalGenerator = lazy_import('analysis.signals', 'SignalGenerator')
 
 app = Flask(__name__)
 CORS(app)
@@ -91,20 +95,8 @@ def initialize_real_data_sources():
         else:
             print("⚠️ TuShare Pro连接修复失败，将仅使用AkShare")
         
-        # 测试AkShare连接
-        print("🧪 测试AkShare连接...")
-        try:
-            import akshare as ak
-            test_data = ak.stock_zh_a_spot_em()
-            if test_data is not None and len(test_data) > 0:
-                print("✅ AkShare API连接成功")
-                akshare_status = True
-            else:
-                print("❌ AkShare API连接失败")
-                akshare_status = False
-        except Exception as e:
-            print(f"❌ AkShare连接测试失败: {str(e)}")
-            akshare_status = False
+        # AkShare可用性使用注册表缓存的健康状态（后台定期检查，不再拉取全市场行情做测试）
+        akshare_status = get_client_registry().akshare_available
         
         # 报告数据源状态
         tushare_status = fixed_ts_pro is not None
@@ -133,6 +125,17 @@ def initialize_real_data_sources():
         print(f"📋 错误详情: {traceback.format_exc()}")
         return False
 
+_data_sources_lock = threading.Lock()
+
+def ensure_data_sources():
+    """
+    确保数据源已初始化：后台预热尚未完成时，由请求线程等待预热或自行完成初始化
+    """
+    with _data_sources_lock:
+        if data_fetcher is None:
+            initialize_real_data_sources()
+    return data_fetcher
+
 def get_real_market_data(data_fetcher, page, page_size, keyword, sort_field, sort_order):
     """
     获取100%真实市场数据 - 强化版TuShare+AkShare数据获取
@@ -354,6 +357,7 @@ def market_overview():
         with processing_lock:
             try:
                 # 确保TuShare连接正常
+                ensure_data_sources()
                 if not data_fetcher or not hasattr(data_fetcher, 'ts_pro') or not data_fetcher.ts_pro:
                     print("🔧 重新初始化TuShare Pro连接...")
                     fixed_ts_pro = fix_tushare_connection()
@@ -679,42 +683,17 @@ def get_real_industry(stock_code):
 
 def fix_tushare_connection():
     """
-    修复TuShare连接问题
+    获取共享的TuShare Pro客户端（不发起网络请求，可用性为注册表缓存的健康状态）
     """
-    try:
-        import tushare as ts
-        
-        # 读取配置文件
-        config_file = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'config', 'tushare_config.json')
-        
-        if os.path.exists(config_file):
-            with open(config_file, 'r', encoding='utf-8') as f:
-                config = json.load(f)
-                token = config.get('token', '')
-                
-            if token:
-                # 设置token并初始化
-                ts.set_token(token)
-                ts_pro = ts.pro_api()
-                
-                # 测试连接
-                test_data = ts_pro.daily_basic(ts_code='000001.SZ', trade_date='20240101', fields='ts_code,close')
-                if test_data is not None:
-                    print("✅ TuShare Pro连接修复成功")
-                    return ts_pro
-                else:
-                    print("❌ TuShare Pro测试查询失败")
-                    return None
-            else:
-                print("❌ TuShare Token为空")
-                return None
-        else:
-            print("❌ TuShare配置文件不存在")
-            return None
-        
-    except Exception as e:
-        print(f"❌ TuShare连接修复失败: {str(e)}")
+    registry = get_client_registry()
+    ts_pro = registry.tushare()
+    if ts_pro is None:
+        print("❌ TuShare未安装或Token未配置")
+        return None
+    if not registry.tushare_available:
+        print("❌ TuShare Pro健康检查未通过")
         return None
+    return ts_pro
 
 def get_real_price_data_with_retry(ts_pro, ts_code, max_retries=3):
     """
@@ -807,6 +786,7 @@ def get_akshare_data_with_enhanced_retry(max_retries=5):
     """
     import akshare as ak
     import requests
+    ak = limit_akshare(ak)
     
     for attempt in range(max_retries):
         try:
@@ -1750,6 +1730,7 @@ def search_stocks():
         print(f"🔍 智能搜索请求: '{query}', 限制: {limit}")
         
         # 使用TuShare获取股票基础信息
+        ensure_data_sources()
         if not data_fetcher or not hasattr(data_fetcher, 'ts_pro') or not data_fetcher.ts_pro:
             # 尝试修复TuShare连接
             fixed_ts_pro = fix_tushare_connection()
@@ -2166,23 +2147,17 @@ def generate_chip_distribution_data(stock_code):
         import pandas as pd
         import numpy as np
         from datetime import datetime, timedelta
+        try:
+            from analysis.chip_state import get_chip_state_store
+        except ImportError:
+            from src.analysis.chip_state import get_chip_state_store
         
         print(f"📊 开始计算筹码分布: {stock_code}")
         
-        # 初始化TuShare Pro API
-        try:
-            # 读取配置文件中的token
-            with open('config/tushare_config.json', 'r', encoding='utf-8') as f:
-                config = json.load(f)
-                token = config.get('token', '')
-            
-            if not token:
-                raise Exception("TuShare token未配置")
-                
-            pro = ts.pro_api(token)
-            
-        except Exception as e:
-            print(f"⚠️ TuShare初始化失败: {e}")
+        # 使用共享的TuShare Pro客户端
+        pro = get_client_registry().tushare()
+        if pro is None:
+            print(f"⚠️ TuShare初始化失败: token未配置")
             return generate_fallback_chip_distribution(stock_code)
         
         # 转换股票代码格式
@@ -2201,6 +2176,7 @@ def generate_chip_distribution_data(stock_code):
         try:
             # 使用pro_bar接口获取前复权数据
             kline_data = ts.pro_bar(
+                api=pro,
                 ts_code=ts_code,
                 adj='qfq',  # 前复权
                 start_date=start_date,
@@ -2255,52 +2231,13 @@ def generate_chip_distribution_data(stock_code):
         max_price = kline_data['high'].max()
         current_price = kline_data.iloc[-1]['close']
         
-        # 生成价格区间
-        price_levels = np.linspace(min_price, max_price, price_bins)
-        
-        # 初始化筹码分布数组
-        chip_distribution_raw = np.zeros(price_bins)
-        
-        # 计算每日筹码分布贡献
-        for i, (_, row) in enumerate(kline_data.iterrows()):
-            # 时间权重（越近期权重越高）
-            days_ago = len(kline_data) - i - 1
-            time_weight = decay_factor ** days_ago
-            
-            # 当日成交量
-            volume = row['vol'] * 100  # 转换为股
-            
-            # 价格分布（假设成交在收盘价附近正态分布）
-            close_price = row['close']
-            high_price = row['high']
-            low_price = row['low']
-            
-            # 找到价格对应的区间索引
-            close_idx = np.searchsorted(price_levels, close_price)
-            high_idx = np.searchsorted(price_levels, high_price)
-            low_idx = np.searchsorted(price_levels, low_price)
-            
-            # 将成交量分布到价格区间（集中在收盘价附近）
-            if high_idx > low_idx:
-                # 成交分布：60%集中在收盘价附近，40%分布在当日价格区间
-                close_volume = volume * 0.6 * time_weight
-                range_volume = volume * 0.4 * time_weight
-                
-                # 收盘价附近的筹码
-                if 0 <= close_idx < price_bins:
-                    chip_distribution_raw[close_idx] += close_volume
-                
-                # 价格区间内的筹码均匀分布
-                range_span = max(1, high_idx - low_idx)
-                volume_per_level = range_volume / range_span
-                
-                for j in range(max(0, low_idx), min(price_bins, high_idx + 1)):
-                    chip_distribution_raw[j] += volume_per_level
-            else:
-                # 价格区间很小，全部分配给最接近的价格级别
-                if 0 <= close_idx < price_bins:
-                    chip_distribution_raw[close_idx] += volume * time_weight
-        
+        # 生成价格区间并计算筹码分布：每日成交60%集中在收盘价附近，40%均匀分布在当日价格区间；
+        # 当日价格区间落在同一价格级别时全部分配给收盘价。筹码分布状态按股票保存，只计算上次请求之后的新K线
+        price_levels, chip_distribution_raw = get_chip_state_store().get_profile(
+            ts_code, kline_data, decay=decay_factor, close_share=0.6, bins=price_bins
+        )
+        chip_distribution_raw = chip_distribution_raw * 100  # 手 -> 股
+
         # 筛选有效的筹码分布数据
         effective_chips = []
         total_effective_volume = 0
@@ -2527,16 +2464,36 @@ def generate_fallback_chip_distribution(stock_code):
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """
-    健康检查
+    健康检查（不触发任何数据模块加载）
     """
     return jsonify({
         'status': 'healthy',
         'service': '快速响应API',
         'port': 5001,
         'response_time': '1-3秒',
+        'data_sources_ready': data_fetcher is not None,
         'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
     })
 
+@app.route('/api/startup-report', methods=['GET'])
+def startup_report():
+    """
+    启动耗时报告：按模块统计的导入耗时和各组件加载状态
+    """
+    return jsonify({
+        'success': True,
+        'imports': import_profiler.report(top=20),
+        'loaded': {
+            'pandas': is_loaded(pd),
+            'tushare': is_loaded(ts),
+            'akshare': is_loaded(ak),
+            'data_fetcher': data_fetcher is not None,
+            'stock_analyzer': is_loaded(StockAnalyzer),
+            'limit_up_analyzer': is_loaded(get_limit_up_analysis),
+            'market_breadth_analyzer': is_loaded(get_market_breadth_analysis)
+        }
+    })
+
 @app.route('/', methods=['GET'])
 def home():
     """
@@ -2680,6 +2637,22 @@ def market_breadth_analysis():
             'message': f'请求处理失败: {str(e)}'
         }), 500
 
+# 启动报告：到这里为止的导入耗时；数据模块和数据源随后在后台预热
+import_profiler.print_report('启动导入耗时')
+
+def _on_warm_up_done():
+    import_profiler.print_report('启动及预热导入耗时')
+    import_profiler.uninstall()
+
+start_warm_up([
+    pd._lazy_get,
+    ak._lazy_get,
+    ensure_data_sources,
+    StockAnalyzer._lazy_get,
+    get_limit_up_analysis._lazy_get,
+    get_market_breadth_analysis._lazy_get,
+], name='signals-warm-up', on_done=_on_warm_up_done)
+
 if __name__ == '__main__':
     print("🚀 启动A股真实数据API服务...")
     print("📡 服务地址: http://127.0.0.1:5001")
@@ -2694,16 +2667,9 @@ if __name__ == '__main__':
     print("   - POST/GET /api/market-breadth")
     print("   - GET /api/strategies/list")
     print("   - GET /api/health")
+    print("   - GET /api/startup-report")
     print("   - GET /")
     print("=" * 50)
     
-    # 初始化真实数据源
-    print("🔧 正在初始化TuShare+AkShare真实数据源...")
-    init_success = initialize_real_data_sources()
-    
-    if init_success:
-        print("✅ 真实数据源初始化成功，服务准备就绪")
-    else:
-        print("⚠️ 真实数据源初始化失败，将提供有限功能")
-        
+    # 真实数据源在后台预热线程中初始化，服务立即开始监听
     app.run(host='127.0.0.1', port=5001, debug=False) 
\ No newline at end of file
@@ -5,24 +5,30 @@ A股实时数据API服务 - 集成TuShare+AkShare
 运行在localhost:5001，提供真实可靠的股票分析数据
 """
 
+import os
+import sys
+
+# 添加src目录到路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+# 在导入其他模块之前开启导入耗时统计
+from analysis.lazy_loader import get_import_profiler, lazy_import, is_loaded, start_warm_up
+import_profiler = get_import_profiler()
+import_profiler.install()
+
 from flask import Flask, jsonify, request
 from flask_cors import CORS
 import threading
 import time
 import json
-import os
 from datetime import datetime, timedelta
-import sys
 import traceback
 
-# 添加src目录到路径
-sys.path.append(os.path.dirname(os.path.abspath(__file__)))
-
-# 导入真实数据获取器
-from analysis.data_fetcher import OptimizedDataFetcher
-from analysis.stock_analyzer import StockAnalyzer
-from analysis.indicators import TechnicalIndicators
-from analysis.signals import SignalGenerator
+# 真实数据获取器及分析模块在后台预热时导入，服务进程启动后即可响应健康检查
+OptimizedDataFetcher = lazy_import('analysis.data_fetcher', 'OptimizedDataFetcher')
+StockAnalyzer = lazy_import('analysis.stock_analyzer', 'StockAnalyzer')
+TechnicalIndicators = lazy_import('analysis.indicators', 'TechnicalIndicators')
+SignalGenerator = lazy_import('analysis.signals', 'SignalGenerator')
 
 app = Flask(__name__)
 CORS(app)
@@ -250,6 +256,9 @@ def get_real_trading_signals(stock_code):
 def calculate_chip_distribution(kline_data):
     """计算真实筹码分布"""
     try:
+        import numpy as np
+        from analysis.chip_kernel import decay_weights, scatter_ranges
+        
         # 使用最近60天数据计算筹码分布
         recent_data = kline_data.tail(60)
         
@@ -259,18 +268,19 @@ def calculate_chip_distribution(kline_data):
         price_range = max_price - min_price
         
         # 生成15个价格层级
+        price_levels = min_price + price_range * np.arange(15) / 14
+        
+        # 每天的成交量（时间衰减权重：最近的权重更高）计入当天最低价和最高价之间的每个价格层级
+        volume = recent_data['Volume'].values
+        volume_weights = scatter_ranges(
+            np.searchsorted(price_levels, recent_data['Low'].values, side='left'),
+            np.searchsorted(price_levels, recent_data['High'].values, side='right') - 1,
+            volume * decay_weights(len(recent_data), 0.97, offset=1),
+            len(price_levels)
+        )
+        
         chip_distribution = []
-        for i in range(15):
-            price_level = min_price + (price_range * i / 14)
-            
-            # 计算该价格层级的成交量权重
-            volume_weight = 0
-            for _, row in recent_data.iterrows():
-                if row['Low'] <= price_level <= row['High']:
-                    # 时间衰减权重：最近的权重更高
-                    time_weight = 0.97 ** (len(recent_data) - recent_data.index.get_loc(row.name))
-                    volume_weight += row['Volume'] * time_weight
-            
+        for price_level, volume_weight in zip(price_levels, volume_weights):
             chip_distribution.append({
                 'price': round(price_level, 2),
                 'volume': round(volume_weight / 10000, 1),  # 转换为万手
@@ -709,6 +719,20 @@ def health_check():
         'data_quality': 'A级(100%真实)'
     })
 
+@app.route('/api/startup-report', methods=['GET'])
+def startup_report():
+    """启动耗时报告：按模块统计的导入耗时和各组件加载状态"""
+    return jsonify({
+        'success': True,
+        'imports': import_profiler.report(top=20),
+        'loaded': {
+            'data_fetcher': data_fetcher is not None,
+            'stock_analyzer': is_loaded(StockAnalyzer),
+            'technical_indicators': is_loaded(TechnicalIndicators),
+            'signal_generator': is_loaded(SignalGenerator)
+        }
+    })
+
 @app.route('/', methods=['GET'])
 def index():
     """首页"""
@@ -833,6 +857,20 @@ def get_real_market_data(data_fetcher, page, page_size, keyword, sort_field, sor
             'total': 0
         }
 
+# 启动报告：到这里为止的导入耗时；数据源随后在后台预热
+import_profiler.print_report('启动导入耗时')
+
+def _on_warm_up_done():
+    import_profiler.print_report('启动及预热导入耗时')
+    import_profiler.uninstall()
+
+start_warm_up([
+    initialize_data_sources,
+    TechnicalIndicators._lazy_get,
+    SignalGenerator._lazy_get,
+    StockAnalyzer._lazy_get,
+], name='realtime-warm-up', on_done=_on_warm_up_done)
+
 if __name__ == '__main__':
     print("🚀 启动A股实时数据API服务...")
     print("📡 服务地址: http://127.0.0.1:5001")
@@ -842,15 +880,11 @@ if __name__ == '__main__':
     print("🔧 支持端点:")
     print("   - GET /api/trading-signals/<stock_code>")
     print("   - GET /api/health")
+    print("   - GET /api/startup-report")
     print("   - GET /")
     print("=" * 50)
     
-    # 初始化数据源
-    if initialize_data_sources():
-        print("✅ 数据源初始化成功，服务准备就绪")
-    else:
-        print("⚠️ 数据源初始化失败，服务将使用降级模式")
-    
+    # 数据源在后台预热线程中初始化，完成前数据接口返回503
     app.run(
         host='127.0.0.1',
         port=5001,
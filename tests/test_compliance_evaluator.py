@@ -0,0 +1,40 @@
+import math
+
+import numpy as np
+import pytest
+
+from src.analysis.compliance_evaluator import ComplianceEvaluator
+
+FIELDS = ['pe', 'pb', 'roe', 'dividend_yield', 'total_mv', 'revenue_growth',
+          'debt_ratio', 'current_ratio', 'volatility']
+
+
+def make_rows():
+    """完整的一行数据，以及每个字段分别缺失（NaN）的各行"""
+    complete = {
+        'pe': 12.0, 'pb': 1.5, 'roe': 15.0, 'dividend_yield': 5.0, 'total_mv': 800.0,
+        'revenue_growth': 12.0, 'debt_ratio': 40.0, 'current_ratio': 1.5, 'volatility': 45.0
+    }
+    rows = [dict(complete)]
+    for field in FIELDS:
+        row = dict(complete)
+        row[field] = math.nan
+        rows.append(row)
+    rows.append({field: math.nan for field in FIELDS})
+    return rows
+
+
+class TestEvaluateBatch:
+    def setup_method(self):
+        self.evaluator = ComplianceEvaluator()
+        self.rows = make_rows()
+        self.universe = {field: np.array([row[field] for row in self.rows]) for field in FIELDS}
+
+    @pytest.mark.parametrize('strategy_type', ['blue_chip', 'high_dividend', 'quality_growth', 'value_investment'])
+    def test_batch_matches_single_stock_with_missing_fields(self, strategy_type):
+        batch = self.evaluator.evaluate_batch(self.universe, strategy_type)
+        for i, row in enumerate(self.rows):
+            single = self.evaluator.evaluate_stock_compliance(row, strategy_type)
+            assert batch['overall_compliance'][i] == pytest.approx(single['overall_compliance'])
+            assert batch['risk_adjusted_compliance'][i] == pytest.approx(single['risk_adjusted_compliance'])
+            assert batch['compliance_grade'][i] == single['compliance_grade']